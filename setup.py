@@ -63,6 +63,7 @@ setup(
     install_requires=INSTALL_REQUIRES,
     dependency_links=DEPENDENCY_LINKS,
     python_requires=">=3.6",
+    entry_points={"console_scripts": ["rhodes = rhodes.cli:main"]},
     classifiers=[
         "Development Status :: 3 - Alpha",
         "Intended Audience :: Developers",
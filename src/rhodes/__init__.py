@@ -1,4 +1,5 @@
 """Tools to create AWS Step Functions state machines."""
 __version__ = "0.5.4"
 
+from .differences import diff
 from .states import StateMachine
@@ -0,0 +1,200 @@
+"""Internal helpers for indexing and rewiring the transition graph of a state machine."""
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from rhodes.states import Choice, Map, Parallel, State, StateMachine
+from rhodes.states._lazy import LazyStates
+
+__all__ = (
+    "GraphIndex",
+    "state_transitions",
+    "machine_transitions",
+    "retarget_state",
+    "nested_machines",
+    "iter_machines",
+    "task_resource",
+)
+
+
+def _catchers(state: State) -> List:
+    catchers = getattr(state, "Catch", None)
+    if not isinstance(catchers, (list, tuple)):
+        return []
+
+    return [catcher for catcher in catchers if isinstance(catcher, dict) and "Next" in catcher]
+
+
+def state_transitions(state: State) -> Iterator[Tuple[str, str]]:
+    """Yield every outgoing transition of ``state`` as ``(field, target)`` pairs.
+
+    ``field`` identifies where the reference lives: ``Next``, ``Default``,
+    ``Choices[N]``, or ``Catch[N]``.
+    """
+    next_state = getattr(state, "Next", None)
+    if next_state is not None:
+        yield "Next", next_state
+
+    if isinstance(state, Choice):
+        for pos, rule in enumerate(state.Choices):
+            if rule.Next is not None:
+                yield f"Choices[{pos}]", rule.Next
+
+        if state.Default is not None:
+            yield "Default", state.Default
+
+    for pos, catcher in enumerate(_catchers(state)):
+        yield f"Catch[{pos}]", catcher["Next"]
+
+
+def machine_transitions(machine: StateMachine, title: str) -> List[Tuple[str, str]]:
+    """List the outgoing transitions of a state in ``machine`` without building lazily loaded states."""
+    states = machine.States
+    if isinstance(states, LazyStates) and not states.is_materialized(title):
+        return states.transitions(title)
+
+    return list(state_transitions(states[title]))
+
+
+def retarget_state(state: State, old: str, new: str):
+    """Replace every transition from ``state`` to ``old`` with a transition to ``new``."""
+    if getattr(state, "Next", None) == old:
+        state.Next = new
+
+    if isinstance(state, Choice):
+        for rule in state.Choices:
+            if rule.Next == old:
+                rule.Next = new
+
+        if state.Default == old:
+            state.Default = new
+
+    catchers = getattr(state, "Catch", None)
+    if any(catcher["Next"] == old for catcher in _catchers(state)):
+        # Catchers are plain data and might be shared between states, so never modify them in place.
+        state.Catch = [
+            dict(catcher, Next=new) if isinstance(catcher, dict) and catcher.get("Next") == old else catcher
+            for catcher in catchers
+        ]
+
+
+def nested_machines(state: State) -> List[StateMachine]:
+    """List the state machines nested directly inside ``state``."""
+    if isinstance(state, Parallel):
+        return list(state.Branches)
+
+    if isinstance(state, Map) and state.processor is not None:
+        return [state.processor]
+
+    return []
+
+
+def iter_machines(machine: StateMachine) -> Iterator[StateMachine]:
+    """Yield ``machine`` and every state machine nested inside it, innermost first."""
+    for state in machine.States.values():
+        for child in nested_machines(state):
+            yield from iter_machines(child)
+
+    yield machine
+
+
+def task_resource(state: State) -> Any:
+    """Find the ``Resource`` of a Task state or service integration helper."""
+    build_task = getattr(state, "_build_task", None)
+    if build_task is not None:
+        # Service integration helpers only know their resource once they are built.
+        return build_task().Resource
+    return state.Resource
+
+
+class GraphIndex:
+    """Adjacency index over the states of a single (non-nested) state machine.
+
+    The index is built once from the state objects,
+    so graph queries never need to serialize states.
+    States that were loaded lazily are indexed from their raw definitions without building them.
+    Any rewiring must go through :meth:`rewire` and :meth:`remove`
+    to keep the index consistent with the state machine.
+
+    :param StateMachine machine: State machine to index
+    """
+
+    def __init__(self, machine: StateMachine):
+        self.machine = machine
+        self.successors: Dict[str, List[Tuple[str, str]]] = OrderedDict()
+        self.predecessors: Dict[str, List[str]] = {title: [] for title in machine.States}
+
+        for title in machine.States:
+            self._index_state(title)
+
+    def _index_state(self, title: str):
+        edges = machine_transitions(self.machine, title)
+        self.successors[title] = edges
+        for _field, target in edges:
+            self.predecessors.setdefault(target, []).append(title)
+
+    def _unindex_state(self, title: str):
+        for _field, target in self.successors.pop(title, []):
+            if target in self.predecessors:
+                self.predecessors[target].remove(title)
+
+    def reindex(self, title: str):
+        """Refresh the outgoing edges of a state after it was modified or replaced."""
+        self._unindex_state(title)
+        self.predecessors.setdefault(title, [])
+        self._index_state(title)
+
+    def incoming(self, title: str) -> int:
+        """Count the references to a state, including ``StartAt``."""
+        count = len(self.predecessors.get(title, []))
+        if self.machine.StartAt == title:
+            count += 1
+        return count
+
+    def targets(self, title: str) -> List[str]:
+        """List the distinct states that ``title`` can transition to, in definition order."""
+        seen: List[str] = []
+        for _field, target in self.successors.get(title, []):
+            if target not in seen:
+                seen.append(target)
+        return seen
+
+    def reachable(self, start: Optional[str] = None) -> List[str]:
+        """List all states reachable from ``start`` (default: ``StartAt``) in breadth-first order."""
+        start = self.machine.StartAt if start is None else start
+        if start not in self.machine.States:
+            return []
+
+        order = [start]
+        seen = {start}
+        for title in order:
+            for target in self.targets(title):
+                if target not in seen and target in self.machine.States:
+                    seen.add(target)
+                    order.append(target)
+        return order
+
+    def rewire(self, old: str, new: str):
+        """Point every reference to ``old`` at ``new`` instead."""
+        for title in set(self.predecessors.get(old, [])):
+            retarget_state(self.machine.States[title], old, new)
+            self.reindex(title)
+
+        if self.machine.StartAt == old:
+            self.machine.StartAt = new
+
+    def replace(self, title: str, new_state: State):
+        """Replace the state stored under ``title``, keeping its position in the definition."""
+        new_state.member_of = self.machine
+        self.machine.States[title] = new_state
+        self.reindex(title)
+
+    def remove(self, title: str):
+        """Remove a state that is no longer referenced."""
+        self._unindex_state(title)
+        del self.machine.States[title]
+        self.predecessors.pop(title, None)
+
+    def referencing_states(self, title: str) -> Iterable[State]:
+        """Iterate over the distinct states that reference ``title``."""
+        for source in OrderedDict.fromkeys(self.predecessors.get(title, [])):
+            yield self.machine.States[source]
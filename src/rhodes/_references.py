@@ -0,0 +1,63 @@
+"""Internal helpers for the ``Fn::Sub`` resource references in serialized definitions."""
+import json
+import re
+from typing import Any, Dict
+
+from troposphere import GetAtt, Ref
+
+from rhodes._util import short_name
+
+__all__ = ("REFERENCE", "ReferenceExtractor", "compact_size", "reference_value", "resolved_size")
+
+#: Same syntax as ``Fn::Sub`` variables, which excludes escaped ``${!Literal}`` values.
+REFERENCE = re.compile(r"\$\{([^!}][^}]*)\}")
+_PLACEHOLDER_PREFIX = "r"
+
+
+def compact_size(value: Any) -> int:
+    """Calculate the size of a value serialized as compact JSON, in bytes."""
+    return len(json.dumps(value, separators=(",", ":")).encode("utf-8"))
+
+
+def resolved_size(text: str, reference_bytes: int) -> int:
+    """Calculate the size of text once ``Fn::Sub`` resolves every reference in it,
+    if each reference resolves to ``reference_bytes`` bytes.
+    """
+    size = len(text.encode("utf-8"))
+    for match in REFERENCE.finditer(text):
+        size += reference_bytes - len(match.group(0).encode("utf-8"))
+    return size
+
+
+def reference_value(reference: str):
+    """Build the ``troposphere`` value that ``Fn::Sub`` resolves a ``${...}`` reference to."""
+    if "." in reference:
+        resource, _, attribute = reference.partition(".")
+        return GetAtt(resource, attribute)
+    return Ref(reference)
+
+
+class ReferenceExtractor:
+    """Replace references with placeholders, giving the same reference the same placeholder every time."""
+
+    def __init__(self):
+        self.placeholders: Dict[str, str] = {}
+        # References replaced since this was last reset, in the order that they were first seen.
+        self.used: Dict[str, str] = {}
+
+    def _placeholder(self, match) -> str:
+        reference = match.group(1)
+        if reference not in self.placeholders:
+            self.placeholders[reference] = _PLACEHOLDER_PREFIX + short_name(len(self.placeholders))
+        self.used.setdefault(reference, self.placeholders[reference])
+        return f"${{{self.placeholders[reference]}}}"
+
+    def value(self, value: Any) -> Any:
+        """Replace the references in a serialized value."""
+        if isinstance(value, str):
+            return REFERENCE.sub(self._placeholder, value)
+        if isinstance(value, dict):
+            return {self.value(key): self.value(member) for key, member in value.items()}
+        if isinstance(value, list):
+            return [self.value(member) for member in value]
+        return value
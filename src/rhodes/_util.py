@@ -1,12 +1,32 @@
 """General internal utilities."""
+import os
+import string
+import tempfile
+import threading
+from contextlib import contextmanager
 from functools import partial
-from typing import Any, Callable, Optional, Type, TypeVar
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, Type, TypeVar
 
 import attr
 
 from .exceptions import InvalidDefinitionError
 
-__all__ = ("RequiredValue", "require_field", "RHODES_ATTRIB", "docstring_with_param")
+__all__ = (
+    "RequiredValue",
+    "require_field",
+    "RHODES_ATTRIB",
+    "docstring_with_param",
+    "instance_lock",
+    "member_lock",
+    "unlocked_state",
+    "atomic_write",
+    "short_name",
+)
+
+_LOCK_ATTRIBUTE = "_rhodes_lock"
+_LOCK_GUARD = threading.Lock()
+_ALPHABET = string.ascii_letters + string.digits
 
 
 @attr.s(auto_attribs=True)
@@ -19,21 +39,92 @@ class RequiredValue:
 
     field_name: str
     error_message: str
+    #: Determine whether a value is set (default: any truthy value)
+    is_set: Callable[[Any], bool] = bool
 
 
-def require_field(*, instance: Any, required_value: RequiredValue, validator: Callable[[Any], bool] = bool):
+def require_field(*, instance: Any, required_value: RequiredValue, validator: Optional[Callable[[Any], bool]] = None):
     """Verify that a required field contains a valid value."""
     # TODO: The validator here is incorrect.
     #  I need to pull the validator for the attribute from the instance class.
     if not hasattr(instance, required_value.field_name):
         raise InvalidDefinitionError(f"Field {required_value.field_name!r} missing.")
 
+    if validator is None:
+        validator = required_value.is_set
+
     if not validator(getattr(instance, required_value.field_name)):
         raise InvalidDefinitionError(required_value.error_message)
 
 
 RHODES_ATTRIB = partial(attr.ib, default=None, kw_only=True)
 
+
+def instance_lock(instance: Any) -> threading.RLock:
+    """Get the lock that serializes changes to an object that is being built, creating it on first use.
+
+    The lock is stored directly in the instance ``__dict__`` so that creating it never triggers validation.
+    """
+    lock = instance.__dict__.get(_LOCK_ATTRIBUTE)
+    if lock is None:
+        with _LOCK_GUARD:
+            lock = instance.__dict__.setdefault(_LOCK_ATTRIBUTE, threading.RLock())
+    return lock
+
+
+@contextmanager
+def member_lock(instance: Any) -> Iterator[None]:
+    """Hold the lock of the state machine that an object belongs to, and then the lock of the object.
+
+    Locks are always taken from the outside in:
+    a state machine, then the ``States`` mapping of a lazily loaded state machine, then a state in it.
+    Code that holds the lock of a state must never take the lock of the state machine that contains it;
+    use this instead of :func:`instance_lock` when changing a state also changes its state machine.
+    """
+    machine = instance.member_of
+    if machine is None:
+        with instance_lock(instance):
+            yield
+        return
+
+    with instance_lock(machine), instance_lock(instance):
+        yield
+
+
+def unlocked_state(instance: Any) -> Dict[str, Any]:
+    """Collect the attributes of an object for copying or pickling, without its lock.
+
+    Locks cannot be copied or pickled; copies create a new lock on first use.
+    """
+    return {name: value for name, value in instance.__dict__.items() if name != _LOCK_ATTRIBUTE}
+
+
+def short_name(position: int) -> str:
+    """Build the ``position``-th shortest name made of ASCII letters and digits (``a``, ``b``, ..., ``aa``, ...)."""
+    name = _ALPHABET[position % len(_ALPHABET)]
+    position //= len(_ALPHABET)
+    while position:
+        position -= 1
+        name = _ALPHABET[position % len(_ALPHABET)] + name
+        position //= len(_ALPHABET)
+    return name
+
+
+def atomic_write(path: Path, data: bytes):
+    """Write a file by writing a temporary file next to it and then moving that into place,
+    so that readers never see a partially written file.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=str(path.parent), prefix=f".{path.name}.", delete=False) as temporary:
+        temporary.write(data)
+
+    try:
+        os.replace(temporary.name, str(path))
+    except OSError:
+        os.unlink(temporary.name)
+        raise
+
+
 TypeMirror = TypeVar("TypeMirror", bound=Type[Any])
 
 
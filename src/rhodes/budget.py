@@ -0,0 +1,239 @@
+"""
+Predict the execution history events that a state machine will record.
+
+Standard workflow executions fail once their history reaches 25,000 events.
+Every state records a fixed set of events each time it runs,
+but a ``Map`` state records events for every item in its input array,
+so an inline ``Map`` with a multi-state ``Iterator`` can reach the limit quickly.
+A distributed ``Map`` state runs each iteration as a child execution with its own history,
+so it records the same few events however many items it processes.
+
+:func:`predict_history` counts the events for the longest path through a state machine
+for a given number of items in each ``Map`` state,
+and reports the largest number of items that each inline ``Map`` state can process
+before the execution would exceed the limit.
+
+.. code-block:: python
+
+    prediction = predict_history(workflow, items={"Process Records": 1000})
+
+    prediction.total
+    prediction.events["MapIterationStarted"]
+    prediction.max_items["Process Records"]
+
+Each state is counted once per execution unless ``visits`` says otherwise,
+and transitions that loop back to an earlier state are not followed.
+Use ``visits`` to account for loops and retries.
+"""
+from collections import Counter
+from typing import Dict, List, Optional
+
+import attr
+
+from rhodes._graph import nested_machines, state_transitions, task_resource
+from rhodes.states import Choice, Fail, Map, Parallel, Pass, State, StateMachine, Succeed, Task, Wait
+
+__all__ = ("MAX_HISTORY_EVENTS", "HistoryPrediction", "predict_history", "state_events")
+
+MAX_HISTORY_EVENTS = 25000
+
+_EXECUTION_EVENTS = ("ExecutionStarted", "ExecutionSucceeded")
+_SIMPLE_STATE_EVENTS = {
+    Pass: ("PassStateEntered", "PassStateExited"),
+    Wait: ("WaitStateEntered", "WaitStateExited"),
+    Choice: ("ChoiceStateEntered", "ChoiceStateExited"),
+    Succeed: ("SucceedStateEntered", "SucceedStateExited"),
+    # A Fail state ends the execution without an exit event.
+    Fail: ("FailStateEntered",),
+}
+_PARALLEL_EVENTS = ("ParallelStateEntered", "ParallelStateStarted", "ParallelStateSucceeded", "ParallelStateExited")
+_MAP_EVENTS = ("MapStateEntered", "MapStateStarted", "MapStateSucceeded", "MapStateExited")
+_MAP_ITERATION_EVENTS = ("MapIterationStarted", "MapIterationSucceeded")
+_DISTRIBUTED_MAP_EVENTS = ("MapStateEntered", "MapRunStarted", "MapRunSucceeded", "MapStateExited")
+_TASK_EVENTS = ("TaskStateEntered", "TaskStateExited")
+_LAMBDA_EVENTS = ("LambdaFunctionScheduled", "LambdaFunctionStarted", "LambdaFunctionSucceeded")
+_ACTIVITY_EVENTS = ("ActivityScheduled", "ActivityStarted", "ActivitySucceeded")
+_SERVICE_EVENTS = ("TaskScheduled", "TaskStarted", "TaskSucceeded")
+# Service integrations that wait for a job or a callback also record a "TaskSubmitted" event.
+_WAITING_SUFFIXES = (".sync", ".sync:2", ".waitForTaskToken")
+
+
+@attr.s
+class HistoryPrediction:
+    """Predicted execution history for a state machine.
+
+    :param int total: Total number of history events
+    :param dict events: Number of history events of each event type
+    :param dict max_items: Largest number of items that each inline ``Map`` state can process within ``limit``
+    :param int limit: Maximum number of history events for one execution
+    """
+
+    total: int = attr.ib()
+    events: Dict[str, int] = attr.ib(factory=dict)
+    max_items: Dict[str, int] = attr.ib(factory=dict)
+    limit: int = attr.ib(default=MAX_HISTORY_EVENTS)
+
+    @property
+    def within_limit(self) -> bool:
+        """Determine whether the execution stays within ``limit``."""
+        return self.total <= self.limit
+
+    @property
+    def headroom(self) -> int:
+        """Number of events that remain before the execution reaches ``limit``."""
+        return self.limit - self.total
+
+
+def _task_events(state: Task) -> List[str]:
+    resource = task_resource(state)
+    if not isinstance(resource, str):
+        # Intrinsic functions almost always refer to a Lambda function.
+        return list(_LAMBDA_EVENTS)
+
+    if resource.startswith("arn:aws:states:::"):
+        events = list(_SERVICE_EVENTS)
+        if resource.endswith(_WAITING_SUFFIXES):
+            events.insert(2, "TaskSubmitted")
+        return events
+
+    if ":activity:" in resource:
+        return list(_ACTIVITY_EVENTS)
+
+    return list(_LAMBDA_EVENTS)
+
+
+def _scaled(events: Counter, factor: int) -> Counter:
+    return Counter({name: count * factor for name, count in events.items()})
+
+
+def _total(events: Counter) -> int:
+    return sum(events.values())
+
+
+class _Predictor:
+    def __init__(self, items: Dict[str, int], visits: Dict[str, int]):
+        self.items = items
+        self.visits = visits
+
+    def state(self, state: State) -> Counter:
+        """Count the events for a single visit to ``state``, including any nested states."""
+        for state_type, names in _SIMPLE_STATE_EVENTS.items():
+            if isinstance(state, state_type):
+                return Counter(names)
+
+        if isinstance(state, Parallel):
+            events = Counter(_PARALLEL_EVENTS)
+            for branch in state.Branches:
+                events += self.machine(branch)
+            return events
+
+        if isinstance(state, Map) and state.distributed:
+            return Counter(_DISTRIBUTED_MAP_EVENTS)
+
+        if isinstance(state, Map):
+            iteration = Counter(_MAP_ITERATION_EVENTS)
+            for iterator in nested_machines(state):
+                iteration += self.machine(iterator)
+            return Counter(_MAP_EVENTS) + _scaled(iteration, self.items.get(state.title, 1))
+
+        # Task and every service integration helper
+        return Counter(list(_TASK_EVENTS) + _task_events(state))
+
+    def machine(self, machine: StateMachine) -> Counter:
+        """Count the events for the path through ``machine`` that records the most events."""
+        if machine.StartAt not in machine.States:
+            return Counter()
+
+        def _targets(title: str) -> List[str]:
+            targets = [target for _field, target in state_transitions(machine.States[title])]
+            return [target for target in dict.fromkeys(targets) if target in machine.States]
+
+        # Depth-first post-order walk that ignores transitions back to a state that is still being walked.
+        best: Dict[str, Counter] = {}
+        active = {machine.StartAt}
+        stack = [(machine.StartAt, iter(_targets(machine.StartAt)))]
+        while stack:
+            title, remaining = stack[-1]
+            for target in remaining:
+                if target not in best and target not in active:
+                    active.add(target)
+                    stack.append((target, iter(_targets(target))))
+                    break
+            else:
+                stack.pop()
+                active.discard(title)
+                visit = _scaled(self.state(machine.States[title]), self.visits.get(title, 1))
+                following = [best[target] for target in _targets(title) if target in best]
+                best[title] = visit + max(following, key=_total, default=Counter())
+
+        return best[machine.StartAt]
+
+    def execution(self, machine: StateMachine) -> Counter:
+        return Counter(_EXECUTION_EVENTS) + self.machine(machine)
+
+
+def _map_states(machine: StateMachine) -> List[Map]:
+    maps = []
+    for state in machine.States.values():
+        if isinstance(state, Map) and state.distributed:
+            # Child executions record their own histories.
+            continue
+        if isinstance(state, Map):
+            maps.append(state)
+        for child in nested_machines(state):
+            maps.extend(_map_states(child))
+    return maps
+
+
+def _max_items(machine: StateMachine, items: Dict[str, int], visits: Dict[str, int], title: str, limit: int) -> int:
+    def _fits(count: int) -> bool:
+        predictor = _Predictor(items=dict(items, **{title: count}), visits=visits)
+        return _total(predictor.execution(machine)) <= limit
+
+    if not _fits(0):
+        return 0
+
+    # Every item records at least two events, so no Map can process more than ``limit`` items.
+    low, high = 0, limit
+    while low < high:
+        middle = (low + high + 1) // 2
+        if _fits(middle):
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+
+def state_events(state: State, items: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+    """Count the history events recorded for a single visit to a state, including any nested states.
+
+    :param State state: State to count
+    :param dict items: Number of items processed by each ``Map`` state, by title (default: 1)
+    :return: Number of history events of each event type
+    """
+    return dict(_Predictor(items=items or {}, visits={}).state(state))
+
+
+def predict_history(
+    state_machine: StateMachine,
+    items: Optional[Dict[str, int]] = None,
+    *,
+    visits: Optional[Dict[str, int]] = None,
+    limit: int = MAX_HISTORY_EVENTS,
+) -> HistoryPrediction:
+    """Predict the execution history events for the longest path through a state machine.
+
+    :param StateMachine state_machine: State machine to predict
+    :param dict items: Number of items processed by each ``Map`` state, by title (default: 1)
+    :param dict visits: Number of times each state runs in one execution, by title (default: 1)
+    :param int limit: Maximum number of history events for one execution
+    """
+    items = items or {}
+    visits = visits or {}
+
+    events = _Predictor(items=items, visits=visits).execution(state_machine)
+    max_items = {
+        map_state.title: _max_items(state_machine, items, visits, map_state.title, limit)
+        for map_state in _map_states(state_machine)
+    }
+    return HistoryPrediction(total=_total(events), events=dict(events), max_items=max_items, limit=limit)
@@ -0,0 +1,228 @@
+"""
+Load and analyze many state machine definitions at once.
+
+:func:`load_directory` and :func:`analyze_directory` process every definition file in a directory
+across a pool of worker processes.
+
+Parsed state machines are cached on disk, keyed by a hash of the definition file contents,
+so later runs only parse the files that have changed.
+
+.. code-block:: python
+
+    results = analyze_directory("definitions/", summarize, cache_dir=".rhodes-cache")
+    for result in results:
+        if result.ok:
+            print(result.path, result.result["history_events"])
+
+The same analysis is available from the command line:
+
+.. code-block:: bash
+
+    rhodes analyze definitions/
+
+.. note::
+
+    Cached state machines are stored with :mod:`pickle`.
+    Only use a cache directory that you trust.
+"""
+import hashlib
+import os
+import pickle  # nosec
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import attr
+
+from rhodes import __version__
+from rhodes._graph import iter_machines
+from rhodes._util import atomic_write
+from rhodes.budget import predict_history
+from rhodes.loader import load_json
+from rhodes.states import StateMachine
+
+__all__ = (
+    "DefinitionResult",
+    "DefinitionCache",
+    "find_definitions",
+    "load_directory",
+    "analyze_directory",
+    "summarize",
+)
+
+# Increment when the cached representation of a state machine changes.
+_CACHE_FORMAT = 1
+DEFAULT_PATTERN = "**/*.json"
+
+PathType = Union[str, "os.PathLike[str]"]
+
+
+@attr.s
+class DefinitionResult:
+    """Result of processing one definition file.
+
+    :param str path: Path to the definition file
+    :param str digest: SHA-256 hash of the definition file contents (if the file could be read)
+    :param StateMachine state_machine: Loaded state machine (if requested and loaded successfully)
+    :param result: Result of the analysis (if requested and successful)
+    :param str error: Description of the error that prevented loading or analysis (if any)
+    :param bool cached: The state machine was loaded from the cache
+    """
+
+    path: str = attr.ib()
+    digest: Optional[str] = attr.ib()
+    state_machine: Optional[StateMachine] = attr.ib(default=None)
+    result: Any = attr.ib(default=None)
+    error: Optional[str] = attr.ib(default=None)
+    cached: bool = attr.ib(default=False)
+
+    @property
+    def ok(self) -> bool:
+        """Determine whether the definition was processed successfully."""
+        return self.error is None
+
+
+class DefinitionCache:
+    """On-disk cache of parsed state machines, keyed by definition content hash.
+
+    Entries are namespaced by rhodes version,
+    so upgrading rhodes never loads state machines that an older version cached.
+
+    :param directory: Directory to store cached state machines in
+    """
+
+    def __init__(self, directory: PathType):
+        self.directory = Path(directory) / f"v{_CACHE_FORMAT}-{__version__}"
+
+    def _path(self, digest: str) -> Path:
+        return self.directory / digest[:2] / f"{digest}.pickle"
+
+    def get(self, digest: str) -> Optional[StateMachine]:
+        """Load a cached state machine, or return ``None`` if it is not cached or cannot be read."""
+        try:
+            with self._path(digest).open("rb") as cached:
+                return pickle.load(cached)  # nosec
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            return None
+
+    def put(self, digest: str, state_machine: StateMachine):
+        """Cache a state machine.
+
+        Entries are written to a temporary file and then moved into place,
+        so concurrent workers never read a partial entry.
+        """
+        atomic_write(self._path(digest), pickle.dumps(state_machine, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def find_definitions(directory: PathType, pattern: str = DEFAULT_PATTERN) -> List[Path]:
+    """List the definition files in a directory, in a stable order.
+
+    :param directory: Directory to search
+    :param str pattern: Glob pattern, relative to ``directory``, that definition files match
+    """
+    return sorted(path for path in Path(directory).glob(pattern) if path.is_file())
+
+
+def summarize(state_machine: StateMachine) -> Dict[str, Any]:
+    """Default analysis: count the states and predict the execution history events for a state machine."""
+    prediction = predict_history(state_machine)
+    return {
+        "states": sum(len(machine.States) for machine in iter_machines(state_machine)),
+        "history_events": prediction.total,
+        "max_map_items": prediction.max_items,
+    }
+
+
+def _process(
+    path: Path, *, cache_dir: Optional[str], analysis: Optional[Callable[[StateMachine], Any]], keep: bool
+) -> DefinitionResult:
+    digest = None
+    cached = False
+    try:
+        content = path.read_bytes()
+        digest = hashlib.sha256(content).hexdigest()
+        cache = None if cache_dir is None else DefinitionCache(cache_dir)
+
+        state_machine = None if cache is None else cache.get(digest)
+        cached = state_machine is not None
+        if state_machine is None:
+            state_machine = load_json(content)
+            if cache is not None:
+                cache.put(digest, state_machine)
+
+        result = None if analysis is None else analysis(state_machine)
+    except Exception as error:  # pylint: disable=broad-except
+        # One bad definition must not stop the rest of the run.
+        return DefinitionResult(path=str(path), digest=digest, error=f"{type(error).__name__}: {error}", cached=cached)
+
+    return DefinitionResult(
+        path=str(path), digest=digest, state_machine=state_machine if keep else None, result=result, cached=cached
+    )
+
+
+def _run(paths: List[Path], workers: Optional[int], **kwargs) -> List[DefinitionResult]:
+    process = partial(_process, **kwargs)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or len(paths) <= 1:
+        return [process(path) for path in paths]
+
+    # Larger chunks amortize the inter-process overhead; several chunks per worker keep the load balanced.
+    chunksize = max(1, len(paths) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(process, paths, chunksize=chunksize))
+
+
+def load_directory(
+    directory: PathType,
+    *,
+    pattern: str = DEFAULT_PATTERN,
+    cache_dir: Optional[PathType] = None,
+    workers: Optional[int] = None,
+) -> List[DefinitionResult]:
+    """Load every definition file in a directory.
+
+    :param directory: Directory that contains definition files
+    :param str pattern: Glob pattern, relative to ``directory``, that definition files match
+    :param cache_dir: Directory to cache parsed state machines in (optional)
+    :param int workers: Number of worker processes (default: number of CPUs)
+    :return: One result for each definition file, in path order
+    """
+    return _run(
+        find_definitions(directory, pattern),
+        workers,
+        cache_dir=None if cache_dir is None else str(cache_dir),
+        analysis=None,
+        keep=True,
+    )
+
+
+def analyze_directory(
+    directory: PathType,
+    analysis: Callable[[StateMachine], Any] = summarize,
+    *,
+    pattern: str = DEFAULT_PATTERN,
+    cache_dir: Optional[PathType] = None,
+    workers: Optional[int] = None,
+) -> List[DefinitionResult]:
+    """Run an analysis on every definition file in a directory.
+
+    The analysis runs in the worker processes,
+    so it must be a module-level function and its result must be picklable.
+    Only the analysis results are returned, not the state machines.
+
+    :param directory: Directory that contains definition files
+    :param analysis: Callable that analyzes one state machine (default: :func:`summarize`)
+    :param str pattern: Glob pattern, relative to ``directory``, that definition files match
+    :param cache_dir: Directory to cache parsed state machines in (optional)
+    :param int workers: Number of worker processes (default: number of CPUs)
+    :return: One result for each definition file, in path order
+    """
+    return _run(
+        find_definitions(directory, pattern),
+        workers,
+        cache_dir=None if cache_dir is None else str(cache_dir),
+        analysis=analysis,
+        keep=False,
+    )
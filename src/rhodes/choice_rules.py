@@ -13,7 +13,7 @@ from typing import Any, Type
 import attr
 from attr.validators import instance_of, optional
 
-from rhodes._util import RHODES_ATTRIB, docstring_with_param
+from rhodes._util import RHODES_ATTRIB, docstring_with_param, member_lock
 from rhodes.exceptions import InvalidDefinitionError
 from rhodes.structures import JsonPath
 
@@ -245,12 +245,14 @@ class ChoiceRule:
         return self.Value
 
     def then(self, state):
-        if self.Next is not None:
-            raise InvalidDefinitionError(f"Choice rule already has a defined target")
+        # Rules are serialized by the Choice state that owns them, so they share its lock.
+        with member_lock(self.member_of):
+            if self.Next is not None:
+                raise InvalidDefinitionError(f"Choice rule already has a defined target")
 
-        self.member_of.member_of.add_state(state)
+            self.member_of.member_of.add_state(state)
 
-        self.Next = state.title
+            self.Next = state.title
 
         return state
 
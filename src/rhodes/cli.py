@@ -0,0 +1,167 @@
+"""
+Command line interface for rhodes.
+
+.. code-block:: bash
+
+    rhodes analyze definitions/ --workers 8
+    rhodes analyze definitions/ --format json --no-cache
+    rhodes build workflows billing.jobs:nightly -o out/
+    rhodes build workflows -o out/ --watch
+"""
+
+import argparse
+import json
+import os
+import sys
+from typing import List, Optional
+
+from rhodes.bulk import DEFAULT_PATTERN, DefinitionResult, analyze_directory
+from rhodes.farm import OUTPUT_FORMATS, BuildReport, build_all, discover
+from rhodes.incremental import build_incremental, watch
+
+__all__ = ("main",)
+
+
+def _default_cache_dir() -> str:
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(cache_home, "rhodes")
+
+
+def _text_line(result: DefinitionResult) -> str:
+    if not result.ok:
+        return f"{result.path}\tERROR\t{result.error}"
+
+    fields = "\t".join(f"{key}={value}" for key, value in result.result.items())
+    suffix = "\t(cached)" if result.cached else ""
+    return f"{result.path}\t{fields}{suffix}"
+
+
+def _json_line(result: DefinitionResult) -> str:
+    return json.dumps(
+        {
+            "path": result.path,
+            "digest": result.digest,
+            "result": result.result,
+            "error": result.error,
+            "cached": result.cached,
+        }
+    )
+
+
+def _analyze(namespace: argparse.Namespace) -> int:
+    results = analyze_directory(
+        namespace.directory,
+        pattern=namespace.pattern,
+        cache_dir=None if namespace.no_cache else namespace.cache_dir,
+        workers=namespace.workers,
+    )
+
+    format_line = _json_line if namespace.format == "json" else _text_line
+    for result in results:
+        sys.stdout.write(format_line(result) + "\n")
+
+    return 0 if all(result.ok for result in results) else 1
+
+
+def _write_report(report: BuildReport):
+    sys.stdout.write(report.summary() + "\n")
+    sys.stdout.flush()
+
+
+def _build(namespace: argparse.Namespace) -> int:
+    # Console scripts do not put the working directory on the import path, but builder targets are usually there.
+    if os.getcwd() not in sys.path:
+        sys.path.insert(0, os.getcwd())
+
+    if namespace.watch:
+        try:
+            watch(
+                namespace.targets,
+                namespace.output_dir,
+                cache_dir=namespace.cache_dir,
+                output_format=namespace.output_format,
+                workers=namespace.workers,
+                interval=namespace.interval,
+                on_report=_write_report,
+            )
+        except KeyboardInterrupt:
+            pass
+        return 0
+
+    builders = discover(*namespace.targets)
+    if namespace.no_cache:
+        report = build_all(
+            builders, namespace.output_dir, output_format=namespace.output_format, workers=namespace.workers
+        )
+    else:
+        report = build_incremental(
+            builders,
+            namespace.output_dir,
+            cache_dir=namespace.cache_dir,
+            output_format=namespace.output_format,
+            workers=namespace.workers,
+        )
+
+    _write_report(report)
+    return 0 if not report.failed else 1
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="rhodes", description="Tools for AWS Step Functions state machines.")
+    commands = parser.add_subparsers(dest="command", metavar="COMMAND")
+    commands.required = True
+
+    analyze = commands.add_parser("analyze", help="Load and analyze every definition file in a directory.")
+    analyze.add_argument("directory", help="Directory that contains definition files")
+    analyze.add_argument(
+        "--pattern", default=DEFAULT_PATTERN, help=f"Glob pattern for definition files (default: {DEFAULT_PATTERN})"
+    )
+    analyze.add_argument(
+        "--cache-dir", default=_default_cache_dir(), help="Directory to cache parsed state machines in"
+    )
+    analyze.add_argument("--no-cache", action="store_true", help="Do not read or write the cache")
+    analyze.add_argument("--workers", type=int, default=None, help="Number of worker processes (default: CPU count)")
+    analyze.add_argument("--format", choices=("text", "json"), default="text", help="Output format (default: text)")
+    analyze.set_defaults(handler=_analyze)
+
+    build = commands.add_parser("build", help="Render state machines from builder functions.")
+    build.add_argument(
+        "targets", nargs="+", metavar="TARGET", help="Builder (module:function), module, or package to build"
+    )
+    build.add_argument("-o", "--output-dir", required=True, help="Directory to write rendered definitions to")
+    build.add_argument(
+        "--output-format",
+        choices=sorted(OUTPUT_FORMATS),
+        default="definition",
+        help="What to render for each state machine (default: definition)",
+    )
+    build.add_argument(
+        "--cache-dir",
+        default=os.path.join(_default_cache_dir(), "builds"),
+        help="Directory to cache rendered definitions in",
+    )
+    build.add_argument(
+        "--no-cache", action="store_true", help="Run every builder, without reading or writing the cache"
+    )
+    build.add_argument("--workers", type=int, default=None, help="Number of worker processes (default: CPU count)")
+    build.add_argument("--watch", action="store_true", help="Build again every time a source file changes")
+    build.add_argument(
+        "--interval", type=float, default=1.0, help="Seconds between checks for changed files (default: 1.0)"
+    )
+    build.set_defaults(handler=_build)
+
+    return parser
+
+
+def main(args: Optional[List[str]] = None) -> int:
+    """Run the ``rhodes`` command.
+
+    :param list args: Command line arguments (default: ``sys.argv[1:]``)
+    :return: Exit code
+    """
+    namespace = _parser().parse_args(args)
+    return namespace.handler(namespace)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,348 @@
+"""
+Structural differences between two state machines.
+
+:func:`diff` compares states by title, so reordering states never shows up as a change.
+States that are the same object in both state machines are skipped without serializing them.
+Every other state is reduced to a structural hash of its serialized form,
+so states and nested state machines that did not change are skipped after a single comparison.
+Only the states whose hashes differ are inspected field by field,
+and the ``Branches``, ``Iterator``, and ``ItemProcessor`` state machines of changed ``Parallel`` and ``Map`` states
+are compared recursively.
+
+.. code-block:: python
+
+    changes = rhodes.diff(deployed, candidate)
+    if changes:
+        for change in changes:
+            print(change)
+
+States that were loaded lazily are hashed from their raw definitions,
+ignoring default values that raw definitions can omit, so that they hash the same as equivalent built states.
+They are only built if their hash differs.
+"""
+import hashlib
+import json
+from enum import Enum
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import attr
+
+from rhodes._graph import machine_transitions
+from rhodes.states import Map, Parallel, State, StateMachine
+from rhodes.states._lazy import LazyStates
+
+__all__ = ("ChangeType", "StateChange", "StateMachineDiff", "diff", "structural_hash")
+
+_MACHINE_FIELDS = ("Comment", "TimeoutSeconds", "Version")
+# Transitions are reported as rewiring and nested state machines are compared recursively,
+# so neither is compared as a plain field.
+_TRANSITION_FIELDS = ("Next", "Default")
+_NESTED_FIELDS = ("Branches", "Iterator", "ItemProcessor")
+# Raw definitions omit these when they are set to their default, ``$``.
+_PATH_FIELDS = ("InputPath", "OutputPath", "ResultPath")
+
+
+class ChangeType(Enum):
+    """Kinds of change between two state machines."""
+
+    ADDED = "added"
+    REMOVED = "removed"
+    MODIFIED = "modified"
+    REWIRED = "rewired"
+
+
+@attr.s(frozen=True)
+class StateChange:
+    """A single change between two state machines.
+
+    Changes to the state machine itself (``StartAt``, ``Comment``, ``TimeoutSeconds``, and ``Version``)
+    have no ``title``.
+
+    :param ChangeType kind: Kind of change
+    :param str title: Title of the changed state
+    :param tuple location: Titles and fields that lead to the nested state machine that contains the state
+        (ex: ``("Process", "Branches[1]")``; empty for the top-level state machine)
+    :param tuple fields: Fields that changed (``MODIFIED``) or the transition that changed (``REWIRED``)
+    :param str old: Previous transition target (``REWIRED`` only)
+    :param str new: New transition target (``REWIRED`` only)
+    """
+
+    kind: ChangeType = attr.ib()
+    title: Optional[str] = attr.ib(default=None)
+    location: Tuple[str, ...] = attr.ib(default=())
+    fields: Tuple[str, ...] = attr.ib(default=())
+    old: Optional[str] = attr.ib(default=None)
+    new: Optional[str] = attr.ib(default=None)
+
+    def __str__(self) -> str:
+        target = "/".join(self.location + ((self.title,) if self.title is not None else ()))
+        description = f"{self.kind.value} {target or '<state machine>'}"
+        if self.kind is ChangeType.REWIRED:
+            return f"{description} {self.fields[0]}: {self.old} -> {self.new}"
+        if self.fields:
+            return f"{description} ({', '.join(self.fields)})"
+        return description
+
+
+@attr.s
+class StateMachineDiff:
+    """All changes between two state machines.
+
+    :param list changes: Changes, in the order that they were found
+    """
+
+    changes: List[StateChange] = attr.ib(factory=list)
+
+    def __iter__(self) -> Iterator[StateChange]:
+        return iter(self.changes)
+
+    def __len__(self) -> int:
+        return len(self.changes)
+
+    def __bool__(self) -> bool:
+        return bool(self.changes)
+
+    def _of_kind(self, kind: ChangeType) -> List[StateChange]:
+        return [change for change in self.changes if change.kind is kind]
+
+    @property
+    def added(self) -> List[StateChange]:
+        """States that only exist in the new state machine."""
+        return self._of_kind(ChangeType.ADDED)
+
+    @property
+    def removed(self) -> List[StateChange]:
+        """States that only exist in the old state machine."""
+        return self._of_kind(ChangeType.REMOVED)
+
+    @property
+    def modified(self) -> List[StateChange]:
+        """States whose fields changed, other than transitions and nested state machines."""
+        return self._of_kind(ChangeType.MODIFIED)
+
+    @property
+    def rewired(self) -> List[StateChange]:
+        """Transitions that now lead to a different state."""
+        return self._of_kind(ChangeType.REWIRED)
+
+
+def _digest(body: Any) -> str:
+    canonical = json.dumps(body, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _normalized_rule(rule: Any) -> Any:
+    if not isinstance(rule, dict):
+        return rule
+    normalized = {}
+    for name, value in rule.items():
+        if name in ("And", "Or") and isinstance(value, list):
+            value = [_normalized_rule(inner) for inner in value]
+        elif name == "Not":
+            value = _normalized_rule(value)
+        elif name.startswith("Numeric") and not name.endswith("Path") and isinstance(value, int):
+            # Numeric comparison values are serialized as floats.
+            value = float(value)
+        normalized[name] = value
+    return normalized
+
+
+def _normalized_machine(body: Any) -> Any:
+    if not isinstance(body, dict) or not isinstance(body.get("States"), dict):
+        return body
+    return dict(body, States={title: _normalized_state(state) for title, state in body["States"].items()})
+
+
+def _normalized_state(body: Dict) -> Dict:
+    """Remove the differences between a raw state definition and the definition that the built state serializes to."""
+    normalized = {name: value for name, value in body.items() if not (name in _PATH_FIELDS and value == "$")}
+    if isinstance(normalized.get("Choices"), list):
+        normalized["Choices"] = [_normalized_rule(rule) for rule in normalized["Choices"]]
+    if isinstance(normalized.get("Branches"), list):
+        normalized["Branches"] = [_normalized_machine(branch) for branch in normalized["Branches"]]
+    for name in ("Iterator", "ItemProcessor"):
+        if name in normalized:
+            normalized[name] = _normalized_machine(normalized[name])
+    return normalized
+
+
+def _entry(machine: StateMachine, title: str) -> Any:
+    """Get a state, or its raw definition if it was loaded lazily and has not been built, without building it."""
+    states = machine.States
+    if isinstance(states, LazyStates):
+        return states._entries[title]  # pylint: disable=protected-access
+    return states[title]
+
+
+def structural_hash(value) -> str:
+    """Calculate a hash of the structure of a :class:`State` or :class:`StateMachine`.
+
+    Two states or state machines have the same hash if and only if they serialize to the same definition.
+
+    :param value: State or state machine to hash
+    """
+    return _digest(value.to_dict())
+
+
+def _without_transitions(body: Dict) -> Dict:
+    """Remove transitions and nested state machines from a serialized state."""
+    stripped = {name: value for name, value in body.items() if name not in _TRANSITION_FIELDS + _NESTED_FIELDS}
+    for name in ("Choices", "Catch"):
+        if isinstance(stripped.get(name), list):
+            stripped[name] = [
+                {key: value for key, value in item.items() if key != "Next"} if isinstance(item, dict) else item
+                for item in stripped[name]
+            ]
+    if isinstance(body.get("ItemProcessor"), dict) and "ProcessorConfig" in body["ItemProcessor"]:
+        # The processing mode is a setting of the Map state rather than part of its nested state machine.
+        stripped["ProcessorConfig"] = body["ItemProcessor"]["ProcessorConfig"]
+    return stripped
+
+
+def _changed_fields(old: Dict, new: Dict) -> Tuple[str, ...]:
+    old, new = _without_transitions(old), _without_transitions(new)
+    return tuple(name for name in sorted(set(old) | set(new)) if old.get(name) != new.get(name))
+
+
+# Serialized states of a state machine, by title, when they are already known.
+_Bodies = Optional[Dict[str, Dict]]
+
+
+class _Differ:
+    def __init__(self):
+        self.changes: List[StateChange] = []
+        self._bodies: Dict[int, Dict] = {}
+
+    def _body(self, machine: StateMachine, title: str, bodies: _Bodies, build: bool = False) -> Dict:
+        if bodies is not None:
+            return bodies[title]
+
+        entry = _entry(machine, title)
+        if isinstance(entry, dict) and not build:
+            return entry
+
+        state = machine.States[title]
+        key = id(state)
+        if key not in self._bodies:
+            self._bodies[key] = state.to_dict()
+        return self._bodies[key]
+
+    def _unchanged(
+        self, old: StateMachine, new: StateMachine, title: str, old_bodies: _Bodies, new_bodies: _Bodies
+    ) -> bool:
+        if old_bodies is None and new_bodies is None:
+            old_entry, new_entry = _entry(old, title), _entry(new, title)
+            # The same state, or the same raw definition, cannot have changed; there is nothing to serialize.
+            if old_entry is new_entry or (isinstance(old_entry, dict) and old_entry == new_entry):
+                return True
+
+        old_body = _normalized_state(self._body(old, title, old_bodies))
+        new_body = _normalized_state(self._body(new, title, new_bodies))
+        return _digest(old_body) == _digest(new_body)
+
+    def machine(
+        self,
+        old: StateMachine,
+        new: StateMachine,
+        location: Tuple[str, ...],
+        old_bodies: _Bodies = None,
+        new_bodies: _Bodies = None,
+    ):
+        if old.StartAt != new.StartAt:
+            self.changes.append(
+                StateChange(
+                    ChangeType.REWIRED, location=location, fields=("StartAt",), old=old.StartAt, new=new.StartAt
+                )
+            )
+
+        changed = tuple(name for name in _MACHINE_FIELDS if getattr(old, name) != getattr(new, name))
+        if changed:
+            self.changes.append(StateChange(ChangeType.MODIFIED, location=location, fields=changed))
+
+        for title in old.States:
+            if title not in new.States:
+                self.changes.append(StateChange(ChangeType.REMOVED, title=title, location=location))
+
+        for title in new.States:
+            if title not in old.States:
+                self.changes.append(StateChange(ChangeType.ADDED, title=title, location=location))
+            elif not self._unchanged(old, new, title, old_bodies, new_bodies):
+                self.state(old, new, title, location, old_bodies, new_bodies)
+
+    def state(
+        self,
+        old_machine: StateMachine,
+        new_machine: StateMachine,
+        title: str,
+        location: Tuple[str, ...],
+        old_bodies: _Bodies,
+        new_bodies: _Bodies,
+    ):
+        # Raw definitions can omit default values, so compare the serialized forms of the built states.
+        old_body = self._body(old_machine, title, old_bodies, build=True)
+        new_body = self._body(new_machine, title, new_bodies, build=True)
+
+        fields = _changed_fields(old_body, new_body)
+        if fields:
+            self.changes.append(StateChange(ChangeType.MODIFIED, title=title, location=location, fields=fields))
+
+        old_transitions = dict(machine_transitions(old_machine, title))
+        new_transitions = dict(machine_transitions(new_machine, title))
+        for field in list(old_transitions) + [name for name in new_transitions if name not in old_transitions]:
+            before, after = old_transitions.get(field), new_transitions.get(field)
+            if before != after:
+                self.changes.append(
+                    StateChange(
+                        ChangeType.REWIRED, title=title, location=location, fields=(field,), old=before, new=after
+                    )
+                )
+
+        if "Type" not in fields:
+            self.nested(old_machine.States[title], new_machine.States[title], old_body, new_body, location + (title,))
+
+    def nested(self, old: State, new: State, old_body: Dict, new_body: Dict, location: Tuple[str, ...]):
+        # The serialized bodies already contain the nested state machines,
+        # so nested state machines are compared using them rather than by serializing their states again.
+        if isinstance(old, Parallel) and isinstance(new, Parallel):
+            if len(old.Branches) != len(new.Branches):
+                self.changes.append(
+                    StateChange(ChangeType.MODIFIED, title=location[-1], location=location[:-1], fields=("Branches",))
+                )
+            for pos, (old_branch, new_branch) in enumerate(zip(old.Branches, new.Branches)):
+                old_branch_body, new_branch_body = old_body["Branches"][pos], new_body["Branches"][pos]
+                if old_branch_body != new_branch_body:
+                    self.machine(
+                        old_branch,
+                        new_branch,
+                        location + (f"Branches[{pos}]",),
+                        old_branch_body["States"],
+                        new_branch_body["States"],
+                    )
+
+        elif isinstance(old, Map) and isinstance(new, Map):
+            for field in ("Iterator", "ItemProcessor"):
+                old_machine, new_machine = getattr(old, field), getattr(new, field)
+                if (old_machine is None) != (new_machine is None):
+                    self.changes.append(
+                        StateChange(ChangeType.MODIFIED, title=location[-1], location=location[:-1], fields=(field,))
+                    )
+                elif old_machine is not None and old_body[field] != new_body[field]:
+                    self.machine(
+                        old_machine,
+                        new_machine,
+                        location + (field,),
+                        old_body[field]["States"],
+                        new_body[field]["States"],
+                    )
+
+
+def diff(old: StateMachine, new: StateMachine) -> StateMachineDiff:
+    """Find the structural differences between two state machines.
+
+    :param StateMachine old: Original state machine
+    :param StateMachine new: Changed state machine
+    :return: Added, removed, modified, and rewired states, including states in nested state machines
+    """
+    differ = _Differ()
+    differ.machine(old, new, ())
+    return StateMachineDiff(changes=differ.changes)
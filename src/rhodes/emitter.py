@@ -0,0 +1,196 @@
+"""
+Add many state machines to one CloudFormation template.
+
+:func:`emit_state_machines` adds an ``AWS::StepFunctions::StateMachine`` resource for each state machine
+in a single pass:
+
+* Every state machine shares one set of ``DefinitionSubstitutions`` placeholders,
+  so each resource reference (ex: a Lambda function that many state machines call)
+  is serialized once and every resource that uses it gets the same placeholder and the same value.
+* State machines with identical definitions share one serialized definition.
+  A state machine that is passed more than once is only serialized once.
+* The template is measured against the CloudFormation template limits once all resources are added.
+* Each definition is measured against the Step Functions definition size limit as it will be
+  once CloudFormation resolves its references.
+  The resolved values are not known until the stack is deployed,
+  so each reference is counted as ``reference_bytes`` long (default: the longest possible ARN).
+* The ``StateMachineType`` property is set from :attr:`StateMachine.StateMachineType`
+  unless it is passed as a property.
+
+.. code-block:: python
+
+    template = Template()
+    report = emit_state_machines(template, workflows, RoleArn=GetAtt(role, "Arn"))
+    if not report.within_limit:
+        raise RuntimeError(f"Template is {-report.headroom} bytes over the limit")
+
+Set ``substitutions=False`` to emit ``DefinitionString`` properties that match
+:meth:`StateMachine.definition_string` instead.
+"""
+import json
+from typing import Any, Dict, List, Mapping, Optional
+
+import attr
+from troposphere import Sub, Template, stepfunctions
+
+from rhodes._references import ReferenceExtractor, compact_size, reference_value, resolved_size
+from rhodes.partition import MAX_DEFINITION_BYTES
+from rhodes.states import StateMachine
+
+__all__ = (
+    "MAX_TEMPLATE_BYTES",
+    "MAX_RESOURCES",
+    "MAX_REFERENCE_BYTES",
+    "EmittedStateMachine",
+    "EmitReport",
+    "emit_state_machines",
+)
+
+#: Maximum size of a template that CloudFormation reads from S3.
+#: Templates passed directly in a request are limited to 51,200 bytes.
+MAX_TEMPLATE_BYTES = 1000000
+#: Maximum number of resources in one template.
+MAX_RESOURCES = 500
+#: Maximum length of an ARN, the longest value that a resource reference in a definition can resolve to.
+MAX_REFERENCE_BYTES = 2048
+
+
+@attr.s
+class EmittedStateMachine:
+    """State machine resource added by :func:`emit_state_machines`.
+
+    :param str title: Logical ID of the resource
+    :param resource: ``troposphere`` state machine resource
+    :param int definition_bytes: Size of the serialized definition once its references are resolved
+    :param str duplicate_of: Title of an earlier state machine with an identical definition (if any)
+    """
+
+    title: str = attr.ib()
+    resource: stepfunctions.StateMachine = attr.ib(repr=False)
+    definition_bytes: int = attr.ib()
+    duplicate_of: Optional[str] = attr.ib(default=None)
+
+
+@attr.s
+class EmitReport:
+    """Resources added by :func:`emit_state_machines` and the size of the resulting template.
+
+    :param list state_machines: State machine resources, in the order that they were given
+    :param int template_bytes: Size of the whole template, as compact JSON
+    :param int resources: Number of resources in the whole template
+    :param int limit: Maximum size of the template
+    """
+
+    state_machines: List[EmittedStateMachine] = attr.ib(factory=list)
+    template_bytes: int = attr.ib(default=0)
+    resources: int = attr.ib(default=0)
+    limit: int = attr.ib(default=MAX_TEMPLATE_BYTES)
+
+    @property
+    def headroom(self) -> int:
+        """Number of bytes that can be added before the template reaches ``limit``."""
+        return self.limit - self.template_bytes
+
+    @property
+    def oversized(self) -> List[EmittedStateMachine]:
+        """State machines whose definitions exceed the Step Functions definition size limit."""
+        return [emitted for emitted in self.state_machines if emitted.definition_bytes > MAX_DEFINITION_BYTES]
+
+    @property
+    def within_limit(self) -> bool:
+        """Determine whether the template and every definition are within CloudFormation and Step Functions limits."""
+        return self.template_bytes <= self.limit and self.resources <= MAX_RESOURCES and not self.oversized
+
+
+class _Emitter:
+    def __init__(self, substitutions: bool, reference_bytes: int):
+        self.substitutions = substitutions
+        self.reference_bytes = reference_bytes
+        self.extractor = ReferenceExtractor()
+        # Values are shared by every resource that uses the same placeholder.
+        self.values: Dict[str, Any] = {}
+        # Serialized definition text -> (first title, properties, size)
+        self.definitions: Dict[str, tuple] = {}
+        # id(state machine) -> serialized definition text
+        self.machines: Dict[int, str] = {}
+
+    def _substituted(self, definition: Dict):
+        self.extractor.used = {}
+        substituted = self.extractor.value(definition)
+        text = json.dumps(substituted, separators=(",", ":"))
+
+        properties: Dict[str, Any] = {"Definition": substituted}
+        if self.extractor.used:
+            for reference, placeholder in self.extractor.used.items():
+                if placeholder not in self.values:
+                    self.values[placeholder] = reference_value(reference)
+            properties["DefinitionSubstitutions"] = {
+                placeholder: self.values[placeholder] for placeholder in self.extractor.used.values()
+            }
+        return text, properties
+
+    def _definition(self, title: str, state_machine: StateMachine) -> str:
+        """Serialize a state machine once, sharing the result with every identical definition."""
+        text = self.machines.get(id(state_machine))
+        if text is not None:
+            return text
+
+        definition = state_machine.to_dict()
+        if self.substitutions:
+            text, properties = self._substituted(definition)
+        else:
+            text = json.dumps(definition)
+            properties = {"DefinitionString": Sub(text)}
+
+        if text not in self.definitions:
+            self.definitions[text] = (title, properties, resolved_size(text, self.reference_bytes))
+        self.machines[id(state_machine)] = text
+        return text
+
+    def emit(self, title: str, state_machine: StateMachine, properties: Mapping[str, Any]) -> EmittedStateMachine:
+        text = self._definition(title, state_machine)
+        first_title, definition_properties, size = self.definitions[text]
+
+        if state_machine.StateMachineType is not None and "StateMachineType" not in properties:
+            properties = dict(properties, StateMachineType=state_machine.StateMachineType.value)
+        resource = stepfunctions.StateMachine(title, **properties, **definition_properties)
+        return EmittedStateMachine(
+            title=title,
+            resource=resource,
+            definition_bytes=size,
+            duplicate_of=None if first_title == title else first_title,
+        )
+
+
+def emit_state_machines(
+    template: Template,
+    state_machines: Mapping[str, StateMachine],
+    *,
+    substitutions: bool = True,
+    limit: int = MAX_TEMPLATE_BYTES,
+    reference_bytes: int = MAX_REFERENCE_BYTES,
+    **properties: Any,
+) -> EmitReport:
+    """Add a state machine resource to a template for each state machine.
+
+    :param Template template: Template to add the resources to
+    :param dict state_machines: Map of resource logical ID to state machine
+    :param bool substitutions: Use ``Definition`` and ``DefinitionSubstitutions``
+        rather than ``DefinitionString`` properties
+    :param int limit: Maximum size of the template
+    :param int reference_bytes: Size that each resource reference is assumed to resolve to
+        when definitions are measured
+    :param properties: Properties to set on every resource (ex: ``RoleArn``)
+    :return: Added resources and the size of the template
+    """
+    emitter = _Emitter(substitutions, reference_bytes)
+    emitted = [emitter.emit(title, state_machine, properties) for title, state_machine in state_machines.items()]
+    for state_machine in emitted:
+        template.add_resource(state_machine.resource)
+
+    return EmitReport(
+        state_machines=emitted,
+        template_bytes=compact_size(template.to_dict()),
+        resources=len(template.resources),
+        limit=limit,
+    )
@@ -11,3 +11,34 @@ class IncompleteDefinitionError(RhodesError):
 
 class InvalidDefinitionError(RhodesError):
     """Raised when an invalid state machine definition is found."""
+
+
+class PartitionError(RhodesError):
+    """Raised when a state machine cannot be partitioned to fit within the requested limits."""
+
+
+class SnapshotError(RhodesError):
+    """Raised when a state machine snapshot cannot be written or read."""
+
+
+class TemplateError(RhodesError):
+    """Raised when a definition template cannot be compiled or filled in."""
+
+
+class LocalExecutionError(RhodesError):
+    """Raised when the local engine cannot run a state machine."""
+
+
+class StatesError(RhodesError):
+    """Raised in a local execution to fail a state with a Step Functions error name (ex: ``States.Timeout``).
+
+    Local task handlers raise this to simulate an error from the service that they stand in for.
+
+    :param str error: Error name, matched against ``ErrorEquals`` in ``Retry`` and ``Catch``
+    :param str cause: Human-readable description of the error
+    """
+
+    def __init__(self, error: str, cause: str = ""):
+        super().__init__(f"{error}: {cause}" if cause else error)
+        self.error = error
+        self.cause = cause
@@ -0,0 +1,219 @@
+"""
+Check that a state machine can run as an Express workflow.
+
+Express workflows run for at most five minutes
+and only support the request-response integration pattern:
+they cannot wait for a job to complete (``.sync``) or for a callback (``.waitForTaskToken``),
+and they cannot run activities or distributed ``Map`` states.
+
+A :class:`StateMachine` with ``StateMachineType=EXPRESS``,
+and the ``ItemProcessor`` of a distributed ``Map`` state that runs ``EXPRESS`` child executions,
+is checked every time it is serialized.
+Use :func:`express_violations` to list every problem at once.
+
+.. code-block:: python
+
+    for violation in express_violations(workflow):
+        print(violation)
+
+Every path through the state machine must also be able to finish within five minutes:
+the ``Seconds`` of the ``Wait`` states along the path that waits the least,
+including the slowest branch of each ``Parallel`` state and one iteration of each ``Map`` state,
+must add up to no more than :data:`EXPRESS_MAX_DURATION_SECONDS`.
+
+These checks only cover what can be known from the definition.
+To check how long executions take when durations depend on the data or on the services that tasks call,
+run them with :func:`rhodes.local.express.simulate_express`.
+"""
+from typing import Any, List, Optional, Tuple
+
+import attr
+from troposphere.stepfunctions import Activity
+
+from rhodes._graph import iter_machines, state_transitions, task_resource
+from rhodes.exceptions import InvalidDefinitionError
+from rhodes.states import Fail, Map, Parallel, State, StateMachine, Succeed, Task, Wait
+
+__all__ = ("EXPRESS_MAX_DURATION_SECONDS", "ExpressViolation", "express_violations", "validate_express")
+
+#: Maximum duration of one Express workflow execution.
+EXPRESS_MAX_DURATION_SECONDS = 300
+
+# Integration patterns that wait for something outside of the request.
+_WAITING_SUFFIXES = (".sync", ".sync:2", ".waitForTaskToken")
+
+
+@attr.s(frozen=True)
+class ExpressViolation:
+    """Something that prevents a state machine from running as an Express workflow.
+
+    :param str title: Title of the state, or ``None`` for the state machine itself
+    :param tuple location: Titles of the containing states and their nested state machines
+        (ex: ``("FanOut", "Branches[1]")``), empty for the top-level state machine
+    :param str reason: Description of the problem
+    """
+
+    title: Optional[str] = attr.ib()
+    location: Tuple[str, ...] = attr.ib(converter=tuple)
+    reason: str = attr.ib()
+
+    def __str__(self) -> str:
+        path = "/".join(self.location + (() if self.title is None else (self.title,)))
+        return f"{path or 'State machine'}: {self.reason}"
+
+
+def _resource_reason(resource: Any) -> Optional[str]:
+    if isinstance(resource, Activity):
+        return "Express workflows do not support activities."
+
+    if not isinstance(resource, str):
+        return None
+
+    if resource.endswith(_WAITING_SUFFIXES):
+        pattern = resource.rsplit(".", 1)[-1]
+        return f"Express workflows do not support the .{pattern} integration pattern ({resource})."
+
+    if ":activity:" in resource:
+        return "Express workflows do not support activities."
+
+    return None
+
+
+def _is_task(state: State) -> bool:
+    return isinstance(state, Task) or hasattr(state, "_build_task")
+
+
+def _state_reasons(state: State) -> List[str]:
+    reasons = []
+    if _is_task(state):
+        reason = _resource_reason(task_resource(state))
+        if reason is not None:
+            reasons.append(reason)
+
+    if isinstance(state, Map) and state.distributed:
+        reasons.append("Express workflows do not support distributed Map states.")
+
+    if _long_wait(state):
+        reasons.append(
+            f"Wait of {state.Seconds} seconds is longer than an Express execution can run "
+            f"({EXPRESS_MAX_DURATION_SECONDS} seconds)."
+        )
+
+    return reasons
+
+
+def _nested(state: State) -> List[Tuple[str, StateMachine]]:
+    if isinstance(state, Parallel):
+        return [(f"Branches[{position}]", branch) for position, branch in enumerate(state.Branches)]
+
+    # The processor of a distributed Map runs as separate executions; the Map state itself is reported instead.
+    if isinstance(state, Map) and not state.distributed and state.processor is not None:
+        return [("ItemProcessor" if state.ItemProcessor is not None else "Iterator", state.processor)]
+
+    return []
+
+
+def _minimum_state_seconds(state: State) -> int:
+    """Seconds that a visit to ``state`` is guaranteed to take, ignoring errors."""
+    if isinstance(state, Wait):
+        # Waits for SecondsPath and Timestamp values depend on the data.
+        return state.Seconds or 0
+
+    if isinstance(state, Parallel):
+        return max((_minimum_seconds(branch) for branch in state.Branches), default=0)
+
+    if isinstance(state, Map) and state.processor is not None:
+        return _minimum_seconds(state.processor)
+
+    return 0
+
+
+def _minimum_seconds(machine: StateMachine) -> int:
+    """Seconds that every path from the start of ``machine`` to the end of an execution is guaranteed to take."""
+    own = {title: _minimum_state_seconds(state) for title, state in machine.States.items()}
+    transitions = {
+        title: [(field, target) for field, target in state_transitions(state) if target in machine.States]
+        for title, state in machine.States.items()
+    }
+    unreachable = float("inf")
+    # Bellman-Ford style relaxation: loops never make a path shorter, so this settles in at most one pass per state.
+    best = {title: unreachable for title in machine.States}
+    for _ in range(len(best)):
+        changed = False
+        for title, state in machine.States.items():
+            options = [own[title]] if getattr(state, "End", False) or isinstance(state, (Succeed, Fail)) else []
+            for field, target in transitions[title]:
+                # An error can be caught as soon as the state starts.
+                options.append(best[target] + (0 if field.startswith("Catch") else own[title]))
+            seconds = min(options, default=unreachable)
+            if seconds < best[title]:
+                best[title] = seconds
+                changed = True
+        if not changed:
+            break
+
+    seconds = best.get(machine.StartAt, unreachable)
+    return 0 if seconds == unreachable else int(seconds)
+
+
+def _long_wait(state: State) -> bool:
+    return isinstance(state, Wait) and state.Seconds is not None and state.Seconds > EXPRESS_MAX_DURATION_SECONDS
+
+
+def _machine_violations(machine: StateMachine, location: Tuple[str, ...]) -> List[ExpressViolation]:
+    violations = []
+    for title, state in machine.States.items():
+        violations.extend(ExpressViolation(title, location, reason) for reason in _state_reasons(state))
+        for field, child in _nested(state):
+            violations.extend(_machine_violations(child, location + (title, field)))
+    return violations
+
+
+def express_violations(state_machine: StateMachine) -> List[ExpressViolation]:
+    """List everything that prevents a state machine from running as an Express workflow.
+
+    The state machine is checked whatever its ``StateMachineType`` is.
+
+    :param StateMachine state_machine: State machine to check
+    """
+    violations = []
+    timeout = state_machine.TimeoutSeconds
+    if timeout is not None and timeout > EXPRESS_MAX_DURATION_SECONDS:
+        violations.append(
+            ExpressViolation(
+                None,
+                (),
+                f"TimeoutSeconds of {timeout} is longer than an Express execution can run "
+                f"({EXPRESS_MAX_DURATION_SECONDS} seconds).",
+            )
+        )
+
+    state_violations = _machine_violations(state_machine, ())
+    minimum = _minimum_seconds(state_machine)
+    # A single Wait state that is too long is already reported on its own.
+    if minimum > EXPRESS_MAX_DURATION_SECONDS and not any(
+        _long_wait(state) for machine in iter_machines(state_machine) for state in machine.States.values()
+    ):
+        violations.append(
+            ExpressViolation(
+                None,
+                (),
+                f"Every path waits for at least {minimum} seconds, longer than an Express execution can run "
+                f"({EXPRESS_MAX_DURATION_SECONDS} seconds).",
+            )
+        )
+
+    violations.extend(state_violations)
+    return violations
+
+
+def validate_express(state_machine: StateMachine):
+    """Check that a state machine can run as an Express workflow.
+
+    :param StateMachine state_machine: State machine to check
+    :raises InvalidDefinitionError: if it cannot
+    """
+    violations = express_violations(state_machine)
+    if violations:
+        details = "; ".join(str(violation) for violation in violations)
+        raise InvalidDefinitionError(f"State machine cannot run as an Express workflow: {details}")
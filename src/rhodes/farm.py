@@ -0,0 +1,336 @@
+"""
+Render many state machines at once.
+
+A *builder* is a module-level function that takes no arguments and returns a :class:`StateMachine`,
+like the ``build`` functions in the ``examples`` directory.
+:func:`discover` finds builders in modules and packages,
+and :func:`build_all` runs them across a pool of worker processes
+and writes each rendered definition to its own file.
+
+.. code-block:: python
+
+    builders = discover("workflows", "billing.jobs:nightly")
+    report = build_all(builders, "out/")
+    print(report.summary())
+
+Each builder runs in isolation: an exception, or even a crashed worker process,
+only fails the builder that caused it.
+Outputs are written to a temporary file and then moved into place,
+so a reader never sees a partially written definition.
+"""
+import importlib
+import json
+import os
+import pkgutil
+import site
+import sys
+import sysconfig
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Union
+
+import attr
+
+from rhodes._util import atomic_write
+from rhodes.states import StateMachine
+
+__all__ = (
+    "OUTPUT_FORMATS",
+    "Builder",
+    "BuildResult",
+    "BuildReport",
+    "discover",
+    "build_all",
+    "is_project_file",
+    "forget_project_modules",
+)
+
+DEFAULT_BUILDER_NAME = "build"
+# The standard library, installed packages (including ``pip install --user`` packages),
+# and anything else that belongs to the Python installation or virtual environment.
+_INSTALLED_ROOTS = tuple(
+    os.path.join(os.path.realpath(path), "")
+    for path in {sysconfig.get_paths()[name] for name in ("stdlib", "platstdlib", "purelib", "platlib")}
+    | {site.getusersitepackages(), sys.prefix, sys.base_prefix, sys.exec_prefix}
+)
+
+
+def _render_definition(state_machine: StateMachine) -> Dict:
+    return state_machine.to_dict()
+
+
+def _render_definition_string(state_machine: StateMachine) -> Dict:
+    return state_machine.definition_string().to_dict()
+
+
+def _render_definition_substitutions(state_machine: StateMachine) -> Dict:
+    substituted = state_machine.definition_substitutions()
+    return {
+        "Definition": substituted.definition,
+        "DefinitionSubstitutions": {name: value.to_dict() for name, value in substituted.substitutions.items()},
+    }
+
+
+#: Ways to render a state machine: ``definition`` writes ``to_dict`` output,
+#: ``definition_string`` writes the CloudFormation ``Fn::Sub`` value from ``definition_string``,
+#: and ``definition_substitutions`` writes the ``Definition`` and ``DefinitionSubstitutions`` resource properties
+#: from ``definition_substitutions``.
+OUTPUT_FORMATS: Dict[str, Callable[[StateMachine], Dict]] = {
+    "definition": _render_definition,
+    "definition_string": _render_definition_string,
+    "definition_substitutions": _render_definition_substitutions,
+}
+
+
+@attr.s(frozen=True)
+class Builder:
+    """Reference to a builder function.
+
+    :param str module: Name of the module that defines the builder
+    :param str name: Name of the builder function
+    """
+
+    module: str = attr.ib()
+    name: str = attr.ib(default=DEFAULT_BUILDER_NAME)
+
+    @classmethod
+    def parse(cls, target: str) -> "Builder":
+        """Parse a ``module:function`` target. The function name defaults to ``build``.
+
+        :param str target: Builder target
+        """
+        module, _, name = target.partition(":")
+        return cls(module=module, name=name or DEFAULT_BUILDER_NAME)
+
+    def __str__(self) -> str:
+        return f"{self.module}:{self.name}"
+
+    @property
+    def filename(self) -> str:
+        """Name of the file that the rendered definition is written to."""
+        return f"{self.module}.{self.name}.json"
+
+    def load(self) -> Callable[[], StateMachine]:
+        """Import the builder function."""
+        return getattr(importlib.import_module(self.module), self.name)
+
+
+@attr.s
+class BuildResult:
+    """Result of running one builder.
+
+    :param Builder builder: Builder that ran
+    :param str output: Path to the rendered definition (if successful)
+    :param float seconds: Time spent importing, building, rendering, and writing
+    :param str error: Description of the error that stopped the build (if any)
+    :param str traceback: Full traceback of the error (if any)
+    :param bool cached: The output was restored from a cache instead of running the builder
+    """
+
+    builder: Builder = attr.ib()
+    output: Optional[str] = attr.ib(default=None)
+    seconds: float = attr.ib(default=0.0)
+    error: Optional[str] = attr.ib(default=None)
+    traceback: Optional[str] = attr.ib(default=None, repr=False)
+    cached: bool = attr.ib(default=False)
+
+    @property
+    def ok(self) -> bool:
+        """Determine whether the build succeeded."""
+        return self.error is None
+
+
+@attr.s
+class BuildReport:
+    """Results of running many builders.
+
+    :param list results: Result of each builder, in the order that the builders were given
+    :param float seconds: Wall clock time for the whole run
+    """
+
+    results: List[BuildResult] = attr.ib(factory=list)
+    seconds: float = attr.ib(default=0.0)
+
+    @property
+    def succeeded(self) -> List[BuildResult]:
+        """Results of the builders that succeeded."""
+        return [result for result in self.results if result.ok]
+
+    @property
+    def failed(self) -> List[BuildResult]:
+        """Results of the builders that failed."""
+        return [result for result in self.results if not result.ok]
+
+    def summary(self) -> str:
+        """Describe the run, with the slowest builders first."""
+        lines = []
+        for result in sorted(self.results, key=lambda result: result.seconds, reverse=True):
+            status = ("cached" if result.cached else "ok") if result.ok else "FAIL"
+            line = f"{status:<6} {result.seconds:8.3f}s  {result.builder}"
+            if not result.ok:
+                line += f"  {result.error}"
+            lines.append(line)
+
+        totals = f"{len(self.succeeded)} succeeded, {len(self.failed)} failed"
+        cached = sum(1 for result in self.results if result.cached)
+        if cached:
+            totals += f", {cached} cached"
+        builder_seconds = sum(result.seconds for result in self.results)
+        lines.append(f"{totals} in {self.seconds:.3f}s ({builder_seconds:.3f}s of builder time)")
+        return "\n".join(lines)
+
+
+def is_project_file(path: str) -> bool:
+    """Determine whether a module file belongs to the project being built,
+    rather than to the standard library, an installed package, the Python installation, or rhodes itself.
+
+    :param str path: Path to the module file
+    """
+    path = os.path.realpath(path)
+    if path.startswith(_INSTALLED_ROOTS):
+        return False
+
+    rhodes_root = os.path.join(os.path.dirname(os.path.realpath(__file__)), "")
+    return not path.startswith(rhodes_root)
+
+
+def forget_project_modules():
+    """Remove project modules from :data:`sys.modules` so that the next import reads them from disk again.
+
+    The ``__main__`` module is never removed, because it cannot be imported again.
+    """
+    for name, module in list(sys.modules.items()):
+        if name == "__main__":
+            continue
+        path = getattr(module, "__file__", None)
+        if path and is_project_file(path):
+            del sys.modules[name]
+
+
+def _module_builders(module_name: str, name: str) -> List[Builder]:
+    module = importlib.import_module(module_name)
+    builders = [Builder(module_name, name)] if callable(getattr(module, name, None)) else []
+
+    module_path = getattr(module, "__path__", None)
+    if module_path is not None:
+        for info in pkgutil.walk_packages(module_path, prefix=f"{module_name}."):
+            if info.ispkg:
+                continue
+            submodule = importlib.import_module(info.name)
+            if callable(getattr(submodule, name, None)):
+                builders.append(Builder(info.name, name))
+    return builders
+
+
+def discover(*targets: str, name: str = DEFAULT_BUILDER_NAME) -> List[Builder]:
+    """Find builder functions.
+
+    Each target is either a ``module:function`` reference to a single builder,
+    a module that defines a builder function called ``name``,
+    or a package whose modules (at any depth) are searched for builder functions called ``name``.
+
+    :param str targets: Targets to search
+    :param str name: Name of the builder functions to search for
+    :return: Builders, without duplicates, in the order that they were found
+    """
+    builders: Dict[Builder, None] = {}
+    for target in targets:
+        if ":" in target:
+            found = [Builder.parse(target)]
+        else:
+            found = _module_builders(target, name)
+        builders.update(dict.fromkeys(found))
+    return list(builders)
+
+
+def _build_one(builder: Builder, output_dir: str, output_format: str, fresh_imports: bool = False) -> BuildResult:
+    start = time.perf_counter()
+    if fresh_imports:
+        forget_project_modules()
+    try:
+        state_machine = builder.load()()
+        if not isinstance(state_machine, StateMachine):
+            raise TypeError(f"Builder returned {type(state_machine).__name__}, not StateMachine")
+
+        rendered = OUTPUT_FORMATS[output_format](state_machine)
+        output = Path(output_dir) / builder.filename
+        atomic_write(output, json.dumps(rendered, indent=4).encode("utf-8"))
+    except Exception as error:  # pylint: disable=broad-except
+        # One broken builder must not stop the rest of the run.
+        return BuildResult(
+            builder=builder,
+            seconds=time.perf_counter() - start,
+            error=f"{type(error).__name__}: {error}",
+            traceback=traceback.format_exc(),
+        )
+
+    return BuildResult(builder=builder, output=str(output), seconds=time.perf_counter() - start)
+
+
+def _build_isolated(builder: Builder, output_dir: str, output_format: str, fresh_imports: bool) -> BuildResult:
+    """Run a single builder in its own process so that a crash only fails that builder."""
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        try:
+            return executor.submit(_build_one, builder, output_dir, output_format, fresh_imports).result()
+        except BrokenProcessPool:
+            return BuildResult(builder=builder, error="Worker process exited unexpectedly")
+
+
+def _build_pool(
+    builders: List[Builder], output_dir: str, output_format: str, workers: int, fresh_imports: bool
+) -> List[BuildResult]:
+    results: List[Optional[BuildResult]] = [None] * len(builders)
+    crashed = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(_build_one, builder, output_dir, output_format, fresh_imports) for builder in builders
+        ]
+        for pos, future in enumerate(futures):
+            try:
+                results[pos] = future.result()
+            except BrokenProcessPool:
+                crashed.append(pos)
+
+    # A crashed worker fails every build that was still pending in the pool,
+    # so run each of those again on its own to find the one that caused the crash.
+    for pos in crashed:
+        results[pos] = _build_isolated(builders[pos], output_dir, output_format, fresh_imports)
+    return results
+
+
+def build_all(
+    builders: Iterable[Union[Builder, str]],
+    output_dir: Union[str, "os.PathLike[str]"],
+    *,
+    output_format: str = "definition",
+    workers: Optional[int] = None,
+    fresh_imports: bool = False,
+) -> BuildReport:
+    """Run builders and write their rendered definitions to ``output_dir``.
+
+    Each definition is written to ``output_dir/<module>.<function>.json``.
+
+    :param builders: Builders to run, as :class:`Builder` instances or ``module:function`` targets
+    :param output_dir: Directory to write rendered definitions to
+    :param str output_format: Output format (see :data:`OUTPUT_FORMATS`)
+    :param int workers: Number of worker processes (default: number of CPUs; ``1`` runs builders in this process)
+    :param bool fresh_imports: Read project modules from disk again even if they were already imported
+        (see :func:`forget_project_modules`)
+    """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format {output_format!r}; expected one of {sorted(OUTPUT_FORMATS)!r}")
+
+    builders = [builder if isinstance(builder, Builder) else Builder.parse(builder) for builder in builders]
+    output_dir = str(output_dir)
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    start = time.perf_counter()
+    if workers <= 1 or len(builders) <= 1:
+        results = [_build_one(builder, output_dir, output_format, fresh_imports) for builder in builders]
+    else:
+        results = _build_pool(builders, output_dir, output_format, workers, fresh_imports)
+    return BuildReport(results=results, seconds=time.perf_counter() - start)
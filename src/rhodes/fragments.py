@@ -0,0 +1,158 @@
+"""
+Reusable workflow fragments.
+
+A :class:`Fragment` is a sub-graph of states that is defined once
+and then instantiated into any number of state machines.
+Each instance gets its own state titles and transitions,
+and its own copy of every mutable container:
+``Choices``, ``Retry``, ``Catch``, nested ``Branches``, ``Iterator``, and ``ItemProcessor`` state machines,
+and any other list or dictionary value.
+Every other value (such as titles, paths, and ``Parameters``) is shared with the template
+rather than copying the whole object graph.
+
+.. code-block:: python
+
+    fetch = Fragment()
+    download = fetch.start_with(Task("Download", Resource=DOWNLOAD_FUNCTION))
+    download.then(Task("Unpack", Resource=UNPACK_FUNCTION)).Next = "Done"
+
+    workflow = StateMachine()
+    for name in ("orders", "refunds"):
+        entry = fetch.instantiate(
+            workflow,
+            prefix=f"{name}-",
+            overrides={"Download": {"Parameters": Parameters(Source=name)}},
+            remap={"Done": f"{name}-Report"},
+        )
+
+Every transition to a state in the template is rewired to the title of the new state (``prefix + title``).
+Transitions to titles that are not in the template are left as they are unless ``remap`` replaces them,
+so a template can exit to a placeholder title that each instance connects to a different state.
+
+Values shared with the template are copied on write: assigning a new value to an instance
+only changes that instance.
+Changing a shared structure such as ``Parameters`` in place changes the template and every instance,
+so use ``overrides`` or assign a new value instead.
+Containers are copied for each instance,
+so changing them in place (ex: ``add_branch`` or changing a nested state machine) only changes that instance.
+"""
+import copy
+from typing import Any, Dict, List, Mapping, Optional
+
+import attr
+from attr.validators import instance_of
+
+from rhodes.states import Choice, State, StateMachine
+
+__all__ = ("Fragment",)
+
+
+def _share(state: State, values: Dict[str, Any]) -> State:
+    """Make a copy of ``state`` that shares its immutable values, with some values replaced.
+
+    The copy is validated once, after every value is in place.
+    """
+    new_state = copy.copy(state)
+    # Bypass per-attribute validation; the new state is validated once below.
+    object.__setattr__(new_state, "member_of", None)
+    for field in attr.fields(type(state)):
+        value = getattr(state, field.name)
+        if field.name not in values and isinstance(value, (list, dict, StateMachine)):
+            # Choice rules refer back to the state that contains them; do not copy the template state with them.
+            values[field.name] = copy.deepcopy(value, {id(state): state})
+    for name, value in values.items():
+        object.__setattr__(new_state, name, value)
+    attr.validate(new_state)
+    return new_state
+
+
+def _rewire_catchers(catchers: List, titles: Dict[str, str]):
+    for catcher in catchers:
+        if isinstance(catcher, dict) and "Next" in catcher:
+            catcher["Next"] = titles.get(catcher["Next"], catcher["Next"])
+
+
+@attr.s
+class Fragment:
+    """Reusable sub-graph of states.
+
+    Build the template with :meth:`start_with` and :meth:`add_state`
+    just like a :class:`StateMachine`, then call :meth:`instantiate` to add a copy to a state machine.
+
+    :param StateMachine template: State machine that contains the template states (optional)
+    """
+
+    template: StateMachine = attr.ib(factory=StateMachine, validator=instance_of(StateMachine))
+
+    def add_state(self, new_state: State) -> State:
+        """Add a state to the template.
+
+        :param State new_state: State to add
+        """
+        return self.template.add_state(new_state)
+
+    def start_with(self, first_state: State) -> State:
+        """Add a state to the template and mark it as the entry point of the fragment.
+
+        :param State first_state: State to start with
+        """
+        return self.template.start_with(first_state)
+
+    def _titles(self, prefix: str, remap: Optional[Mapping[str, str]]) -> Dict[str, str]:
+        titles = {title: f"{prefix}{title}" for title in self.template.States}
+        titles.update(remap or {})
+        return titles
+
+    def _instance(self, state: State, titles: Dict[str, str], overrides: Mapping[str, Any]) -> State:
+        fields = attr.fields_dict(type(state))
+        for name in overrides:
+            if name not in fields or name == "title":
+                raise AttributeError(f"{type(state).__name__} state {state.title!r} has no field {name!r} to override")
+
+        values: Dict[str, Any] = {"title": titles[state.title]}
+        next_state = getattr(state, "Next", None)
+        if next_state is not None:
+            values["Next"] = titles.get(next_state, next_state)
+        if isinstance(state, Choice) and state.Default is not None:
+            values["Default"] = titles.get(state.Default, state.Default)
+        values.update(overrides)
+
+        new_state = _share(state, values)
+        # The copied containers belong to this instance, so they can be rewired in place.
+        if isinstance(new_state, Choice):
+            for rule in new_state.Choices:
+                rule.member_of = new_state
+                if rule.Next is not None and "Choices" not in overrides:
+                    rule.Next = titles.get(rule.Next, rule.Next)
+        if isinstance(getattr(new_state, "Catch", None), list) and "Catch" not in overrides:
+            _rewire_catchers(new_state.Catch, titles)
+        return new_state
+
+    def instantiate(
+        self,
+        state_machine: StateMachine,
+        prefix: str = "",
+        *,
+        overrides: Optional[Mapping[str, Mapping[str, Any]]] = None,
+        remap: Optional[Mapping[str, str]] = None,
+    ) -> State:
+        """Add a copy of the fragment to a state machine.
+
+        :param StateMachine state_machine: State machine to add the states to
+        :param str prefix: Prefix to add to the title of every state
+        :param dict overrides: Values to set on the new states, by template state title
+            (ex: ``{"Download": {"Parameters": Parameters(Source="orders")}}``)
+        :param dict remap: Titles to use instead of the default titles,
+            by template state title or by transition target outside the template
+        :return: New state that corresponds to the template ``StartAt`` state
+        """
+        overrides = overrides or {}
+        unknown = set(overrides) - set(self.template.States)
+        if unknown:
+            raise KeyError(f"Overrides for states that are not in the fragment: {sorted(unknown)!r}")
+
+        titles = self._titles(prefix, remap)
+        for state in self.template.States.values():
+            state_machine.add_state(self._instance(state, titles, overrides.get(state.title, {})))
+
+        return state_machine.States[titles[self.template.StartAt]]
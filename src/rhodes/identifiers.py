@@ -1,10 +1,22 @@
 """Static identifiers used within Rhodes."""
 from enum import Enum
 
-__all__ = ("ServiceArn", "IntegrationPattern")
+import attr
+
+__all__ = (
+    "ServiceArn",
+    "AwsSdkArn",
+    "IntegrationPattern",
+    "MapMode",
+    "ExecutionType",
+    "ItemReaderInputType",
+    "CsvHeaderLocation",
+)
 
 _DDB_BASE_ARN = "arn:aws:states:::dynamodb"
 _SAGEMAKER_BASE_ARN = "arn:aws:states:::sagemaker"
+_AWS_SDK_BASE_ARN = "arn:aws:states:::aws-sdk"
+_S3_BASE_ARN = "arn:aws:states:::s3"
 
 
 class ServiceArn(Enum):
@@ -35,6 +47,31 @@ class ServiceArn(Enum):
     SAGEMAKER_CREATE_TRAINING_JOB = f"{_SAGEMAKER_BASE_ARN}:createTrainingJob"
     SAGEMAKER_CREATE_TRANSFORM_JOB = f"{_SAGEMAKER_BASE_ARN}:createTransformJob"
     SAGEMAKER_UPDATE_ENDPOINT = f"{_SAGEMAKER_BASE_ARN}:updateEndpoint"
+    # Only used by the ItemReader and ResultWriter of distributed Map states.
+    S3_LIST_OBJECTS_V2 = f"{_S3_BASE_ARN}:listObjectsV2"
+    S3_GET_OBJECT = f"{_S3_BASE_ARN}:getObject"
+    S3_PUT_OBJECT = f"{_S3_BASE_ARN}:putObject"
+
+
+@attr.s(frozen=True)
+class AwsSdkArn:
+    """Step Functions `AWS SDK service integration`_ ARN.
+
+    Provides ``value`` like a :class:`ServiceArn` member.
+
+    :param str service: Service name, in lowercase (ex: ``sqs``)
+    :param str action: API action name, in camel case (ex: ``sendMessageBatch``)
+
+    .. _AWS SDK service integration: https://docs.aws.amazon.com/step-functions/latest/dg/supported-services-awssdk.html
+    """
+
+    service: str = attr.ib()
+    action: str = attr.ib()
+
+    @property
+    def value(self) -> str:
+        """Resource ARN for this action."""
+        return f"{_AWS_SDK_BASE_ARN}:{self.service}:{self.action}"
 
 
 class IntegrationPattern(Enum):
@@ -48,4 +85,39 @@ class IntegrationPattern(Enum):
 
     REQUEST_RESPONSE = ""
     SYNCHRONOUS = ".sync"
+    # Only supported by Step Functions: the child execution output is returned as JSON rather than a string.
+    SYNCHRONOUS_JSON = ".sync:2"
     WAIT_FOR_CALLBACK = ".waitForTaskToken"
+
+
+class MapMode(Enum):
+    """Processing mode of a :class:`Map` state's ``ItemProcessor``.
+
+    `See Step Functions docs for more details.
+    <https://docs.aws.amazon.com/step-functions/latest/dg/concepts-asl-use-map-state-distributed.html>`_
+    """
+
+    INLINE = "INLINE"
+    DISTRIBUTED = "DISTRIBUTED"
+
+
+class ExecutionType(Enum):
+    """Workflow type of a state machine, or of the child executions of a distributed :class:`Map` state."""
+
+    STANDARD = "STANDARD"
+    EXPRESS = "EXPRESS"
+
+
+class ItemReaderInputType(Enum):
+    """Format of the S3 object that a distributed :class:`Map` state's ``ItemReader`` reads items from."""
+
+    CSV = "CSV"
+    JSON = "JSON"
+    MANIFEST = "MANIFEST"
+
+
+class CsvHeaderLocation(Enum):
+    """Where a distributed :class:`Map` state's ``ItemReader`` finds the column names of a CSV file."""
+
+    FIRST_ROW = "FIRST_ROW"
+    GIVEN = "GIVEN"
@@ -0,0 +1,328 @@
+"""
+Incremental, cache-backed builds.
+
+:func:`build_incremental` only runs a builder when something that it depends on has changed.
+Each builder gets a fingerprint, which is a hash of:
+
+* the builder target and output format,
+* the rhodes version,
+* the source of the builder module and of every project module that it imports, directly or indirectly.
+
+Rendered definitions are stored in a cache directory under their fingerprint.
+When a fingerprint is already in the cache, the cached definition is written to the output directory
+and the builder is not run.
+
+Imports are found by reading the source of each module,
+so modules that are imported dynamically (ex: with :func:`importlib.import_module`) are not tracked.
+Standard library modules, installed packages, and rhodes itself are not tracked either;
+changes to rhodes are covered by its version.
+
+:func:`watch` repeats an incremental build every time a tracked file changes.
+"""
+import ast
+import hashlib
+import importlib.util
+import os
+import time
+from importlib.machinery import PathFinder
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from rhodes import __version__
+from rhodes._util import atomic_write
+from rhodes.farm import Builder, BuildReport, BuildResult, build_all, discover, forget_project_modules, is_project_file
+
+__all__ = ("dependencies", "fingerprint", "BuildCache", "build_incremental", "watch")
+
+PathType = Union[str, "os.PathLike[str]"]
+
+# Increment when the fingerprint inputs change.
+_FINGERPRINT_VERSION = 1
+
+
+def _module_file(name: str) -> Optional[str]:
+    """Find the source file of a module without importing it or its parent packages."""
+    parts = name.split(".")
+    search_path = None
+    spec = None
+    for depth in range(1, len(parts) + 1):
+        if spec is not None:
+            search_path = spec.submodule_search_locations
+            if search_path is None:
+                # The parent is a module, so this is a name imported from it rather than a submodule.
+                return None
+        try:
+            spec = PathFinder.find_spec(".".join(parts[:depth]), search_path)
+        except (ImportError, ValueError):
+            return None
+        if spec is None:
+            return None
+
+    if not spec.has_location or not spec.origin or not spec.origin.endswith(".py"):
+        return None
+    return spec.origin
+
+
+def _imported_names(path: str, module: str) -> Iterable[str]:
+    """List the module names that a module imports, including possible submodules of ``from`` imports."""
+    with open(path, "rb") as source:
+        tree = ast.parse(source.read(), filename=path)
+
+    is_package = os.path.basename(path) == "__init__.py"
+    package = module if is_package else module.rpartition(".")[0]
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                yield alias.name
+        elif isinstance(node, ast.ImportFrom):
+            base = "." * node.level + (node.module or "")
+            try:
+                base = importlib.util.resolve_name(base, package) if node.level else base
+            except (ImportError, ValueError):
+                continue
+            yield base
+            for alias in node.names:
+                # "from package import module" imports a submodule.
+                yield f"{base}.{alias.name}"
+
+
+class _Scanner:
+    """Find module dependencies and hash module files, reading each file at most once."""
+
+    def __init__(self):
+        self._files: Dict[str, Optional[str]] = {}
+        self._imports: Dict[str, List[str]] = {}
+        self._digests: Dict[str, str] = {}
+
+    def module_file(self, name: str) -> Optional[str]:
+        if name not in self._files:
+            path = _module_file(name)
+            self._files[name] = path if path is not None and is_project_file(path) else None
+        return self._files[name]
+
+    def dependencies(self, module: str) -> Dict[str, str]:
+        found: Dict[str, str] = {}
+        pending = [module]
+        seen: Set[str] = set()
+        while pending:
+            name = pending.pop()
+            if name in seen:
+                continue
+            seen.add(name)
+
+            # Importing a module also runs the __init__ of every parent package.
+            parts = name.split(".")
+            pending.extend(".".join(parts[:depth]) for depth in range(1, len(parts)))
+
+            path = self.module_file(name)
+            if path is None:
+                continue
+
+            found[name] = path
+            if name not in self._imports:
+                self._imports[name] = list(_imported_names(path, name))
+            pending.extend(self._imports[name])
+        return found
+
+    def digest(self, path: str) -> str:
+        if path not in self._digests:
+            with open(path, "rb") as source:
+                self._digests[path] = hashlib.sha256(source.read()).hexdigest()
+        return self._digests[path]
+
+    def fingerprint(self, builder: Builder, output_format: str) -> str:
+        digest = hashlib.sha256()
+        for part in (str(_FINGERPRINT_VERSION), __version__, str(builder), output_format):
+            digest.update(part.encode("utf-8") + b"\0")
+
+        for name, path in sorted(self.dependencies(builder.module).items()):
+            digest.update(f"{name}\0{self.digest(path)}\0".encode("utf-8"))
+        return digest.hexdigest()
+
+
+def dependencies(module: str) -> Dict[str, str]:
+    """Find the project modules that a module imports, directly or indirectly.
+
+    The module itself and its parent packages are included.
+
+    :param str module: Module name
+    :return: Map of module name to module file
+    """
+    return _Scanner().dependencies(module)
+
+
+def fingerprint(builder: Builder, output_format: str = "definition") -> str:
+    """Calculate a hash of everything that the output of a builder depends on.
+
+    :param Builder builder: Builder to fingerprint
+    :param str output_format: Output format (see :data:`rhodes.farm.OUTPUT_FORMATS`)
+    """
+    return _Scanner().fingerprint(builder, output_format)
+
+
+class BuildCache:
+    """On-disk cache of rendered definitions, keyed by builder fingerprint.
+
+    :param directory: Directory to store rendered definitions in
+    """
+
+    def __init__(self, directory: PathType):
+        self.directory = Path(directory)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Read a cached definition, or return ``None`` if it is not cached."""
+        try:
+            return self._path(key).read_bytes()
+        except OSError:
+            return None
+
+    def put(self, key: str, data: bytes):
+        """Cache a rendered definition."""
+        atomic_write(self._path(key), data)
+
+
+def _restore(builder: Builder, output_dir: Path, data: bytes) -> BuildResult:
+    output = output_dir / builder.filename
+    try:
+        current = output.read_bytes()
+    except OSError:
+        current = None
+
+    if current != data:
+        atomic_write(output, data)
+    return BuildResult(builder=builder, output=str(output), cached=True)
+
+
+def build_incremental(
+    builders: Iterable[Union[Builder, str]],
+    output_dir: PathType,
+    *,
+    cache_dir: PathType,
+    output_format: str = "definition",
+    workers: Optional[int] = None,
+    fresh_imports: bool = False,
+) -> BuildReport:
+    """Run only the builders whose fingerprint is not in the cache and write every definition to ``output_dir``.
+
+    :param builders: Builders to run, as :class:`Builder` instances or ``module:function`` targets
+    :param output_dir: Directory to write rendered definitions to
+    :param cache_dir: Directory to cache rendered definitions in
+    :param str output_format: Output format (see :data:`rhodes.farm.OUTPUT_FORMATS`)
+    :param int workers: Number of worker processes (default: number of CPUs)
+    :param bool fresh_imports: Read project modules from disk again even if they were already imported
+    """
+    start = time.perf_counter()
+    builders = [builder if isinstance(builder, Builder) else Builder.parse(builder) for builder in builders]
+    output_dir = Path(output_dir)
+    cache = BuildCache(cache_dir)
+
+    scanner = _Scanner()
+    results: Dict[Builder, BuildResult] = {}
+    stale: Dict[Builder, str] = {}
+    for builder in builders:
+        key = scanner.fingerprint(builder, output_format)
+        cached = cache.get(key)
+        if cached is None:
+            stale[builder] = key
+        else:
+            results[builder] = _restore(builder, output_dir, cached)
+
+    if stale:
+        report = build_all(
+            list(stale), output_dir, output_format=output_format, workers=workers, fresh_imports=fresh_imports
+        )
+        for result in report.results:
+            if result.ok:
+                cache.put(stale[result.builder], Path(result.output).read_bytes())
+            results[result.builder] = result
+
+    return BuildReport(results=[results[builder] for builder in builders], seconds=time.perf_counter() - start)
+
+
+def _tracked_paths(builders: List[Builder]) -> Set[str]:
+    """List every file that a build depends on."""
+    scanner = _Scanner()
+    paths: Set[str] = set()
+    for builder in builders:
+        paths.update(scanner.dependencies(builder.module).values())
+    return paths
+
+
+def _stat(paths: Set[str], targets: List[str]) -> Dict[str, Tuple[int, int]]:
+    """Collect the modification time and size of each file, including new files in the target packages."""
+    paths = set(paths)
+    for target in targets:
+        # New modules in a package add new builders.
+        path = _module_file(target.partition(":")[0])
+        if path is not None and os.path.basename(path) == "__init__.py":
+            paths.update(str(module) for module in Path(path).parent.rglob("*.py"))
+
+    stats = {}
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        stats[path] = (stat.st_mtime_ns, stat.st_size)
+    return stats
+
+
+def _discover_each(targets: List[str]) -> Tuple[List[Builder], List[BuildResult]]:
+    """Discover builders, reporting targets that cannot be imported (ex: while they are being edited) as failures."""
+    builders: List[Builder] = []
+    failures: List[BuildResult] = []
+    for target in targets:
+        try:
+            builders.extend(builder for builder in discover(target) if builder not in builders)
+        except Exception as error:  # pylint: disable=broad-except
+            failures.append(BuildResult(builder=Builder.parse(target), error=f"{type(error).__name__}: {error}"))
+    return builders, failures
+
+
+def watch(
+    targets: List[str],
+    output_dir: PathType,
+    *,
+    cache_dir: PathType,
+    output_format: str = "definition",
+    workers: Optional[int] = None,
+    interval: float = 1.0,
+    on_report: Callable[[BuildReport], None] = lambda report: None,
+    should_stop: Callable[[], bool] = lambda: False,
+):
+    """Build incrementally every time a file that the build depends on changes.
+
+    Runs until ``should_stop`` returns ``True`` or the process is interrupted.
+
+    :param list targets: Targets to build (see :func:`rhodes.farm.discover`)
+    :param output_dir: Directory to write rendered definitions to
+    :param cache_dir: Directory to cache rendered definitions in
+    :param str output_format: Output format (see :data:`rhodes.farm.OUTPUT_FORMATS`)
+    :param int workers: Number of worker processes (default: number of CPUs)
+    :param float interval: Seconds between checks for changed files
+    :param on_report: Called with the report of each build
+    :param should_stop: Called before each check for changed files
+    """
+    paths: Set[str] = set()
+    stats: Optional[Dict[str, Tuple[int, int]]] = None
+    while not should_stop():
+        if stats is None or _stat(paths, targets) != stats:
+            # Modules that changed on disk must be imported again.
+            forget_project_modules()
+            builders, failures = _discover_each(targets)
+            paths = _tracked_paths(builders)
+            stats = _stat(paths, targets)
+            report = build_incremental(
+                builders,
+                output_dir,
+                cache_dir=cache_dir,
+                output_format=output_format,
+                workers=workers,
+                fresh_imports=True,
+            )
+            report.results = failures + report.results
+            on_report(report)
+        time.sleep(interval)
@@ -0,0 +1,475 @@
+"""
+Load Amazon States Language definitions into rhodes objects.
+
+:func:`load_definition` and :func:`load_json` build a :class:`StateMachine`
+from an existing state machine definition,
+including nested ``Parallel`` branches and ``Map`` iterators and item processors.
+These are also available as :meth:`StateMachine.from_dict` and :meth:`StateMachine.from_json`.
+
+* Choice rules are loaded as :class:`ChoiceRule` instances.
+* ``Parameters`` are loaded as :class:`Parameters`,
+  with ``.$`` suffixed fields loaded as :class:`JsonPath` or :class:`ContextPath` values.
+* ``Task`` states whose ``Resource`` is a :class:`ServiceArn` with an :class:`IntegrationPattern` suffix
+  are loaded as the matching service integration helper, such as :class:`AwsLambda`.
+  If the state cannot be represented by that helper, it is loaded as a plain :class:`Task`.
+
+Every object is validated as it is built,
+and each state machine is validated again once all of its states have been added.
+
+:func:`load_json` also accepts a file object.
+File objects are read incrementally and each state is built as soon as it has been read,
+so the complete definition is never held in memory as text or as a dictionary.
+
+.. code-block:: python
+
+    with open("definition.json") as definition:
+        workflow = StateMachine.from_json(definition)
+
+With ``lazy=True``, ``StateMachine.States`` is a :class:`LazyStates` mapping
+that keeps the raw definition of each state
+and only builds and validates a state the first time that it is accessed.
+:meth:`LazyStates.peek` provides the ``Type``, ``Next``, and ``End`` values of a state without building it,
+and graph analyses read transitions from the raw definitions.
+
+.. code-block:: python
+
+    workflow = StateMachine.from_json(definition, lazy=True)
+    workflow.States.peek("Process Records").Type
+
+.. note::
+
+    Definitions that set ``InputPath``, ``OutputPath``, or ``ResultPath`` to ``null``
+    cannot be represented and are rejected.
+"""
+import json
+from datetime import datetime
+from functools import lru_cache, partial
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional, Tuple, Type, Union
+
+import attr
+import jsonpath_rw
+
+from rhodes import choice_rules
+from rhodes.choice_rules import And, ChoiceRule, Not, Or, VariablePath
+from rhodes.exceptions import InvalidDefinitionError
+from rhodes.states import Choice, Fail, Map, Parallel, Pass, State, StateMachine, Succeed, Task, Wait
+from rhodes.states._lazy import LazyStates, StateSummary
+from rhodes.states.services import awslambda, batch, dynamodb, ecs, glue, sagemaker, sns, sqs, stepfunctions
+from rhodes.structures import (
+    ContextPath,
+    ItemBatcher,
+    ItemReader,
+    JsonPath,
+    Parameters,
+    ProcessorConfig,
+    ReaderConfig,
+    ResultWriter,
+)
+
+__all__ = ("load_definition", "load_json", "LazyStates", "StateSummary")
+
+_STATE_TYPES: Dict[str, Type[State]] = {
+    state_type.__name__: state_type for state_type in (Pass, Task, Choice, Wait, Succeed, Fail, Parallel, Map)
+}
+_SERVICE_MODULES = (awslambda, batch, dynamodb, ecs, glue, sagemaker, sns, sqs, stepfunctions)
+_NULLABLE_PATH_FIELDS = ("InputPath", "OutputPath", "ResultPath")
+_PATH_FIELDS = _NULLABLE_PATH_FIELDS + ("ItemsPath", "SecondsPath", "TimestampPath")
+_MACHINE_FIELDS = ("StartAt", "Comment", "Version", "TimeoutSeconds")
+_STRUCTURE_FIELDS = {"ItemReader": ItemReader, "ItemBatcher": ItemBatcher, "ResultWriter": ResultWriter}
+_TASK_FIELDS = frozenset(attr.fields_dict(Task))
+_WHITESPACE = " \t\n\r"
+_CHUNK_SIZE = 64 * 1024
+
+
+def _service_resources() -> Dict[str, Tuple[Type[State], Any]]:
+    """Map every service integration resource to the helper class and integration pattern that produce it."""
+    resources = {}
+    for module in _SERVICE_MODULES:
+        for name in module.__all__:
+            helper = getattr(module, name)
+            service_arn = getattr(helper, "_resource_name", None)
+            if service_arn is None:
+                continue
+
+            for pattern in attr.fields_dict(helper)["Pattern"].validator.options:
+                resources[service_arn.value + pattern.value] = (helper, pattern)
+    return resources
+
+
+_SERVICE_RESOURCES = _service_resources()
+
+
+def _parse_timestamp(value: str) -> datetime:
+    """Parse an RFC3339 timestamp, as used by ``Timestamp*`` choice rules."""
+    date_time, offset = value[:19], value[19:]
+    fraction = ""
+    if offset.startswith("."):
+        digits = len(offset) - len(offset[1:].lstrip("0123456789"))
+        fraction, offset = offset[:digits], offset[digits:]
+
+    if offset in ("Z", "z"):
+        offset = "+0000"
+    offset = offset.replace(":", "")
+    if fraction:
+        return datetime.strptime(f"{date_time}{fraction[:7]}{offset}", "%Y-%m-%dT%H:%M:%S.%f%z")
+    return datetime.strptime(f"{date_time}{offset}", "%Y-%m-%dT%H:%M:%S%z")
+
+
+@lru_cache(maxsize=4096)
+def _parse_path(value: str) -> jsonpath_rw.JSONPath:
+    # Parsing a JSONPath is slow, and the same few paths appear in most states of most definitions.
+    return jsonpath_rw.parse(value)
+
+
+def _state_type(definition: Dict, location: str) -> Type[State]:
+    try:
+        state_type = _STATE_TYPES[definition["Type"]]
+    except KeyError:
+        raise InvalidDefinitionError(f"Unknown state type {definition.get('Type')!r} for state {location!r}.")
+
+    for name in _NULLABLE_PATH_FIELDS:
+        if name in definition and definition[name] is None:
+            raise InvalidDefinitionError(f"State {location!r} sets {name} to null, which is not supported.")
+
+    return state_type
+
+
+class _Loader:
+    """Build rhodes objects from a definition."""
+
+    def __init__(self, lazy: bool = False):
+        self.lazy = lazy
+        self._machines: List[Tuple[StateMachine, str]] = []
+
+    def machine(self, definition: Dict, location: str = "") -> StateMachine:
+        fields = {}
+        states = {}
+        for key, value in definition.items():
+            if key == "States":
+                states = value
+            elif key in _MACHINE_FIELDS:
+                fields[key] = value
+            else:
+                raise InvalidDefinitionError(f"Unsupported state machine field {location}{key!r}.")
+
+        machine = self.new_machine(fields, location)
+        self.add_states(machine, states, location)
+        return machine
+
+    def new_machine(self, fields: Dict, location: str) -> StateMachine:
+        machine = StateMachine(**fields)
+        self._machines.append((machine, location))
+        return machine
+
+    def add_states(self, machine: StateMachine, definitions: Dict[str, Dict], location: str):
+        if not self.lazy:
+            for title, definition in definitions.items():
+                self.add_state(machine, title, definition, location)
+            return
+
+        states = LazyStates(definitions, partial(_materialize, location))
+        states.owner = machine
+        machine.States = states
+
+    def add_state(self, machine: StateMachine, title: str, definition: Dict, location: str):
+        state_location = f"{location}States.{title}"
+        try:
+            state = self.state(title, definition, state_location)
+        except InvalidDefinitionError:
+            raise
+        except Exception as error:
+            raise InvalidDefinitionError(f"Invalid state {state_location!r}: {error}") from error
+
+        state.member_of = machine
+        machine.States[title] = state
+
+    def state(self, title: str, definition: Dict, location: str) -> State:
+        state_type = _state_type(definition, location)
+        fields = attr.fields_dict(state_type)
+        kwargs = {}
+        if state_type is Map and isinstance(definition.get("ItemProcessor"), dict):
+            # ProcessorConfig is serialized inside the ItemProcessor object, but is a field of the Map state.
+            definition = dict(definition, ItemProcessor=dict(definition["ItemProcessor"]))
+            if "ProcessorConfig" in definition["ItemProcessor"]:
+                kwargs["ProcessorConfig"] = ProcessorConfig(**definition["ItemProcessor"].pop("ProcessorConfig"))
+
+        for key, value in definition.items():
+            if key == "Type":
+                continue
+
+            if key not in fields or key == "title":
+                raise InvalidDefinitionError(f"Unsupported field {key!r} for {state_type.__name__} state {location!r}.")
+
+            kwargs[key] = self.field(key, value, location)
+
+        state = state_type(title, **kwargs)
+        if isinstance(state, Choice):
+            for rule in state.Choices:
+                rule.member_of = state
+
+        if isinstance(state, Task):
+            service_state = self.service_state(title, kwargs)
+            if service_state is not None:
+                return service_state
+
+        return state
+
+    @staticmethod
+    def path(value: str, path_type: Type[JsonPath] = JsonPath) -> JsonPath:
+        return path_type(_parse_path(value))
+
+    def path_value(self, value: str) -> Optional[Union[JsonPath, ContextPath]]:
+        """Load the value of a ``.$`` suffixed field, or ``None`` if it is not a path, such as an intrinsic function."""
+        try:
+            if value.startswith("$$"):
+                return ContextPath(value)
+            if value.startswith("$"):
+                return self.path(value)
+        except Exception:  # pylint: disable=broad-except
+            # jsonpath_rw raises plain Exception subclasses for paths that it cannot parse.
+            pass
+        return None
+
+    def parameters(self, value: Dict) -> Parameters:
+        fields = {}
+        for name, inner in value.items():
+            if name.endswith(".$") and isinstance(inner, str):
+                path = self.path_value(inner)
+                if path is not None:
+                    fields[name[:-2]] = path
+                    continue
+
+            if isinstance(inner, dict):
+                inner = self.parameters(inner)
+
+            fields[name] = inner
+        return Parameters(**fields)
+
+    def field(self, key: str, value: Any, location: str) -> Any:
+        if key in ("Parameters", "ItemSelector"):
+            return self.parameters(value)
+
+        if key in _PATH_FIELDS and isinstance(value, str):
+            return self.path(value)
+
+        if key == "Choices":
+            return [self.choice_rule(rule) for rule in value]
+
+        if key == "Branches":
+            return [self.machine(branch, f"{location}.Branches[{pos}].") for pos, branch in enumerate(value)]
+
+        if key in ("Iterator", "ItemProcessor"):
+            return self.machine(value, f"{location}.{key}.")
+
+        if key in _STRUCTURE_FIELDS:
+            return self.structure(key, value)
+
+        return value
+
+    def structure(self, key: str, value: Dict) -> Any:
+        """Build the helper structure for a distributed Map field."""
+        fields = dict(value)
+        for name in ("Parameters", "BatchInput"):
+            if name in fields:
+                fields[name] = self.parameters(fields[name])
+        if "ReaderConfig" in fields:
+            fields["ReaderConfig"] = ReaderConfig(**fields["ReaderConfig"])
+        return _STRUCTURE_FIELDS[key](**fields)
+
+    @staticmethod
+    def service_state(title: str, task_kwargs: Dict) -> Optional[State]:
+        """Build the service integration helper for a Task state, if one matches and accepts its values."""
+        resource = task_kwargs.get("Resource")
+        if not isinstance(resource, str) or resource not in _SERVICE_RESOURCES:
+            return None
+
+        helper, pattern = _SERVICE_RESOURCES[resource]
+        helper_fields = attr.fields_dict(helper)
+        kwargs = {"Pattern": pattern}
+        for key, value in task_kwargs.items():
+            if key == "Resource":
+                continue
+
+            if key == "Parameters":
+                for name, parameter in value._map.items():  # pylint: disable=protected-access
+                    if name in _TASK_FIELDS or name not in helper_fields or name.startswith("_"):
+                        return None
+                    kwargs[name] = parameter
+            else:
+                kwargs[key] = value
+
+        try:
+            return helper(title, **kwargs)
+        except (TypeError, ValueError):
+            return None
+
+    def choice_rule(self, definition: Dict) -> ChoiceRule:
+        fields = dict(definition)
+        next_state = fields.pop("Next", None)
+
+        if "And" in fields or "Or" in fields:
+            operator = And if "And" in fields else Or
+            rules = [self.choice_rule(rule) for rule in fields.pop(operator.__name__)]
+            rule = operator(Rules=rules, Next=next_state)
+        elif "Not" in fields:
+            rule = Not(Rule=self.choice_rule(fields.pop("Not")), Next=next_state)
+        else:
+            variable = fields.pop("Variable", None)
+            if variable is None or len(fields) != 1:
+                raise InvalidDefinitionError(f"Unsupported choice rule {definition!r}.")
+
+            operator_name, value = fields.popitem()
+            operator = getattr(choice_rules, operator_name, None)
+            if operator_name not in choice_rules.__all__ or not issubclass(operator, ChoiceRule):
+                raise InvalidDefinitionError(f"Unsupported choice rule operator {operator_name!r}.")
+
+            if operator_name.startswith("Timestamp"):
+                value = _parse_timestamp(value)
+
+            return operator(Variable=self.path(variable, VariablePath), Value=value, Next=next_state)
+
+        if fields:
+            raise InvalidDefinitionError(f"Unsupported choice rule {definition!r}.")
+
+        return rule
+
+    def validate(self):
+        """Validate every state machine that was built, now that all of its states have been added."""
+        for machine, location in self._machines:
+            try:
+                attr.validate(machine)
+            except (TypeError, ValueError) as error:
+                raise InvalidDefinitionError(f"Invalid state machine {location!r}: {error}") from error
+
+
+def _build(populate: Callable[[_Loader], Any], lazy: bool = False) -> Any:
+    loader = _Loader(lazy=lazy)
+    result = populate(loader)
+    loader.validate()
+    return result
+
+
+def _materialize(location: str, machine: StateMachine, title: str, definition: Dict):
+    """Build a single state of a lazily loaded state machine and store it in the state machine."""
+    _build(lambda loader: loader.add_state(machine, title, definition, location), lazy=True)
+
+
+def load_definition(definition: Dict, *, lazy: bool = False) -> StateMachine:
+    """Load a state machine from a definition dictionary.
+
+    :param dict definition: State machine definition
+    :param bool lazy: Only build each state the first time that it is accessed (see :class:`LazyStates`)
+    :raises InvalidDefinitionError: if the definition cannot be represented
+    """
+    return _build(lambda loader: loader.machine(definition), lazy=lazy)
+
+
+class _JsonStream:
+    """Incrementally read JSON values from a file object."""
+
+    def __init__(self, source: IO, chunk_size: int):
+        self._source = source
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+
+        chunk = self._source.read(self._chunk_size)
+        if isinstance(chunk, bytes):
+            chunk = chunk.decode("utf-8")
+        if not chunk:
+            self._eof = True
+            return False
+
+        self._buffer = self._buffer[self._pos :] + chunk
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Return the next non-whitespace character without consuming it."""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                raise InvalidDefinitionError("Unexpected end of state machine definition.")
+
+    def expect(self, *characters: str) -> str:
+        character = self.peek()
+        if character not in characters:
+            raise InvalidDefinitionError(f"Expected one of {characters!r} in state machine definition.")
+        self._pos += 1
+        return character
+
+    def value(self) -> Any:
+        """Decode the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError as error:
+                if self._fill():
+                    continue
+                raise InvalidDefinitionError(f"Invalid state machine definition: {error}") from error
+
+            # A number at the end of the buffer might continue in the next chunk.
+            if end == len(self._buffer) and self._fill():
+                continue
+
+            self._pos = end
+            return value
+
+    def members(self) -> Iterator[str]:
+        """Iterate over the keys of a JSON object, leaving each value to be read by the caller."""
+        self.expect("{")
+        if self.peek() == "}":
+            self._pos += 1
+            return
+
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            if self.expect(",", "}") == "}":
+                return
+
+
+def _load_stream(loader: _Loader, stream: _JsonStream) -> StateMachine:
+    machine = loader.new_machine({}, "")
+    for key in stream.members():
+        if key == "States" and loader.lazy:
+            loader.add_states(machine, {title: stream.value() for title in stream.members()}, "")
+        elif key == "States":
+            for title in stream.members():
+                loader.add_state(machine, title, stream.value(), "")
+        elif key in _MACHINE_FIELDS:
+            setattr(machine, key, stream.value())
+        else:
+            raise InvalidDefinitionError(f"Unsupported state machine field {key!r}.")
+    return machine
+
+
+def load_json(definition: Union[str, bytes, IO], *, lazy: bool = False, chunk_size: int = _CHUNK_SIZE) -> StateMachine:
+    """Load a state machine from a JSON definition.
+
+    :param definition: JSON state machine definition or a file object to read it from
+    :param bool lazy: Only build each state the first time that it is accessed (see :class:`LazyStates`)
+    :param int chunk_size: Number of characters to read from a file object at a time
+    :raises InvalidDefinitionError: if the definition cannot be represented
+    """
+    if hasattr(definition, "read"):
+        stream = _JsonStream(definition, chunk_size)
+        return _build(lambda loader: _load_stream(loader, stream), lazy=lazy)
+
+    try:
+        data = json.loads(definition)
+    except ValueError as error:
+        raise InvalidDefinitionError(f"Invalid state machine definition: {error}") from error
+
+    return load_definition(data, lazy=lazy)
@@ -0,0 +1,38 @@
+"""
+Run state machines locally, without AWS.
+
+:class:`LocalEngine` interprets a state machine definition,
+calling a handler that you register in place of each service that a Task state calls.
+Executions run on a virtual clock,
+so ``Wait`` states, retry intervals and simulated service latency take no real time,
+but :attr:`Execution.duration` reports how long the execution would have taken.
+
+.. code-block:: python
+
+    engine = LocalEngine()
+
+    @engine.register("arn:aws:lambda:*")
+    def _double(event, context):
+        return event["value"] * 2
+
+    execution = engine.execute(workflow, {"value": 21})
+    assert execution.succeeded
+
+Handlers may be coroutines; a handler that calls ``await asyncio.sleep(...)`` models service latency.
+Handlers raise :class:`rhodes.exceptions.StatesError` to fail the task with a Step Functions error name,
+which the ``Retry`` and ``Catch`` fields of the state then handle.
+
+:mod:`rhodes.local.dynamodb` provides an in-memory stand-in for DynamoDB,
+and :mod:`rhodes.local.s3` provides a directory-backed stand-in for S3
+that distributed ``Map`` states read their items from and write their results to.
+Each child execution of a distributed ``Map`` state is recorded in :attr:`Execution.map_runs`.
+:mod:`rhodes.local.express` runs many Express executions at once to estimate their throughput and cost.
+:mod:`rhodes.local.callbacks` hands out task tokens to ``.waitForTaskToken`` Task states
+and completes them when a handler or another coroutine calls back.
+:mod:`rhodes.local.jobs` runs AWS Batch, Amazon ECS, AWS Glue, and Amazon SageMaker jobs
+in pools of limited capacity, to estimate how long job pipelines queue and run.
+"""
+from rhodes.local._clock import VirtualClockLoop, run
+from rhodes.local.engine import Execution, Handler, LocalEngine, MapRun, TaskContext
+
+__all__ = ("LocalEngine", "Execution", "MapRun", "TaskContext", "Handler", "VirtualClockLoop", "run")
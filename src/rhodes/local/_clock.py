@@ -0,0 +1,82 @@
+"""Event loop that runs on virtual time."""
+import asyncio
+import selectors
+from typing import Dict, List, Optional
+
+from rhodes.exceptions import LocalExecutionError
+
+__all__ = ("VirtualClockLoop", "run")
+
+
+class _VirtualSelector(selectors.BaseSelector):
+    """Selector that never waits.
+
+    Rather than blocking until the next scheduled callback is due,
+    it moves the loop's clock forward to that time.
+    """
+
+    def __init__(self):
+        self._map: Dict[int, selectors.SelectorKey] = {}
+        self.now = 0.0
+
+    def register(self, fileobj, events, data=None) -> selectors.SelectorKey:
+        key = selectors.SelectorKey(fileobj, self._fileobj_lookup(fileobj), events, data)
+        self._map[key.fd] = key
+        return key
+
+    def unregister(self, fileobj) -> selectors.SelectorKey:
+        return self._map.pop(self._fileobj_lookup(fileobj))
+
+    def _fileobj_lookup(self, fileobj) -> int:
+        # pylint: disable=no-self-use
+        return fileobj if isinstance(fileobj, int) else fileobj.fileno()
+
+    def select(self, timeout: Optional[float] = None) -> List:
+        if timeout is None:
+            raise LocalExecutionError("Execution is waiting for an event that will never happen")
+        self.now += timeout
+        return []
+
+    def get_map(self) -> Dict[int, selectors.SelectorKey]:
+        return self._map
+
+    def close(self):
+        self._map.clear()
+
+
+class VirtualClockLoop(asyncio.SelectorEventLoop):
+    """Event loop whose clock only moves forward when every task is waiting.
+
+    ``asyncio.sleep``, ``asyncio.wait_for`` and ``call_later`` all use the virtual clock,
+    so an execution that waits for an hour finishes as soon as it has no other work to do.
+    The loop does not support I/O.
+    """
+
+    def __init__(self):
+        self._virtual_selector = _VirtualSelector()
+        super().__init__(selector=self._virtual_selector)
+        self._clock_resolution = 1e-9
+
+    def time(self) -> float:
+        """Seconds of virtual time since the loop was created."""
+        return self._virtual_selector.now
+
+
+def run(coroutine):
+    """Run a coroutine to completion on a new :class:`VirtualClockLoop`.
+
+    :param coroutine: Coroutine to run
+    :returns: Result of the coroutine
+    """
+    loop = VirtualClockLoop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        # Stop work that outlived the coroutine, such as jobs that no Task state waits for.
+        all_tasks = getattr(asyncio, "all_tasks", None) or asyncio.Task.all_tasks
+        pending = [task for task in all_tasks(loop) if not task.done()]
+        for task in pending:
+            task.cancel()
+        if pending:
+            loop.run_until_complete(asyncio.gather(*pending, return_exceptions=True))
+        loop.close()
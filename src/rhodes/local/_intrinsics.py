@@ -0,0 +1,230 @@
+"""Evaluate ``Parameters`` templates and intrinsic functions."""
+import base64
+import hashlib
+import json
+import random
+import re
+import uuid
+from typing import Any, Callable, Dict, List, Tuple
+
+from rhodes.exceptions import StatesError
+from rhodes.local._paths import read_path
+
+__all__ = ("evaluate_intrinsic", "resolve_parameters")
+
+_NAME = re.compile(r"States\.[A-Za-z0-9]+")
+_NUMBER = re.compile(r"-?\d+(\.\d+)?([eE][-+]?\d+)?")
+_HASHES = {"MD5": "md5", "SHA-1": "sha1", "SHA-256": "sha256", "SHA-384": "sha384", "SHA-512": "sha512"}
+
+
+def _failure(message: str) -> StatesError:
+    return StatesError("States.IntrinsicFailure", message)
+
+
+def _format(template: str, *values: Any) -> str:
+    pieces = template.split("{}")
+    if len(pieces) != len(values) + 1:
+        raise _failure(f"States.Format template has {len(pieces) - 1} placeholders but {len(values)} values")
+
+    rendered = [pieces[0]]
+    for value, piece in zip(values, pieces[1:]):
+        rendered.append(value if isinstance(value, str) else json.dumps(value, separators=(",", ":")))
+        rendered.append(piece)
+    return "".join(rendered)
+
+
+def _array_partition(values: List, size: int) -> List[List]:
+    if not isinstance(size, int) or size < 1:
+        raise _failure(f"States.ArrayPartition chunk size must be a positive integer, not {size!r}")
+    return [values[start : start + size] for start in range(0, len(values), size)]
+
+
+def _array_range(start: int, end: int, step: int) -> List[int]:
+    if not step:
+        raise _failure("States.ArrayRange step must not be zero")
+    return list(range(start, end + (1 if step > 0 else -1), step))
+
+
+def _array_unique(values: List) -> List:
+    seen = set()
+    unique = []
+    for value in values:
+        key = json.dumps(value, sort_keys=True)
+        if key not in seen:
+            seen.add(key)
+            unique.append(value)
+    return unique
+
+
+def _math_random(start: int, end: int, seed: Any = None) -> int:
+    return random.Random(seed).randrange(start, end)
+
+
+def _string_split(value: str, delimiters: str) -> List[str]:
+    return [part for part in re.split("|".join(re.escape(char) for char in delimiters), value) if part]
+
+
+def _json_merge(first: Dict, second: Dict, deep: bool = False) -> Dict:
+    if deep:
+        raise _failure("States.JsonMerge only supports shallow merges")
+    return {**first, **second}
+
+
+def _hash(value: str, algorithm: str) -> str:
+    try:
+        return hashlib.new(_HASHES[algorithm], value.encode("utf-8")).hexdigest()
+    except KeyError:
+        raise _failure(f"Unsupported hash algorithm {algorithm!r}") from None
+
+
+_FUNCTIONS: Dict[str, Callable[..., Any]] = {
+    "States.Format": _format,
+    "States.StringToJson": json.loads,
+    "States.JsonToString": lambda value: json.dumps(value, separators=(",", ":")),
+    "States.Array": lambda *values: list(values),
+    "States.ArrayPartition": _array_partition,
+    "States.ArrayContains": lambda values, value: value in values,
+    "States.ArrayRange": _array_range,
+    "States.ArrayGetItem": lambda values, index: values[index],
+    "States.ArrayLength": len,
+    "States.ArrayUnique": _array_unique,
+    "States.MathAdd": lambda first, second: first + second,
+    "States.MathRandom": _math_random,
+    "States.StringSplit": _string_split,
+    "States.JsonMerge": _json_merge,
+    "States.UUID": lambda: str(uuid.uuid4()),
+    "States.Base64Encode": lambda value: base64.b64encode(value.encode("utf-8")).decode("ascii"),
+    "States.Base64Decode": lambda value: base64.b64decode(value).decode("utf-8"),
+    "States.Hash": _hash,
+}
+
+
+class _Parser:
+    """Recursive descent parser for one intrinsic function expression."""
+
+    def __init__(self, expression: str, data: Any, context: Dict):
+        self.expression = expression
+        self.position = 0
+        self.data = data
+        self.context = context
+
+    def _skip_space(self):
+        while self.position < len(self.expression) and self.expression[self.position] == " ":
+            self.position += 1
+
+    def _string(self) -> str:
+        characters = []
+        self.position += 1
+        while self.position < len(self.expression):
+            char = self.expression[self.position]
+            if char == "\\" and self.position + 1 < len(self.expression):
+                characters.append(self.expression[self.position + 1])
+                self.position += 2
+                continue
+            self.position += 1
+            if char == "'":
+                return "".join(characters)
+            characters.append(char)
+        raise _failure(f"Unterminated string in {self.expression!r}")
+
+    def _path(self) -> Any:
+        start = self.position
+        depth = 0
+        while self.position < len(self.expression):
+            char = self.expression[self.position]
+            if char == "[":
+                depth += 1
+            elif char == "]":
+                depth -= 1
+            elif char in ",)" and not depth:
+                break
+            self.position += 1
+        return read_path(self.expression[start : self.position].strip(), self.data, self.context)
+
+    def _literal(self) -> Any:
+        for word, value in (("null", None), ("true", True), ("false", False)):
+            if self.expression.startswith(word, self.position):
+                self.position += len(word)
+                return value
+
+        match = _NUMBER.match(self.expression, self.position)
+        if match is None:
+            raise _failure(f"Unexpected argument at position {self.position} in {self.expression!r}")
+        self.position = match.end()
+        return json.loads(match.group())
+
+    def argument(self) -> Any:
+        self._skip_space()
+        char = self.expression[self.position : self.position + 1]
+        if char == "'":
+            return self._string()
+        if char == "$":
+            return self._path()
+        if self.expression.startswith("States.", self.position):
+            return self.call()
+        return self._literal()
+
+    def _arguments(self) -> Tuple:
+        arguments = []
+        self._skip_space()
+        if self.expression[self.position : self.position + 1] == ")":
+            self.position += 1
+            return ()
+
+        while True:
+            arguments.append(self.argument())
+            self._skip_space()
+            char = self.expression[self.position : self.position + 1]
+            self.position += 1
+            if char == ")":
+                return tuple(arguments)
+            if char != ",":
+                raise _failure(f"Expected ',' or ')' at position {self.position - 1} in {self.expression!r}")
+
+    def call(self) -> Any:
+        match = _NAME.match(self.expression, self.position)
+        if match is None or self.expression[match.end() : match.end() + 1] != "(":
+            raise _failure(f"Invalid intrinsic function call in {self.expression!r}")
+
+        name = match.group()
+        try:
+            function = _FUNCTIONS[name]
+        except KeyError:
+            raise _failure(f"Unknown intrinsic function {name}") from None
+
+        self.position = match.end() + 1
+        arguments = self._arguments()
+        try:
+            return function(*arguments)
+        except StatesError:
+            raise
+        except Exception as error:  # pylint: disable=broad-except
+            raise _failure(f"{name} failed: {error}") from error
+
+
+def evaluate_intrinsic(expression: str, data: Any, context: Dict) -> Any:
+    """Evaluate an intrinsic function expression (ex: ``States.ArrayPartition($.items, 25)``)."""
+    parser = _Parser(expression.strip(), data, context)
+    value = parser.call()
+    if parser.position != len(parser.expression):
+        raise _failure(f"Unexpected text after intrinsic function call in {expression!r}")
+    return value
+
+
+def resolve_parameters(template: Any, data: Any, context: Dict) -> Any:
+    """Build the effective input from a ``Parameters`` template."""
+    if isinstance(template, list):
+        return [resolve_parameters(value, data, context) for value in template]
+
+    if not isinstance(template, dict):
+        return template
+
+    resolved = {}
+    for name, value in template.items():
+        if not name.endswith(".$"):
+            resolved[name] = resolve_parameters(value, data, context)
+        elif value.startswith("$"):
+            resolved[name[:-2]] = read_path(value, data, context)
+        else:
+            resolved[name[:-2]] = evaluate_intrinsic(value, data, context)
+    return resolved
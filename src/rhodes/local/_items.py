@@ -0,0 +1,112 @@
+"""Read and batch the items of distributed Map states."""
+import csv
+import io
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from rhodes.exceptions import StatesError
+
+__all__ = ("reader_items", "manifest_files", "csv_items", "batch_items")
+
+
+def _failure(message: str) -> StatesError:
+    return StatesError("States.ItemReaderFailed", message)
+
+
+def csv_items(body: str, headers: Optional[List[str]] = None) -> List[Dict[str, str]]:
+    """Read one item for each row of a CSV file, using the first row as the headers unless ``headers`` is set."""
+    rows = [row for row in csv.reader(io.StringIO(body)) if row]
+    if headers is None:
+        if not rows:
+            raise _failure("CSV file has no header row")
+        headers, rows = rows[0], rows[1:]
+
+    items = []
+    for number, row in enumerate(rows, start=1):
+        if len(row) != len(headers):
+            raise _failure(f"CSV row {number} has {len(row)} values but there are {len(headers)} headers")
+        items.append(dict(zip(headers, row)))
+    return items
+
+
+def reader_items(result: Dict, config: Dict) -> List:
+    """Read the items from the result of an ``ItemReader`` call.
+
+    :param dict result: Result of the ``ItemReader`` resource
+    :param dict config: ``ReaderConfig`` of the ``ItemReader``
+    """
+    input_type = config.get("InputType")
+    if input_type is None:
+        return list(result.get("Contents", ()))
+
+    body = result["Body"]
+    if input_type == "JSON":
+        try:
+            items = json.loads(body)
+        except ValueError as error:
+            raise _failure(f"Object is not valid JSON: {error}") from None
+        if not isinstance(items, list):
+            raise _failure("JSON object must contain an array")
+        return items
+
+    if input_type == "CSV":
+        headers = config.get("CSVHeaders") if config.get("CSVHeaderLocation") == "GIVEN" else None
+        return csv_items(body, headers)
+
+    raise _failure(f"Unsupported ItemReader input type {input_type!r}")
+
+
+def manifest_files(body: str) -> Tuple[str, List[str], List[str]]:
+    """Read an S3 inventory manifest.
+
+    :returns: Bucket that contains the inventory files, keys of the inventory files, and the inventory columns
+    """
+    try:
+        manifest = json.loads(body)
+        bucket = manifest["destinationBucket"].split(":::", 1)[-1]
+        keys = [file["key"] for file in manifest["files"]]
+        columns = [column.strip() for column in manifest["fileSchema"].split(",")]
+    except (ValueError, KeyError, TypeError) as error:
+        raise _failure(f"Invalid S3 inventory manifest: {error!r}") from None
+
+    if manifest.get("fileFormat", "CSV") != "CSV":
+        raise _failure(f"Unsupported S3 inventory format {manifest['fileFormat']!r}")
+    return bucket, keys, columns
+
+
+def _size(value: Any) -> int:
+    return len(json.dumps(value, separators=(",", ":")).encode("utf-8"))
+
+
+def batch_items(items: List, batcher: Dict, batch_input: Optional[Dict]) -> List[Dict]:
+    """Group items into the inputs of the child executions of a distributed Map state.
+
+    :param list items: Items, after ``ItemSelector``
+    :param dict batcher: ``ItemBatcher`` of the Map state
+    :param dict batch_input: Resolved ``BatchInput``
+    """
+    max_items = batcher.get("MaxItemsPerBatch")
+    max_bytes = batcher.get("MaxInputBytesPerBatch")
+    extra = {} if batch_input is None else {"BatchInput": batch_input}
+    # Serialized size of a batch with no items; each item adds its own size and a separating comma.
+    empty_size = _size(dict(extra, Items=[]))
+
+    batches: List[Dict] = []
+    current: List = []
+    current_size = empty_size
+    for item in items:
+        item_size = _size(item)
+        full = max_items is not None and len(current) >= max_items
+        too_big = max_bytes is not None and current_size + item_size + 1 > max_bytes
+        if current and (full or too_big):
+            batches.append(dict(extra, Items=current))
+            current, current_size = [], empty_size
+
+        current_size += item_size + (1 if current else 0)
+        if max_bytes is not None and current_size > max_bytes:
+            raise StatesError("States.Runtime", f"Item is larger than MaxInputBytesPerBatch ({max_bytes} bytes)")
+        current.append(item)
+
+    if current:
+        batches.append(dict(extra, Items=current))
+    return batches
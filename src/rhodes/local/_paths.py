@@ -0,0 +1,74 @@
+"""Read and write state data with JSONPath and reference paths."""
+import copy
+from functools import lru_cache
+from typing import Any, Dict, List, Union
+
+import jsonpath_rw
+
+from rhodes.exceptions import StatesError
+
+__all__ = ("read_path", "write_path")
+
+_INDEFINITE = ("*", "..", "?(", ":")
+
+
+@lru_cache(maxsize=1024)
+def _parse(path: str) -> jsonpath_rw.JSONPath:
+    try:
+        return jsonpath_rw.parse(path)
+    except Exception as error:  # jsonpath_rw raises bare Exceptions for invalid paths
+        raise StatesError("States.Runtime", f"Invalid path {path!r}: {error}") from error
+
+
+def read_path(path: str, data: Any, context: Dict) -> Any:
+    """Read the value at a path in the state data, or in the context object for paths that start with ``$$``.
+
+    Paths that can only select one value return that value;
+    paths with wildcards, slices, or filters return a list of every value that they select.
+    """
+    if path.startswith("$$"):
+        path, data = "$" + path[2:], context
+
+    matches = [match.value for match in _parse(path).find(data)]
+    if any(marker in path for marker in _INDEFINITE):
+        return matches
+
+    if not matches:
+        raise StatesError("States.Runtime", f"Path {path!r} does not match any value in the input")
+    return matches[0]
+
+
+def _reference_parts(expression: jsonpath_rw.JSONPath) -> List[Union[str, int]]:
+    if isinstance(expression, jsonpath_rw.Root):
+        return []
+    if isinstance(expression, jsonpath_rw.Child):
+        return _reference_parts(expression.left) + _reference_parts(expression.right)
+    if isinstance(expression, jsonpath_rw.Fields) and len(expression.fields) == 1:
+        return [expression.fields[0]]
+    if isinstance(expression, jsonpath_rw.Index):
+        return [expression.index]
+    raise StatesError("States.Runtime", f"{expression} is not a reference path")
+
+
+def write_path(path: str, data: Any, value: Any) -> Any:
+    """Place a value in a copy of the state data at a reference path, as ``ResultPath`` does."""
+    parts = _reference_parts(_parse(path))
+    if not parts:
+        return value
+
+    data = copy.deepcopy(data)
+    if not isinstance(data, dict):
+        raise StatesError("States.Runtime", f"Unable to apply ResultPath {path!r} to non-object input")
+
+    target = data
+    try:
+        for part in parts[:-1]:
+            if isinstance(part, int):
+                target = target[part]
+            else:
+                target = target.setdefault(part, {})
+        target[parts[-1]] = value
+    except (AttributeError, IndexError, KeyError, TypeError) as error:
+        # An intermediate value is not an object or array that the path can be applied to.
+        raise StatesError("States.Runtime", f"Unable to apply ResultPath {path!r} to the input: {error!r}") from None
+    return data
@@ -0,0 +1,131 @@
+"""Evaluate Choice state rules."""
+import operator
+import re
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Any, Callable, Dict
+
+from rhodes.exceptions import StatesError
+from rhodes.local._paths import read_path
+
+__all__ = ("parse_timestamp", "rule_matches")
+
+_TIMESTAMP = re.compile(
+    r"^(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2}):(\d{2})(?:\.(\d{1,9}))?(Z|[+-]\d{2}:\d{2})$", re.IGNORECASE
+)
+_COMPARISONS: Dict[str, Callable[[Any, Any], bool]] = {
+    "Equals": operator.eq,
+    "LessThan": operator.lt,
+    "GreaterThan": operator.gt,
+    "LessThanEquals": operator.le,
+    "GreaterThanEquals": operator.ge,
+}
+_TYPES = ("String", "Numeric", "Boolean", "Timestamp")
+_MISSING = object()
+
+
+def parse_timestamp(value: Any) -> datetime:
+    """Parse an ISO 8601 timestamp in the form that Step Functions accepts.
+
+    :raises ValueError: if ``value`` is not a timestamp
+    """
+    match = _TIMESTAMP.match(value) if isinstance(value, str) else None
+    if match is None:
+        raise ValueError(f"{value!r} is not a timestamp")
+
+    year, month, day, hour, minute, second, fraction, zone = match.groups()
+    if zone.upper() == "Z":
+        offset = timedelta(0)
+    else:
+        offset = timedelta(hours=int(zone[1:3]), minutes=int(zone[4:6])) * (1 if zone[0] == "+" else -1)
+    parsed = datetime(int(year), int(month), int(day), int(hour), int(minute), int(second), tzinfo=timezone(offset))
+    return parsed + timedelta(microseconds=int((fraction or "0").ljust(6, "0")[:6]))
+
+
+def _is_timestamp(value: Any) -> bool:
+    try:
+        parse_timestamp(value)
+    except ValueError:
+        return False
+    return True
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float, Decimal)) and not isinstance(value, bool)
+
+
+def _string_matches(value: Any, pattern: str) -> bool:
+    if not isinstance(value, str):
+        return False
+    expression = "".join(
+        ".*" if piece == "*" else re.escape(piece[1:] if piece.startswith("\\") else piece)
+        for piece in re.findall(r"\\.|\*|[^\\*]+", pattern)
+    )
+    return re.fullmatch(expression, value, re.DOTALL) is not None
+
+
+_TYPE_TESTS: Dict[str, Callable[[Any], bool]] = {
+    "IsNull": lambda value: value is None,
+    "IsString": lambda value: isinstance(value, str),
+    "IsNumeric": _is_number,
+    "IsBoolean": lambda value: isinstance(value, bool),
+    "IsTimestamp": _is_timestamp,
+}
+
+
+def _typed(kind: str, value: Any) -> Any:
+    """Convert a value for comparison, or return ``_MISSING`` if it is the wrong type for the comparison."""
+    if kind == "String":
+        return value if isinstance(value, str) else _MISSING
+    if kind == "Numeric":
+        return value if _is_number(value) else _MISSING
+    if kind == "Boolean":
+        return value if isinstance(value, bool) else _MISSING
+    return parse_timestamp(value) if _is_timestamp(value) else _MISSING
+
+
+def _compare(rule: Dict, name: str, value: Any, data: Any, context: Dict) -> bool:
+    expected = rule[name]
+    if name.endswith("Path"):
+        name = name[: -len("Path")]
+        expected = read_path(expected, data, context)
+
+    if name == "StringMatches":
+        return _string_matches(value, expected)
+
+    kind = next(kind for kind in _TYPES if name.startswith(kind))
+    left, right = _typed(kind, value), _typed(kind, expected)
+    if left is _MISSING or right is _MISSING:
+        return False
+    return _COMPARISONS[name[len(kind) :]](left, right)
+
+
+def _variable_matches(rule: Dict, value: Any, data: Any, context: Dict) -> bool:
+    for name in rule:
+        if name in _TYPE_TESTS:
+            return _TYPE_TESTS[name](value) == rule[name]
+        if name not in ("Variable", "Next"):
+            return _compare(rule, name, value, data, context)
+
+    raise StatesError("States.Runtime", f"Choice rule {rule!r} has no comparison")
+
+
+def rule_matches(rule: Dict, data: Any, context: Dict) -> bool:
+    """Determine whether a serialized choice rule matches the state input."""
+    if "And" in rule:
+        return all(rule_matches(inner, data, context) for inner in rule["And"])
+    if "Or" in rule:
+        return any(rule_matches(inner, data, context) for inner in rule["Or"])
+    if "Not" in rule:
+        return not rule_matches(rule["Not"], data, context)
+
+    try:
+        value = read_path(rule["Variable"], data, context)
+    except StatesError:
+        value = _MISSING
+
+    if "IsPresent" in rule:
+        return (value is not _MISSING) == rule["IsPresent"]
+    if value is _MISSING:
+        raise StatesError("States.Runtime", f"Invalid path {rule['Variable']!r}: the path does not match the input")
+    return _variable_matches(rule, value, data, context)
@@ -0,0 +1,218 @@
+"""
+Task tokens for Task states that wait for a callback.
+
+Once a :class:`CallbackBroker` is registered with a :class:`LocalEngine`,
+each Task state with a ``.waitForTaskToken`` resource gets a task token in ``$$.Task.Token``.
+The state calls its handler, which should pass the token on (ex: in the message that it sends),
+and then waits until the token is used to call :meth:`CallbackBroker.send_task_success`
+or :meth:`CallbackBroker.send_task_failure`.
+``HeartbeatSeconds`` and ``TimeoutSeconds`` are enforced on the virtual clock.
+Without a broker, the handler result is the task result.
+
+.. code-block:: python
+
+    broker = CallbackBroker()
+    engine = LocalEngine()
+    broker.register(engine)
+
+    @engine.register("arn:aws:states:::sqs:sendMessage")
+    def _send(parameters, context):
+        # Approve every request five seconds after it is sent.
+        token = parameters["MessageBody"]["TaskToken"]
+        asyncio.get_event_loop().call_later(5, broker.send_task_success, token, {"approved": True})
+        return {}
+
+    execution = engine.execute(workflow)
+    broker.latencies
+
+The broker also handles the ``sendTaskSuccess``, ``sendTaskFailure``, and ``sendTaskHeartbeat``
+AWS SDK service integrations, so that one execution can call back another.
+"""
+import asyncio
+import json
+from typing import Any, Awaitable, Dict, List, Optional
+
+import attr
+
+from rhodes.exceptions import StatesError
+from rhodes.identifiers import AwsSdkArn
+from rhodes.local.engine import LocalEngine, TaskContext
+
+__all__ = ("Callback", "CallbackBroker")
+
+
+@attr.s
+class Callback:
+    """One task token handed out by a Task state.
+
+    :param str task_token: Task token
+    :param str execution_id: Execution ARN of the execution that is waiting
+    :param str state: Name of the Task state that is waiting
+    :param str status: ``WAITING``, ``SUCCEEDED``, ``FAILED``,
+        or ``TIMED_OUT`` if the state stopped waiting without a callback
+        (because of ``HeartbeatSeconds``, ``TimeoutSeconds``, or an error)
+    :param float opened: Virtual time when the state started waiting, in seconds
+    :param float closed: Virtual time when the state stopped waiting, in seconds
+    :param float last_heartbeat: Virtual time of the last heartbeat, or ``opened`` if there was none
+    :param int heartbeats: Number of heartbeats sent
+    """
+
+    task_token: str = attr.ib()
+    execution_id: str = attr.ib()
+    state: str = attr.ib()
+    status: str = attr.ib(default="WAITING")
+    opened: float = attr.ib(default=0.0)
+    closed: Optional[float] = attr.ib(default=None)
+    last_heartbeat: float = attr.ib(default=0.0)
+    heartbeats: int = attr.ib(default=0)
+
+    @property
+    def latency(self) -> Optional[float]:
+        """Virtual seconds from the start of the wait to the callback, if it was called back."""
+        if self.status not in ("SUCCEEDED", "FAILED"):
+            return None
+        return self.closed - self.opened
+
+
+class CallbackBroker:
+    """Task tokens of Task states that wait for a callback, for :class:`LocalEngine` executions.
+
+    Use :meth:`send_task_success`, :meth:`send_task_failure`, and :meth:`send_task_heartbeat`
+    from handlers, from other coroutines on the engine's event loop, or from the AWS SDK service integrations.
+    They raise :class:`StatesError` ``Sfn.InvalidToken`` for unknown tokens
+    and ``Sfn.TaskTimedOut`` for tokens that are no longer waiting.
+    """
+
+    def __init__(self):
+        self.callbacks: Dict[str, Callback] = {}
+        self.peak_waiting = 0
+        self._open = 0
+        self._futures: Dict[str, asyncio.Future] = {}
+
+    def register(self, engine: LocalEngine):
+        """Hand out task tokens for the ``.waitForTaskToken`` Task states that an engine runs,
+        and register handlers for the Step Functions callback resources.
+        """
+        engine.callbacks = self
+        engine.register(AwsSdkArn(service="sfn", action="sendTaskSuccess").value, self._sdk_send_task_success)
+        engine.register(AwsSdkArn(service="sfn", action="sendTaskFailure").value, self._sdk_send_task_failure)
+        engine.register(AwsSdkArn(service="sfn", action="sendTaskHeartbeat").value, self._sdk_send_task_heartbeat)
+
+    @property
+    def waiting(self) -> List[Callback]:
+        """Callbacks that Task states are waiting for."""
+        return [callback for callback in self.callbacks.values() if callback.status == "WAITING"]
+
+    @property
+    def latencies(self) -> List[float]:
+        """Virtual seconds from the start of each wait to its callback, in the order the waits started."""
+        return [callback.latency for callback in self.callbacks.values() if callback.latency is not None]
+
+    def _waiting(self, task_token: str) -> Callback:
+        try:
+            callback = self.callbacks[task_token]
+        except KeyError:
+            raise StatesError("Sfn.InvalidToken", f"Invalid task token: {task_token!r}") from None
+        if callback.status != "WAITING":
+            raise StatesError("Sfn.TaskTimedOut", f"Task is no longer waiting: {callback.status}")
+        return callback
+
+    def _close(self, task_token: str, status: str):
+        self._open -= 1
+        callback = self.callbacks[task_token]
+        callback.status = status
+        callback.closed = asyncio.get_event_loop().time()
+
+    def send_task_success(self, task_token: str, output: Any):
+        """Complete the task that handed out a token.
+
+        :param str task_token: Task token
+        :param output: Task result
+        """
+        self._waiting(task_token)
+        self._close(task_token, "SUCCEEDED")
+        self._futures[task_token].set_result(output)
+
+    def send_task_failure(self, task_token: str, error: str = "", cause: str = ""):
+        """Fail the task that handed out a token.
+
+        :param str task_token: Task token
+        :param str error: Error name
+        :param str cause: Error cause
+        """
+        self._waiting(task_token)
+        self._close(task_token, "FAILED")
+        self._futures[task_token].set_exception(StatesError(error, cause))
+
+    def send_task_heartbeat(self, task_token: str):
+        """Report that the task that handed out a token is still running, restarting its ``HeartbeatSeconds``.
+
+        :param str task_token: Task token
+        """
+        callback = self._waiting(task_token)
+        callback.heartbeats += 1
+        callback.last_heartbeat = asyncio.get_event_loop().time()
+
+    async def wait_for_callback(
+        self,
+        task_token: str,
+        submit: Awaitable,
+        *,
+        execution_id: str,
+        state: str,
+        heartbeat_seconds: Optional[float] = None,
+    ) -> Any:
+        """Run the call that hands out a task token, then wait for the callback. Used by :class:`LocalEngine`.
+
+        :param str task_token: Task token
+        :param submit: Call to the Task state's handler
+        :param str execution_id: Execution ARN of the waiting execution
+        :param str state: Name of the waiting Task state
+        :param float heartbeat_seconds: Maximum virtual seconds between heartbeats
+        :returns: Output sent with :meth:`send_task_success`
+        :raises StatesError: the error sent with :meth:`send_task_failure`,
+            or ``States.HeartbeatTimeout`` if a heartbeat is late
+        """
+        loop = asyncio.get_event_loop()
+        now = loop.time()
+        callback = Callback(task_token, execution_id, state, opened=now, last_heartbeat=now)
+        self.callbacks[task_token] = callback
+        future = self._futures[task_token] = loop.create_future()
+        self._open += 1
+        self.peak_waiting = max(self.peak_waiting, self._open)
+
+        try:
+            await submit
+            while not future.done():
+                remaining = None
+                if heartbeat_seconds is not None:
+                    remaining = callback.last_heartbeat + heartbeat_seconds - loop.time()
+                    if remaining <= 0:
+                        raise StatesError(
+                            "States.HeartbeatTimeout",
+                            f"Task {state!r} sent no heartbeat for {heartbeat_seconds} seconds",
+                        )
+                try:
+                    await asyncio.wait_for(asyncio.shield(future), remaining)
+                except asyncio.TimeoutError:
+                    continue
+            return future.result()
+        finally:
+            if callback.status == "WAITING":
+                self._close(task_token, "TIMED_OUT")
+            del self._futures[task_token]
+
+    async def _sdk_send_task_success(self, parameters: Dict, context: TaskContext) -> Dict:
+        # pylint: disable=unused-argument
+        self.send_task_success(parameters["TaskToken"], json.loads(parameters["Output"]))
+        return {}
+
+    async def _sdk_send_task_failure(self, parameters: Dict, context: TaskContext) -> Dict:
+        # pylint: disable=unused-argument
+        self.send_task_failure(parameters["TaskToken"], parameters.get("Error", ""), parameters.get("Cause", ""))
+        return {}
+
+    async def _sdk_send_task_heartbeat(self, parameters: Dict, context: TaskContext) -> Dict:
+        # pylint: disable=unused-argument
+        self.send_task_heartbeat(parameters["TaskToken"])
+        return {}
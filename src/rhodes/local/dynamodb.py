@@ -0,0 +1,231 @@
+"""
+In-memory stand-in for Amazon DynamoDB.
+
+:class:`InMemoryDynamoDb` handles the DynamoDB Task states that rhodes builds,
+including the ``BatchWriteItem`` calls made by :meth:`AmazonDynamoDb.bulk_write`,
+and models provisioned write capacity on the engine's virtual clock.
+Write requests that exceed the available capacity are returned as ``UnprocessedItems``,
+and a batch where no request could be written fails with ``ProvisionedThroughputExceededException``,
+as DynamoDB does.
+
+.. code-block:: python
+
+    database = InMemoryDynamoDb(write_capacity=100)
+    database.create_table("orders", "pk")
+
+    engine = LocalEngine()
+    database.register(engine)
+    execution = engine.execute(workflow, {"orders": requests})
+
+    database.stats.items_written
+    database.stats.unprocessed_items
+"""
+import asyncio
+import json
+import math
+from typing import Dict, List, Optional, Tuple
+
+import attr
+
+from rhodes.exceptions import StatesError
+from rhodes.identifiers import AwsSdkArn, ServiceArn
+from rhodes.local.engine import LocalEngine, TaskContext
+from rhodes.states.services.dynamodb import MAX_BATCH_WRITE_ITEMS
+
+__all__ = ("DynamoDbStats", "InMemoryDynamoDb")
+
+# Size of one write capacity unit.
+_WRITE_UNIT_BYTES = 1024
+
+
+@attr.s
+class DynamoDbStats:
+    """Requests handled by :class:`InMemoryDynamoDb`.
+
+    :param int requests: Number of calls
+    :param int throttled_requests: Number of calls rejected because no write capacity was available
+    :param int items_written: Number of write requests applied
+    :param int unprocessed_items: Number of write requests returned as ``UnprocessedItems``
+    :param float first_write: Virtual time of the first applied write request
+    :param float last_write: Virtual time of the last applied write request
+    """
+
+    requests: int = attr.ib(default=0)
+    throttled_requests: int = attr.ib(default=0)
+    items_written: int = attr.ib(default=0)
+    unprocessed_items: int = attr.ib(default=0)
+    first_write: Optional[float] = attr.ib(default=None)
+    last_write: Optional[float] = attr.ib(default=None)
+
+    @property
+    def write_throughput(self) -> float:
+        """Write requests applied per virtual second, between the first and the last write."""
+        if self.first_write is None or self.last_write == self.first_write:
+            return float(self.items_written)
+        return self.items_written / (self.last_write - self.first_write)
+
+    def record_writes(self, count: int, now: float):
+        """Count write requests applied at a point in virtual time."""
+        if not count:
+            return
+        self.items_written += count
+        if self.first_write is None:
+            self.first_write = now
+        self.last_write = now
+
+
+def _units(item: Dict) -> int:
+    return max(1, math.ceil(len(json.dumps(item, separators=(",", ":")).encode("utf-8")) / _WRITE_UNIT_BYTES))
+
+
+class InMemoryDynamoDb:
+    """In-memory DynamoDB tables for :class:`LocalEngine` executions.
+
+    Items use the DynamoDB JSON format (ex: ``{"pk": {"S": "a"}}``).
+
+    :param float write_capacity: Write capacity units per second for each table (default: unlimited).
+        Unused capacity accumulates for up to one second.
+    :param float latency: Virtual seconds that each call takes
+    """
+
+    def __init__(self, *, write_capacity: Optional[float] = None, latency: float = 0.01):
+        self.write_capacity = write_capacity
+        self.latency = latency
+        self.tables: Dict[str, Dict[str, Dict]] = {}
+        self.stats = DynamoDbStats()
+        self._key_names: Dict[str, Tuple[str, ...]] = {}
+        # Table name -> (available capacity units, virtual time of last refill)
+        self._capacity: Dict[str, Tuple[float, float]] = {}
+
+    def create_table(self, name: str, *key_names: str) -> Dict[str, Dict]:
+        """Create an empty table.
+
+        :param str name: Table name
+        :param str key_names: Names of the key attributes (default: ``pk``)
+        :returns: Items in the table, by key
+        """
+        self._key_names[name] = key_names or ("pk",)
+        self.tables[name] = {}
+        return self.tables[name]
+
+    def register(self, engine: LocalEngine):
+        """Register handlers for the DynamoDB resources with an engine."""
+        engine.register(AwsSdkArn(service="dynamodb", action="batchWriteItem").value, self.batch_write_item)
+        engine.register(ServiceArn.DYNAMODB_GET_ITEM.value, self.get_item)
+        engine.register(ServiceArn.DYNAMODB_PUT_ITEM.value, self.put_item)
+        engine.register(ServiceArn.DYNAMODB_DELETE_ITEM.value, self.delete_item)
+
+    def _table(self, name: str, prefix: str) -> Dict[str, Dict]:
+        try:
+            return self.tables[name]
+        except KeyError:
+            raise StatesError(f"{prefix}.ResourceNotFoundException", f"Requested resource not found: {name}") from None
+
+    def _key(self, table: str, item: Dict, prefix: str) -> str:
+        try:
+            return json.dumps([item[name] for name in self._key_names[table]], sort_keys=True)
+        except KeyError as error:
+            raise StatesError(f"{prefix}.ValidationException", f"Missing the key {error.args[0]} in the item") from None
+
+    def _consume(self, table: str, units: int, now: float) -> bool:
+        """Take write capacity from a table, if enough is available."""
+        if self.write_capacity is None:
+            return True
+
+        available, updated = self._capacity.get(table, (self.write_capacity, now))
+        available = min(self.write_capacity, available + (now - updated) * self.write_capacity)
+        allowed = available >= units
+        self._capacity[table] = (available - units if allowed else available, now)
+        return allowed
+
+    async def _call(self) -> float:
+        self.stats.requests += 1
+        await asyncio.sleep(self.latency)
+        return asyncio.get_event_loop().time()
+
+    async def batch_write_item(self, parameters: Dict, context: TaskContext) -> Dict:
+        """Handle ``BatchWriteItem``, returning write requests that exceed the write capacity as unprocessed."""
+        # pylint: disable=unused-argument
+        request_items: Dict[str, List[Dict]] = parameters.get("RequestItems") or {}
+        if not 0 < sum(len(requests) for requests in request_items.values()) <= MAX_BATCH_WRITE_ITEMS:
+            raise StatesError(
+                "DynamoDb.ValidationException",
+                f"Member must have length less than or equal to {MAX_BATCH_WRITE_ITEMS} and at least 1",
+            )
+
+        now = await self._call()
+        written = 0
+        unprocessed: Dict[str, List[Dict]] = {}
+        for table_name, requests in request_items.items():
+            table = self._table(table_name, "DynamoDb")
+            for request in requests:
+                if "PutRequest" in request:
+                    item = request["PutRequest"]["Item"]
+                    key = self._key(table_name, item, "DynamoDb")
+                elif "DeleteRequest" in request:
+                    item = request["DeleteRequest"]["Key"]
+                    key = self._key(table_name, item, "DynamoDb")
+                else:
+                    raise StatesError("DynamoDb.ValidationException", f"Invalid write request: {request!r}")
+
+                if not self._consume(table_name, _units(item), now):
+                    unprocessed.setdefault(table_name, []).append(request)
+                    continue
+
+                if "PutRequest" in request:
+                    table[key] = item
+                else:
+                    table.pop(key, None)
+                written += 1
+
+        if unprocessed and not written:
+            self.stats.throttled_requests += 1
+            raise StatesError(
+                "DynamoDb.ProvisionedThroughputExceededException",
+                "The level of configured provisioned throughput for the table was exceeded.",
+            )
+
+        self.stats.record_writes(written, now)
+        self.stats.unprocessed_items += sum(len(requests) for requests in unprocessed.values())
+        return {"UnprocessedItems": unprocessed}
+
+    async def get_item(self, parameters: Dict, context: TaskContext) -> Dict:
+        """Handle ``GetItem``."""
+        # pylint: disable=unused-argument
+        table = self._table(parameters["TableName"], "DynamoDB")
+        key = self._key(parameters["TableName"], parameters["Key"], "DynamoDB")
+        await self._call()
+        return {"Item": table[key]} if key in table else {}
+
+    async def put_item(self, parameters: Dict, context: TaskContext) -> Dict:
+        """Handle ``PutItem``."""
+        # pylint: disable=unused-argument
+        table = self._table(parameters["TableName"], "DynamoDB")
+        item = parameters["Item"]
+        key = self._key(parameters["TableName"], item, "DynamoDB")
+        now = await self._call()
+        if not self._consume(parameters["TableName"], _units(item), now):
+            self.stats.throttled_requests += 1
+            raise StatesError(
+                "DynamoDB.ProvisionedThroughputExceededException",
+                "The level of configured provisioned throughput for the table was exceeded.",
+            )
+        table[key] = item
+        self.stats.record_writes(1, now)
+        return {}
+
+    async def delete_item(self, parameters: Dict, context: TaskContext) -> Dict:
+        """Handle ``DeleteItem``."""
+        # pylint: disable=unused-argument
+        table = self._table(parameters["TableName"], "DynamoDB")
+        key = self._key(parameters["TableName"], parameters["Key"], "DynamoDB")
+        now = await self._call()
+        if not self._consume(parameters["TableName"], 1, now):
+            self.stats.throttled_requests += 1
+            raise StatesError(
+                "DynamoDB.ProvisionedThroughputExceededException",
+                "The level of configured provisioned throughput for the table was exceeded.",
+            )
+        table.pop(key, None)
+        self.stats.record_writes(1, now)
+        return {}
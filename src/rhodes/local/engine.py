@@ -0,0 +1,667 @@
+"""Run state machines locally, on virtual time."""
+import asyncio
+import fnmatch
+import inspect
+import json
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+import attr
+
+from rhodes.exceptions import LocalExecutionError, StatesError
+from rhodes.express import EXPRESS_MAX_DURATION_SECONDS
+from rhodes.identifiers import ExecutionType
+from rhodes.local._clock import run
+from rhodes.local._intrinsics import resolve_parameters
+from rhodes.local._items import batch_items, csv_items, manifest_files, reader_items
+from rhodes.local._paths import read_path, write_path
+from rhodes.local._rules import parse_timestamp, rule_matches
+from rhodes.states import StateMachine
+
+__all__ = ("Handler", "TaskContext", "Execution", "MapRun", "LocalEngine")
+
+# Suffixes that select the integration pattern of a service integration resource.
+_PATTERN_SUFFIXES = (".sync:2", ".sync", ".waitForTaskToken")
+_CALLBACK_SUFFIX = ".waitForTaskToken"
+_DEFAULT_EPOCH = datetime(2020, 1, 1, tzinfo=timezone.utc)
+_ARN_PREFIX = "arn:aws:states:local:000000000000"
+# Step Functions runs up to 10,000 child executions of a distributed Map state at once.
+_MAX_CHILD_EXECUTIONS = 10000
+
+
+@attr.s
+class TaskContext:
+    """Information about the Task state that a handler is called for.
+
+    :param str resource: ``Resource`` of the Task state
+    :param str state: Name of the Task state
+    :param int retry_count: Number of times that the state has been retried
+    :param dict context: `Context object`_ for the state
+    :param engine: Engine that is running the execution
+
+    .. _Context object: https://docs.aws.amazon.com/step-functions/latest/dg/input-output-contextobject.html
+    """
+
+    resource: str = attr.ib()
+    state: str = attr.ib()
+    retry_count: int = attr.ib()
+    context: Dict = attr.ib(repr=False)
+    engine: "LocalEngine" = attr.ib(repr=False)
+
+
+#: A task handler takes the effective input of a Task state and a :class:`TaskContext`
+#: and returns the result of the task, or an awaitable that resolves to the result.
+Handler = Callable[[Any, TaskContext], Union[Any, Awaitable[Any]]]
+
+
+@attr.s
+class Execution:
+    """Result of running a state machine with :class:`LocalEngine`.
+
+    :param str execution_id: Execution ARN
+    :param str status: ``SUCCEEDED``, ``FAILED``, or ``TIMED_OUT``
+    :param output: Execution output (if succeeded)
+    :param str error: Error name (if failed or timed out)
+    :param str cause: Error cause (if failed or timed out)
+    :param float started: Virtual time when the execution started, in seconds
+    :param float stopped: Virtual time when the execution stopped, in seconds
+    :param int transitions: Number of states entered, including states in branches and iterations
+    :param Counter task_calls: Number of handler calls for each ``Resource``, including retries
+        and calls made by child executions of distributed ``Map`` states
+    :param list map_runs: :class:`MapRun` for each distributed ``Map`` state that ran
+    """
+
+    execution_id: str = attr.ib()
+    status: str = attr.ib()
+    output: Any = attr.ib(default=None)
+    error: Optional[str] = attr.ib(default=None)
+    cause: Optional[str] = attr.ib(default=None)
+    started: float = attr.ib(default=0.0)
+    stopped: float = attr.ib(default=0.0)
+    transitions: int = attr.ib(default=0)
+    task_calls: Counter = attr.ib(factory=Counter)
+    map_runs: List["MapRun"] = attr.ib(factory=list, repr=False)
+
+    @property
+    def duration(self) -> float:
+        """Virtual seconds that the execution ran for."""
+        return self.stopped - self.started
+
+    @property
+    def succeeded(self) -> bool:
+        """Determine whether the execution succeeded."""
+        return self.status == "SUCCEEDED"
+
+
+@attr.s
+class MapRun:
+    """Child executions started by one run of a distributed ``Map`` state.
+
+    :param str map_run_arn: Map Run ARN
+    :param str state: Name of the Map state
+    :param int items: Number of items read
+    :param list executions: :class:`Execution` for each child execution that finished
+    :param float started: Virtual time when the Map Run started, in seconds
+    :param float stopped: Virtual time when the Map Run stopped, in seconds
+    """
+
+    map_run_arn: str = attr.ib()
+    state: str = attr.ib()
+    items: int = attr.ib(default=0)
+    executions: List[Execution] = attr.ib(factory=list, repr=False)
+    started: float = attr.ib(default=0.0)
+    stopped: float = attr.ib(default=0.0)
+
+    @property
+    def succeeded(self) -> int:
+        """Number of child executions that succeeded."""
+        return sum(1 for execution in self.executions if execution.succeeded)
+
+    @property
+    def failed(self) -> int:
+        """Number of child executions that failed."""
+        return len(self.executions) - self.succeeded
+
+    @property
+    def duration(self) -> float:
+        """Virtual seconds that the Map Run ran for."""
+        return self.stopped - self.started
+
+
+def _error_matches(error_equals: Iterable[str], error: StatesError) -> bool:
+    if error.error in error_equals:
+        return True
+    # Runtime errors are only retried or caught when they are named explicitly.
+    if error.error == "States.Runtime":
+        return False
+    for name in error_equals:
+        if name == "States.ALL":
+            return True
+        if name == "States.TaskFailed" and error.error != "States.Timeout":
+            return True
+    return False
+
+
+def _exceeds_tolerance(state: Dict, failed: int, total: int) -> bool:
+    """Determine whether failed child executions exceed the failures that a distributed Map state tolerates."""
+    percentage = state.get("ToleratedFailurePercentage")
+    count = state.get("ToleratedFailureCount")
+    if percentage is None and count is None:
+        return failed > 0
+    if count is not None and failed > count:
+        return True
+    return percentage is not None and failed * 100 > percentage * total
+
+
+async def _gather(coroutines: Iterable[Awaitable]) -> List:
+    """Run coroutines concurrently, cancelling the rest as soon as one fails."""
+    tasks = [asyncio.ensure_future(coroutine) for coroutine in coroutines]
+    if not tasks:
+        return []
+
+    try:
+        done, pending = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+    except asyncio.CancelledError:
+        # The execution timed out.
+        for task in tasks:
+            task.cancel()
+        raise
+    for task in pending:
+        task.cancel()
+    for task in done:
+        if task.exception() is not None:
+            if pending:
+                await asyncio.wait(pending)
+            raise task.exception()
+    return [task.result() for task in tasks]
+
+
+class _Run:
+    """State of one execution."""
+
+    def __init__(self, engine: "LocalEngine", execution: Execution, context: Dict):
+        self.engine = engine
+        self.execution = execution
+        self.context = context
+        self.loop = asyncio.get_event_loop()
+
+    def now(self) -> datetime:
+        return self.engine.epoch + timedelta(seconds=self.loop.time())
+
+    def _state_context(self, name: str, retry_count: int, extra: Optional[Dict]) -> Dict:
+        context = dict(self.context, **(extra or {}))
+        context["State"] = {"Name": name, "EnteredTime": self.now().isoformat(), "RetryCount": retry_count}
+        return context
+
+    async def machine(self, definition: Dict, data: Any, extra: Optional[Dict] = None) -> Any:
+        """Run a state machine, or a branch or iterator of one, and return its output."""
+        name = definition["StartAt"]
+        while True:
+            state = definition["States"][name]
+            self.execution.transitions += 1
+            try:
+                data, name = await self._retrying(name, state, data, extra)
+            except StatesError as error:
+                catcher = next(
+                    (catcher for catcher in state.get("Catch", ()) if _error_matches(catcher["ErrorEquals"], error)),
+                    None,
+                )
+                if catcher is None:
+                    raise
+                error_output = {"Error": error.error, "Cause": error.cause}
+                data = self._result(catcher.get("ResultPath", "$"), data, error_output)
+                name = catcher["Next"]
+
+            if name is None:
+                return data
+
+    async def _retrying(self, name: str, state: Dict, data: Any, extra: Optional[Dict]) -> Tuple[Any, Optional[str]]:
+        attempts: Counter = Counter()
+        while True:
+            context = self._state_context(name, sum(attempts.values()), extra)
+            if self._waits_for_callback(state):
+                # Every attempt gets a new task token.
+                context["Task"] = {"Token": uuid.uuid4().hex}
+            try:
+                return await self._state(name, state, data, context)
+            except StatesError as error:
+                position, retrier = next(
+                    (
+                        (position, retrier)
+                        for position, retrier in enumerate(state.get("Retry", ()))
+                        if _error_matches(retrier["ErrorEquals"], error)
+                    ),
+                    (None, None),
+                )
+                if retrier is None or attempts[position] >= retrier.get("MaxAttempts", 3):
+                    raise
+
+                delay = retrier.get("IntervalSeconds", 1) * retrier.get("BackoffRate", 2.0) ** attempts[position]
+                if "MaxDelaySeconds" in retrier:
+                    delay = min(delay, retrier["MaxDelaySeconds"])
+                attempts[position] += 1
+                await asyncio.sleep(delay)
+
+    @staticmethod
+    def _path(state: Dict, field: str, data: Any, context: Dict) -> Any:
+        if field not in state:
+            return data
+        if state[field] is None:
+            return {}
+        return read_path(state[field], data, context)
+
+    @staticmethod
+    def _result(path: Optional[str], data: Any, result: Any) -> Any:
+        if path is None:
+            return data
+        return write_path(path, data, result)
+
+    def _effective(self, state: Dict, data: Any, context: Dict) -> Any:
+        effective = self._path(state, "InputPath", data, context)
+        # Map states apply their Parameters to each item instead.
+        if "Parameters" in state and state["Type"] != "Map":
+            effective = resolve_parameters(state["Parameters"], effective, context)
+        return effective
+
+    def _output(self, state: Dict, data: Any, result: Any, context: Dict) -> Any:
+        output = self._result(state.get("ResultPath", "$"), data, result)
+        return self._path(state, "OutputPath", output, context)
+
+    async def _state(self, name: str, state: Dict, data: Any, context: Dict) -> Tuple[Any, Optional[str]]:
+        state_type = state["Type"]
+        next_name = None if state.get("End") else state.get("Next")
+
+        if state_type == "Choice":
+            return self._choice(name, state, data, context)
+
+        if state_type == "Fail":
+            raise StatesError(state.get("Error", "States.Fail"), state.get("Cause", ""))
+
+        if state_type in ("Succeed", "Wait"):
+            effective = self._path(state, "InputPath", data, context)
+            if state_type == "Wait":
+                await asyncio.sleep(self._wait_seconds(state, effective, context))
+            return self._path(state, "OutputPath", effective, context), next_name
+
+        effective = self._effective(state, data, context)
+        if state_type == "Pass":
+            result = state.get("Result", effective)
+        elif state_type == "Task":
+            result = await self._task(name, state, effective, context)
+        elif state_type == "Parallel":
+            result = await _gather(self.machine(branch, effective) for branch in state["Branches"])
+        elif state_type == "Map":
+            result = await self._map(name, state, effective, context)
+        else:
+            raise LocalExecutionError(f"State {name!r} has unsupported type {state_type!r}")
+
+        return self._output(state, data, result, context), next_name
+
+    def _choice(self, name: str, state: Dict, data: Any, context: Dict) -> Tuple[Any, str]:
+        effective = self._path(state, "InputPath", data, context)
+        for rule in state["Choices"]:
+            if rule_matches(rule, effective, context):
+                return self._path(state, "OutputPath", effective, context), rule["Next"]
+
+        if "Default" not in state:
+            raise StatesError("States.NoChoiceMatched", f"No choice rule in {name!r} matched the input")
+        return self._path(state, "OutputPath", effective, context), state["Default"]
+
+    def _wait_seconds(self, state: Dict, data: Any, context: Dict) -> float:
+        if "Seconds" in state:
+            return state["Seconds"]
+        if "SecondsPath" in state:
+            return read_path(state["SecondsPath"], data, context)
+
+        timestamp = state["Timestamp"] if "Timestamp" in state else read_path(state["TimestampPath"], data, context)
+        try:
+            target = parse_timestamp(timestamp)
+        except ValueError as error:
+            raise StatesError("States.Runtime", str(error)) from None
+        return max(0.0, (target - self.now()).total_seconds())
+
+    async def _invoke(self, resource: str, name: str, data: Any, context: Dict) -> Any:
+        """Call the handler for a resource and return its result."""
+        handler = self.engine.handler(resource)
+        self.execution.task_calls[resource] += 1
+        try:
+            result = handler(data, TaskContext(resource, name, context["State"]["RetryCount"], context, self.engine))
+            if inspect.isawaitable(result):
+                result = await result
+        except (StatesError, LocalExecutionError, asyncio.CancelledError):
+            raise
+        except Exception as error:  # pylint: disable=broad-except
+            # Unhandled handler errors fail the task with the error type as the error name, as Lambda does.
+            raise StatesError(type(error).__name__, str(error)) from error
+        return result
+
+    def _waits_for_callback(self, state: Dict) -> bool:
+        resource = state.get("Resource")
+        return self.engine.callbacks is not None and isinstance(resource, str) and resource.endswith(_CALLBACK_SUFFIX)
+
+    def _callback(self, name: str, state: Dict, data: Any, context: Dict) -> Awaitable:
+        """Call the handler, then wait for a callback with the task token."""
+        heartbeat = state.get("HeartbeatSeconds")
+        if "HeartbeatSecondsPath" in state:
+            heartbeat = read_path(state["HeartbeatSecondsPath"], data, context)
+        return self.engine.callbacks.wait_for_callback(
+            context["Task"]["Token"],
+            self._invoke(state["Resource"], name, data, context),
+            execution_id=self.execution.execution_id,
+            state=name,
+            heartbeat_seconds=heartbeat,
+        )
+
+    async def _task(self, name: str, state: Dict, data: Any, context: Dict) -> Any:
+        resource = state["Resource"]
+        timeout = state.get("TimeoutSeconds")
+        if "TimeoutSecondsPath" in state:
+            timeout = read_path(state["TimeoutSecondsPath"], data, context)
+        if "Task" in context:
+            running = self._callback(name, state, data, context)
+        else:
+            running = self._invoke(resource, name, data, context)
+        if timeout is None:
+            return await running
+
+        try:
+            return await asyncio.wait_for(running, timeout)
+        except asyncio.TimeoutError:
+            raise StatesError("States.Timeout", f"Task {name!r} timed out after {timeout} seconds") from None
+
+    @staticmethod
+    def _selected(state: Dict, data: Any, context: Dict, index: int, item: Any) -> Any:
+        """Apply the ``ItemSelector`` (or ``Parameters``) of a Map state to one item."""
+        selector = state.get("ItemSelector", state.get("Parameters"))
+        if selector is None:
+            return item
+        return resolve_parameters(selector, data, dict(context, Map={"Item": {"Index": index, "Value": item}}))
+
+    async def _map(self, name: str, state: Dict, data: Any, context: Dict) -> Any:
+        iterator = state.get("Iterator") or state["ItemProcessor"]
+        if iterator.get("ProcessorConfig", {}).get("Mode") == "DISTRIBUTED":
+            return await self._map_run(name, state, data, context)
+
+        items = await self._items(name, state, data, context)
+        concurrency = state.get("MaxConcurrency") or len(items) or 1
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def _iteration(index: int, item: Any):
+            item_context = {"Map": {"Item": {"Index": index, "Value": item}}}
+            item_input = self._selected(state, data, context, index, item)
+            async with semaphore:
+                return await self.machine(iterator, item_input, item_context)
+
+        return await _gather(_iteration(index, item) for index, item in enumerate(items))
+
+    async def _items(self, name: str, state: Dict, data: Any, context: Dict) -> List:
+        """Read the items of a Map state from its input or its ``ItemReader``."""
+        if "ItemReader" not in state:
+            items = read_path(state.get("ItemsPath", "$"), data, context)
+            if not isinstance(items, list):
+                raise StatesError("States.Runtime", "Map ItemsPath must select an array")
+            return items
+
+        reader = state["ItemReader"]
+        config = reader.get("ReaderConfig", {})
+        parameters = resolve_parameters(reader.get("Parameters", {}), data, context)
+        result = await self._invoke(reader["Resource"], name, parameters, context)
+        if config.get("InputType") == "MANIFEST":
+            bucket, keys, columns = manifest_files(result["Body"])
+            items = []
+            for key in keys:
+                inventory = await self._invoke(reader["Resource"], name, {"Bucket": bucket, "Key": key}, context)
+                items.extend(csv_items(inventory["Body"], columns))
+        else:
+            items = reader_items(result, config)
+
+        return items[: config["MaxItems"]] if "MaxItems" in config else items
+
+    async def _map_run(self, name: str, state: Dict, data: Any, context: Dict) -> Any:
+        """Run a distributed Map state, with each item or batch of items in a separate child execution."""
+        label = state.get("Label", name)
+        map_run = MapRun(map_run_arn=f"{_ARN_PREFIX}:mapRun:local/{label}:{uuid.uuid4()}", state=name)
+        map_run.started = self.loop.time()
+        self.execution.map_runs.append(map_run)
+
+        items = await self._items(name, state, data, context)
+        map_run.items = len(items)
+        inputs = [self._selected(state, data, context, index, item) for index, item in enumerate(items)]
+        if "ItemBatcher" in state:
+            batcher = state["ItemBatcher"]
+            batch_input = resolve_parameters(batcher["BatchInput"], data, context) if "BatchInput" in batcher else None
+            inputs = batch_items(inputs, batcher, batch_input)
+
+        semaphore = asyncio.Semaphore(state.get("MaxConcurrency") or _MAX_CHILD_EXECUTIONS)
+
+        async def _child(child_input: Any) -> Execution:
+            async with semaphore:
+                # pylint: disable=protected-access
+                child = await self.engine._execute(
+                    state["ItemProcessor"],
+                    child_input,
+                    f"local/{label}",
+                    state["ItemProcessor"]["ProcessorConfig"].get("ExecutionType"),
+                )
+            map_run.executions.append(child)
+            self.execution.task_calls.update(child.task_calls)
+            if not child.succeeded and _exceeds_tolerance(state, map_run.failed, len(inputs)):
+                raise StatesError(
+                    "States.ExceedToleratedFailureThreshold",
+                    f"{map_run.failed} of {len(inputs)} child executions of Map state {name!r} failed",
+                )
+            return child
+
+        try:
+            children = await _gather(_child(child_input) for child_input in inputs)
+        finally:
+            map_run.stopped = self.loop.time()
+
+        if "ResultWriter" in state:
+            return await self._write_results(name, state, data, context, map_run, list(zip(inputs, children)))
+        return [child.output if child.succeeded else {"Error": child.error, "Cause": child.cause} for child in children]
+
+    def _result_record(self, child_input: Any, child: Execution) -> Dict:
+        record = {
+            "ExecutionArn": child.execution_id,
+            "Name": child.execution_id.rsplit(":", 1)[-1],
+            "Input": json.dumps(child_input),
+            "InputDetails": {"Included": True},
+            "Status": child.status,
+            "StartDate": (self.engine.epoch + timedelta(seconds=child.started)).isoformat(),
+            "StopDate": (self.engine.epoch + timedelta(seconds=child.stopped)).isoformat(),
+        }
+        if child.succeeded:
+            record.update(Output=json.dumps(child.output), OutputDetails={"Included": True})
+        else:
+            record.update(Error=child.error, Cause=child.cause)
+        return record
+
+    async def _write_results(
+        self, name: str, state: Dict, data: Any, context: Dict, map_run: MapRun, children: List[Tuple[Any, Execution]]
+    ) -> Dict:
+        """Write the results of a Map Run through the ``ResultWriter`` resource, as Step Functions does to S3."""
+        writer = state["ResultWriter"]
+        parameters = resolve_parameters(writer.get("Parameters", {}), data, context)
+        bucket = parameters["Bucket"]
+        map_run_id = map_run.map_run_arn.rsplit(":", 1)[-1]
+        prefix = "/".join(part for part in (parameters.get("Prefix", "").strip("/"), map_run_id) if part)
+
+        async def _put(key: str, body: str):
+            await self._invoke(writer["Resource"], name, {"Bucket": bucket, "Key": key, "Body": body}, context)
+
+        result_files: Dict[str, List[Dict]] = {"FAILED": [], "PENDING": [], "SUCCEEDED": []}
+        for status in ("SUCCEEDED", "FAILED"):
+            # Timed out child executions are written with the failed ones.
+            records = [
+                self._result_record(*child) for child in children if child[1].succeeded == (status == "SUCCEEDED")
+            ]
+            if records:
+                key = f"{prefix}/{status}_0.json"
+                body = json.dumps(records)
+                await _put(key, body)
+                result_files[status].append({"Key": key, "Size": len(body.encode("utf-8"))})
+
+        manifest_key = f"{prefix}/manifest.json"
+        manifest = {"DestinationBucket": bucket, "MapRunArn": map_run.map_run_arn, "ResultFiles": result_files}
+        await _put(manifest_key, json.dumps(manifest))
+        return {"MapRunArn": map_run.map_run_arn, "ResultWriterDetails": {"Bucket": bucket, "Key": manifest_key}}
+
+
+class LocalEngine:
+    """Run state machines locally, with task handlers standing in for the services that Task states call.
+
+    Every execution runs on a virtual clock:
+    ``Wait`` states, retry intervals, and handlers that ``await asyncio.sleep(...)``
+    take no real time, but the clock still moves forward,
+    so :attr:`Execution.duration` reports how long the execution would take.
+    Executions that run longer than the ``TimeoutSeconds`` of the state machine,
+    or longer than five minutes for Express workflows, stop with the ``TIMED_OUT`` status.
+
+    :param dict handlers: Map of ``Resource`` to handler
+    :param datetime epoch: Time that the virtual clock starts at
+    """
+
+    def __init__(self, handlers: Optional[Mapping[str, Handler]] = None, *, epoch: datetime = _DEFAULT_EPOCH):
+        self._handlers: Dict[str, Handler] = dict(handlers or {})
+        self.epoch = epoch
+        # Set by rhodes.local.callbacks.CallbackBroker.register
+        self.callbacks = None
+
+    def register(self, resource: str, handler: Optional[Handler] = None):
+        """Register the handler for Task states with a ``Resource``.
+
+        ``resource`` can be a Unix shell-style pattern (ex: ``arn:aws:lambda:*``).
+        A handler registered for a service integration resource
+        also handles that resource with any integration pattern suffix (ex: ``.sync``),
+        unless another handler is registered for the suffixed resource.
+        With a :class:`rhodes.local.callbacks.CallbackBroker`,
+        the handler for a ``.waitForTaskToken`` resource hands out the task token
+        and the task waits for the callback rather than returning the handler result.
+        Can be called directly or used as a decorator.
+
+        :param str resource: Resource or resource pattern
+        :param handler: Handler to call
+        """
+        if handler is None:
+
+            def _register(function: Handler) -> Handler:
+                self.register(resource, function)
+                return function
+
+            return _register
+
+        self._handlers[resource] = handler
+        return handler
+
+    def handler(self, resource: str) -> Handler:
+        """Find the handler for a ``Resource``.
+
+        :raises LocalExecutionError: if no handler is registered for the resource
+        """
+        candidates = [resource]
+        for suffix in _PATTERN_SUFFIXES:
+            if resource.endswith(suffix):
+                candidates.append(resource[: -len(suffix)])
+                break
+
+        for candidate in candidates:
+            if candidate in self._handlers:
+                return self._handlers[candidate]
+            for pattern, handler in self._handlers.items():
+                if fnmatch.fnmatchcase(candidate, pattern):
+                    return handler
+
+        raise LocalExecutionError(f"No local handler registered for resource {resource!r}")
+
+    async def start(
+        self,
+        state_machine: Union[StateMachine, Dict],
+        execution_input: Any = None,
+        *,
+        execution_type: Optional[Union[str, ExecutionType]] = None,
+    ) -> Execution:
+        """Run an execution on the running event loop.
+
+        Use this to run many executions at once on one virtual clock:
+
+        .. code-block:: python
+
+            async def _run_all():
+                return await asyncio.gather(*(engine.start(workflow, value) for value in inputs))
+
+            executions = rhodes.local.run(_run_all())
+
+        :param state_machine: State machine, or its serialized definition
+        :param execution_input: Execution input
+        :param execution_type: Workflow type (default: ``StateMachineType`` of the state machine, or ``STANDARD``)
+        """
+        if isinstance(state_machine, StateMachine):
+            definition = state_machine.to_dict()
+            if execution_type is None:
+                execution_type = state_machine.StateMachineType
+        else:
+            definition = state_machine
+        return await self._execute(definition, execution_input, "local", execution_type)
+
+    async def _execute(
+        self,
+        definition: Dict,
+        execution_input: Any,
+        state_machine_name: str,
+        execution_type: Optional[Union[str, ExecutionType]] = None,
+    ) -> Execution:
+        execution_input = {} if execution_input is None else execution_input
+        timeout = definition.get("TimeoutSeconds")
+        if execution_type is not None and ExecutionType(execution_type) is ExecutionType.EXPRESS:
+            timeout = min(timeout or EXPRESS_MAX_DURATION_SECONDS, EXPRESS_MAX_DURATION_SECONDS)
+
+        loop = asyncio.get_event_loop()
+        name = str(uuid.uuid4())
+        execution = Execution(
+            execution_id=f"{_ARN_PREFIX}:execution:{state_machine_name}:{name}", status="RUNNING", started=loop.time()
+        )
+        context = {
+            "Execution": {
+                "Id": execution.execution_id,
+                "Name": name,
+                "Input": execution_input,
+                "StartTime": (self.epoch + timedelta(seconds=execution.started)).isoformat(),
+            },
+            "StateMachine": {
+                "Id": f"{_ARN_PREFIX}:stateMachine:{state_machine_name}",
+                "Name": state_machine_name,
+            },
+        }
+
+        try:
+            running = _Run(self, execution, context).machine(definition, execution_input)
+            execution.output = await (running if timeout is None else asyncio.wait_for(running, timeout))
+            execution.status = "SUCCEEDED"
+        except asyncio.TimeoutError:
+            execution.status = "TIMED_OUT"
+            execution.error = "States.Timeout"
+            execution.cause = f"Execution timed out after {timeout} seconds"
+        except StatesError as error:
+            execution.status = "FAILED"
+            execution.error = error.error
+            execution.cause = error.cause
+        execution.stopped = loop.time()
+        return execution
+
+    def execute(
+        self,
+        state_machine: Union[StateMachine, Dict],
+        execution_input: Any = None,
+        *,
+        execution_type: Optional[Union[str, ExecutionType]] = None,
+    ) -> Execution:
+        """Run one execution on a new virtual clock.
+
+        :param state_machine: State machine, or its serialized definition
+        :param execution_input: Execution input
+        :param execution_type: Workflow type (default: ``StateMachineType`` of the state machine, or ``STANDARD``)
+        """
+        return run(self.start(state_machine, execution_input, execution_type=execution_type))
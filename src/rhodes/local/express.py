@@ -0,0 +1,158 @@
+"""
+Simulate the throughput and cost of an Express workflow.
+
+:func:`simulate_express` runs many executions of a state machine as Express workflows on one virtual clock
+and reports how many executions finish each second and what they would cost.
+Express workflows are billed for each execution and for the memory that each execution uses
+for as long as it runs, rounded up to the next 100 milliseconds and the next 64 MB.
+
+.. code-block:: python
+
+    simulation = simulate_express(engine, workflow, inputs, arrival_rate=50)
+
+    simulation.executions_per_second
+    simulation.gb_seconds
+    simulation.cost
+    simulation.within_limit
+
+Executions that run longer than five minutes stop with the ``TIMED_OUT`` status, as they would in Step Functions.
+"""
+import asyncio
+import math
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+import attr
+
+from rhodes.express import EXPRESS_MAX_DURATION_SECONDS, validate_express
+from rhodes.identifiers import ExecutionType
+from rhodes.local._clock import run
+from rhodes.local.engine import Execution, LocalEngine
+from rhodes.states import StateMachine
+
+__all__ = ("EXPRESS_REQUEST_PRICE", "EXPRESS_GB_SECOND_PRICE", "ExpressSimulation", "simulate_express")
+
+#: Price of one Express workflow execution, in USD (us-east-1).
+EXPRESS_REQUEST_PRICE = 1.0 / 1000000
+#: Price of one GB-second of Express workflow duration, in USD (us-east-1, first 1,000 hours).
+EXPRESS_GB_SECOND_PRICE = 0.00001667
+
+_BILLED_MEMORY_MB = 64
+_BILLED_DURATION_SECONDS = 0.1
+
+
+@attr.s
+class ExpressSimulation:
+    """Executions run by :func:`simulate_express`.
+
+    :param list executions: :class:`Execution` for each input, in input order
+    :param int memory_mb: Memory that each execution uses, in MB
+    :param float request_price: Price of one execution
+    :param float gb_second_price: Price of one GB-second of duration
+    """
+
+    executions: List[Execution] = attr.ib(factory=list, repr=False)
+    memory_mb: int = attr.ib(default=_BILLED_MEMORY_MB)
+    request_price: float = attr.ib(default=EXPRESS_REQUEST_PRICE)
+    gb_second_price: float = attr.ib(default=EXPRESS_GB_SECOND_PRICE)
+
+    def _count(self, status: str) -> int:
+        return sum(1 for execution in self.executions if execution.status == status)
+
+    @property
+    def succeeded(self) -> int:
+        """Number of executions that succeeded."""
+        return self._count("SUCCEEDED")
+
+    @property
+    def failed(self) -> int:
+        """Number of executions that failed."""
+        return self._count("FAILED")
+
+    @property
+    def timed_out(self) -> int:
+        """Number of executions that ran longer than an Express execution can."""
+        return self._count("TIMED_OUT")
+
+    @property
+    def makespan(self) -> float:
+        """Virtual seconds from the start of the first execution to the end of the last one."""
+        if not self.executions:
+            return 0.0
+        return max(execution.stopped for execution in self.executions) - min(
+            execution.started for execution in self.executions
+        )
+
+    @property
+    def executions_per_second(self) -> float:
+        """Executions finished per virtual second, over the makespan."""
+        if not self.makespan:
+            return float(len(self.executions))
+        return len(self.executions) / self.makespan
+
+    @property
+    def max_duration(self) -> float:
+        """Virtual seconds that the longest execution ran for."""
+        return max((execution.duration for execution in self.executions), default=0.0)
+
+    @property
+    def within_limit(self) -> bool:
+        """Determine whether every execution finished within the Express duration limit."""
+        return not self.timed_out and self.max_duration <= EXPRESS_MAX_DURATION_SECONDS
+
+    @property
+    def gb_seconds(self) -> float:
+        """Billed GB-seconds of every execution."""
+        memory_gb = max(1, math.ceil(self.memory_mb / _BILLED_MEMORY_MB)) * _BILLED_MEMORY_MB / 1024
+        # Round to whole milliseconds first so that float error in the virtual clock cannot add a billing increment.
+        increments = sum(
+            max(1, math.ceil(round(execution.duration, 3) / _BILLED_DURATION_SECONDS - 1e-9))
+            for execution in self.executions
+        )
+        return increments * _BILLED_DURATION_SECONDS * memory_gb
+
+    @property
+    def cost(self) -> float:
+        """Estimated price of every execution, in USD."""
+        return len(self.executions) * self.request_price + self.gb_seconds * self.gb_second_price
+
+
+def simulate_express(
+    engine: LocalEngine,
+    state_machine: Union[StateMachine, Dict],
+    inputs: Iterable[Any],
+    *,
+    arrival_rate: Optional[float] = None,
+    memory_mb: int = _BILLED_MEMORY_MB,
+    request_price: float = EXPRESS_REQUEST_PRICE,
+    gb_second_price: float = EXPRESS_GB_SECOND_PRICE,
+) -> ExpressSimulation:
+    """Run one Express execution of a state machine for each input, all on one virtual clock.
+
+    :param LocalEngine engine: Engine with handlers for every Task state
+    :param state_machine: State machine, or its serialized definition
+    :param inputs: Execution input for each execution
+    :param float arrival_rate: Executions started per virtual second (default: start every execution at once)
+    :param int memory_mb: Memory that each execution uses, in MB
+    :param float request_price: Price of one execution
+    :param float gb_second_price: Price of one GB-second of duration
+    :raises InvalidDefinitionError: if the state machine cannot run as an Express workflow
+    """
+    if isinstance(state_machine, StateMachine):
+        validate_express(state_machine)
+        # Serialize once rather than once for each execution.
+        state_machine = state_machine.to_dict()
+
+    async def _start(index: int, execution_input: Any) -> Execution:
+        if arrival_rate:
+            await asyncio.sleep(index / arrival_rate)
+        return await engine.start(state_machine, execution_input, execution_type=ExecutionType.EXPRESS)
+
+    async def _run_all() -> List[Execution]:
+        return list(await asyncio.gather(*(_start(index, value) for index, value in enumerate(inputs))))
+
+    return ExpressSimulation(
+        executions=run(_run_all()),
+        memory_mb=memory_mb,
+        request_price=request_price,
+        gb_second_price=gb_second_price,
+    )
@@ -0,0 +1,505 @@
+"""
+Stand-ins for the AWS Batch, Amazon ECS, AWS Glue, and Amazon SageMaker jobs that Task states start.
+
+Each service runs jobs on the engine's virtual clock, in pools of limited capacity:
+vCPUs in each AWS Batch job queue, tasks in each Amazon ECS cluster,
+AWS Glue DPUs, and Amazon SageMaker instances of each instance type.
+A job waits ``scheduling`` seconds before it is placed, queues until its pool has enough capacity,
+takes ``startup`` seconds to start, and then runs for ``duration`` seconds.
+Each of these is either a number of seconds or a distribution
+(:func:`uniform`, :func:`exponential`, or :func:`lognormal`) that is sampled for every job.
+
+With the ``.sync`` integration pattern, the Task state waits for the job to finish
+and fails with ``States.TaskFailed`` if the job fails.
+Otherwise the Task state returns as soon as the job is submitted,
+and the job keeps its capacity until it finishes.
+
+.. code-block:: python
+
+    batch = LocalBatch(capacity={"etl": 256}, startup=uniform(30, 90), duration=lognormal(600, 0.5), seed=1)
+    engine = LocalEngine()
+    batch.register(engine)
+    executions = rhodes.local.run(_start_all(engine))
+
+    batch.stats.makespan
+    batch.stats.mean_queue_time
+    batch.stats.peak_queued["etl"]
+    batch.utilization("etl")
+
+To model a service that rejects jobs over its quota rather than queueing them, set ``queue=False``.
+"""
+import abc
+import asyncio
+import json
+import math
+import random
+import uuid
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Mapping, Optional, Tuple, Union
+
+import attr
+
+from rhodes.exceptions import StatesError
+from rhodes.identifiers import ServiceArn
+from rhodes.local.engine import LocalEngine, TaskContext
+
+__all__ = (
+    "Distribution",
+    "uniform",
+    "exponential",
+    "lognormal",
+    "Job",
+    "JobStats",
+    "LocalJobService",
+    "LocalBatch",
+    "LocalEcs",
+    "LocalGlue",
+    "LocalSageMaker",
+)
+
+#: Seconds, or a function that samples seconds from a random number generator.
+Distribution = Union[float, Callable[[random.Random], float]]
+
+_SYNC_SUFFIXES = (".sync", ".sync:2")
+# AWS Glue runs Spark jobs with 10 DPUs unless told otherwise.
+_DEFAULT_GLUE_DPUS = 10.0
+_GLUE_WORKER_DPUS = {"Standard": 1.0, "G.025X": 0.25, "G.1X": 1.0, "G.2X": 2.0, "G.4X": 4.0, "G.8X": 8.0}
+
+
+def uniform(low: float, high: float) -> Callable[[random.Random], float]:
+    """Seconds spread evenly between ``low`` and ``high``."""
+    return lambda generator: generator.uniform(low, high)
+
+
+def exponential(mean: float) -> Callable[[random.Random], float]:
+    """Exponentially distributed seconds, with mean ``mean``."""
+    return lambda generator: generator.expovariate(1.0 / mean)
+
+
+def lognormal(median: float, sigma: float) -> Callable[[random.Random], float]:
+    """Log-normally distributed seconds, with median ``median`` and shape ``sigma``.
+
+    Job run times are usually close to log-normal: most runs take about the median, and a few take much longer.
+    """
+    return lambda generator: generator.lognormvariate(math.log(median), sigma)
+
+
+@attr.s
+class Job:
+    """One job run by a :class:`LocalJobService`.
+
+    :param str job_id: Job ID
+    :param str name: Job name, job definition, or task definition
+    :param str pool: Capacity pool that the job runs in
+    :param float units: Capacity that each copy of the job uses
+    :param int count: Number of copies (array job children or ECS tasks), which run independently
+    :param str status: ``SUBMITTED``, ``RUNNING``, ``SUCCEEDED``, or ``FAILED``
+    :param float submitted: Virtual time when the job was submitted, in seconds
+    :param float started: Virtual time when the first copy got its capacity, in seconds
+    :param float stopped: Virtual time when the last copy finished, in seconds
+    :param float run_time: Virtual seconds that the copies spent starting and running, added together
+    """
+
+    job_id: str = attr.ib()
+    name: str = attr.ib()
+    pool: str = attr.ib()
+    units: float = attr.ib()
+    count: int = attr.ib(default=1)
+    status: str = attr.ib(default="SUBMITTED")
+    submitted: float = attr.ib(default=0.0)
+    started: Optional[float] = attr.ib(default=None)
+    stopped: Optional[float] = attr.ib(default=None)
+    run_time: float = attr.ib(default=0.0)
+
+    @property
+    def queue_time(self) -> Optional[float]:
+        """Virtual seconds from submission until the first copy got its capacity."""
+        return None if self.started is None else self.started - self.submitted
+
+    @property
+    def duration(self) -> Optional[float]:
+        """Virtual seconds from submission until the job finished."""
+        return None if self.stopped is None else self.stopped - self.submitted
+
+
+@attr.s
+class JobStats:
+    """Jobs run by a :class:`LocalJobService`.
+
+    :param list jobs: Every submitted job, in submission order
+    :param dict peak_queued: Largest number of job copies waiting for capacity at once, by pool
+    """
+
+    jobs: List[Job] = attr.ib(factory=list, repr=False)
+    peak_queued: Dict[str, int] = attr.ib(factory=dict)
+
+    @property
+    def finished(self) -> List[Job]:
+        """Jobs that succeeded or failed."""
+        return [job for job in self.jobs if job.stopped is not None]
+
+    @property
+    def makespan(self) -> float:
+        """Virtual seconds from the first submission until the last job finished."""
+        finished = self.finished
+        if not finished:
+            return 0.0
+        return max(job.stopped for job in finished) - min(job.submitted for job in self.jobs)
+
+    @property
+    def mean_queue_time(self) -> float:
+        """Average virtual seconds that started jobs waited before they got capacity."""
+        queue_times = [job.queue_time for job in self.jobs if job.queue_time is not None]
+        return sum(queue_times) / len(queue_times) if queue_times else 0.0
+
+    @property
+    def max_queue_time(self) -> float:
+        """Longest virtual time that a started job waited before it got capacity."""
+        return max((job.queue_time for job in self.jobs if job.queue_time is not None), default=0.0)
+
+
+class _Pool:
+    """Capacity shared by jobs, granted in the order that it was requested."""
+
+    def __init__(self, name: str, capacity: Optional[float], peak_queued: Dict[str, int]):
+        self.name = name
+        self.capacity = capacity
+        self.available = capacity
+        self.busy = 0.0
+        self._peak_queued = peak_queued
+        self._waiting: Deque[asyncio.Future] = deque()
+        # Ticket -> units, for every ticket that is waiting or holds capacity
+        self._units: Dict[asyncio.Future, float] = {}
+
+    def fits(self, units: float) -> bool:
+        return self.capacity is None or (not self._waiting and self.available >= units)
+
+    def request(self, units: float) -> asyncio.Future:
+        """Ask for capacity, returning a ticket that is done once the capacity is granted."""
+        ticket = asyncio.get_event_loop().create_future()
+        self._units[ticket] = units
+        if self.fits(units):
+            if self.capacity is not None:
+                self.available -= units
+            ticket.set_result(None)
+        else:
+            self._waiting.append(ticket)
+            self._peak_queued[self.name] = max(self._peak_queued.get(self.name, 0), len(self._waiting))
+        return ticket
+
+    def release(self, ticket: asyncio.Future):
+        """Give back the capacity of a ticket, or stop waiting for it. Releasing a ticket again does nothing."""
+        units = self._units.pop(ticket, None)
+        if units is None:
+            return
+        if ticket in self._waiting:
+            self._waiting.remove(ticket)
+        elif self.capacity is not None:
+            self.available += units
+
+        # First come, first served: a large job at the front of the queue holds up smaller jobs behind it.
+        while self._waiting and self._units[self._waiting[0]] <= self.available:
+            granted = self._waiting.popleft()
+            self.available -= self._units[granted]
+            granted.set_result(None)
+
+
+class LocalJobService(abc.ABC):
+    """Base class for stand-ins for services that run jobs.
+
+    :param capacity: Capacity of every pool, or of each pool by name (default: unlimited).
+        With a mapping, pools that it does not name are unlimited.
+    :param duration: Seconds that each job copy runs for
+    :param startup: Seconds that each job copy takes to start once it has capacity
+    :param scheduling: Seconds from submission until the job starts waiting for capacity
+    :param float failure_rate: Fraction of jobs that fail
+    :param bool queue: Queue jobs until capacity is available, rather than rejecting them
+    :param seed: Seed for the random number generator that samples distributions and failures
+    """
+
+    #: Resources that this service handles.
+    resources: Tuple[str, ...] = ()
+    #: Error raised for jobs that need more capacity than is available.
+    limit_error = "States.TaskFailed"
+
+    def __init__(
+        self,
+        *,
+        capacity: Union[None, float, Mapping[str, float]] = None,
+        duration: Distribution = 60.0,
+        startup: Distribution = 0.0,
+        scheduling: Distribution = 0.0,
+        failure_rate: float = 0.0,
+        queue: bool = True,
+        seed: Any = None,
+    ):
+        self.capacity = capacity
+        self.duration = duration
+        self.startup = startup
+        self.scheduling = scheduling
+        self.failure_rate = failure_rate
+        self.queue = queue
+        self.random = random.Random(seed)  # nosec
+        self.stats = JobStats()
+        self._pools: Dict[str, _Pool] = {}
+        self._background: List[asyncio.Future] = []
+
+    def register(self, engine: LocalEngine):
+        """Register handlers for this service's resources with an engine."""
+        for resource in self.resources:
+            engine.register(resource, self.submit)
+
+    def utilization(self, pool: str) -> float:
+        """Fraction of a pool's capacity that jobs held, over the makespan."""
+        capacity = self._capacity(pool)
+        if capacity is None or not self.stats.makespan or pool not in self._pools:
+            return 0.0
+        return self._pools[pool].busy / (capacity * self.stats.makespan)
+
+    def _capacity(self, pool: str) -> Optional[float]:
+        if isinstance(self.capacity, Mapping):
+            return self.capacity.get(pool)
+        return self.capacity
+
+    def _pool(self, name: str) -> _Pool:
+        if name not in self._pools:
+            self._pools[name] = _Pool(name, self._capacity(name), self.stats.peak_queued)
+        return self._pools[name]
+
+    def _sample(self, distribution: Distribution) -> float:
+        value = distribution(self.random) if callable(distribution) else distribution
+        return max(0.0, float(value))
+
+    @abc.abstractmethod
+    def demand(self, parameters: Dict) -> Tuple[str, str, float, int]:
+        """Read a job request.
+
+        :returns: Job name, capacity pool, capacity that each copy uses, and number of copies
+        """
+
+    @abc.abstractmethod
+    def submitted(self, job: Job) -> Dict:
+        """Result of a request that does not wait for the job."""
+
+    @abc.abstractmethod
+    def described(self, job: Job) -> Dict:
+        """Result of a request that waits for the job to finish."""
+
+    async def _copy(self, job: Job, pool: _Pool, ticket: asyncio.Future, loop: asyncio.AbstractEventLoop):
+        await asyncio.shield(ticket)
+        acquired = loop.time()
+        if job.started is None:
+            job.started = acquired
+            job.status = "RUNNING"
+        try:
+            await asyncio.sleep(self._sample(self.startup) + self._sample(self.duration))
+        finally:
+            held = loop.time() - acquired
+            job.run_time += held
+            pool.busy += held * job.units
+            pool.release(ticket)
+
+    async def _run(self, job: Job, pool: _Pool, delay: float, tickets: List[asyncio.Future]):
+        loop = asyncio.get_event_loop()
+        try:
+            if not tickets:
+                await asyncio.sleep(delay)
+                tickets.extend(pool.request(job.units) for _ in range(job.count))
+            await asyncio.gather(*(self._copy(job, pool, ticket, loop) for ticket in tickets))
+            job.status = "FAILED" if self.random.random() < self.failure_rate else "SUCCEEDED"
+        except asyncio.CancelledError:
+            # Step Functions stops the job when the Task state stops waiting for it.
+            job.status = "FAILED"
+            raise
+        finally:
+            for ticket in tickets:
+                pool.release(ticket)
+            job.stopped = loop.time()
+
+    async def submit(self, parameters: Dict, context: TaskContext) -> Dict:
+        """Handle a request to start a job."""
+        loop = asyncio.get_event_loop()
+        name, pool_name, units, count = self.demand(parameters)
+        pool = self._pool(pool_name)
+        if pool.capacity is not None and units > pool.capacity:
+            raise StatesError(self.limit_error, f"Job needs {units} of the {pool.capacity} capacity of {pool_name!r}")
+        if not self.queue and not pool.fits(units * count):
+            raise StatesError(self.limit_error, f"Not enough capacity in {pool_name!r} to start the job now")
+
+        job = Job(job_id=str(uuid.uuid4()), name=name, pool=pool_name, units=units, count=count, submitted=loop.time())
+        self.stats.jobs.append(job)
+        delay = self._sample(self.scheduling)
+        # Jobs that are placed straight away join the queue now, in submission order.
+        tickets = [] if delay else [pool.request(units) for _ in range(count)]
+        running = self._run(job, pool, delay, tickets)
+        if not context.resource.endswith(_SYNC_SUFFIXES):
+            self._background.append(asyncio.ensure_future(running))
+            return self.submitted(job)
+
+        await running
+        if job.status == "FAILED":
+            raise StatesError("States.TaskFailed", json.dumps(self.described(job)))
+        return self.described(job)
+
+
+def _last_segment(value: str) -> str:
+    """Read the name from a name or an ARN."""
+    return value.rsplit("/", 1)[-1]
+
+
+class LocalBatch(LocalJobService):
+    """AWS Batch jobs, for :class:`LocalEngine` executions.
+
+    Each job queue is a pool of vCPUs.
+    A job uses the vCPUs in its ``ContainerOverrides`` (``Vcpus`` or a ``VCPU`` resource requirement),
+    or ``vcpus`` if it does not set them.
+    Each child of an array job (``ArrayProperties.Size``) runs separately.
+
+    :param float vcpus: vCPUs for jobs that do not set them
+    """
+
+    resources = (ServiceArn.BATCH.value,)
+    limit_error = "Batch.ClientException"
+
+    def __init__(self, *, vcpus: float = 1.0, **kwargs):
+        super().__init__(**kwargs)
+        self.vcpus = vcpus
+
+    def demand(self, parameters: Dict) -> Tuple[str, str, float, int]:
+        overrides = parameters.get("ContainerOverrides") or {}
+        vcpus = overrides.get("Vcpus", self.vcpus)
+        for requirement in overrides.get("ResourceRequirements", ()):
+            if requirement.get("Type") == "VCPU":
+                vcpus = float(requirement["Value"])
+        count = (parameters.get("ArrayProperties") or {}).get("Size", 1)
+        return parameters["JobName"], _last_segment(parameters["JobQueue"]), float(vcpus), int(count)
+
+    def submitted(self, job: Job) -> Dict:
+        return {"JobId": job.job_id, "JobName": job.name}
+
+    def described(self, job: Job) -> Dict:
+        return {
+            "JobId": job.job_id,
+            "JobName": job.name,
+            "JobQueue": job.pool,
+            "Status": job.status,
+            "CreatedAt": int(job.submitted * 1000),
+            "StartedAt": int(job.started * 1000),
+            "StoppedAt": int(job.stopped * 1000),
+        }
+
+
+class LocalEcs(LocalJobService):
+    """Amazon ECS tasks, for :class:`LocalEngine` executions.
+
+    Each cluster is a pool of tasks, and each request runs ``Count`` tasks (default: 1).
+    """
+
+    resources = (ServiceArn.ECS.value,)
+    limit_error = "ECS.ClientException"
+
+    def demand(self, parameters: Dict) -> Tuple[str, str, float, int]:
+        cluster = _last_segment(parameters.get("Cluster", "default"))
+        return _last_segment(parameters["TaskDefinition"]), cluster, 1.0, int(parameters.get("Count", 1))
+
+    def _tasks(self, job: Job, status: str) -> List[Dict]:
+        return [
+            {
+                "TaskArn": f"arn:aws:ecs:local:000000000000:task/{job.pool}/{job.job_id}-{index}",
+                "ClusterArn": f"arn:aws:ecs:local:000000000000:cluster/{job.pool}",
+                "TaskDefinitionArn": job.name,
+                "LastStatus": status,
+            }
+            for index in range(job.count)
+        ]
+
+    def submitted(self, job: Job) -> Dict:
+        return {"Tasks": self._tasks(job, "PROVISIONING"), "Failures": []}
+
+    def described(self, job: Job) -> Dict:
+        tasks = self._tasks(job, "STOPPED")
+        for task in tasks:
+            task["Containers"] = [{"ExitCode": 0 if job.status == "SUCCEEDED" else 1}]
+        return {"Tasks": tasks, "Failures": []}
+
+
+class LocalGlue(LocalJobService):
+    """AWS Glue job runs, for :class:`LocalEngine` executions.
+
+    Every job run shares one pool of DPUs, named ``glue``.
+    A job run uses ``NumberOfWorkers`` workers of ``WorkerType``, or ``MaxCapacity`` DPUs,
+    or the DPUs in ``dpus`` for its job name (default: 10).
+
+    :param dpus: DPUs that each job run uses, or DPUs by job name
+    """
+
+    resources = (ServiceArn.GLUE.value,)
+    limit_error = "Glue.ResourceNumberLimitExceededException"
+
+    def __init__(self, *, dpus: Union[float, Mapping[str, float]] = _DEFAULT_GLUE_DPUS, **kwargs):
+        super().__init__(**kwargs)
+        self.dpus = dpus
+
+    def demand(self, parameters: Dict) -> Tuple[str, str, float, int]:
+        name = parameters["JobName"]
+        if "NumberOfWorkers" in parameters:
+            dpus = parameters["NumberOfWorkers"] * _GLUE_WORKER_DPUS.get(parameters.get("WorkerType", "G.1X"), 1.0)
+        elif "MaxCapacity" in parameters:
+            dpus = parameters["MaxCapacity"]
+        elif isinstance(self.dpus, Mapping):
+            dpus = self.dpus.get(name, _DEFAULT_GLUE_DPUS)
+        else:
+            dpus = self.dpus
+        return name, "glue", float(dpus), 1
+
+    def submitted(self, job: Job) -> Dict:
+        return {"JobRunId": job.job_id}
+
+    def described(self, job: Job) -> Dict:
+        return {
+            "Id": job.job_id,
+            "JobName": job.name,
+            "JobRunState": job.status,
+            "ExecutionTime": int(job.stopped - job.started),
+            "MaxCapacity": job.units,
+        }
+
+
+class LocalSageMaker(LocalJobService):
+    """Amazon SageMaker training and transform jobs, for :class:`LocalEngine` executions.
+
+    Each instance type is a pool of instances,
+    and each job uses the ``InstanceCount`` instances in its ``ResourceConfig`` or ``TransformResources``.
+    """
+
+    resources = (ServiceArn.SAGEMAKER_CREATE_TRAINING_JOB.value, ServiceArn.SAGEMAKER_CREATE_TRANSFORM_JOB.value)
+    limit_error = "SageMaker.ResourceLimitExceededException"
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # Job name -> "TrainingJob" or "TransformJob"
+        self._kinds: Dict[str, str] = {}
+
+    def demand(self, parameters: Dict) -> Tuple[str, str, float, int]:
+        if "TrainingJobName" in parameters:
+            kind, resources = "TrainingJob", parameters.get("ResourceConfig") or {}
+        else:
+            kind, resources = "TransformJob", parameters.get("TransformResources") or {}
+        name = parameters[f"{kind}Name"]
+        self._kinds[name] = kind
+        return name, resources.get("InstanceType", "ml.m5.large"), float(resources.get("InstanceCount", 1)), 1
+
+    def _arn(self, job: Job) -> str:
+        kind = self._kinds[job.name]
+        return f"arn:aws:sagemaker:local:000000000000:{kind[0].lower()}{kind[1:-3]}-job/{job.name}"
+
+    def submitted(self, job: Job) -> Dict:
+        return {f"{self._kinds[job.name]}Arn": self._arn(job)}
+
+    def described(self, job: Job) -> Dict:
+        kind = self._kinds[job.name]
+        return {
+            f"{kind}Name": job.name,
+            f"{kind}Arn": self._arn(job),
+            f"{kind}Status": "Completed" if job.status == "SUCCEEDED" else "Failed",
+        }
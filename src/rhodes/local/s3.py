@@ -0,0 +1,138 @@
+"""
+Directory-backed stand-in for Amazon S3.
+
+:class:`LocalS3` handles the S3 resources that distributed ``Map`` states use:
+``ItemReader`` reads items from objects in the directory,
+and ``ResultWriter`` writes the results of the child executions back to it.
+Each subdirectory of the root directory is a bucket,
+and each file under a bucket is an object, with its path relative to the bucket as its key.
+
+.. code-block:: python
+
+    storage = LocalS3("test-data")
+
+    engine = LocalEngine()
+    storage.register(engine)
+    engine.register("arn:aws:lambda:*", _process_row)
+    execution = engine.execute(workflow, {"key": "rows.csv"})
+
+    run = execution.map_runs[0]
+    run.failed
+    run.duration
+"""
+import asyncio
+import gzip
+import hashlib
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from rhodes.exceptions import StatesError
+from rhodes.identifiers import ServiceArn
+from rhodes.local.engine import LocalEngine, TaskContext
+
+__all__ = ("LocalS3",)
+
+_GZIP_MAGIC = b"\x1f\x8b"
+
+
+class LocalS3:
+    """S3 buckets stored in a local directory, for :class:`LocalEngine` executions.
+
+    Objects compressed with gzip, such as S3 inventory files, are decompressed when they are read.
+
+    :param root: Directory that contains one subdirectory for each bucket
+    :param float latency: Virtual seconds that each call takes
+    """
+
+    def __init__(self, root: Union[str, Path], *, latency: float = 0.02):
+        self.root = Path(root)
+        self.latency = latency
+        self.requests = 0
+
+    def register(self, engine: LocalEngine):
+        """Register handlers for the S3 resources with an engine."""
+        engine.register(ServiceArn.S3_LIST_OBJECTS_V2.value, self.list_objects_v2)
+        engine.register(ServiceArn.S3_GET_OBJECT.value, self.get_object)
+        engine.register(ServiceArn.S3_PUT_OBJECT.value, self.put_object)
+
+    def _bucket(self, name: str) -> Path:
+        bucket = (self.root / name).resolve()
+        # Only directories directly under the root are buckets.
+        if bucket.parent != self.root.resolve() or not bucket.is_dir():
+            raise StatesError("S3.NoSuchBucket", f"The specified bucket does not exist: {name}")
+        return bucket
+
+    @staticmethod
+    def _key_path(bucket: Path, key: str) -> Optional[Path]:
+        """Find the path of an object, or ``None`` if the key would place it outside of the bucket."""
+        path = (bucket / key).resolve()
+        if bucket not in path.parents:
+            return None
+        return path
+
+    def _object(self, bucket: str, key: str) -> Path:
+        path = self._key_path(self._bucket(bucket), key)
+        if path is None or not path.is_file():
+            raise StatesError("S3.NoSuchKey", f"The specified key does not exist: {key}")
+        return path
+
+    async def _call(self):
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+
+    @staticmethod
+    def _etag(data: bytes) -> str:
+        return f'"{hashlib.md5(data).hexdigest()}"'  # nosec
+
+    async def list_objects_v2(self, parameters: Dict, context: TaskContext) -> Dict:
+        """Handle ``ListObjectsV2``, listing every object under ``Prefix``."""
+        # pylint: disable=unused-argument
+        bucket = self._bucket(parameters["Bucket"])
+        prefix = parameters.get("Prefix", "")
+        await self._call()
+
+        contents: List[Dict] = []
+        for path in sorted(path for path in bucket.rglob("*") if path.is_file()):
+            key = path.relative_to(bucket).as_posix()
+            if not key.startswith(prefix):
+                continue
+            data = path.read_bytes()
+            modified = datetime.fromtimestamp(path.stat().st_mtime, tz=timezone.utc)
+            contents.append(
+                {
+                    "Key": key,
+                    "Size": len(data),
+                    "ETag": self._etag(data),
+                    "LastModified": modified.isoformat(),
+                    "StorageClass": "STANDARD",
+                }
+            )
+        return {"Name": parameters["Bucket"], "Prefix": prefix, "KeyCount": len(contents), "Contents": contents}
+
+    async def get_object(self, parameters: Dict, context: TaskContext) -> Dict:
+        """Handle ``GetObject``, returning the object content as text in ``Body``."""
+        # pylint: disable=unused-argument
+        path = self._object(parameters["Bucket"], parameters["Key"])
+        await self._call()
+        data = path.read_bytes()
+        etag = self._etag(data)
+        if data.startswith(_GZIP_MAGIC):
+            data = gzip.decompress(data)
+        return {"Body": data.decode("utf-8"), "ContentLength": len(data), "ETag": etag}
+
+    async def put_object(self, parameters: Dict, context: TaskContext) -> Dict:
+        """Handle ``PutObject``, writing ``Body`` to the object."""
+        # pylint: disable=unused-argument
+        bucket = self._bucket(parameters["Bucket"])
+        key = parameters["Key"]
+        path = self._key_path(bucket, key)
+        if path is None:
+            raise StatesError("S3.InvalidArgument", f"Invalid object key: {key!r}")
+
+        await self._call()
+        data = parameters.get("Body", "")
+        data = data.encode("utf-8") if isinstance(data, str) else bytes(data)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        return {"ETag": self._etag(data)}
@@ -0,0 +1,189 @@
+"""
+Minified state machine definitions.
+
+Step Functions limits a state machine definition to 1 MB.
+Descriptive state titles and comments make definitions readable
+but can account for a large share of that budget.
+A minified definition replaces every state title with a short name,
+drops comments and path fields that are set to their default value,
+and uses compact JSON separators.
+
+The :class:`SourceMap` that is produced alongside the minified definition
+maps the short names back to the original state titles,
+so execution history can still be read in terms of the original titles.
+
+.. code-block:: python
+
+    minified = workflow.minify()
+    definition = minified.definition_string()
+    source_map = minified.source_map
+
+    events = sfn.get_execution_history(executionArn=arn)["events"]
+    readable_events = source_map.translate_history(events)
+
+"""
+import copy
+import json
+from typing import Any, Dict, Iterable, List, Optional
+
+import attr
+from troposphere import Sub
+
+from rhodes._util import short_name
+
+__all__ = ("SourceMap", "MinifiedDefinition", "minify_definition")
+
+# Path fields that Step Functions defaults to "$" when they are not present.
+_DEFAULT_PATHS = ("InputPath", "OutputPath", "ResultPath")
+# Event detail fields that identify a state by name.
+_NAMED_EVENT_DETAILS = (
+    "stateEnteredEventDetails",
+    "stateExitedEventDetails",
+    "mapIterationStartedEventDetails",
+    "mapIterationSucceededEventDetails",
+    "mapIterationFailedEventDetails",
+    "mapIterationAbortedEventDetails",
+)
+
+
+@attr.s
+class SourceMap:
+    """Map from minified state names back to the original state titles.
+
+    :param dict titles: Map of minified state name to original state title
+    """
+
+    titles: Dict[str, str] = attr.ib(factory=dict)
+
+    def original(self, name: str) -> str:
+        """Translate a minified state name to the original state title.
+
+        Names that are not in the map are returned unchanged.
+        """
+        return self.titles.get(name, name)
+
+    def minified(self, title: str) -> str:
+        """Translate an original state title to its minified state name."""
+        for name, original in self.titles.items():
+            if original == title:
+                return name
+        raise KeyError(title)
+
+    def translate_history(self, events: Iterable[Dict]) -> List[Dict]:
+        """Translate the state names in execution history events back to the original state titles.
+
+        The events are in the format returned by the Step Functions ``GetExecutionHistory`` API.
+        The provided events are not modified.
+
+        :param events: Execution history events
+        :return: Copies of the events with original state titles
+        """
+        translated = []
+        for event in events:
+            event = dict(event)
+            for detail_name in _NAMED_EVENT_DETAILS:
+                details = event.get(detail_name)
+                if isinstance(details, dict) and "name" in details:
+                    event[detail_name] = dict(details, name=self.original(details["name"]))
+            translated.append(event)
+        return translated
+
+    def to_dict(self) -> Dict[str, str]:
+        """Serialize this source map as a dictionary."""
+        return dict(self.titles)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, str]) -> "SourceMap":
+        """Load a source map that was serialized with :meth:`to_dict`."""
+        return cls(titles=dict(data))
+
+
+class _Minifier:
+    def __init__(self):
+        self.source_map = SourceMap()
+        self._names: Dict[str, str] = {}
+
+    def _name(self, title: Optional[str]) -> Optional[str]:
+        if title is None:
+            return None
+
+        if title not in self._names:
+            name = short_name(len(self._names))
+            self._names[title] = name
+            self.source_map.titles[name] = title
+
+        return self._names[title]
+
+    def machine(self, definition: Dict) -> Dict:
+        minified: Dict[str, Any] = {}
+        for key, value in definition.items():
+            if key == "Comment":
+                continue
+
+            if key == "StartAt":
+                minified[key] = self._name(value)
+            elif key == "States":
+                minified[key] = {self._name(title): self.state(state) for title, state in value.items()}
+            else:
+                minified[key] = value
+
+        return minified
+
+    def state(self, definition: Dict) -> Dict:
+        minified: Dict[str, Any] = {}
+        for key, value in definition.items():
+            if key == "Comment" or (key in _DEFAULT_PATHS and value == "$"):
+                continue
+
+            if key in ("Next", "Default"):
+                value = self._name(value)
+            elif key == "Choices":
+                value = [dict(rule, Next=self._name(rule["Next"])) for rule in value]
+            elif key == "Catch" and isinstance(value, list):
+                value = [
+                    dict(catcher, Next=self._name(catcher["Next"])) if "Next" in catcher else catcher
+                    for catcher in value
+                ]
+            elif key == "Branches":
+                value = [self.machine(branch) for branch in value]
+            elif key in ("Iterator", "ItemProcessor"):
+                # The ProcessorConfig of an ItemProcessor is kept like any other state machine field.
+                value = self.machine(value)
+
+            minified[key] = value
+
+        return minified
+
+
+def minify_definition(definition: Dict) -> "MinifiedDefinition":
+    """Minify a serialized state machine definition.
+
+    :param dict definition: Serialized state machine definition as returned by :meth:`StateMachine.to_dict`
+    """
+    minifier = _Minifier()
+    minified = minifier.machine(copy.deepcopy(definition))
+    return MinifiedDefinition(definition=minified, source_map=minifier.source_map)
+
+
+@attr.s
+class MinifiedDefinition:
+    """A minified state machine definition and the source map to read it.
+
+    :param dict definition: Minified state machine definition
+    :param SourceMap source_map: Map from minified state names to the original state titles
+    """
+
+    definition: Dict = attr.ib()
+    source_map: SourceMap = attr.ib()
+
+    def to_dict(self) -> Dict:
+        """Return the minified state machine definition as a dictionary."""
+        return self.definition
+
+    def to_json(self) -> str:
+        """Serialize the minified state machine definition as compact JSON."""
+        return json.dumps(self.definition, separators=(",", ":"))
+
+    def definition_string(self) -> Sub:
+        """Serialize the minified state machine for use in a ``troposphere`` state machine definition."""
+        return Sub(self.to_json())
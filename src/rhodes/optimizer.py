@@ -0,0 +1,507 @@
+"""
+Graph optimizer that removes redundant state transitions.
+
+Every state that an execution enters is a billed state transition and adds latency.
+:func:`optimize` rewrites a :class:`StateMachine`,
+including any nested ``Parallel`` branches and ``Map`` iterators,
+without changing the data that flows through it.
+
+The following rewrites are applied until none of them match:
+
+* ``Pass`` states that do not change their input are removed.
+* Chains of ``Pass`` states are fused into a single ``Pass`` state
+  whose ``InputPath``, ``Parameters``, or ``Result`` produces the same output.
+* ``Pass`` states that only select part of their input are folded
+  into the ``InputPath`` of the state that follows them.
+* ``Choice`` states where every rule and the ``Default`` lead to the same state
+  are removed or folded like a ``Pass`` state.
+* Identical ``Succeed`` and ``Fail`` states are merged.
+
+.. code-block:: python
+
+    report = optimize(workflow)
+    print(f"Saved {report.transitions_saved} transitions per execution path")
+
+"""
+from enum import Enum
+from typing import Any, Dict, List, Optional, Tuple
+
+import attr
+import jsonpath_rw
+from jsonpath_rw.jsonpath import Child, Fields, Index, Root
+
+from rhodes._graph import GraphIndex, iter_machines
+from rhodes.serialization import serialize_name_and_value
+from rhodes.states import Choice, Fail, Pass, State, StateMachine, Succeed
+from rhodes.structures import ContextPath, JsonPath, Parameters
+
+__all__ = ("OptimizationReport", "optimize")
+
+
+@attr.s
+class OptimizationReport:
+    """Summary of the rewrites applied by :func:`optimize`.
+
+    :param int removed_passes: ``Pass`` states removed because they did not change their input
+    :param int fused_passes: ``Pass`` states merged into the preceding ``Pass`` state
+    :param int folded_passes: ``Pass`` states folded into the ``InputPath`` of the following state
+    :param int collapsed_choices: ``Choice`` states removed because every branch led to the same state
+    :param int deduplicated_terminals: ``Succeed`` and ``Fail`` states merged into an identical state
+    """
+
+    removed_passes: int = attr.ib(default=0)
+    fused_passes: int = attr.ib(default=0)
+    folded_passes: int = attr.ib(default=0)
+    collapsed_choices: int = attr.ib(default=0)
+    deduplicated_terminals: int = attr.ib(default=0)
+
+    @property
+    def transitions_saved(self) -> int:
+        """Number of state transitions no longer taken along the paths that crossed a removed state.
+
+        Merging terminal states shrinks the definition but does not save transitions.
+        """
+        return self.removed_passes + self.fused_passes + self.folded_passes + self.collapsed_choices
+
+    @property
+    def states_removed(self) -> int:
+        """Total number of states removed from the definition."""
+        return self.transitions_saved + self.deduplicated_terminals
+
+
+class _CannotFuse(Exception):
+    """Raised internally when a rewrite would not preserve data-flow semantics."""
+
+
+# Path segments are ("field", name) or ("index", position).
+_Segment = Tuple[str, Any]
+
+
+def _path_segments(path: Optional[JsonPath]) -> Optional[List[_Segment]]:
+    """Split a definite path into segments, or return ``None`` if the path can select multiple values."""
+    if path is None:
+        return []
+
+    segments: List[_Segment] = []
+
+    def _walk(node: jsonpath_rw.JSONPath) -> bool:
+        if isinstance(node, Root):
+            return True
+
+        if isinstance(node, Child):
+            return _walk(node.left) and _walk(node.right)
+
+        if isinstance(node, Fields) and len(node.fields) == 1 and node.fields[0] != "*":
+            segments.append(("field", node.fields[0]))
+            return True
+
+        if isinstance(node, Index):
+            segments.append(("index", node.index))
+            return True
+
+        return False
+
+    if not _walk(path.path):
+        return None
+
+    return segments
+
+
+def _segments_to_path(segments: List[_Segment]) -> JsonPath:
+    node: jsonpath_rw.JSONPath = Root()
+    for kind, value in segments:
+        node = Child(node, Fields(value) if kind == "field" else Index(value))
+    return JsonPath(node)
+
+
+def _is_root(path: Optional[JsonPath]) -> bool:
+    return path is None or _path_segments(path) == []
+
+
+@attr.s(frozen=True)
+class _InputRef:
+    """Symbolic reference to a definite path in the raw input of the first state in a fused chain."""
+
+    segments: Tuple[_Segment, ...] = attr.ib()
+
+
+@attr.s(frozen=True)
+class _ContextRef:
+    """Symbolic reference to a value in the Context Object."""
+
+    path: str = attr.ib()
+
+
+@attr.s(frozen=True)
+class _Merged:
+    """Symbolic value where ``value`` was written at ``segments`` inside ``base`` (a ``ResultPath`` merge)."""
+
+    base: Any = attr.ib()
+    segments: Tuple[_Segment, ...] = attr.ib()
+    value: Any = attr.ib()
+
+
+def _definite(path: Optional[JsonPath]) -> List[_Segment]:
+    segments = _path_segments(path)
+    if segments is None:
+        raise _CannotFuse()
+    return segments
+
+
+def _step(template: Any, kind: str, value: Any) -> Any:
+    """Apply a single path segment to a symbolic value."""
+    if isinstance(template, _InputRef):
+        return _InputRef(template.segments + ((kind, value),))
+
+    if isinstance(template, _ContextRef):
+        if kind != "field":
+            raise _CannotFuse()
+        try:
+            return _ContextRef(str(getattr(ContextPath(template.path), value)))
+        except ValueError:
+            raise _CannotFuse()
+
+    if kind == "field" and isinstance(template, dict) and value in template:
+        return template[value]
+
+    if kind == "index" and isinstance(template, list) and -len(template) <= value < len(template):
+        return template[value]
+
+    # The path would fail at execution time: leave that failure where it is.
+    raise _CannotFuse()
+
+
+def _select(template: Any, segments: List[_Segment]) -> Any:
+    """Apply a definite path to a symbolic value."""
+    for pos, (kind, value) in enumerate(segments):
+        if isinstance(template, _Merged):
+            remaining = tuple(segments[pos:])
+            written = template.segments
+            if remaining[: len(written)] == written:
+                return _select(template.value, list(remaining[len(written) :]))
+            if written[: len(remaining)] == remaining:
+                # Selecting a parent of the merged value would need the merge itself.
+                raise _CannotFuse()
+            return _select(template.base, list(remaining))
+
+        template = _step(template, kind, value)
+
+    return template
+
+
+def _write(template: Any, segments: List[_Segment], value: Any) -> Any:
+    """Apply a ``ResultPath`` to a symbolic value."""
+    if not segments:
+        return value
+
+    if isinstance(template, _Merged):
+        if template.segments != tuple(segments):
+            raise _CannotFuse()
+        return _Merged(template.base, template.segments, value)
+
+    if isinstance(template, dict):
+        kind, name = segments[0]
+        if kind != "field":
+            raise _CannotFuse()
+        updated = dict(template)
+        updated[name] = _write(template.get(name, {}), segments[1:], value)
+        return updated
+
+    if isinstance(template, _InputRef):
+        return _Merged(template, tuple(segments), value)
+
+    raise _CannotFuse()
+
+
+def _resolve_path_string(value: str, effective_input: Any) -> Any:
+    if value.startswith("$$"):
+        try:
+            return _ContextRef(str(ContextPath(value)))
+        except ValueError:
+            raise _CannotFuse()
+
+    try:
+        path = JsonPath(value)
+    except Exception:  # pylint: disable=broad-except
+        raise _CannotFuse()
+
+    return _select(effective_input, _definite(path))
+
+
+def _parameters_template(values: Dict[str, Any], effective_input: Any) -> Dict[str, Any]:
+    """Evaluate ``Parameters`` symbolically against an effective input."""
+    template = {}
+    for name, value in values.items():
+        if isinstance(value, Enum):
+            value = value.value
+
+        if isinstance(value, JsonPath):
+            template[name[:-2] if name.endswith(".$") else name] = _select(effective_input, _definite(value))
+        elif isinstance(value, ContextPath):
+            template[name[:-2] if name.endswith(".$") else name] = _ContextRef(str(value))
+        elif isinstance(value, Parameters):
+            template[name] = _parameters_template(value._map, effective_input)  # pylint: disable=protected-access
+        elif name.endswith(".$") and isinstance(value, str):
+            template[name[:-2]] = _resolve_path_string(value, effective_input)
+        elif isinstance(value, dict):
+            template[name] = _parameters_template(value, effective_input)
+        else:
+            _, serialized = serialize_name_and_value(name=name, value=value)
+            template[name] = serialized
+
+    return template
+
+
+def _pass_output(state: Pass, input_template: Any) -> Any:
+    """Evaluate a ``Pass`` state symbolically."""
+    effective_input = _select(input_template, _definite(state.InputPath))
+
+    if state.Result is not None:
+        produced = state.Result
+    elif state.Parameters is not None:
+        produced = _parameters_template(state.Parameters._map, effective_input)  # pylint: disable=protected-access
+    else:
+        produced = effective_input
+
+    output = _write(input_template, _definite(state.ResultPath), produced)
+    return _select(output, _definite(state.OutputPath))
+
+
+def _contains_refs(template: Any) -> bool:
+    if isinstance(template, (_InputRef, _ContextRef, _Merged)):
+        return True
+
+    if isinstance(template, dict):
+        return any(_contains_refs(value) for value in template.values())
+
+    if isinstance(template, list):
+        return any(_contains_refs(value) for value in template)
+
+    return False
+
+
+def _template_to_parameters(template: Dict[str, Any]) -> Parameters:
+    values = {}
+    for name, value in template.items():
+        if name.endswith(".$"):
+            # A literal key with this suffix would be read as a path.
+            raise _CannotFuse()
+
+        if isinstance(value, _InputRef):
+            values[name] = _segments_to_path(list(value.segments))
+        elif isinstance(value, _ContextRef):
+            values[name] = ContextPath(value.path)
+        elif isinstance(value, dict):
+            values[name] = _template_to_parameters(value)
+        elif _contains_refs(value):
+            # Paths inside arrays are not evaluated by Step Functions.
+            raise _CannotFuse()
+        else:
+            values[name] = value
+    return Parameters(**values)
+
+
+def _value_kwargs(template: Any) -> Dict[str, Any]:
+    """Determine the ``Pass`` state fields that produce ``template`` from the state input."""
+    if isinstance(template, _InputRef):
+        return dict(InputPath=_segments_to_path(list(template.segments)))
+
+    if isinstance(template, dict) and _contains_refs(template):
+        return dict(Parameters=_template_to_parameters(template))
+
+    if isinstance(template, (_ContextRef, _Merged)) or _contains_refs(template) or template is None:
+        raise _CannotFuse()
+
+    return dict(Result=template)
+
+
+def _fused_pass(first: Pass, second: Pass) -> Pass:
+    """Build a single ``Pass`` state equivalent to ``first`` followed by ``second``."""
+    if _references_state_context(second):
+        raise _CannotFuse()
+
+    template = _pass_output(second, _pass_output(first, _InputRef(())))
+
+    kwargs: Dict[str, Any] = dict(Comment=first.Comment, Next=second.Next, End=second.End)
+    if isinstance(template, _Merged):
+        if template.base != _InputRef(()):
+            raise _CannotFuse()
+        kwargs.update(_value_kwargs(template.value))
+        kwargs["ResultPath"] = _segments_to_path(list(template.segments))
+    else:
+        kwargs.update(_value_kwargs(template))
+
+    return Pass(first.title, **kwargs)
+
+
+def _references_state_context(state: Pass) -> bool:
+    """Determine whether a state reads ``$$.State``, which changes when the state is renamed."""
+
+    def _check(values: Dict[str, Any]) -> bool:
+        for name, value in values.items():
+            if isinstance(value, ContextPath) and str(value).startswith("$$.State"):
+                return True
+            if isinstance(value, str) and name.endswith(".$") and value.startswith("$$.State"):
+                return True
+            if isinstance(value, Parameters) and _check(value._map):  # pylint: disable=protected-access
+                return True
+            if isinstance(value, dict) and _check(value):
+                return True
+        return False
+
+    return state.Parameters is not None and _check(state.Parameters._map)  # pylint: disable=protected-access
+
+
+def _projection(state: State) -> Optional[List[_Segment]]:
+    """If ``state`` only selects part of its input, return the definite path that it selects."""
+    if isinstance(state, Pass):
+        if state.Parameters is not None or state.Result is not None:
+            return None
+
+        input_segments = _path_segments(state.InputPath)
+        if not _is_root(state.ResultPath):
+            if _path_segments(state.ResultPath) == input_segments and _is_root(state.OutputPath):
+                # Writing a value back where it was read from is a no-op.
+                return []
+            return None
+    elif isinstance(state, Choice):
+        if state.Default is None or any(rule.Next != state.Default for rule in state.Choices):
+            return None
+        input_segments = _path_segments(state.InputPath)
+    else:
+        return None
+
+    output_segments = _path_segments(state.OutputPath)
+    if input_segments is None or output_segments is None:
+        return None
+
+    return input_segments + output_segments
+
+
+def _successor(state: State) -> Optional[str]:
+    if isinstance(state, Choice):
+        return state.Default
+    return getattr(state, "Next", None)
+
+
+def _count(report: OptimizationReport, state: State, pass_field: str):
+    if isinstance(state, Choice):
+        report.collapsed_choices += 1
+    else:
+        setattr(report, pass_field, getattr(report, pass_field) + 1)
+
+
+def _remove_identities(index: GraphIndex, report: OptimizationReport) -> bool:
+    changed = False
+    for title, state in list(index.machine.States.items()):
+        if _projection(state) != [] or _successor(state) is None or _successor(state) == title:
+            continue
+
+        index.rewire(title, _successor(state))
+        index.remove(title)
+        _count(report, state, "removed_passes")
+        changed = True
+    return changed
+
+
+def _fold_projections(index: GraphIndex, report: OptimizationReport) -> bool:
+    changed = False
+    for title, state in list(index.machine.States.items()):
+        segments = _projection(state)
+        target_title = _successor(state)
+        if not segments or target_title is None or target_title == title:
+            continue
+
+        target = index.machine.States.get(target_title)
+        if target is None or index.incoming(target_title) != 1 or not hasattr(target, "InputPath"):
+            continue
+
+        # The state that follows must not read its raw input,
+        # which is what ResultPath merges into and what Catch hands to error handlers.
+        if not _is_root(getattr(target, "ResultPath", None)) or getattr(target, "Catch", None):
+            continue
+
+        target_segments = _path_segments(target.InputPath)
+        if target_segments is None:
+            continue
+
+        target.InputPath = _segments_to_path(segments + target_segments)
+        index.rewire(title, target_title)
+        index.remove(title)
+        _count(report, state, "folded_passes")
+        changed = True
+    return changed
+
+
+def _fuse_passes(index: GraphIndex, report: OptimizationReport) -> bool:
+    changed = False
+    for title in list(index.machine.States):
+        first = index.machine.States.get(title)
+        if not isinstance(first, Pass) or first.Next is None or first.Next == title:
+            continue
+
+        second = index.machine.States.get(first.Next)
+        if not isinstance(second, Pass) or index.incoming(second.title) != 1:
+            continue
+
+        try:
+            fused = _fused_pass(first, second)
+        except _CannotFuse:
+            continue
+
+        second_title = second.title
+        index.replace(title, fused)
+        index.remove(second_title)
+        report.fused_passes += 1
+        changed = True
+    return changed
+
+
+def _deduplicate_terminals(index: GraphIndex, report: OptimizationReport) -> bool:
+    changed = False
+    canonical: Dict[Tuple, str] = {}
+    for title, state in list(index.machine.States.items()):
+        if not isinstance(state, (Succeed, Fail)):
+            continue
+
+        key = (state.Type, getattr(state, "Error", None), getattr(state, "Cause", None))
+        if key not in canonical:
+            canonical[key] = title
+            continue
+
+        index.rewire(title, canonical[key])
+        index.remove(title)
+        report.deduplicated_terminals += 1
+        changed = True
+    return changed
+
+
+def _optimize_machine(machine: StateMachine, report: OptimizationReport):
+    index = GraphIndex(machine)
+
+    changed = True
+    while changed:
+        changed = _remove_identities(index, report)
+        changed = _fuse_passes(index, report) or changed
+        changed = _fold_projections(index, report) or changed
+        changed = _deduplicate_terminals(index, report) or changed
+
+
+def optimize(state_machine: StateMachine) -> OptimizationReport:
+    """Remove redundant states from ``state_machine`` and all state machines nested inside it.
+
+    The state machine is rewritten in place.
+    States are only removed when the rewritten state machine
+    passes the same data between the remaining states,
+    so any state that reads ``$$.State``, merges into its raw input,
+    or has error handlers that observe its raw input is left alone.
+
+    :param StateMachine state_machine: State machine to optimize
+    :return: Summary of the applied rewrites
+    """
+    report = OptimizationReport()
+
+    for machine in iter_machines(state_machine):
+        _optimize_machine(machine, report)
+
+    return report
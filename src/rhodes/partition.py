@@ -0,0 +1,366 @@
+"""
+Split oversized state machines into a parent state machine and child executions.
+
+Step Functions limits the size of a state machine definition
+and the number of events in the history of a Standard workflow execution.
+:func:`partition` moves single-entry/single-exit regions of a state machine
+into child state machines
+and replaces each region in the parent with an :class:`AwsStepFunctions` task
+that runs the child execution synchronously.
+
+The child execution receives the input of the first state in the region
+and its output becomes the output of the task,
+so the states that follow the region see the same data.
+
+.. code-block:: python
+
+    result = partition(workflow, PartitionLimits(max_history_events=10_000))
+
+    template.add_resource(stepfunctions.StateMachine("Parent", DefinitionString=result.parent.definition_string(), ...))
+    for name, child in result.children.items():
+        template.add_resource(stepfunctions.StateMachine(name, DefinitionString=child.definition_string(), ...))
+
+By default the parent refers to each child with a ``Ref`` to a CloudFormation resource
+whose logical ID is the child name.
+
+.. note::
+
+    A ``Fail`` state in a child state machine fails the child execution,
+    which the parent task reports as a ``States.TaskFailed`` error.
+    States that read ``$$.Execution`` or ``$$.StateMachine``
+    are never moved into a child state machine because the child execution would see different values.
+"""
+import copy
+import json
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import attr
+from attr.validators import instance_of, optional
+from troposphere import Ref
+
+from rhodes._graph import GraphIndex, nested_machines, state_transitions
+from rhodes.budget import MAX_HISTORY_EVENTS, state_events
+from rhodes.exceptions import PartitionError
+from rhodes.identifiers import IntegrationPattern
+from rhodes.states import Fail, State, StateMachine, Succeed
+from rhodes.states.services.stepfunctions import AwsStepFunctions
+from rhodes.structures import ContextPath, JsonPath, Parameters
+
+__all__ = ("PartitionLimits", "PartitionResult", "partition")
+
+MAX_DEFINITION_BYTES = 1024 * 1024
+
+
+@attr.s
+class PartitionLimits:
+    """Limits that every state machine produced by :func:`partition` must stay within.
+
+    :param int max_definition_bytes: Maximum size of the serialized definition
+    :param int max_history_events: Maximum number of history events for one execution
+    :param int max_states: Maximum number of top-level states (optional)
+    """
+
+    max_definition_bytes: int = attr.ib(default=MAX_DEFINITION_BYTES, validator=instance_of(int))
+    max_history_events: int = attr.ib(default=MAX_HISTORY_EVENTS, validator=instance_of(int))
+    max_states: Optional[int] = attr.ib(default=None, validator=optional(instance_of(int)))
+
+
+@attr.s
+class PartitionResult:
+    """Parent and child state machines produced by :func:`partition`.
+
+    :param StateMachine parent: State machine that starts the child executions
+    :param dict children: Map of child name to child state machine
+    :param dict regions: Map of child name to the titles of the original states that it contains
+    """
+
+    parent: StateMachine = attr.ib()
+    children: Dict[str, StateMachine] = attr.ib(factory=dict)
+    regions: Dict[str, List[str]] = attr.ib(factory=dict)
+
+
+def _default_arn(name: str) -> Ref:
+    return Ref(name)
+
+
+def _state_bytes(title: str, state: State) -> int:
+    return len(json.dumps({title: state.to_dict()})) + 2
+
+
+def _reads_execution_context(state: State) -> bool:
+    def _check(value: Any) -> bool:
+        if isinstance(value, ContextPath):
+            return str(value).startswith(("$$.Execution", "$$.StateMachine"))
+        if isinstance(value, Parameters):
+            return _check(value._map)  # pylint: disable=protected-access
+        if isinstance(value, dict):
+            return any(_check(inner) for inner in value.values()) or any(
+                name.endswith(".$") and isinstance(inner, str) and inner.startswith(("$$.Execution", "$$.StateMachine"))
+                for name, inner in value.items()
+            )
+        return False
+
+    if any(_check(value) for value in attr.asdict(state, recurse=False).values()):
+        return True
+
+    return any(_reads_execution_context(nested) for child in nested_machines(state) for nested in child.States.values())
+
+
+def _is_terminal(state: State) -> bool:
+    return isinstance(state, (Succeed, Fail)) or getattr(state, "End", None) is True
+
+
+class _Region:
+    """A set of states that grows from a single entry state, with running totals of its cost."""
+
+    def __init__(self, partitioner: "_Partitioner", machine: StateMachine, index: GraphIndex, entry: str):
+        self.partitioner = partitioner
+        self.machine = machine
+        self.index = index
+        self.entry = entry
+        self.titles: Set[str] = set()
+        self.size = 0
+        self.events = 0.0
+        # References from states outside the region to states inside it, other than the entry.
+        self.external = 0
+        self._pending: List[str] = []
+
+    def cost(self) -> Tuple[int, float, int]:
+        return self.size, self.events, len(self.titles)
+
+    def add(self, title: str) -> bool:
+        """Add a state to the region, or return ``False`` if it can never be moved into a child."""
+        state = self.machine.States[title]
+        if _reads_execution_context(state) or (title != self.entry and title == self.machine.StartAt):
+            return False
+
+        self.titles.add(title)
+        self._pending.append(title)
+        size, events, _ = self.partitioner._cost(self.machine, [title])  # pylint: disable=protected-access
+        self.size += size
+        self.events += events
+        if title != self.entry:
+            self.external += sum(1 for source in self.index.predecessors[title] if source not in self.titles)
+        self.external -= sum(
+            1
+            for _field, target in self.index.successors[title]
+            if target in self.titles and target not in (self.entry, title)
+        )
+        return True
+
+    def close(self, exit_title: Optional[str]) -> bool:
+        """Add every state reachable from the region without passing through ``exit_title``."""
+        while self._pending:
+            for target in self.index.targets(self._pending.pop()):
+                if target == exit_title or target in self.titles or target not in self.machine.States:
+                    continue
+                if not self.add(target):
+                    return False
+        return True
+
+
+class _Partitioner:
+    def __init__(self, limits: PartitionLimits, traffic: Dict[str, float], arn: Callable[[str], Any], prefix: str):
+        self.limits = limits
+        self.traffic = traffic
+        self.arn = arn
+        self.prefix = prefix
+        self.result: Optional[PartitionResult] = None
+        self._bytes: Dict[int, int] = {}
+
+    def _size(self, title: str, state: State) -> int:
+        key = id(state)
+        if key not in self._bytes:
+            self._bytes[key] = _state_bytes(title, state)
+        return self._bytes[key]
+
+    def _cost(self, machine: StateMachine, titles) -> Tuple[int, float, int]:
+        size = sum(self._size(title, machine.States[title]) for title in titles)
+        events = sum(
+            self.traffic.get(title, 1.0) * sum(state_events(machine.States[title]).values()) for title in titles
+        )
+        return size, events, len(titles)
+
+    def _fits(self, machine: StateMachine, titles=None) -> bool:
+        titles = list(machine.States) if titles is None else titles
+        return self._within_limits(*self._cost(machine, titles))
+
+    def _within_limits(self, size: int, events: float, count: int) -> bool:
+        # Leave room for the top-level fields and the execution start and end events.
+        return (
+            size + 64 <= self.limits.max_definition_bytes
+            and events + 2 <= self.limits.max_history_events
+            and (self.limits.max_states is None or count <= self.limits.max_states)
+        )
+
+    def _regions(self, machine: StateMachine, index: GraphIndex) -> List[Tuple[str, Optional[str], Set[str]]]:
+        """Find all single-entry/single-exit regions of at least two states."""
+        titles = list(machine.States)
+        position = {title: pos for pos, title in enumerate(titles)}
+        exit_node = len(titles)
+        everything = (1 << (exit_node + 1)) - 1
+
+        successors: List[List[int]] = []
+        for title in titles:
+            targets = [position[target] for target in index.targets(title) if target in position]
+            if _is_terminal(machine.States[title]) or not targets:
+                targets.append(exit_node)
+            successors.append(targets)
+
+        # Iterative post-dominator sets as bitsets; the virtual exit node post-dominates everything.
+        post_dominators = [everything] * len(titles) + [1 << exit_node]
+        changed = True
+        while changed:
+            changed = False
+            for pos in reversed(range(len(titles))):
+                updated = everything
+                for target in successors[pos]:
+                    updated &= post_dominators[target]
+                updated |= 1 << pos
+                if updated != post_dominators[pos]:
+                    post_dominators[pos] = updated
+                    changed = True
+
+        immediate = [self._immediate(post_dominators, pos) for pos in range(len(titles))]
+
+        regions = []
+        for pos, entry in enumerate(titles):
+            region = self._largest_region(machine, index, entry, pos, immediate, titles)
+            if region is not None:
+                regions.append(region)
+
+        return regions
+
+    @staticmethod
+    def _immediate(post_dominators: List[int], pos: int) -> Optional[int]:
+        strict = post_dominators[pos] & ~(1 << pos)
+        remaining = strict
+        while remaining:
+            lowest = remaining & -remaining
+            candidate = lowest.bit_length() - 1
+            if post_dominators[candidate] == strict:
+                return candidate
+            remaining ^= lowest
+        return None
+
+    def _largest_region(self, machine, index, entry, pos, immediate, titles):
+        """Grow a region from ``entry`` one post-dominator at a time and keep the largest valid one that fits."""
+        region = _Region(self, machine, index, entry)
+        if not region.add(entry):
+            return None
+
+        best = None
+        current = pos
+        while immediate[current] is not None:
+            current = immediate[current]
+            exit_title = titles[current] if current < len(titles) else None
+
+            if not region.close(exit_title):
+                break
+
+            if len(region.titles) == len(machine.States) or not self._within_limits(*region.cost()):
+                break
+
+            if region.external == 0 and len(region.titles) >= 2:
+                best = (entry, exit_title, set(region.titles))
+
+            if exit_title is None or not region.add(exit_title):
+                break
+
+        return best
+
+    def _extract(self, machine: StateMachine, index: GraphIndex, entry: str, exit_title: Optional[str], region):
+        name = f"{self.prefix}{len(self.result.children) + 1}"
+        ordered = [title for title in machine.States if title in region]
+
+        child = StateMachine(StartAt=entry)
+        exit_state = None
+        for title in ordered:
+            state = machine.States[title]
+            if title != entry:
+                index.remove(title)
+            state.member_of = child
+            child.States[title] = state
+
+            if exit_title is None:
+                continue
+
+            if getattr(state, "Next", None) == exit_title:
+                state.Next = None
+                state.End = True
+
+            if any(target == exit_title for _field, target in state_transitions(state)):
+                # Choice rules and catchers cannot end an execution, so they transition to a Succeed state.
+                if exit_state is None:
+                    exit_state = child.add_state(Succeed(exit_title))
+
+        task = AwsStepFunctions(
+            entry,
+            StateMachineArn=self.arn(name),
+            Input=JsonPath("$"),
+            Pattern=IntegrationPattern.SYNCHRONOUS_JSON,
+            OutputPath=JsonPath("$.Output"),
+        )
+        if exit_title is None:
+            task.End = True
+        else:
+            task.Next = exit_title
+
+        index.replace(entry, task)
+
+        self.result.regions[name] = ordered
+        self.result.children[name] = child
+        return child
+
+    def split(self, machine: StateMachine):
+        index = GraphIndex(machine)
+
+        while not self._fits(machine):
+            candidates = []
+            for entry, exit_title, region in self._regions(machine, index):
+                child_fits = self._fits(machine, region)
+                size, events, _ = self._cost(machine, region)
+                candidates.append(
+                    ((not child_fits, self.traffic.get(entry, 1.0), -events, -size), entry, exit_title, region)
+                )
+
+            if not candidates:
+                raise PartitionError(
+                    f"Unable to find a single-entry/single-exit region to split out of state machine "
+                    f"starting at {machine.StartAt!r}."
+                )
+
+            _, entry, exit_title, region = min(candidates, key=lambda candidate: candidate[0])
+            child = self._extract(machine, index, entry, exit_title, region)
+            self.split(child)
+
+
+def partition(
+    state_machine: StateMachine,
+    limits: Optional[PartitionLimits] = None,
+    *,
+    traffic: Optional[Dict[str, float]] = None,
+    state_machine_arn: Callable[[str], Any] = _default_arn,
+    prefix: str = "Child",
+) -> PartitionResult:
+    """Split a state machine into a parent and child state machines that each fit within ``limits``.
+
+    Regions whose first state is visited least often are moved first,
+    so that the fewest child executions are started.
+    ``state_machine`` is not modified.
+
+    :param StateMachine state_machine: State machine to split
+    :param PartitionLimits limits: Limits to enforce (default: Step Functions service limits)
+    :param dict traffic: Expected number of visits per execution for each top-level state (default: 1)
+    :param state_machine_arn: Callable that returns the ``StateMachineArn`` value for a child name
+        (default: a ``Ref`` to a CloudFormation resource with the child name as its logical ID)
+    :param str prefix: Prefix for child names
+    :raises PartitionError: if no suitable region can be found to bring a state machine within ``limits``
+    """
+    partitioner = _Partitioner(
+        limits=limits or PartitionLimits(), traffic=traffic or {}, arn=state_machine_arn, prefix=prefix
+    )
+    parent = copy.deepcopy(state_machine)
+    partitioner.result = PartitionResult(parent=parent)
+    partitioner.split(parent)
+    return partitioner.result
@@ -0,0 +1,372 @@
+"""
+Render state machines as `Graphviz DOT`_ or `Mermaid`_ flowcharts.
+
+Nested ``Parallel`` branches and ``Map`` iterators are drawn as subgraphs inside the state that runs them.
+
+States can be colored by performance data,
+such as statistics collected from execution history with :func:`history_stats`.
+Statistics are keyed by state title;
+states inside a ``Parallel`` or ``Map`` state are keyed by the titles of the states that contain them,
+joined with ``/`` (ex: ``"Repeat/Each"``).
+
+.. code-block:: python
+
+    events = sfn.get_execution_history(executionArn=arn)["events"]
+    stats = history_stats(events)
+
+    with open("workflow.dot", "w") as dot:
+        dot.write(to_dot(workflow, stats, metric="p99_latency"))
+
+.. _Graphviz DOT: https://graphviz.org/doc/info/lang.html
+.. _Mermaid: https://mermaid-js.github.io/mermaid/#/flowchart
+"""
+import datetime
+import math
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import attr
+
+from rhodes._graph import GraphIndex, nested_machines
+from rhodes.states import Choice, Fail, State, StateMachine, Succeed
+
+__all__ = ("METRICS", "StateStats", "history_stats", "to_dot", "to_mermaid")
+
+#: Names of the :class:`StateStats` values that can be used to color states.
+METRICS = ("mean_latency", "p99_latency", "transition_share", "payload_bytes", "retry_rate")
+# Sequential color scale from cool to hot.
+_PALETTE = ("#fef0d9", "#fdcc8a", "#fc8d59", "#e34a33", "#b30000")
+_SCHEDULED_EVENTS = ("TaskScheduled", "LambdaFunctionScheduled", "ActivityScheduled")
+
+
+@attr.s
+class StateStats:
+    """Performance data for a single state.
+
+    :param int visits: Number of times the state was entered
+    :param float mean_latency: Mean time from entering to exiting the state, in seconds
+    :param float p99_latency: 99th percentile time from entering to exiting the state, in seconds
+    :param float transition_share: Share of all state transitions that entered this state
+    :param float payload_bytes: Mean size of the state output, in bytes
+    :param float retry_rate: Mean number of retried attempts per visit
+    """
+
+    visits: int = attr.ib(default=0)
+    mean_latency: float = attr.ib(default=0.0)
+    p99_latency: float = attr.ib(default=0.0)
+    transition_share: float = attr.ib(default=0.0)
+    payload_bytes: float = attr.ib(default=0.0)
+    retry_rate: float = attr.ib(default=0.0)
+
+
+def _seconds(timestamp: Any) -> float:
+    if isinstance(timestamp, datetime.datetime):
+        return timestamp.timestamp()
+    return float(timestamp)
+
+
+def _percentile(values: List[float], percent: float) -> float:
+    ordered = sorted(values)
+    rank = max(int(math.ceil(percent / 100 * len(ordered))), 1)
+    return ordered[rank - 1]
+
+
+def _entered_name(event: Dict) -> Optional[str]:
+    if event["type"].endswith("StateEntered"):
+        return event.get("stateEnteredEventDetails", {}).get("name")
+    return None
+
+
+class _HistoryReader:
+    """Attribute each event in one execution history to the state visit that recorded it."""
+
+    def __init__(self, events: Iterable[Dict]):
+        self.events = {event["id"]: event for event in events}
+        # Event ID to the ID of the innermost "StateEntered" event that precedes it.
+        self.owner: Dict[int, Optional[int]] = {}
+        for event_id in sorted(self.events):
+            event = self.events[event_id]
+            if _entered_name(event) is not None:
+                self.owner[event_id] = event_id
+            else:
+                self.owner[event_id] = self.owner.get(event.get("previousEventId"))
+
+        self._paths: Dict[int, Tuple[str, ...]] = {}
+
+    def path(self, entered: Dict) -> Tuple[str, ...]:
+        """Find the titles of the states that contain a visit, ending with the visited state."""
+        event_id = entered["id"]
+        if event_id not in self._paths:
+            parent = self.parent(entered)
+            prefix = () if parent is None else self.path(parent)
+            self._paths[event_id] = prefix + (_entered_name(entered),)
+        return self._paths[event_id]
+
+    def parent(self, entered: Dict) -> Optional[Dict]:
+        """Find the "StateEntered" event for the visit to the state that contains a visit."""
+        candidate = entered.get("previousEventId")
+        while candidate in self.events:
+            event = self.events[candidate]
+            if _entered_name(event) is not None:
+                return event
+            details = event.get("stateExitedEventDetails")
+            if event["type"].endswith("StateExited") and details:
+                # A sibling state that ran earlier: continue from the event before it started.
+                event = self.entered(event, details["name"]) or event
+            candidate = event.get("previousEventId")
+        return None
+
+    def entered(self, event: Dict, name: str) -> Optional[Dict]:
+        """Find the "StateEntered" event for the visit to ``name`` that contains ``event``."""
+        candidate = self.owner.get(event.get("previousEventId"))
+        while candidate is not None:
+            entered = self.events[candidate]
+            if _entered_name(entered) == name:
+                return entered
+            # Skip over the nested state that recorded this event.
+            candidate = self.owner.get(entered.get("previousEventId"))
+        return None
+
+
+def history_stats(*histories: Iterable[Dict]) -> Dict[str, StateStats]:
+    """Collect performance data for each state from one or more execution histories.
+
+    Histories are in the format returned by the Step Functions ``GetExecutionHistory`` API.
+    Event timestamps can be :class:`datetime.datetime` values or seconds since the epoch.
+
+    :param histories: Execution history events, one iterable per execution
+    :return: Map of state key (the state title, prefixed with the titles of the states that contain it) to
+        performance data
+    """
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    payloads: Dict[str, List[int]] = defaultdict(list)
+    visits: Dict[str, int] = defaultdict(int)
+    attempts: Dict[str, int] = defaultdict(int)
+
+    for history in histories:
+        reader = _HistoryReader(history)
+        for event in reader.events.values():
+            if _entered_name(event) is not None:
+                visits[_key(reader.path(event))] += 1
+                continue
+
+            if event["type"] in _SCHEDULED_EVENTS:
+                owner = reader.owner.get(event["id"])
+                if owner is not None:
+                    attempts[_key(reader.path(reader.events[owner]))] += 1
+                continue
+
+            details = event.get("stateExitedEventDetails")
+            if not event["type"].endswith("StateExited") or not details:
+                continue
+
+            entered = reader.entered(event, details["name"])
+            if entered is None:
+                continue
+            name = _key(reader.path(entered))
+            payloads[name].append(len(details.get("output", "").encode("utf-8")))
+            latencies[name].append(_seconds(event["timestamp"]) - _seconds(entered["timestamp"]))
+
+    total_visits = sum(visits.values())
+    stats = {}
+    for name, count in visits.items():
+        state_latencies = latencies.get(name) or [0.0]
+        state_payloads = payloads.get(name) or [0]
+        stats[name] = StateStats(
+            visits=count,
+            mean_latency=sum(state_latencies) / len(state_latencies),
+            p99_latency=_percentile(state_latencies, 99),
+            transition_share=count / total_visits,
+            payload_bytes=sum(state_payloads) / len(state_payloads),
+            retry_rate=max(attempts.get(name, 0) - count, 0) / count,
+        )
+    return stats
+
+
+def _key(path: Sequence[str]) -> str:
+    return "/".join(path)
+
+
+def _format_metric(metric: str, value: float) -> str:
+    if metric.endswith("latency"):
+        return f"{value:.3g}s"
+    if metric == "transition_share":
+        return f"{value:.1%}"
+    if metric == "payload_bytes":
+        return f"{value:.0f} B"
+    return f"{value:.2f}"
+
+
+class _Renderer:
+    """Walk a state machine and its nested state machines, assigning identifiers and colors."""
+
+    def __init__(self, stats: Optional[Dict[str, StateStats]], metric: str):
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric {metric!r}. Must be one of {METRICS!r}")
+
+        self.stats = stats or {}
+        self.metric = metric
+        self._ids: Dict[Tuple[int, str], str] = {}
+        self._counter = 0
+        values = [getattr(state_stats, metric) for state_stats in self.stats.values()]
+        self._hottest = max(values, default=0.0)
+
+    def new_id(self, prefix: str) -> str:
+        self._counter += 1
+        return f"{prefix}{self._counter}"
+
+    def state_id(self, machine: StateMachine, title: str) -> str:
+        # Nested state machines may reuse the titles of states in other state machines.
+        key = (id(machine), title)
+        if key not in self._ids:
+            self._ids[key] = self.new_id("s")
+        return self._ids[key]
+
+    def label(self, path: Tuple[str, ...]) -> str:
+        title = path[-1]
+        state_stats = self.stats.get(_key(path))
+        if state_stats is None:
+            return title
+        return f"{title}\n{_format_metric(self.metric, getattr(state_stats, self.metric))}"
+
+    def color(self, path: Tuple[str, ...]) -> Optional[str]:
+        state_stats = self.stats.get(_key(path))
+        if state_stats is None or self._hottest <= 0:
+            return None
+        heat = getattr(state_stats, self.metric) / self._hottest
+        return _PALETTE[min(int(heat * len(_PALETTE)), len(_PALETTE) - 1)]
+
+    @staticmethod
+    def order(index: GraphIndex) -> List[str]:
+        """List states reachable from the start first, so that layout follows the flow of the state machine."""
+        reachable = index.reachable()
+        seen = set(reachable)
+        return reachable + [title for title in index.machine.States if title not in seen]
+
+
+def _dot_quote(value: str) -> str:
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+
+
+def _dot_shape(state: State) -> str:
+    if isinstance(state, Choice):
+        return "diamond"
+    if isinstance(state, (Succeed, Fail)):
+        return "doubleoctagon"
+    return "box"
+
+
+def _dot_machine(
+    renderer: _Renderer, machine: StateMachine, lines: List[str], indent: str, parents: Tuple[str, ...] = ()
+) -> str:
+    index = GraphIndex(machine)
+    start = renderer.new_id("start")
+    lines.append(f"{indent}{start} [shape=point];")
+    if machine.StartAt in machine.States:
+        lines.append(f"{indent}{start} -> {renderer.state_id(machine, machine.StartAt)};")
+
+    order = renderer.order(index)
+    for title in order:
+        state = machine.States[title]
+        path = parents + (title,)
+        attributes = [f"label={_dot_quote(renderer.label(path))}", f"shape={_dot_shape(state)}"]
+        color = renderer.color(path)
+        if color is not None:
+            attributes.append(f'style=filled, fillcolor="{color}"')
+        lines.append(f"{indent}{renderer.state_id(machine, title)} [{', '.join(attributes)}];")
+
+        for pos, child in enumerate(nested_machines(state)):
+            lines.append(f"{indent}subgraph {renderer.new_id('cluster_')} {{")
+            lines.append(f"{indent}  label={_dot_quote(f'{title} [{pos}]')};")
+            child_start = _dot_machine(renderer, child, lines, indent + "  ", path)
+            lines.append(f"{indent}}}")
+            lines.append(f"{indent}{renderer.state_id(machine, title)} -> {child_start} [style=dotted];")
+
+    for title in order:
+        for field, target in index.successors[title]:
+            attributes = []
+            if field != "Next":
+                attributes.append(f"label={_dot_quote(field)}")
+            if field.startswith("Catch"):
+                attributes.append("style=dashed")
+            suffix = f" [{', '.join(attributes)}]" if attributes else ""
+            source, destination = renderer.state_id(machine, title), renderer.state_id(machine, target)
+            lines.append(f"{indent}{source} -> {destination}{suffix};")
+
+    return start
+
+
+def to_dot(state_machine: StateMachine, stats: Optional[Dict[str, StateStats]] = None, *, metric="mean_latency") -> str:
+    """Render a state machine as a Graphviz DOT digraph.
+
+    :param StateMachine state_machine: State machine to render
+    :param dict stats: Performance data for each state, by state key (optional)
+    :param str metric: Name of the :class:`StateStats` value that colors each state
+    """
+    renderer = _Renderer(stats, metric)
+    lines = ["digraph {", "  node [fontname=Helvetica];"]
+    _dot_machine(renderer, state_machine, lines, "  ")
+    lines.append("}")
+    return "\n".join(lines) + "\n"
+
+
+def _mermaid_quote(value: str) -> str:
+    return '"' + value.replace('"', "#quot;").replace("\n", "<br/>") + '"'
+
+
+def _mermaid_node(state: State, node_id: str, label: str) -> str:
+    if isinstance(state, Choice):
+        return f"{node_id}{{{label}}}"
+    if isinstance(state, (Succeed, Fail)):
+        return f"{node_id}([{label}])"
+    return f"{node_id}[{label}]"
+
+
+def _mermaid_machine(
+    renderer: _Renderer, machine: StateMachine, lines: List[str], indent: str, parents: Tuple[str, ...] = ()
+) -> str:
+    index = GraphIndex(machine)
+    start = renderer.new_id("start")
+    lines.append(f'{indent}{start}((" "))')
+    if machine.StartAt in machine.States:
+        lines.append(f"{indent}{start} --> {renderer.state_id(machine, machine.StartAt)}")
+
+    order = renderer.order(index)
+    for title in order:
+        state = machine.States[title]
+        node_id = renderer.state_id(machine, title)
+        path = parents + (title,)
+        lines.append(indent + _mermaid_node(state, node_id, _mermaid_quote(renderer.label(path))))
+        color = renderer.color(path)
+        if color is not None:
+            lines.append(f"{indent}style {node_id} fill:{color}")
+
+        for pos, child in enumerate(nested_machines(state)):
+            lines.append(f"{indent}subgraph {renderer.new_id('cluster')}[{_mermaid_quote(f'{title} [{pos}]')}]")
+            child_start = _mermaid_machine(renderer, child, lines, indent + "  ", path)
+            lines.append(f"{indent}end")
+            lines.append(f"{indent}{node_id} -.-> {child_start}")
+
+    for title in order:
+        for field, target in index.successors[title]:
+            arrow = "-.->" if field.startswith("Catch") else "-->"
+            label = "" if field == "Next" else f"|{_mermaid_quote(field)}|"
+            source, destination = renderer.state_id(machine, title), renderer.state_id(machine, target)
+            lines.append(f"{indent}{source} {arrow}{label} {destination}")
+
+    return start
+
+
+def to_mermaid(
+    state_machine: StateMachine, stats: Optional[Dict[str, StateStats]] = None, *, metric="mean_latency"
+) -> str:
+    """Render a state machine as a Mermaid flowchart.
+
+    :param StateMachine state_machine: State machine to render
+    :param dict stats: Performance data for each state, by state key (optional)
+    :param str metric: Name of the :class:`StateStats` value that colors each state
+    """
+    renderer = _Renderer(stats, metric)
+    lines = ["flowchart TD"]
+    _mermaid_machine(renderer, state_machine, lines, "  ")
+    return "\n".join(lines) + "\n"
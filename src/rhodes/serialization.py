@@ -0,0 +1,130 @@
+"""
+Serialize field values into Amazon States Language and CloudFormation syntax.
+
+Every field of every state is serialized by :func:`serialize_value`,
+which looks up a serializer by the exact type of the value.
+The serializer for a type is resolved once, by walking the type's method resolution order,
+and then cached, so serializing another value of the same type is a single dictionary lookup.
+
+A type is serialized by the first of these that applies:
+
+* a serializer registered with :func:`register_serializer` for the type or one of its base classes,
+* the value's ``to_dict`` method,
+* the value of an :class:`Enum`,
+* the value itself.
+
+Register serializers for your own types, such as tokens from other infrastructure tools or custom ARN classes:
+
+.. code-block:: python
+
+    @register_serializer(FunctionArn)
+    def _serialize_function_arn(value: FunctionArn) -> str:
+        return value.arn
+
+If ``troposphere`` is installed, Lambda functions, activities, ``Ref``, and ``GetAtt`` values
+are serialized as ``Fn::Sub`` references (ex: ``${MyFunction.Arn}``).
+"""
+from enum import Enum
+from typing import Any, Callable, Dict, Optional, Tuple
+
+try:
+    from troposphere import awslambda, stepfunctions, Ref, GetAtt
+
+    TROPOSPHERE = True
+except ImportError:
+    TROPOSPHERE = False
+
+__all__ = ("register_serializer", "serialize_value", "serialize_name_and_value")
+
+Serializer = Callable[[Any], Any]
+
+_SERIALIZERS: Dict[type, Serializer] = {}
+# Serializer resolved for each exact type, including types that use a default.
+_RESOLVED: Dict[type, Serializer] = {}
+
+
+def _unchanged(value: Any) -> Any:
+    return value
+
+
+def _to_dict(value: Any) -> Any:
+    return value.to_dict()
+
+
+def _enum_value(value: Enum) -> Any:
+    return value.value
+
+
+def _resolve(value_type: type) -> Serializer:
+    for base in value_type.__mro__:
+        if base in _SERIALIZERS:
+            return _SERIALIZERS[base]
+
+    if callable(getattr(value_type, "to_dict", None)):
+        return _to_dict
+
+    if issubclass(value_type, Enum):
+        return _enum_value
+
+    return _unchanged
+
+
+def register_serializer(value_type: type, serializer: Optional[Serializer] = None):
+    """Register the serializer for a type and its subclasses.
+
+    Can be called directly or used as a decorator.
+    A serializer registered for a type replaces any serializer that it inherits,
+    including the default ``to_dict`` and :class:`Enum` serializers.
+
+    :param type value_type: Type to serialize
+    :param serializer: Function that takes a value of that type and returns its serialized value
+    """
+    if serializer is None:
+
+        def _register(function: Serializer) -> Serializer:
+            register_serializer(value_type, function)
+            return function
+
+        return _register
+
+    if not isinstance(value_type, type):
+        raise TypeError(f"Serializers are registered for types, not {value_type!r}")
+
+    _SERIALIZERS[value_type] = serializer
+    # Registering a serializer can change the resolution of any subclass.
+    _RESOLVED.clear()
+    return serializer
+
+
+def serialize_value(value: Any) -> Any:
+    """Serialize a value to the value that should be in the serialized dictionary.
+
+    :param value: Value to serialize
+    """
+    value_type = type(value)
+    try:
+        serializer = _RESOLVED[value_type]
+    except KeyError:
+        serializer = _RESOLVED[value_type] = _resolve(value_type)
+    return serializer(value)
+
+
+def serialize_name_and_value(*, name: str, value: Any) -> Tuple[str, Any]:
+    """Serialize a value to the value that should be in the serialized dictionary."""
+    return name, serialize_value(value)
+
+
+def _getatt_arn(value: str) -> str:
+    return f"${{{value}.Arn}}"
+
+
+def _ref(value: str) -> str:
+    return f"${{{value}}}"
+
+
+if TROPOSPHERE:
+    # Inject appropriate Ref/GetAtt for Troposphere
+    register_serializer(awslambda.Function, lambda value: _getatt_arn(value.title))
+    register_serializer(stepfunctions.Activity, lambda value: _ref(value.title))
+    register_serializer(Ref, lambda value: _ref(value.data["Ref"]))
+    register_serializer(GetAtt, lambda value: _getatt_arn(value.data["Fn::GetAtt"][0]))
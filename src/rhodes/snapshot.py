@@ -0,0 +1,146 @@
+"""
+Compact binary snapshots of state machines.
+
+A snapshot stores the definition of a state machine in a versioned binary format
+that is smaller than JSON and does not depend on pickling Python objects.
+Loading a snapshot produces a state machine with the same ``to_dict`` output as the original.
+
+.. code-block:: python
+
+    data = snapshot.dumps(workflow)
+    same_workflow = snapshot.loads(data)
+
+    snapshot.save(workflow, "workflow.rhsnap")
+    same_workflow = snapshot.load_file("workflow.rhsnap", lazy=True)
+
+The definition is stored as compact JSON, compressed with :mod:`zlib` at its fastest level,
+so both directions run in the C ``json`` and ``zlib`` modules:
+decoding a snapshot takes about as long as :func:`json.loads` takes to parse the equivalent JSON,
+and a snapshot is usually less than a tenth of the size of that JSON.
+:func:`load_file` reads snapshots through :mod:`mmap` and decompresses them without first copying the file.
+
+Snapshot layout:
+
+* ``RHSNAP`` magic bytes, format version (little-endian ``u16``), and flags (little-endian ``u16``)
+* Definition: zlib stream of the UTF-8 JSON definition
+"""
+import json
+import mmap
+import struct
+import zlib
+from typing import IO, Dict, Union
+
+from rhodes.exceptions import SnapshotError
+from rhodes.loader import load_definition
+from rhodes.states import StateMachine
+
+__all__ = ("FORMAT_VERSION", "dumps", "loads", "dump", "load", "save", "load_file")
+
+_MAGIC = b"RHSNAP"
+#: Current snapshot format version
+FORMAT_VERSION = 2
+_HEADER = struct.Struct("<6sHH")
+# Compression level 1 is several times faster than the default and the output is only a few percent larger.
+_COMPRESSION_LEVEL = 1
+
+
+def _encode(definition: Dict) -> bytes:
+    try:
+        text = json.dumps(definition, separators=(",", ":"), ensure_ascii=False)
+    except (TypeError, ValueError) as error:
+        raise SnapshotError(f"Cannot snapshot definition: {error}") from error
+
+    return _HEADER.pack(_MAGIC, FORMAT_VERSION, 0) + zlib.compress(text.encode("utf-8"), _COMPRESSION_LEVEL)
+
+
+def _decode(data: memoryview) -> Dict:
+    try:
+        magic, version, _flags = _HEADER.unpack_from(data, 0)
+    except struct.error as error:
+        raise SnapshotError(f"Snapshot is truncated or corrupt: {error}") from error
+    if magic != _MAGIC:
+        raise SnapshotError("Data is not a rhodes snapshot.")
+    if version != FORMAT_VERSION:
+        raise SnapshotError(f"Unsupported snapshot format version {version} (expected {FORMAT_VERSION}).")
+
+    decompressor = zlib.decompressobj()
+    try:
+        text = decompressor.decompress(data[_HEADER.size :])
+        definition = json.loads(text)
+    except (zlib.error, ValueError) as error:
+        raise SnapshotError(f"Snapshot is truncated or corrupt: {error}") from error
+
+    if not decompressor.eof:
+        raise SnapshotError("Snapshot is truncated or corrupt: incomplete definition")
+    if decompressor.unused_data:
+        raise SnapshotError("Snapshot has unexpected data after the definition.")
+    if not isinstance(definition, dict):
+        raise SnapshotError("Snapshot does not contain a state machine definition.")
+    return definition
+
+
+def dumps(state_machine: StateMachine) -> bytes:
+    """Serialize a state machine as a snapshot.
+
+    :param StateMachine state_machine: State machine to serialize
+    """
+    return _encode(state_machine.to_dict())
+
+
+def loads(data: Union[bytes, bytearray, memoryview], *, lazy: bool = False) -> StateMachine:
+    """Load a state machine from a snapshot.
+
+    :param data: Snapshot contents
+    :param bool lazy: Only build each state the first time that it is accessed (see :class:`rhodes.loader.LazyStates`)
+    """
+    return load_definition(_decode(memoryview(data)), lazy=lazy)
+
+
+def dump(state_machine: StateMachine, stream: IO[bytes]):
+    """Write a state machine snapshot to a binary file object.
+
+    :param StateMachine state_machine: State machine to serialize
+    :param stream: Binary file object to write to
+    """
+    stream.write(dumps(state_machine))
+
+
+def load(stream: IO[bytes], *, lazy: bool = False) -> StateMachine:
+    """Load a state machine from a binary file object that contains a snapshot.
+
+    :param stream: Binary file object to read from
+    :param bool lazy: Only build each state the first time that it is accessed (see :class:`rhodes.loader.LazyStates`)
+    """
+    return loads(stream.read(), lazy=lazy)
+
+
+def save(state_machine: StateMachine, path: str):
+    """Write a state machine snapshot to a file.
+
+    :param StateMachine state_machine: State machine to serialize
+    :param str path: File to write
+    """
+    with open(path, "wb") as stream:
+        dump(state_machine, stream)
+
+
+def load_file(path: str, *, lazy: bool = False) -> StateMachine:
+    """Load a state machine from a snapshot file, decompressing the file in place through :mod:`mmap`.
+
+    :param str path: Snapshot file to read
+    :param bool lazy: Only build each state the first time that it is accessed (see :class:`rhodes.loader.LazyStates`)
+    """
+    with open(path, "rb") as stream:
+        try:
+            mapped = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as error:
+            raise SnapshotError(f"Snapshot file {path!r} is empty.") from error
+
+    with mapped:
+        view = memoryview(mapped)
+        try:
+            definition = _decode(view)
+        finally:
+            # The mapping cannot be closed while a view of it is still open.
+            view.release()
+    return load_definition(definition, lazy=lazy)
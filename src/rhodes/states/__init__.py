@@ -7,22 +7,27 @@ Standard Step Functions and state machine states.
 """
 import json
 from enum import Enum
-from typing import Any, Dict, Iterable, List, Optional, Union
+from typing import IO, Any, Dict, Iterable, List, Optional, Union
 
 import attr
 import jsonpath_rw
+from attr.converters import optional as optional_converter
 from attr.validators import deep_iterable, deep_mapping, instance_of, optional
 from troposphere import Sub
 
 from rhodes._converters import convert_to_json_path
 from rhodes._runtime_types import TASK_RESOURCE_TYPES
-from rhodes._serialization import serialize_name_and_value
-from rhodes._util import RHODES_ATTRIB, RequiredValue, require_field
+from rhodes._util import RHODES_ATTRIB, RequiredValue, instance_lock, member_lock, require_field, unlocked_state
 from rhodes._validators import is_valid_timestamp
 from rhodes.choice_rules import ChoiceRule
 from rhodes.exceptions import InvalidDefinitionError
-from rhodes.structures import JsonPath
+from rhodes.identifiers import ExecutionType, MapMode
+from rhodes.minify import MinifiedDefinition, minify_definition
+from rhodes.serialization import serialize_name_and_value
+from rhodes.structures import ItemBatcher, ItemReader, JsonPath, Parameters, ProcessorConfig, ResultWriter
+from rhodes.substitutions import SubstitutedDefinition, extract_substitutions
 
+from ._lazy import LazyStates
 from ._parameters import _catch_retry, _input_output, _next_and_end, _parameters, _result_path, state, task_type
 
 __all__ = ("State", "StateMachine", "Pass", "Parallel", "Map", "Choice", "Task", "Wait", "Fail", "Succeed")
@@ -46,11 +51,18 @@ class State:
 
     def __setattr__(self, name, value):
         """Validate the value attribute value after setting."""
-        super(State, self).__setattr__(name, value)
-        if self.__setup_complete:
+        if not self.__setup_complete:
             # Don't validate until after attrs is done setting up.
+            super(State, self).__setattr__(name, value)
+            return
+
+        with instance_lock(self):
+            super(State, self).__setattr__(name, value)
             attr.validate(self)
 
+    def __getstate__(self) -> Dict:
+        return unlocked_state(self)
+
     def __eq__(self, other: "State") -> bool:
         if not isinstance(other, self.__class__):
             # TODO: What about the other direction?
@@ -112,6 +124,17 @@ class State:
         return self.then(Pass(f"{self.title}-PromoteResult", InputPath=input_path, ResultPath=self.ResultPath))
 
 
+_STATES_VALIDATOR = deep_mapping(key_validator=instance_of(str), value_validator=instance_of(State))
+
+
+def _validate_states(instance, attribute: attr.Attribute, value: Any):
+    if isinstance(value, LazyStates):
+        # Only validate the states that have been built; building the rest would defeat the purpose.
+        value = dict(value.materialized())
+
+    _STATES_VALIDATOR(instance, attribute, value)
+
+
 @attr.s
 class StateMachine:
     """Step Functions State Machine.
@@ -119,6 +142,25 @@ class StateMachine:
     `See Step Functions docs for more details.
     <https://docs.aws.amazon.com/step-functions/latest/dg/amazon-states-language-state-machine-structure.html>`_
 
+    State machines and states can be built from several threads at once.
+    ``add_state``, ``start_with``, ``then``, ``end``, ``if_``, ``else_``, ``add_branch``,
+    and setting an attribute (including its validation) are each atomic,
+    so different threads can build different branches or ``Map`` iterators
+    and add states to the same state machine concurrently:
+
+    .. code-block:: python
+
+        fan_out = workflow.start_with(Parallel("FanOut"))
+        with ThreadPoolExecutor() as executor:
+            executor.map(lambda region: build_region(fan_out.add_branch(), region), REGIONS)
+
+    Each object has its own lock, which is created the first time it is needed
+    and is not copied or pickled with the object.
+    Locks are always taken from the outside in: a state machine before any of its states,
+    so that building from several threads cannot deadlock.
+    Sequences of several calls, and in-place changes to values such as ``Parameters`` or ``Catch``,
+    are not atomic: build each part of a state machine in a single thread.
+
     :param States: Map of states that make up this state machine
     :type States: dict(str, State)
     :param str StartAt: The state where this state machine starts
@@ -126,6 +168,9 @@ class StateMachine:
     :param str Version: The version of the Amazon States Language used in this state machine
       (must be ``1.0`` if provided)
     :param int TimeoutSeconds: Maximum time that this state machine is allowed to run
+    :param ExecutionType StateMachineType: Workflow type of this state machine (default: ``STANDARD``).
+      This is not part of the definition:
+      ``EXPRESS`` state machines are checked with :func:`rhodes.express.validate_express` when they are serialized.
     """
 
     _required_fields = [
@@ -134,10 +179,7 @@ class StateMachine:
     ]
     __setup_complete = False
 
-    States: Dict[str, State] = RHODES_ATTRIB(
-        default=attr.Factory(dict),
-        validator=deep_mapping(key_validator=instance_of(str), value_validator=instance_of(State)),
-    )
+    States: Dict[str, State] = RHODES_ATTRIB(default=attr.Factory(dict), validator=_validate_states)
     # TODO: Name of State
     StartAt: Optional[str] = RHODES_ATTRIB(validator=optional(instance_of(str)))
     Comment: Optional[str] = RHODES_ATTRIB(validator=optional(instance_of(str)))
@@ -145,17 +187,27 @@ class StateMachine:
     Version: Optional[str] = RHODES_ATTRIB(validator=optional(instance_of(str)))
     # TODO: MUST be non-negative
     TimeoutSeconds: Optional[int] = RHODES_ATTRIB(validator=optional(instance_of(int)))
+    StateMachineType: Optional[ExecutionType] = RHODES_ATTRIB(
+        converter=optional_converter(ExecutionType), validator=optional(instance_of(ExecutionType))
+    )
 
     def __attrs_post_init__(self):
         self.__setup_complete = True
 
     def __setattr__(self, name, value):
         """Validate the value attribute value after setting."""
-        super(StateMachine, self).__setattr__(name, value)
-        if self.__setup_complete:
+        if not self.__setup_complete:
             # Don't validate until after attrs is done setting up.
+            super(StateMachine, self).__setattr__(name, value)
+            return
+
+        with instance_lock(self):
+            super(StateMachine, self).__setattr__(name, value)
             attr.validate(self)
 
+    def __getstate__(self) -> Dict:
+        return unlocked_state(self)
+
     def to_dict(self) -> Dict:
         """Serialize this state machine as a dictionary."""
         for required in self._required_fields:
@@ -164,6 +216,12 @@ class StateMachine:
         if self.StartAt not in self.States:
             raise InvalidDefinitionError(f"Starting state {self.StartAt!r} not in states {self.States.keys()!r}.")
 
+        if self.StateMachineType is ExecutionType.EXPRESS:
+            # pylint: disable=import-outside-toplevel,cyclic-import
+            from rhodes.express import validate_express
+
+            validate_express(self)
+
         self_dict = dict(StartAt=self.StartAt)
 
         for optional_attribute in ("Comment", "TimeoutSeconds", "Version"):
@@ -174,37 +232,83 @@ class StateMachine:
 
         return self_dict
 
+    @classmethod
+    def from_dict(cls, definition: Dict, *, lazy: bool = False) -> "StateMachine":
+        """Load a state machine from a definition dictionary.
+
+        See :mod:`rhodes.loader` for details.
+
+        :param dict definition: State machine definition
+        :param bool lazy: Only build each state the first time that it is accessed
+        """
+        # pylint: disable=import-outside-toplevel,cyclic-import
+        from rhodes.loader import load_definition
+
+        return load_definition(definition, lazy=lazy)
+
+    @classmethod
+    def from_json(cls, definition: Union[str, bytes, IO], *, lazy: bool = False) -> "StateMachine":
+        """Load a state machine from a JSON definition or a file object that contains one.
+
+        See :mod:`rhodes.loader` for details.
+
+        :param definition: JSON state machine definition or a file object to read it from
+        :param bool lazy: Only build each state the first time that it is accessed
+        """
+        # pylint: disable=import-outside-toplevel,cyclic-import
+        from rhodes.loader import load_json
+
+        return load_json(definition, lazy=lazy)
+
     def definition_string(self) -> Sub:
         """Serialize this state machine for use in a ``troposphere`` state machine definition."""
         data = self.to_dict()
         initial_value = json.dumps(data)
         return Sub(initial_value)
 
+    def minify(self) -> MinifiedDefinition:
+        """Serialize this state machine with short state names and without comments.
+
+        The result provides the minified ``to_dict`` and ``definition_string`` output
+        as well as the :class:`SourceMap` from the short state names to the original state titles.
+        """
+        return minify_definition(self.to_dict())
+
+    def definition_substitutions(self) -> SubstitutedDefinition:
+        """Serialize this state machine as a native ``Definition``
+        with each unique resource reference collected once into ``DefinitionSubstitutions``.
+
+        See :mod:`rhodes.substitutions` for details.
+        """
+        return extract_substitutions(self.to_dict())
+
     def add_state(self, new_state: State) -> State:
         """Add a state to this state machine.
 
         :param State new_state: State to add
         """
-        if new_state.title in self.States:
-            if self.States[new_state.title] == new_state:
-                return new_state
+        with instance_lock(self):
+            if new_state.title in self.States:
+                if self.States[new_state.title] == new_state:
+                    return new_state
 
-            raise InvalidDefinitionError(f"State {new_state.title!r} already in state machine.")
+                raise InvalidDefinitionError(f"State {new_state.title!r} already in state machine.")
 
-        new_state.member_of = self
-        # TODO: use references rather than extracting names
-        self.States[new_state.title] = new_state
-        return new_state
+            new_state.member_of = self
+            # TODO: use references rather than extracting names
+            self.States[new_state.title] = new_state
+            return new_state
 
     def start_with(self, first_state: State) -> State:
         """Add a state to this state machine and mark it as the starting state.
 
         :param State first_state: State to start with
         """
-        self.add_state(new_state=first_state)
+        with instance_lock(self):
+            self.add_state(new_state=first_state)
 
-        # TODO: use references rather than extracting names
-        self.StartAt = first_state.title
+            # TODO: use references rather than extracting names
+            self.StartAt = first_state.title
 
         return first_state
 
@@ -332,15 +436,16 @@ class Choice(State):
         :param rule: Rule to add
         :return: ``rule``
         """
-        if rule.member_of is not None:
-            if rule.member_of is self:
-                return rule
+        with instance_lock(self):
+            if rule.member_of is not None:
+                if rule.member_of is self:
+                    return rule
 
-            raise InvalidDefinitionError("Rule already added to another Choice state")
+                raise InvalidDefinitionError("Rule already added to another Choice state")
 
-        self.Choices.append(rule)
-        rule.member_of = self
-        return rule
+            self.Choices.append(rule)
+            rule.member_of = self
+            return rule
 
     def if_(self, rule: ChoiceRule) -> ChoiceRule:
         """Add a choice rule to this state as one possible logic branch.
@@ -372,13 +477,14 @@ class Choice(State):
         :param state: The default state to add
         :return: ``state``
         """
-        if self.Default is not None:
-            raise InvalidDefinitionError(f'Choice state "{self.title}" already has a Default transition.')
+        with member_lock(self):
+            if self.Default is not None:
+                raise InvalidDefinitionError(f'Choice state "{self.title}" already has a Default transition.')
 
-        self.member_of.add_state(state)
+            self.member_of.add_state(state)
 
-        # TODO: use references rather than extracting names
-        self.Default = state.title
+            # TODO: use references rather than extracting names
+            self.Default = state.title
 
         return state
 
@@ -393,6 +499,8 @@ class Choice(State):
             )
 
         self_dict = super(Choice, self).to_dict()
+        # Serialize into a new list so that the rule instances on this state are not replaced.
+        self_dict["Choices"] = list(self_dict["Choices"])
 
         for pos, branch in enumerate(self_dict["Choices"]):
             self_dict["Choices"][pos] = branch.to_dict()
@@ -523,6 +631,8 @@ class Parallel(State):
     def to_dict(self) -> Dict:
         """Serialize state as a dictionary."""
         self_dict = super(Parallel, self).to_dict()
+        # Serialize into a new list so that the branch instances on this state are not replaced.
+        self_dict["Branches"] = list(self_dict["Branches"])
 
         for pos, branch in enumerate(self_dict["Branches"]):
             self_dict["Branches"][pos] = branch.to_dict()
@@ -539,10 +649,23 @@ class Parallel(State):
         if state_machine is None:
             state_machine = StateMachine()
 
-        self.Branches.append(state_machine)
+        with instance_lock(self):
+            self.Branches.append(state_machine)
         return state_machine
 
 
+# Fields that only distributed Map states support.
+_DISTRIBUTED_FIELDS = (
+    "ItemReader",
+    "ItemBatcher",
+    "ResultWriter",
+    "ToleratedFailurePercentage",
+    "ToleratedFailureCount",
+    "Label",
+)
+_INVALID_LABEL_CHARACTERS = frozenset(' \t\n?*<>{}[]:;,\\|^~$#%&`"')
+
+
 @attr.s(eq=False)
 @_parameters
 @_catch_retry
@@ -558,16 +681,225 @@ class Map(State):
     `See Step Functions docs for more details.
     <https://docs.aws.amazon.com/step-functions/latest/dg/amazon-states-language-map-state.html>`_
 
-    """
+    Set either ``Iterator`` or ``ItemProcessor``.
+    An ``ItemProcessor`` with a ``DISTRIBUTED`` :class:`ProcessorConfig`
+    runs each iteration as a child execution,
+    and can read its items with an ``ItemReader``, group them with an ``ItemBatcher``,
+    write the results with a ``ResultWriter``, and tolerate some failed iterations.
 
-    _required_fields = [
-        RequiredValue("Iterator", "Map iterator must be set."),
-        RequiredValue("ItemsPath", "Map items path must be set."),
-    ]
+    `See Step Functions docs for more details about distributed mode.
+    <https://docs.aws.amazon.com/step-functions/latest/dg/concepts-asl-use-map-state-distributed.html>`_
+
+    """
 
     # TODO: Iterator MUST be a self-contained state machine.
-    Iterator: StateMachine = RHODES_ATTRIB(validator=instance_of(StateMachine))
+    Iterator: Optional[StateMachine] = RHODES_ATTRIB(validator=optional(instance_of(StateMachine)))
+    ItemProcessor: Optional[StateMachine] = RHODES_ATTRIB(validator=optional(instance_of(StateMachine)))
+    ProcessorConfig: "Optional[ProcessorConfig]" = RHODES_ATTRIB(validator=optional(instance_of(ProcessorConfig)))
     # TODO: ItemsPath MUST be a valid JSON-path
     ItemsPath: JsonPath = RHODES_ATTRIB(validator=optional(instance_of(JsonPath)), converter=convert_to_json_path)
+    ItemReader: "Optional[ItemReader]" = RHODES_ATTRIB(validator=optional(instance_of(ItemReader)))
+    ItemSelector: Optional[Parameters] = RHODES_ATTRIB(validator=optional(instance_of(Parameters)))
+    ItemBatcher: "Optional[ItemBatcher]" = RHODES_ATTRIB(validator=optional(instance_of(ItemBatcher)))
+    ResultWriter: "Optional[ResultWriter]" = RHODES_ATTRIB(validator=optional(instance_of(ResultWriter)))
     # TODO: MaxConcurrency MUST be non-negative
     MaxConcurrency: Optional[int] = RHODES_ATTRIB(validator=optional(instance_of(int)))
+    ToleratedFailurePercentage: Optional[Union[int, float]] = RHODES_ATTRIB(
+        validator=optional(instance_of((int, float)))
+    )
+    ToleratedFailureCount: Optional[int] = RHODES_ATTRIB(validator=optional(instance_of(int)))
+    Label: Optional[str] = RHODES_ATTRIB(validator=optional(instance_of(str)))
+
+    @ToleratedFailurePercentage.validator
+    def _validate_tolerated_percentage(self, attribute: attr.Attribute, value: Any):
+        # pylint: disable=no-self-use,unused-argument
+        if value is not None and not 0 <= value <= 100:
+            raise ValueError("ToleratedFailurePercentage must be between 0 and 100")
+
+    @ToleratedFailureCount.validator
+    def _validate_tolerated_count(self, attribute: attr.Attribute, value: Any):
+        # pylint: disable=no-self-use,unused-argument
+        if value is not None and value < 0:
+            raise ValueError("ToleratedFailureCount must not be negative")
+
+    @Label.validator
+    def _validate_label(self, attribute: attr.Attribute, value: Any):
+        # pylint: disable=no-self-use,unused-argument
+        if value is not None and (len(value) > 40 or any(char in _INVALID_LABEL_CHARACTERS for char in value)):
+            raise ValueError(
+                f"Invalid Map label {value!r}: "
+                "labels are at most 40 characters, without whitespace or special characters"
+            )
+
+    @property
+    def processor(self) -> Optional[StateMachine]:
+        """State machine that runs for each item (``ItemProcessor`` or ``Iterator``)."""
+        return self.ItemProcessor if self.ItemProcessor is not None else self.Iterator
+
+    @property
+    def distributed(self) -> bool:
+        """Determine whether iterations run as child executions."""
+        return self.ProcessorConfig is not None and self.ProcessorConfig.Mode is MapMode.DISTRIBUTED
+
+    def _validate_fields(self):
+        if (self.Iterator is None) == (self.ItemProcessor is None):
+            if self.Iterator is None:
+                raise InvalidDefinitionError("Map iterator must be set.")
+            raise InvalidDefinitionError("Only one of 'Iterator' and 'ItemProcessor' is allowed.")
+
+        if self.ProcessorConfig is not None and self.ItemProcessor is None:
+            raise InvalidDefinitionError("ProcessorConfig requires 'ItemProcessor'.")
+
+        if self.Parameters is not None and self.ItemSelector is not None:
+            raise InvalidDefinitionError("Only one of 'Parameters' and 'ItemSelector' is allowed.")
+
+        if self.ItemReader is None and self.ItemsPath is None:
+            raise InvalidDefinitionError("Map items path must be set.")
+
+        if self.ItemReader is not None and self.ItemsPath is not None:
+            raise InvalidDefinitionError("Only one of 'ItemsPath' and 'ItemReader' is allowed.")
+
+        if not self.distributed:
+            for name in _DISTRIBUTED_FIELDS:
+                if getattr(self, name) is not None:
+                    raise InvalidDefinitionError(f"Map field {name!r} requires DISTRIBUTED processing.")
+
+    def to_dict(self) -> Dict:
+        """Serialize state as a dictionary."""
+        self._validate_fields()
+        self_dict = super(Map, self).to_dict()
+
+        if self.distributed and self.ProcessorConfig.ExecutionType is ExecutionType.EXPRESS:
+            # pylint: disable=import-outside-toplevel,cyclic-import
+            from rhodes.express import validate_express
+
+            validate_express(self.ItemProcessor)
+
+        # ProcessorConfig is part of the ItemProcessor object.
+        processor_config = self_dict.pop("ProcessorConfig", None)
+        if processor_config is not None:
+            self_dict["ItemProcessor"] = dict(self_dict["ItemProcessor"], ProcessorConfig=processor_config)
+
+        return self_dict
+
+    def batched(
+        self, BatchSize: Optional[int] = None, *, MaxBatchBytes: Optional[int] = None, ItemBytes: Optional[int] = None
+    ) -> "Parallel":
+        """Build a state that runs this Map state's ``Iterator`` once per batch of items rather than once per item.
+
+        Each iteration of a Map state costs a state transition and usually a task invocation,
+        so for small items the per-invocation overhead dominates.
+        The returned :class:`Parallel` state has this state's title, transitions, ``Retry`` and ``Catch``
+        and produces the same output as this state, but:
+
+        #. A :class:`Pass` state splits the items into batches with ``States.ArrayPartition``.
+        #. A copy of this state runs ``Iterator`` once for each batch.
+           The iterator input is ``{"Items": [...]}`` plus this state's ``Parameters``.
+           The iterator must return a list with one result for each item, in the same order.
+        #. A :class:`Pass` state flattens the batch results back into one list, in the original item order,
+           and applies this state's ``ResultPath`` and ``OutputPath``.
+
+        Inline Map states cannot measure items while they run,
+        so ``MaxBatchBytes`` limits the batch size using ``ItemBytes``,
+        an estimate of the serialized size of the largest item.
+
+        ``Parameters`` (or ``ItemSelector``) can only refer to the state input, constants, and the context object;
+        values that refer to a single item (``$$.Map.Item``) are not available per item in a batch.
+
+        Distributed Map states batch their items with an :class:`ItemBatcher` instead.
+
+        :param int BatchSize: Maximum number of items in each batch
+        :param int MaxBatchBytes: Maximum serialized size of each batch
+        :param int ItemBytes: Estimated serialized size of one item (required with ``MaxBatchBytes``)
+        :raises ValueError: if no batch size can be determined
+        :raises InvalidDefinitionError: if ``Parameters`` refer to a single item or this state is distributed
+        """
+        if self.distributed:
+            raise InvalidDefinitionError(f"Map state {self.title!r} is distributed: use an ItemBatcher to batch items")
+
+        size = _batch_size(BatchSize, MaxBatchBytes, ItemBytes)
+        # The batched Map state reads the original input from "Input", so paths into it are rebased.
+        base = "$.Input" + _relative(self.InputPath)
+        items = "$" + _relative(self.InputPath) + _relative(self.ItemsPath)
+
+        parameters = {"Items.$": "$$.Map.Item.Value"}
+        selector = self.ItemSelector if self.ItemSelector is not None else self.Parameters
+        if selector is not None:
+            parameters.update(_rebased_parameters(selector.to_dict(), base, self.title))
+        selector_field = "ItemSelector" if self.ItemSelector is not None else "Parameters"
+
+        split = Pass(
+            f"{self.title} Batch",
+            Parameters=Parameters(**{"Input.$": "$", "Batches.$": f"States.ArrayPartition({items}, {size})"}),
+        )
+        each = Map(
+            f"{self.title} Batches",
+            Comment=self.Comment,
+            Iterator=self.Iterator,
+            ItemProcessor=self.ItemProcessor,
+            ProcessorConfig=self.ProcessorConfig,
+            ItemsPath="$.Batches",
+            MaxConcurrency=self.MaxConcurrency,
+            ResultPath="$.Results",
+            **{selector_field: Parameters(**parameters)},
+        )
+        flatten = Pass(
+            f"{self.title} Flatten",
+            InputPath="$.Results[*][*]",
+            ResultPath="$.Input" + _relative(self.ResultPath),
+            OutputPath="$.Input" + _relative(self.OutputPath),
+        )
+
+        branch = StateMachine()
+        branch.start_with(split).then(each).then(flatten).end()
+        return Parallel(
+            self.title,
+            Comment=self.Comment,
+            Next=self.Next,
+            End=self.End,
+            Retry=self.Retry,
+            Catch=self.Catch,
+            Branches=[branch],
+            OutputPath="$[0]",
+        )
+
+
+def _relative(path: Optional[JsonPath]) -> str:
+    """Strip the leading ``$`` from a path so that it can be appended to another path."""
+    return str(path)[1:] if path is not None else ""
+
+
+def _batch_size(batch_size: Optional[int], max_batch_bytes: Optional[int], item_bytes: Optional[int]) -> int:
+    sizes = []
+    if batch_size is not None:
+        sizes.append(batch_size)
+    if max_batch_bytes is not None:
+        if not item_bytes:
+            raise ValueError("ItemBytes is required to limit batches by MaxBatchBytes")
+        sizes.append(max_batch_bytes // item_bytes)
+
+    if not sizes:
+        raise ValueError("At least one of BatchSize and MaxBatchBytes must be set")
+    size = min(sizes)
+    if size < 1:
+        raise ValueError("Batch size must be at least one item")
+    return size
+
+
+def _rebased_parameters(template: Dict[str, Any], base: str, title: str) -> Dict[str, Any]:
+    """Rewrite the paths in serialized ``Parameters`` to read from the original input under ``base``."""
+    rebased = {}
+    for name, value in template.items():
+        if isinstance(value, dict):
+            value = _rebased_parameters(value, base, title)
+        elif name.endswith(".$") and isinstance(value, str):
+            if value.startswith("$$.Map.Item"):
+                raise InvalidDefinitionError(f"Map state {title!r} Parameters refer to a single item: {value}")
+            if not value.startswith("$"):
+                raise InvalidDefinitionError(
+                    f"Map state {title!r} Parameters use an intrinsic function, which cannot be batched: {value}"
+                )
+            if not value.startswith("$$"):
+                value = base + value[1:]
+        rebased[name] = value
+    return rebased
@@ -1,4 +1,4 @@
-from typing import Any, Dict, Iterable, List, Optional
+from typing import IO, Any, Dict, Iterable, List, Optional, Union
 
 import attr
 from troposphere import Sub
@@ -24,7 +24,10 @@ from rhodes._types import (
 )
 from rhodes._util import RequiredValue
 from rhodes.choice_rules import ChoiceRule
-from rhodes.structures import JsonPath
+from rhodes.identifiers import ExecutionType
+from rhodes.minify import MinifiedDefinition
+from rhodes.structures import ItemBatcher, ItemReader, JsonPath, ProcessorConfig, ResultWriter
+from rhodes.substitutions import SubstitutedDefinition
 
 class State:
     def __init__(self, title: TITLE, *, Comment: COMMENT = None) -> None: ...
@@ -45,15 +48,23 @@ class StateMachine:
         Comment: COMMENT = None,
         Version: Optional[str] = None,
         TimeoutSeconds: TIMEOUT_SECONDS = None,
+        StateMachineType: Optional[Union[str, ExecutionType]] = None,
     ): ...
     States: Dict[str, State]
     StartAt: Optional[str]
     Comment: COMMENT
     Version: Optional[str]
     TimeoutSeconds: TIMEOUT_SECONDS
+    StateMachineType: Optional[ExecutionType]
     _required_fields: Iterable[RequiredValue]
+    @classmethod
+    def from_dict(cls, definition: Dict, *, lazy: bool = False) -> StateMachine: ...
+    @classmethod
+    def from_json(cls, definition: Union[str, bytes, IO], *, lazy: bool = False) -> StateMachine: ...
     def to_dict(self) -> Dict: ...
     def definition_string(self) -> Sub: ...
+    def minify(self) -> MinifiedDefinition: ...
+    def definition_substitutions(self) -> SubstitutedDefinition: ...
     def add_state(self, new_state: StateMirror) -> StateMirror: ...
     def start_with(self, first_state: StateMirror) -> StateMirror: ...
 
@@ -211,8 +222,17 @@ class Map(State):
         Retry: RETRY = None,
         Parameters: PARAMETERS = None,
         Iterator: Optional[StateMachine] = None,
+        ItemProcessor: Optional[StateMachine] = None,
+        ProcessorConfig: Optional[ProcessorConfig] = None,
         ItemsPath: PATH_INPUT = JsonPath("$"),
+        ItemReader: Optional[ItemReader] = None,
+        ItemSelector: PARAMETERS = None,
+        ItemBatcher: Optional[ItemBatcher] = None,
+        ResultWriter: Optional[ResultWriter] = None,
         MaxConcurrency: Optional[int] = None,
+        ToleratedFailurePercentage: Optional[Union[int, float]] = None,
+        ToleratedFailureCount: Optional[int] = None,
+        Label: Optional[str] = None,
     ): ...
     Next: NEXT
     End: END
@@ -223,7 +243,23 @@ class Map(State):
     Retry: RETRY
     Parameters: PARAMETERS
     Iterator: Optional[StateMachine]
+    ItemProcessor: Optional[StateMachine]
+    ProcessorConfig: Optional[ProcessorConfig]
     ItemsPath: Optional[JsonPath]
+    ItemReader: Optional[ItemReader]
+    ItemSelector: PARAMETERS
+    ItemBatcher: Optional[ItemBatcher]
+    ResultWriter: Optional[ResultWriter]
     MaxConcurrency: Optional[int]
+    ToleratedFailurePercentage: Optional[Union[int, float]]
+    ToleratedFailureCount: Optional[int]
+    Label: Optional[str]
+    @property
+    def processor(self) -> Optional[StateMachine]: ...
+    @property
+    def distributed(self) -> bool: ...
     def then(self, next_state: StateMirror) -> StateMirror: ...
     def end(self) -> Map: ...
+    def batched(
+        self, BatchSize: Optional[int] = None, *, MaxBatchBytes: Optional[int] = None, ItemBytes: Optional[int] = None
+    ) -> Parallel: ...
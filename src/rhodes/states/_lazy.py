@@ -0,0 +1,118 @@
+"""State mapping that builds states from their raw definitions on first access."""
+from typing import Any, Callable, Dict, Iterator, List, MutableMapping, Optional, Tuple
+
+import attr
+
+from rhodes._util import instance_lock, unlocked_state
+
+__all__ = ("LazyStates", "StateSummary")
+
+
+@attr.s(frozen=True)
+class StateSummary:
+    """Metadata about a state that is available without building the state.
+
+    :param str Type: State type
+    :param str Next: The state that will follow this state
+    :param bool End: This state is a terminal state
+    """
+
+    Type: str = attr.ib()
+    Next: Optional[str] = attr.ib(default=None)
+    End: Optional[bool] = attr.ib(default=None)
+
+
+def _raw_transitions(definition: Dict) -> List[Tuple[str, str]]:
+    """List the outgoing transitions of a raw state definition in the same form as ``state_transitions``."""
+    transitions = []
+    if definition.get("Next") is not None:
+        transitions.append(("Next", definition["Next"]))
+
+    for pos, rule in enumerate(definition.get("Choices") or []):
+        if rule.get("Next") is not None:
+            transitions.append((f"Choices[{pos}]", rule["Next"]))
+
+    if definition.get("Default") is not None:
+        transitions.append(("Default", definition["Default"]))
+
+    for pos, catcher in enumerate(definition.get("Catch") or []):
+        if isinstance(catcher, dict) and "Next" in catcher:
+            transitions.append((f"Catch[{pos}]", catcher["Next"]))
+
+    return transitions
+
+
+class LazyStates(MutableMapping):
+    """Map of state title to state that keeps raw state definitions
+    and only builds each :class:`State` the first time that it is accessed.
+
+    Use :meth:`peek` and :meth:`transitions` to inspect a state without building it.
+
+    :param dict definitions: Map of state title to raw state definition
+    :param build: Callable that builds a state in ``owner`` from its title and raw definition
+        and stores it in this mapping
+    """
+
+    def __init__(self, definitions: Dict[str, Dict], build: Callable[[Any, str, Dict], None]):
+        self._entries: Dict[str, Any] = dict(definitions)
+        self._build = build
+        #: State machine that these states belong to
+        self.owner = None
+
+    def is_materialized(self, title: str) -> bool:
+        """Determine whether the state stored under ``title`` has been built."""
+        return not isinstance(self._entries[title], dict)
+
+    def __getitem__(self, title: str):
+        entry = self._entries[title]
+        if isinstance(entry, dict):
+            with instance_lock(self):
+                # Another thread might have built the state while this one waited for the lock.
+                entry = self._entries[title]
+                if isinstance(entry, dict):
+                    # The build callable stores the new state in this mapping.
+                    self._build(self.owner, title, entry)
+                    entry = self._entries[title]
+        return entry
+
+    def __setitem__(self, title: str, state):
+        self._entries[title] = state
+
+    def __delitem__(self, title: str):
+        del self._entries[title]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, title: object) -> bool:
+        return title in self._entries
+
+    def __getstate__(self) -> Dict:
+        return unlocked_state(self)
+
+    def __repr__(self) -> str:
+        built = sum(1 for title in self._entries if self.is_materialized(title))
+        return f"{self.__class__.__name__}({len(self)} states, {built} materialized)"
+
+    def materialized(self) -> Iterator[Tuple[str, Any]]:
+        """Iterate over the states that have been built, without building any others."""
+        for title, entry in list(self._entries.items()):
+            if not isinstance(entry, dict):
+                yield title, entry
+
+    def peek(self, title: str) -> StateSummary:
+        """Describe the state stored under ``title`` without building it."""
+        entry = self._entries[title]
+        if isinstance(entry, dict):
+            return StateSummary(Type=entry["Type"], Next=entry.get("Next"), End=entry.get("End"))
+
+        # Service integration helpers are serialized as Task states.
+        state_type = "Task" if hasattr(entry, "_build_task") else entry.Type
+        return StateSummary(Type=state_type, Next=getattr(entry, "Next", None), End=getattr(entry, "End", None))
+
+    def transitions(self, title: str) -> List[Tuple[str, str]]:
+        """List the outgoing transitions of a state that has not been built as ``(field, target)`` pairs."""
+        return _raw_transitions(self._entries[title])
@@ -5,7 +5,7 @@ import attr
 from attr.validators import instance_of, optional
 
 from rhodes._converters import convert_to_json_path
-from rhodes._util import RHODES_ATTRIB, docstring_with_param
+from rhodes._util import RHODES_ATTRIB, docstring_with_param, instance_lock, member_lock
 from rhodes.exceptions import InvalidDefinitionError
 from rhodes.structures import JsonPath, Parameters
 
@@ -37,19 +37,20 @@ def _next_and_end(cls: "StateMirror") -> "StateMirror":
     def _then(instance, next_state):
         """Set the next state in this state machine."""
 
-        if instance.End is not None:
-            raise InvalidDefinitionError(
-                f"Cannot set state transition. State {instance.title!r} already has an end condition."
-            )
+        with member_lock(instance):
+            if instance.End is not None:
+                raise InvalidDefinitionError(
+                    f"Cannot set state transition. State {instance.title!r} already has an end condition."
+                )
 
-        if instance.Next is not None:
-            raise InvalidDefinitionError(
-                f"Cannot set state transition. State {instance.title!r} already has a state transition."
-            )
+            if instance.Next is not None:
+                raise InvalidDefinitionError(
+                    f"Cannot set state transition. State {instance.title!r} already has a state transition."
+                )
 
-        instance.member_of.add_state(next_state)
-        # TODO: set reference rather than extracting name
-        instance.Next = next_state.title
+            instance.member_of.add_state(next_state)
+            # TODO: set reference rather than extracting name
+            instance.Next = next_state.title
         return next_state
 
     cls.then = _then
@@ -57,12 +58,13 @@ def _next_and_end(cls: "StateMirror") -> "StateMirror":
     def _end(instance):
         """Make this state a terminal state."""
 
-        if instance.Next is not None:
-            raise InvalidDefinitionError(
-                "Cannot set end condition." f"State {instance.title!r} already has a state transition."
-            )
+        with instance_lock(instance):
+            if instance.Next is not None:
+                raise InvalidDefinitionError(
+                    "Cannot set end condition." f"State {instance.title!r} already has a state transition."
+                )
 
-        instance.End = True
+            instance.End = True
 
         return instance
 
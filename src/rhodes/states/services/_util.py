@@ -41,6 +41,8 @@ def service_integration(*options: IntegrationPattern) -> Callable[[StateMirror],
             field_name_blacklist = ("Pattern",)
             resource_name = instance._resource_name.value + instance.Pattern.value
 
+            # Fields that are named differently from the parameters that they set.
+            parameter_names = getattr(instance, "_parameter_names", {})
             task_kwargs = {}
             parameters_kwargs = {}
 
@@ -52,7 +54,9 @@ def service_integration(*options: IntegrationPattern) -> Callable[[StateMirror],
                 if value is None:
                     continue
 
-                if field.name in task_fields and field.name != "Parameters":
+                if field.name in parameter_names:
+                    parameters_kwargs[parameter_names[field.name]] = value
+                elif field.name in task_fields and field.name != "Parameters":
                     task_kwargs[field.name] = value
                 else:
                     parameters_kwargs[field.name] = value
@@ -1,14 +1,18 @@
 """
 `Amazon DynamoDB <https://docs.aws.amazon.com/step-functions/latest/dg/connect-ddb.html>`_ Task states.
 """
+from typing import Optional, Union
+
 import attr
 from attr.validators import instance_of
 
 from rhodes._types import StateMirror
 from rhodes._util import RHODES_ATTRIB, RequiredValue, docstring_with_param
-from rhodes.identifiers import IntegrationPattern, ServiceArn
-from rhodes.states import State
+from rhodes.choice_rules import VariablePath
+from rhodes.identifiers import AwsSdkArn, IntegrationPattern, ServiceArn
+from rhodes.states import Choice, Fail, Map, Parallel, Pass, State, StateMachine, Task, Wait
 from rhodes.states.services._util import service_integration
+from rhodes.structures import ContextPath, JsonPath, Parameters
 
 __all__ = (
     "AmazonDynamoDb",
@@ -19,6 +23,15 @@ __all__ = (
 )
 
 _DDB_INTEGRATION = service_integration(IntegrationPattern.REQUEST_RESPONSE)
+#: Maximum number of write requests in one ``BatchWriteItem`` call.
+MAX_BATCH_WRITE_ITEMS = 25
+# Errors that mean the batch was rejected by throttling and can be sent again unchanged.
+_THROTTLING_ERRORS = [
+    "DynamoDb.ProvisionedThroughputExceededException",
+    "DynamoDb.RequestLimitExceeded",
+    "DynamoDb.ThrottlingException",
+    "DynamoDb.InternalServerErrorException",
+]
 
 
 @attr.s
@@ -62,6 +75,125 @@ class AmazonDynamoDb:
         """
         return AmazonDynamoDbUpdateItem(title, TableName=self.TableName, **kwargs)
 
+    def bulk_write(
+        self,
+        title: str,
+        *,
+        Items: Union[str, JsonPath],
+        MaxConcurrency: Optional[int] = None,
+        MaxAttempts: int = 8,
+        IntervalSeconds: int = 1,
+        ChunkSize: int = MAX_BATCH_WRITE_ITEMS,
+        **kwargs,
+    ) -> Parallel:
+        """Write every item in an array with as few ``BatchWriteItem`` calls as possible.
+
+        Returns a single :class:`Parallel` state that contains the states that do the work:
+
+        #. A :class:`Pass` state splits the array into chunks of ``ChunkSize`` write requests.
+        #. A :class:`Map` state sends each chunk as one ``BatchWriteItem`` request,
+           running up to ``MaxConcurrency`` requests at once.
+        #. Any ``UnprocessedItems`` in a response are sent again after waiting ``IntervalSeconds``,
+           doubling the wait after each attempt.
+           Batches that DynamoDB rejects with a throttling error are retried in the same way.
+           A chunk that still has unprocessed items after ``MaxAttempts`` calls
+           fails the state with the error ``DynamoDb.UnprocessedItems``.
+
+        Each member of the array must be a ``BatchWriteItem`` write request for this table
+        (ex: ``{"PutRequest": {"Item": {"pk": {"S": "a"}}}}``).
+        The result of the state is a list, with one entry per chunk,
+        of ``{"Attempts": N}`` objects that count the calls made for that chunk.
+        Use ``ResultPath`` to keep the original input.
+        ``InputPath``, ``ResultPath``, and ``OutputPath`` are applied inside the :class:`Parallel` state,
+        so the state's output is the same as that of a single state with those paths.
+
+        Any additional kwargs are passed to the :class:`Parallel` constructor.
+
+        :param str title: Name of the state
+        :param Items: Path to the array of write requests in the state input
+        :param int MaxConcurrency: Maximum number of ``BatchWriteItem`` requests to run at once (default: no limit)
+        :param int MaxAttempts: Maximum number of calls to send each chunk in
+        :param int IntervalSeconds: Seconds to wait before sending unprocessed items the first time
+        :param int ChunkSize: Number of write requests in each ``BatchWriteItem`` call (maximum 25)
+        """
+        if not 0 < ChunkSize <= MAX_BATCH_WRITE_ITEMS:
+            raise ValueError(f"ChunkSize must be between 1 and {MAX_BATCH_WRITE_ITEMS}")
+        if MaxAttempts < 1 or IntervalSeconds < 1:
+            raise ValueError("MaxAttempts and IntervalSeconds must be positive")
+
+        # The branch reads the original input from "Input", so the caller's paths are rebased onto it.
+        items = "$" + _relative(kwargs.pop("InputPath", None)) + _relative(Items)
+        result_path = "$.Input" + _relative(kwargs.pop("ResultPath", None))
+        output_path = "$.Input" + _relative(kwargs.pop("OutputPath", None))
+
+        write = Task(
+            f"{title} Write",
+            Resource=AwsSdkArn(service="dynamodb", action="batchWriteItem").value,
+            Parameters=Parameters(RequestItems=JsonPath("$.RequestItems")),
+            ResultPath="$.Result",
+            Retry=[
+                {
+                    "ErrorEquals": list(_THROTTLING_ERRORS),
+                    "IntervalSeconds": IntervalSeconds,
+                    "MaxAttempts": MaxAttempts - 1,
+                    "BackoffRate": 2,
+                }
+            ],
+        )
+        prepare = Pass(
+            f"{title} Check Unprocessed",
+            Parameters=Parameters(
+                **{
+                    "RequestItems.$": "$.Result.UnprocessedItems",
+                    "Unprocessed.$": "States.JsonToString($.Result.UnprocessedItems)",
+                    "Attempt.$": "States.MathAdd($.Attempt, 1)",
+                    "Wait.$": "$.Delay",
+                    "Delay.$": "States.MathAdd($.Delay, $.Delay)",
+                }
+            ),
+        )
+        done = Pass(f"{title} Written", Parameters=Parameters(Attempts=JsonPath("$.Attempt")), End=True)
+        backoff = Wait(f"{title} Backoff", SecondsPath="$.Wait")
+
+        iterator = StateMachine()
+        decide = iterator.start_with(write).then(prepare).then(Choice(f"{title} Unprocessed?"))
+        decide.if_(VariablePath("$.Unprocessed") == "{}").then(done)
+        decide.if_(VariablePath("$.Attempt") >= MaxAttempts).then(
+            Fail(
+                f"{title} Failed",
+                Error="DynamoDb.UnprocessedItems",
+                Cause=f"Items were still unprocessed after {MaxAttempts} BatchWriteItem calls",
+            )
+        )
+        decide.else_(backoff).then(write)
+
+        chunk = Pass(
+            f"{title} Chunk",
+            Parameters=Parameters(**{"Input.$": "$", "Chunks.$": f"States.ArrayPartition({items}, {ChunkSize})"}),
+        )
+        batches = Map(
+            f"{title} Batches",
+            Iterator=iterator,
+            ItemsPath="$.Chunks",
+            MaxConcurrency=MaxConcurrency,
+            Parameters=Parameters(
+                RequestItems=Parameters(**{self.TableName: ContextPath("$$.Map.Item.Value")}),
+                Attempt=0,
+                Delay=IntervalSeconds,
+            ),
+            ResultPath=result_path,
+            OutputPath=output_path,
+        )
+
+        branch = StateMachine()
+        branch.start_with(chunk).then(batches).end()
+        return Parallel(title, Branches=[branch], OutputPath="$[0]", **kwargs)
+
+
+def _relative(path: Optional[Union[str, JsonPath]]) -> str:
+    """Strip the leading ``$`` from a path so that it can be appended to another path."""
+    return str(JsonPath(path) if isinstance(path, str) else path)[1:] if path is not None else ""
+
 
 def _ddb_table_name(cls: StateMirror) -> StateMirror:
     cls.TableName = RHODES_ATTRIB()
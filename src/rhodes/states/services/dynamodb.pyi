@@ -1,4 +1,4 @@
-from typing import Any, Optional
+from typing import Any, Optional, Union
 
 from rhodes._types import (
     CATCH,
@@ -16,7 +16,7 @@ from rhodes._types import (
     StateMirror,
 )
 from rhodes.identifiers import IntegrationPattern
-from rhodes.states import State
+from rhodes.states import Parallel, State
 from rhodes.structures import JsonPath
 
 class AmazonDynamoDb:
@@ -121,6 +121,26 @@ class AmazonDynamoDb:
         UpdateExpression: Optional[Any] = None,
         Pattern: IntegrationPattern = IntegrationPattern.REQUEST_RESPONSE,
     ) -> AmazonDynamoDbUpdateItem: ...
+    def bulk_write(
+        self,
+        title: TITLE,
+        *,
+        Items: Union[str, JsonPath],
+        MaxConcurrency: Optional[int] = None,
+        MaxAttempts: int = 8,
+        IntervalSeconds: int = 1,
+        ChunkSize: int = 25,
+        Comment: COMMENT = None,
+        Next: NEXT = None,
+        End: END = None,
+        InputPath: PATH_INPUT = JsonPath("$"),
+        OutputPath: PATH_INPUT = JsonPath("$"),
+        ResultPath: PATH_INPUT = JsonPath("$"),
+        Catch: CATCH = None,
+        Retry: RETRY = None,
+    ) -> Parallel: ...
+
+MAX_BATCH_WRITE_ITEMS: int
 
 class AmazonDynamoDbGetItem(State):
     def __init__(
@@ -0,0 +1,214 @@
+"""
+`AWS SDK service integration <https://docs.aws.amazon.com/step-functions/latest/dg/supported-services-awssdk.html>`_
+Task states.
+
+Step Functions can call almost any AWS API action through an ``arn:aws:states:::aws-sdk:<service>:<action>`` resource,
+including batch actions that the optimized integrations do not cover,
+such as ``sqs:sendMessageBatch`` and ``dynamodb:transactWriteItems``.
+
+:func:`aws_sdk` generates a helper class for an action from the ``botocore`` service model for that service.
+Each field of the class is a top-level request member of the action, named in PascalCase
+(the form that Step Functions requires for AWS SDK integration parameters: ``restApiId`` becomes ``RestApiId``),
+and fields that the action requires must be set before the state is serialized.
+Members whose names are also ``Task`` state fields or methods (ex: ``Comment``, ``TimeoutSeconds``, or ``Parameters``)
+are fields with a ``Member`` suffix (ex: ``CommentMember``) so that they set the request parameter
+rather than the field of the state.
+
+.. code-block:: python
+
+    SendMessageBatch = aws_sdk("sqs", "sendMessageBatch")
+
+    send = SendMessageBatch("Send", QueueUrl=QUEUE_URL, Entries=JsonPath("$.messages"))
+
+Service models are only loaded when :func:`aws_sdk` is first called for a service,
+and each generated class is cached, so importing this module does not load any service models.
+``botocore`` is only needed for services that do not have a model added with :func:`add_service_model`.
+
+Task states with AWS SDK resources are loaded from definitions as plain :class:`Task` states.
+"""
+import re
+import threading
+from typing import Any, Dict, Tuple, Type
+
+import attr
+from attr.validators import instance_of, optional
+
+from rhodes._runtime_types import SERVICE_INTEGRATION_COMPLEX_VALUE_TYPES, SERVICE_INTEGRATION_SIMPLE_VALUE_TYPES
+from rhodes._util import RHODES_ATTRIB, RequiredValue, docstring_with_param
+from rhodes.identifiers import AwsSdkArn, IntegrationPattern
+from rhodes.states import State, Task
+from rhodes.states.services._util import service_integration
+
+__all__ = ("aws_sdk", "add_service_model")
+
+# Step Functions service names that differ from the botocore service model names.
+_BOTOCORE_SERVICE_NAMES = {
+    "sfn": "stepfunctions",
+    "cloudwatchlogs": "logs",
+    "cognitoidentityprovider": "cognito-idp",
+    "elasticloadbalancingv2": "elbv2",
+}
+# Values that are resolved when the state runs or when the template is deployed.
+_DYNAMIC_TYPES = tuple(value_type for value_type in SERVICE_INTEGRATION_SIMPLE_VALUE_TYPES if value_type is not str)
+# Types that each botocore shape type accepts, in addition to values that are resolved at run time.
+_SHAPE_TYPES: Dict[str, Tuple[type, ...]] = {
+    "string": SERVICE_INTEGRATION_SIMPLE_VALUE_TYPES,
+    "blob": SERVICE_INTEGRATION_SIMPLE_VALUE_TYPES,
+    "timestamp": SERVICE_INTEGRATION_SIMPLE_VALUE_TYPES,
+    "integer": (int,) + _DYNAMIC_TYPES,
+    "long": (int,) + _DYNAMIC_TYPES,
+    "float": (int, float) + _DYNAMIC_TYPES,
+    "double": (int, float) + _DYNAMIC_TYPES,
+    "boolean": (bool,) + _DYNAMIC_TYPES,
+    "structure": SERVICE_INTEGRATION_COMPLEX_VALUE_TYPES,
+    "map": SERVICE_INTEGRATION_COMPLEX_VALUE_TYPES,
+    "list": (list,) + _DYNAMIC_TYPES,
+}
+_TAGS = re.compile(r"<[^>]+>")
+# Names that request members cannot use as fields, because the generated class already uses them.
+_RESERVED_NAMES = frozenset(dir(Task)) | frozenset(attr.fields_dict(Task)) | {"Pattern", "Type"}
+_RENAMED_SUFFIX = "Member"
+
+_LOCK = threading.RLock()
+_MODELS: Dict[str, Dict] = {}
+_CLASSES: Dict[Tuple[str, str], Type[State]] = {}
+
+
+def add_service_model(service: str, model: Dict):
+    """Use a service model instead of the one from ``botocore``.
+
+    Use this for services or actions that are newer than the installed ``botocore``.
+    Classes that were already generated for the service are discarded.
+
+    :param str service: Step Functions service name (ex: ``sqs``)
+    :param dict model: Service model in the ``botocore`` ``service-2.json`` format
+    """
+    with _LOCK:
+        _MODELS[service] = model
+        for key in [key for key in _CLASSES if key[0] == service]:
+            del _CLASSES[key]
+
+
+def _load_model(service: str) -> Dict:
+    # pylint: disable=import-outside-toplevel
+    try:
+        from botocore.exceptions import DataNotFoundError
+        from botocore.loaders import create_loader
+    except ImportError as error:
+        raise ImportError(
+            f"botocore is required to generate AWS SDK integrations for {service!r} "
+            "unless its model is added with add_service_model"
+        ) from error
+
+    try:
+        return create_loader().load_service_model(_BOTOCORE_SERVICE_NAMES.get(service, service), "service-2")
+    except DataNotFoundError:
+        raise ValueError(f"No botocore service model for service {service!r}") from None
+
+
+def _service_model(service: str) -> Dict:
+    with _LOCK:
+        if service not in _MODELS:
+            _MODELS[service] = _load_model(service)
+        return _MODELS[service]
+
+
+def _summary(documentation: str) -> str:
+    text = " ".join(_TAGS.sub("", documentation or "").split())
+    return text.split(". ")[0].rstrip(".") + "." if text else ""
+
+
+def _class_name(service: str, operation: str) -> str:
+    words = re.split(r"[^A-Za-z0-9]+", service)
+    return "AwsSdk" + "".join(word[:1].upper() + word[1:] for word in words) + operation
+
+
+def _is_set(value: Any) -> bool:
+    # Required members can be set to falsy values, such as False or 0.
+    return value is not None
+
+
+def _parameter_name(member: str) -> str:
+    return member[:1].upper() + member[1:]
+
+
+def _field_names(members: Dict[str, Dict]) -> Dict[str, str]:
+    """Choose the field name of each request member, by member name."""
+    parameter_names = {member: _parameter_name(member) for member in members}
+    taken = set(parameter_names.values())
+    field_names = {}
+    for member, parameter_name in parameter_names.items():
+        field_name = parameter_name
+        while field_name in _RESERVED_NAMES or (field_name != parameter_name and field_name in taken):
+            field_name += _RENAMED_SUFFIX
+        taken.add(field_name)
+        field_names[member] = field_name
+    return field_names
+
+
+def _restore(service: str, action: str, state: Dict) -> State:
+    cls = aws_sdk(service, action)
+    instance = cls.__new__(cls)
+    instance.__dict__.update(state)
+    return instance
+
+
+def _generate(service: str, action: str) -> Type[State]:
+    model = _service_model(service)
+    operation_name = action[:1].upper() + action[1:]
+    try:
+        operation = model["operations"][operation_name]
+    except KeyError:
+        raise ValueError(f"Service {service!r} has no action {action!r}") from None
+
+    shapes = model.get("shapes", {})
+    input_shape = shapes.get(operation.get("input", {}).get("shape"), {})
+    members = input_shape.get("members", {})
+    field_names = _field_names(members)
+    resource = AwsSdkArn(service=service, action=action)
+
+    namespace: Dict[str, Any] = {
+        "__doc__": f"{_summary(operation.get('documentation'))}\n\n    Calls ``{service}:{action}``.\n",
+        "_resource_name": resource,
+        "_required_fields": tuple(
+            RequiredValue(field_names[name], f"{resource.value} Task requires {field_names[name]}", _is_set)
+            for name in input_shape.get("required", ())
+        ),
+        "_parameter_names": {
+            field_name: _parameter_name(member)
+            for member, field_name in field_names.items()
+            if field_name != _parameter_name(member)
+        },
+        "__reduce__": lambda self: (_restore, (service, action, self.__getstate__())),
+    }
+    cls = type(_class_name(service, operation_name), (State,), namespace)
+    cls.__module__ = __name__
+
+    for name, member in members.items():
+        shape_type = shapes.get(member.get("shape"), {}).get("type")
+        field_name = field_names[name]
+        setattr(
+            cls, field_name, RHODES_ATTRIB(validator=optional(instance_of(_SHAPE_TYPES.get(shape_type, (object,)))))
+        )
+        cls.__doc__ = docstring_with_param(
+            cls, field_name, description=f"({shape_type}) {_summary(member.get('documentation'))}".rstrip()
+        )
+
+    cls = service_integration(IntegrationPattern.REQUEST_RESPONSE, IntegrationPattern.WAIT_FOR_CALLBACK)(cls)
+    return attr.s(eq=False)(cls)
+
+
+def aws_sdk(service: str, action: str) -> Type[State]:
+    """Get the helper class for an AWS SDK integration action, generating it on first use.
+
+    :param str service: Step Functions service name, in lowercase (ex: ``sqs``)
+    :param str action: API action name, in camel case (ex: ``sendMessageBatch``)
+    :raises ValueError: if the service or action does not exist
+    :raises ImportError: if ``botocore`` is needed to load the service model and is not installed
+    """
+    action = action[:1].lower() + action[1:]
+    key = (service, action)
+    with _LOCK:
+        if key not in _CLASSES:
+            _CLASSES[key] = _generate(service, action)
+        return _CLASSES[key]
@@ -0,0 +1,6 @@
+from typing import Dict, Type
+
+from rhodes.states import State
+
+def add_service_model(service: str, model: Dict) -> None: ...
+def aws_sdk(service: str, action: str) -> Type[State]: ...
@@ -15,7 +15,10 @@ __all__ = ("AwsStepFunctions",)
 
 @attr.s(eq=False)
 @service_integration(
-    IntegrationPattern.REQUEST_RESPONSE, IntegrationPattern.SYNCHRONOUS, IntegrationPattern.WAIT_FOR_CALLBACK
+    IntegrationPattern.REQUEST_RESPONSE,
+    IntegrationPattern.SYNCHRONOUS,
+    IntegrationPattern.SYNCHRONOUS_JSON,
+    IntegrationPattern.WAIT_FOR_CALLBACK,
 )
 class AwsStepFunctions(State):
     """Start a state machine execution.
@@ -1,13 +1,28 @@
 """Helper structures for Rhodes."""
-from typing import Any, Dict, Union
+from typing import Any, Dict, List, Optional, Union
 
 import attr
 import jsonpath_rw
-from attr.validators import instance_of
+from attr.converters import optional as optional_converter
+from attr.validators import deep_iterable, instance_of, optional
 
-from rhodes._serialization import serialize_name_and_value
+from rhodes._util import RHODES_ATTRIB
+from rhodes.identifiers import CsvHeaderLocation, ExecutionType, ItemReaderInputType, MapMode, ServiceArn
+from rhodes.serialization import serialize_name_and_value
 
-__all__ = ("JsonPath", "ContextPath", "Parameters")
+__all__ = (
+    "JsonPath",
+    "ContextPath",
+    "Parameters",
+    "ProcessorConfig",
+    "ReaderConfig",
+    "ItemReader",
+    "ItemBatcher",
+    "ResultWriter",
+)
+
+# Largest input that Step Functions accepts for one child execution of a distributed Map state.
+MAX_BATCH_INPUT_BYTES = 256 * 1024
 
 
 def _convert_path(value: Union[str, jsonpath_rw.JSONPath, "JsonPath"]) -> jsonpath_rw.JSONPath:
@@ -30,7 +45,8 @@ class JsonPath:
     path: jsonpath_rw.JSONPath = attr.ib(validator=instance_of(jsonpath_rw.JSONPath), converter=_convert_path)
 
     def __str__(self):
-        return str(self.path)
+        # jsonpath_rw joins every child with a dot (ex: ``$.items.[0]``); brackets do not need one.
+        return str(self.path).replace(".[", "[")
 
     def to_dict(self) -> str:
         """Serialize path for use in serialized state machine definition."""
@@ -108,6 +124,9 @@ class ContextPath:
         return str(self)
 
     def __getattr__(self, item):
+        if item.startswith("__"):
+            # Special method lookups, such as those made by ``copy`` and ``pickle``, are not path members.
+            raise AttributeError(item)
         return ContextPath(f"{self._path}.{item}")
 
 
@@ -148,3 +167,249 @@ class Parameters:
 
     def __repr__(self):
         return f"{self.__class__.__name__}({', '.join(f'{name}={value!r}' for name, value in self._map.items())})"
+
+
+def _serialize_fields(instance: Any) -> Dict[str, Any]:
+    """Serialize the fields of an attrs instance that are set."""
+    serialized = {}
+    for field in attr.fields(type(instance)):
+        value = getattr(instance, field.name)
+        if value is None:
+            continue
+
+        name, value = serialize_name_and_value(name=field.name, value=value)
+        serialized[name] = value
+    return serialized
+
+
+def _non_negative(instance, attribute: attr.Attribute, value: Any):
+    # pylint: disable=unused-argument
+    if value is not None and value < 0:
+        raise ValueError(f"{attribute.name!r} must not be negative")
+
+
+def _positive(instance, attribute: attr.Attribute, value: Any):
+    # pylint: disable=unused-argument
+    if value is not None and value < 1:
+        raise ValueError(f"{attribute.name!r} must be at least 1")
+
+
+@attr.s
+class ProcessorConfig:
+    """Processing mode of a :class:`Map` state's ``ItemProcessor``.
+
+    In ``DISTRIBUTED`` mode, each iteration runs as a child execution of type ``ExecutionType``.
+
+    :param MapMode Mode: Processing mode (default: ``INLINE``)
+    :param ExecutionType ExecutionType: Workflow type of child executions (required in ``DISTRIBUTED`` mode)
+    """
+
+    Mode: MapMode = attr.ib(default=MapMode.INLINE, converter=MapMode, validator=instance_of(MapMode), kw_only=True)
+    ExecutionType: "Optional[ExecutionType]" = RHODES_ATTRIB(
+        converter=optional_converter(ExecutionType), validator=optional(instance_of(ExecutionType))
+    )
+
+    @ExecutionType.validator
+    def _validate_execution_type(self, attribute: attr.Attribute, value: Any):
+        # pylint: disable=unused-argument
+        if self.Mode is MapMode.DISTRIBUTED and value is None:
+            raise ValueError("ExecutionType is required for DISTRIBUTED processing")
+        if self.Mode is MapMode.INLINE and value is not None:
+            raise ValueError("ExecutionType is only allowed for DISTRIBUTED processing")
+
+    @classmethod
+    def distributed(cls, execution_type: Union[str, "ExecutionType"] = "STANDARD") -> "ProcessorConfig":
+        """Run each iteration as a child execution.
+
+        :param execution_type: Workflow type of child executions (default: ``STANDARD``)
+        """
+        return cls(Mode=MapMode.DISTRIBUTED, ExecutionType=execution_type)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize configuration for use in serialized state machine definition."""
+        return _serialize_fields(self)
+
+
+@attr.s
+class ReaderConfig:
+    """Format of the items that a distributed :class:`Map` state's ``ItemReader`` reads.
+
+    :param ItemReaderInputType InputType: Format of the S3 object (not set when listing objects)
+    :param CsvHeaderLocation CSVHeaderLocation: Where the column names of a CSV file are (default: ``FIRST_ROW``)
+    :param list CSVHeaders: Column names, if ``CSVHeaderLocation`` is ``GIVEN``
+    :param int MaxItems: Maximum number of items to read
+    """
+
+    InputType: "Optional[ItemReaderInputType]" = RHODES_ATTRIB(
+        converter=optional_converter(ItemReaderInputType), validator=optional(instance_of(ItemReaderInputType))
+    )
+    CSVHeaderLocation: "Optional[CsvHeaderLocation]" = RHODES_ATTRIB(
+        converter=optional_converter(CsvHeaderLocation), validator=optional(instance_of(CsvHeaderLocation))
+    )
+    CSVHeaders: Optional[List[str]] = RHODES_ATTRIB(
+        validator=optional(deep_iterable(member_validator=instance_of(str), iterable_validator=instance_of(list)))
+    )
+    MaxItems: Optional[int] = RHODES_ATTRIB(validator=optional(instance_of(int)))
+
+    @CSVHeaders.validator
+    def _validate_headers(self, attribute: attr.Attribute, value: Any):
+        # pylint: disable=unused-argument
+        if (value is not None) != (self.CSVHeaderLocation is CsvHeaderLocation.GIVEN):
+            raise ValueError("CSVHeaders must be set if and only if CSVHeaderLocation is GIVEN")
+
+    @MaxItems.validator
+    def _validate_max_items(self, attribute: attr.Attribute, value: Any):
+        # Step Functions reads at most 100,000,000 items.
+        if value is not None and not 0 <= value <= 100_000_000:
+            raise ValueError(f"{attribute.name!r} must be between 0 and 100000000")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize configuration for use in serialized state machine definition."""
+        return _serialize_fields(self)
+
+
+@attr.s
+class ItemReader:
+    """Where a distributed :class:`Map` state reads its items from, instead of its input.
+
+    Use the ``s3_objects``, ``json_file``, ``csv_file``, and ``manifest`` constructors
+    for the readers that Step Functions supports.
+
+    `See Step Functions docs for more details.
+    <https://docs.aws.amazon.com/step-functions/latest/dg/input-output-itemreader.html>`_
+
+    :param Resource: Resource that reads the items (ex: :attr:`ServiceArn.S3_GET_OBJECT`)
+    :param Parameters Parameters: Parameters for the resource
+    :param ReaderConfig ReaderConfig: Format of the items
+    """
+
+    Resource: Union[str, ServiceArn] = RHODES_ATTRIB(validator=instance_of((str, ServiceArn)))
+    Parameters: "Optional[Parameters]" = RHODES_ATTRIB(validator=optional(instance_of(Parameters)))
+    ReaderConfig: "Optional[ReaderConfig]" = RHODES_ATTRIB(validator=optional(instance_of(ReaderConfig)))
+
+    @classmethod
+    def s3_objects(cls, Bucket: Any, Prefix: Any = None, *, MaxItems: Optional[int] = None) -> "ItemReader":
+        """Read one item for each object in an S3 bucket, with the object's ``Key``, ``Size``, and ``ETag``.
+
+        :param Bucket: Bucket name
+        :param Prefix: Only list objects with keys that start with this prefix
+        :param int MaxItems: Maximum number of items to read
+        """
+        parameters = {"Bucket": Bucket}
+        if Prefix is not None:
+            parameters["Prefix"] = Prefix
+        return cls(
+            Resource=ServiceArn.S3_LIST_OBJECTS_V2,
+            Parameters=Parameters(**parameters),
+            ReaderConfig=None if MaxItems is None else ReaderConfig(MaxItems=MaxItems),
+        )
+
+    @classmethod
+    def json_file(cls, Bucket: Any, Key: Any, *, MaxItems: Optional[int] = None) -> "ItemReader":
+        """Read the items of a JSON array stored in S3.
+
+        :param Bucket: Bucket name
+        :param Key: Object key
+        :param int MaxItems: Maximum number of items to read
+        """
+        return cls._object(Bucket, Key, ReaderConfig(InputType=ItemReaderInputType.JSON, MaxItems=MaxItems))
+
+    @classmethod
+    def csv_file(
+        cls, Bucket: Any, Key: Any, *, CSVHeaders: Optional[List[str]] = None, MaxItems: Optional[int] = None
+    ) -> "ItemReader":
+        """Read one item for each row of a CSV file stored in S3.
+
+        Each item is an object that maps the column names to the values in the row.
+
+        :param Bucket: Bucket name
+        :param Key: Object key
+        :param list CSVHeaders: Column names (default: read from the first row of the file)
+        :param int MaxItems: Maximum number of items to read
+        """
+        location = CsvHeaderLocation.FIRST_ROW if CSVHeaders is None else CsvHeaderLocation.GIVEN
+        config = ReaderConfig(
+            InputType=ItemReaderInputType.CSV, CSVHeaderLocation=location, CSVHeaders=CSVHeaders, MaxItems=MaxItems
+        )
+        return cls._object(Bucket, Key, config)
+
+    @classmethod
+    def manifest(cls, Bucket: Any, Key: Any, *, MaxItems: Optional[int] = None) -> "ItemReader":
+        """Read one item for each object listed in an S3 inventory manifest.
+
+        :param Bucket: Bucket name
+        :param Key: Key of the ``manifest.json`` object
+        :param int MaxItems: Maximum number of items to read
+        """
+        return cls._object(Bucket, Key, ReaderConfig(InputType=ItemReaderInputType.MANIFEST, MaxItems=MaxItems))
+
+    @classmethod
+    def _object(cls, bucket: Any, key: Any, config: "ReaderConfig") -> "ItemReader":
+        return cls(
+            Resource=ServiceArn.S3_GET_OBJECT, Parameters=Parameters(Bucket=bucket, Key=key), ReaderConfig=config
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize reader for use in serialized state machine definition."""
+        return _serialize_fields(self)
+
+
+@attr.s
+class ItemBatcher:
+    """How a distributed :class:`Map` state groups items into batches, one batch per child execution.
+
+    Each child execution receives ``{"Items": [...]}``, plus ``BatchInput`` in the ``BatchInput`` field.
+
+    `See Step Functions docs for more details.
+    <https://docs.aws.amazon.com/step-functions/latest/dg/input-output-itembatcher.html>`_
+
+    :param int MaxItemsPerBatch: Maximum number of items in each batch
+    :param int MaxInputBytesPerBatch: Maximum serialized size of each batch, up to 256 KiB
+    :param Parameters BatchInput: Input that every batch receives
+    """
+
+    MaxItemsPerBatch: Optional[int] = RHODES_ATTRIB(validator=(optional(instance_of(int)), _positive))
+    MaxInputBytesPerBatch: Optional[int] = RHODES_ATTRIB(validator=(optional(instance_of(int)), _positive))
+    BatchInput: "Optional[Parameters]" = RHODES_ATTRIB(validator=optional(instance_of(Parameters)))
+
+    @MaxInputBytesPerBatch.validator
+    def _validate_bytes(self, attribute: attr.Attribute, value: Any):
+        if value is not None and value > MAX_BATCH_INPUT_BYTES:
+            raise ValueError(f"{attribute.name!r} must not be more than {MAX_BATCH_INPUT_BYTES}")
+        if value is None and self.MaxItemsPerBatch is None:
+            raise ValueError("At least one of 'MaxItemsPerBatch' and 'MaxInputBytesPerBatch' must be set")
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize batcher for use in serialized state machine definition."""
+        return _serialize_fields(self)
+
+
+@attr.s
+class ResultWriter:
+    """Where a distributed :class:`Map` state writes the results of its child executions,
+    instead of returning them in its output.
+
+    `See Step Functions docs for more details.
+    <https://docs.aws.amazon.com/step-functions/latest/dg/input-output-resultwriter.html>`_
+
+    :param Resource: Resource that writes the results (default: :attr:`ServiceArn.S3_PUT_OBJECT`)
+    :param Parameters Parameters: Parameters for the resource
+    """
+
+    Resource: Union[str, ServiceArn] = attr.ib(
+        default=ServiceArn.S3_PUT_OBJECT, validator=instance_of((str, ServiceArn)), kw_only=True
+    )
+    Parameters: "Optional[Parameters]" = RHODES_ATTRIB(validator=optional(instance_of(Parameters)))
+
+    @classmethod
+    def s3(cls, Bucket: Any, Prefix: Any) -> "ResultWriter":
+        """Write the results to S3, under a prefix.
+
+        :param Bucket: Bucket name
+        :param Prefix: Key prefix
+        """
+        return cls(Parameters=Parameters(Bucket=Bucket, Prefix=Prefix))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize writer for use in serialized state machine definition."""
+        return _serialize_fields(self)
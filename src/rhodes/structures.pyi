@@ -1,7 +1,11 @@
-from typing import Any, Dict, Optional, Union
+from typing import Any, Dict, List, Optional, Union
 
 import jsonpath_rw
 
+from rhodes.identifiers import CsvHeaderLocation, ExecutionType, ItemReaderInputType, MapMode, ServiceArn
+
+MAX_BATCH_INPUT_BYTES: int
+
 class JsonPath:
     def __init__(self, path: Union[str, jsonpath_rw]): ...
     path: jsonpath_rw.JSONPath
@@ -15,3 +19,72 @@ class Parameters:
     def __init__(self, **kwargs: Any): ...
     def to_dict(self) -> Dict[str, Any]: ...
     _map: Dict[str, Any]
+
+class ProcessorConfig:
+    def __init__(
+        self, *, Mode: Union[str, MapMode] = MapMode.INLINE, ExecutionType: Optional[Union[str, ExecutionType]] = None
+    ): ...
+    Mode: MapMode
+    ExecutionType: Optional[ExecutionType]
+    @classmethod
+    def distributed(cls, execution_type: Union[str, ExecutionType] = "STANDARD") -> ProcessorConfig: ...
+    def to_dict(self) -> Dict[str, Any]: ...
+
+class ReaderConfig:
+    def __init__(
+        self,
+        *,
+        InputType: Optional[Union[str, ItemReaderInputType]] = None,
+        CSVHeaderLocation: Optional[Union[str, CsvHeaderLocation]] = None,
+        CSVHeaders: Optional[List[str]] = None,
+        MaxItems: Optional[int] = None,
+    ): ...
+    InputType: Optional[ItemReaderInputType]
+    CSVHeaderLocation: Optional[CsvHeaderLocation]
+    CSVHeaders: Optional[List[str]]
+    MaxItems: Optional[int]
+    def to_dict(self) -> Dict[str, Any]: ...
+
+class ItemReader:
+    def __init__(
+        self,
+        *,
+        Resource: Union[str, ServiceArn],
+        Parameters: Optional[Parameters] = None,
+        ReaderConfig: Optional[ReaderConfig] = None,
+    ): ...
+    Resource: Union[str, ServiceArn]
+    Parameters: Optional[Parameters]
+    ReaderConfig: Optional[ReaderConfig]
+    @classmethod
+    def s3_objects(cls, Bucket: Any, Prefix: Any = None, *, MaxItems: Optional[int] = None) -> ItemReader: ...
+    @classmethod
+    def json_file(cls, Bucket: Any, Key: Any, *, MaxItems: Optional[int] = None) -> ItemReader: ...
+    @classmethod
+    def csv_file(
+        cls, Bucket: Any, Key: Any, *, CSVHeaders: Optional[List[str]] = None, MaxItems: Optional[int] = None
+    ) -> ItemReader: ...
+    @classmethod
+    def manifest(cls, Bucket: Any, Key: Any, *, MaxItems: Optional[int] = None) -> ItemReader: ...
+    def to_dict(self) -> Dict[str, Any]: ...
+
+class ItemBatcher:
+    def __init__(
+        self,
+        *,
+        MaxItemsPerBatch: Optional[int] = None,
+        MaxInputBytesPerBatch: Optional[int] = None,
+        BatchInput: Optional[Parameters] = None,
+    ): ...
+    MaxItemsPerBatch: Optional[int]
+    MaxInputBytesPerBatch: Optional[int]
+    BatchInput: Optional[Parameters]
+    def to_dict(self) -> Dict[str, Any]: ...
+
+class ResultWriter:
+    def __init__(self, *, Resource: Union[str, ServiceArn] = ServiceArn.S3_PUT_OBJECT, Parameters: Optional[Parameters] = None): ...
+    Resource: Union[str, ServiceArn]
+    Parameters: Optional[Parameters]
+    @classmethod
+    def s3(cls, Bucket: Any, Prefix: Any) -> ResultWriter: ...
+    def to_dict(self) -> Dict[str, Any]: ...
@@ -0,0 +1,103 @@
+"""
+State machine definitions that use ``DefinitionSubstitutions``.
+
+:meth:`StateMachine.definition_string` inlines every ``troposphere`` resource reference
+as a ``${Resource.Arn}`` or ``${Resource}`` string and wraps the whole definition in ``Fn::Sub``.
+A state machine that calls the same function from many states repeats that reference every time,
+and CloudFormation has to process the whole definition as one large ``Fn::Sub`` string.
+
+:meth:`StateMachine.definition_substitutions` instead keeps the definition as a native object,
+replaces each unique reference with a short placeholder,
+and collects the references once into a ``DefinitionSubstitutions`` map.
+
+.. code-block:: python
+
+    substituted = workflow.definition_substitutions()
+    template.add_resource(substituted.state_machine_resource("Workflow", RoleArn=GetAtt(role, "Arn")))
+    print(f"Saved {substituted.bytes_saved} bytes")
+
+Every ``${...}`` reference that ``Fn::Sub`` would resolve is collected, including pseudo parameters
+such as ``${AWS::Region}``. Escaped ``${!Literal}`` values are left unchanged.
+"""
+import json
+from typing import Any, Dict
+
+import attr
+from troposphere import Sub, stepfunctions
+
+from rhodes._references import ReferenceExtractor, compact_size, reference_value
+
+__all__ = ("SubstitutedDefinition", "extract_substitutions")
+
+
+def extract_substitutions(definition: Dict) -> "SubstitutedDefinition":
+    """Replace the resource references in a serialized state machine definition with placeholders.
+
+    :param dict definition: Serialized state machine definition as returned by :meth:`StateMachine.to_dict`
+    """
+    extractor = ReferenceExtractor()
+    substituted = extractor.value(definition)
+    substitutions = {
+        placeholder: reference_value(reference) for reference, placeholder in extractor.placeholders.items()
+    }
+    return SubstitutedDefinition(
+        definition=substituted,
+        substitutions=substitutions,
+        definition_string_bytes=compact_size({"DefinitionString": Sub(json.dumps(definition)).to_dict()}),
+    )
+
+
+@attr.s
+class SubstitutedDefinition:
+    """A state machine definition with its resource references collected into ``DefinitionSubstitutions``.
+
+    :param dict definition: State machine definition with a placeholder for each resource reference
+    :param dict substitutions: Map of placeholder to the ``troposphere`` value that it stands for
+    :param int definition_string_bytes: Size of the equivalent ``DefinitionString`` property, as compact JSON
+    """
+
+    definition: Dict = attr.ib()
+    substitutions: Dict[str, Any] = attr.ib(factory=dict)
+    definition_string_bytes: int = attr.ib(default=0)
+
+    def to_dict(self) -> Dict:
+        """Return the state machine definition as a dictionary."""
+        return self.definition
+
+    def resource_properties(self) -> Dict:
+        """Return the ``Definition`` and ``DefinitionSubstitutions`` properties
+        for an ``AWS::StepFunctions::StateMachine`` resource.
+
+        ``DefinitionSubstitutions`` is only included if the definition references any resources.
+        """
+        properties = {"Definition": self.definition}
+        if self.substitutions:
+            properties["DefinitionSubstitutions"] = self.substitutions
+        return properties
+
+    @property
+    def template_bytes(self) -> int:
+        """Size of the ``Definition`` and ``DefinitionSubstitutions`` properties, as compact JSON."""
+        properties = self.resource_properties()
+        if self.substitutions:
+            properties["DefinitionSubstitutions"] = {
+                placeholder: value.to_dict() for placeholder, value in self.substitutions.items()
+            }
+        return compact_size(properties)
+
+    @property
+    def bytes_saved(self) -> int:
+        """Template bytes saved compared to using :meth:`StateMachine.definition_string`.
+
+        This is negative if the definition references few resources and using ``DefinitionString`` is smaller.
+        """
+        return self.definition_string_bytes - self.template_bytes
+
+    def state_machine_resource(self, title: str, **properties: Any) -> stepfunctions.StateMachine:
+        """Build a ``troposphere`` state machine resource that uses this definition.
+
+        :param str title: Logical ID of the resource
+        :param properties: Additional resource properties (ex: ``RoleArn``)
+        """
+        properties.update(self.resource_properties())
+        return stepfunctions.StateMachine(title, **properties)
@@ -0,0 +1,204 @@
+"""
+Render-once definition templates.
+
+Deploying the same state machine to many accounts and regions usually only changes a few values,
+such as function ARNs and table names.
+Rather than building the state machine again for each environment,
+build it once with a :class:`Slot` in place of each of those values,
+compile it into a :class:`DefinitionTemplate`,
+and then fill in the values for each environment.
+
+.. code-block:: python
+
+    workflow = StateMachine()
+    workflow.start_with(
+        Task("Lookup", Resource=Slot("LookupFunction", pattern=r"arn:aws:lambda:.+"))
+    ).then(
+        AmazonDynamoDb(TableName=Slot("OrdersTable")).put_item("Store", Item=JsonPath("$.order"))
+    ).end()
+
+    template = compile_template(workflow)
+
+    for environment in environments:
+        definition = template.substitute(
+            {"LookupFunction": environment.lookup_arn, "OrdersTable": environment.orders_table}
+        )
+
+Filling in a template does not touch any rhodes objects:
+it joins the precompiled JSON text with the JSON encoding of each value in a single pass.
+The result is byte-identical to ``json.dumps`` of the ``to_dict`` output
+of a state machine that was built with the values in place of the slots.
+
+A :class:`Slot` is a string, so it can be used for any field that accepts a string,
+including ``Resource``, service integration fields, and ``Parameters`` values,
+and it can be embedded in a longer string (ex: ``f"arn:aws:sns:{region}:{account}:{topic}"``).
+Fields that rhodes parses, such as ``JsonPath`` values and ``Choice`` rule variables, cannot contain slots.
+"""
+import json
+import re
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import attr
+from troposphere import Sub
+
+from rhodes.exceptions import TemplateError
+from rhodes.serialization import serialize_name_and_value
+from rhodes.states import StateMachine
+
+__all__ = ("Slot", "DefinitionTemplate", "compile_template")
+
+_NAME = re.compile(r"[A-Za-z0-9_.\-]+")
+# Plain ASCII so that JSON encoding never changes the marker.
+_MARKER = "<<rhodes.slot:{name}>>"
+_MARKERS = re.compile(r"<<rhodes\.slot:([A-Za-z0-9_.\-]+)>>")
+
+
+class Slot(str):
+    """Placeholder for a value that is filled in when a :class:`DefinitionTemplate` is substituted.
+
+    :param str name: Name of the value
+    :param str pattern: Regular expression that every value for this slot must match (optional)
+    """
+
+    def __new__(cls, name: str, pattern: Optional[str] = None) -> "Slot":
+        if not isinstance(name, str) or not _NAME.fullmatch(name):
+            raise ValueError(f"Slot name must contain only letters, digits, '_', '.', and '-': {name!r}")
+
+        slot = super().__new__(cls, _MARKER.format(name=name))
+        slot.name = name
+        slot.pattern = pattern
+        return slot
+
+    def __getnewargs__(self) -> Tuple[str, Optional[str]]:
+        return self.name, self.pattern
+
+    def __repr__(self) -> str:
+        pattern = "" if self.pattern is None else f", pattern={self.pattern!r}"
+        return f"Slot({self.name!r}{pattern})"
+
+
+def _slot_patterns(value: Any, patterns: Dict[str, Optional[str]]):
+    """Collect the pattern of every :class:`Slot` in a serialized definition."""
+    if isinstance(value, dict):
+        for key, member in value.items():
+            _slot_patterns(key, patterns)
+            _slot_patterns(member, patterns)
+    elif isinstance(value, list):
+        for member in value:
+            _slot_patterns(member, patterns)
+    elif isinstance(value, Slot) and value.pattern is not None:
+        if patterns.setdefault(value.name, value.pattern) != value.pattern:
+            raise TemplateError(
+                f"Slot {value.name!r} has conflicting patterns {patterns[value.name]!r} and {value.pattern!r}"
+            )
+
+
+@attr.s(frozen=True)
+class DefinitionTemplate:
+    """Serialized state machine definition with slots to fill in.
+
+    Use :func:`compile_template` to create a template.
+
+    :param tuple chunks: JSON text between the slots
+    :param tuple slots: Name of the slot after each chunk except the last
+    :param dict patterns: Regular expression that values must match, by slot name
+    :param bool ensure_ascii: Escape non-ASCII characters in values, as the definition was serialized
+    """
+
+    chunks: Tuple[str, ...] = attr.ib(converter=tuple)
+    slots: Tuple[str, ...] = attr.ib(converter=tuple)
+    patterns: Dict[str, str] = attr.ib(factory=dict)
+    ensure_ascii: bool = attr.ib(default=True)
+
+    @slots.validator
+    def _validate_slots(self, attribute, value):  # pylint: disable=unused-argument
+        if len(self.chunks) != len(value) + 1:
+            raise ValueError("A template must have exactly one more chunk than slots")
+
+    @property
+    def names(self) -> List[str]:
+        """Names of the slots in this template, in the order that they first appear."""
+        return list(dict.fromkeys(self.slots))
+
+    def _text(self, name: str, value: Any) -> str:
+        if isinstance(value, Slot):
+            raise TemplateError(f"Value for slot {name!r} is itself a slot: {value!r}")
+
+        _, value = serialize_name_and_value(name=name, value=value)
+        if not isinstance(value, str):
+            raise TemplateError(f"Value for slot {name!r} must serialize to a string, not {type(value).__name__}")
+
+        pattern = self.patterns.get(name)
+        if pattern is not None and not re.fullmatch(pattern, value):
+            raise TemplateError(f"Value {value!r} for slot {name!r} does not match {pattern!r}")
+
+        # Strip the quotes to get the value as it would appear inside any JSON string.
+        return json.dumps(value, ensure_ascii=self.ensure_ascii)[1:-1]
+
+    def substitute(self, values: Mapping[str, Any]) -> str:
+        """Fill in the slots and return the JSON definition.
+
+        Each value must be a string, an :class:`Enum` with a string value,
+        or a ``troposphere`` value that rhodes serializes to a string.
+
+        :param dict values: Value for each slot, by slot name
+        :raises TemplateError: if a slot has no value, a value has no slot, or a value is not valid
+        """
+        names = set(self.slots)
+        missing = names.difference(values)
+        if missing:
+            raise TemplateError(f"No values for slots: {sorted(missing)!r}")
+        unknown = set(values).difference(names)
+        if unknown:
+            raise TemplateError(f"Values for slots that are not in the template: {sorted(unknown)!r}")
+
+        texts = {name: self._text(name, value) for name, value in values.items()}
+        parts = [self.chunks[0]]
+        for name, chunk in zip(self.slots, self.chunks[1:]):
+            parts.append(texts[name])
+            parts.append(chunk)
+        return "".join(parts)
+
+    def to_dict(self, values: Mapping[str, Any]) -> Dict:
+        """Fill in the slots and return the definition as a dictionary.
+
+        :param dict values: Value for each slot, by slot name
+        """
+        return json.loads(self.substitute(values))
+
+    def definition_string(self, values: Mapping[str, Any]) -> Sub:
+        """Fill in the slots and return the definition for use in a ``troposphere`` state machine definition.
+
+        The template must have been compiled with the default JSON options,
+        as used by :meth:`StateMachine.definition_string`.
+
+        :param dict values: Value for each slot, by slot name
+        """
+        return Sub(self.substitute(values))
+
+
+def compile_template(
+    state_machine: StateMachine,
+    *,
+    indent: Optional[int] = None,
+    separators: Optional[Tuple[str, str]] = None,
+    ensure_ascii: bool = True,
+) -> DefinitionTemplate:
+    """Serialize a state machine that contains :class:`Slot` values into a template.
+
+    The JSON options are the same as for :func:`json.dumps`
+    and must match the options used for the definitions that the template replaces.
+    Keys are never sorted, because values can change the order of keys that contain slots.
+
+    :param StateMachine state_machine: State machine to compile
+    :param int indent: JSON indent
+    :param tuple separators: JSON item and key separators
+    :param bool ensure_ascii: Escape non-ASCII characters
+    """
+    definition = state_machine.to_dict()
+    patterns: Dict[str, Optional[str]] = {}
+    _slot_patterns(definition, patterns)
+
+    text = json.dumps(definition, indent=indent, separators=separators, ensure_ascii=ensure_ascii)
+    pieces = _MARKERS.split(text)
+    return DefinitionTemplate(chunks=pieces[0::2], slots=pieces[1::2], patterns=patterns, ensure_ascii=ensure_ascii)
@@ -0,0 +1,184 @@
+"""Unit test suite for ``rhodes.local.callbacks``."""
+import asyncio
+
+import pytest
+
+from rhodes.exceptions import StatesError
+from rhodes.local import LocalEngine, run
+from rhodes.local.callbacks import CallbackBroker
+from rhodes.states import StateMachine, Task
+from rhodes.structures import ContextPath, JsonPath, Parameters
+
+from ..unit_test_helpers import single_state_machine
+
+pytestmark = [pytest.mark.local, pytest.mark.functional]
+
+QUEUE = "arn:aws:states:::sqs:sendMessage"
+
+
+def _workflow(**kwargs) -> StateMachine:
+    return single_state_machine(
+        Task(
+            "Ask",
+            Resource=f"{QUEUE}.waitForTaskToken",
+            Parameters=Parameters(MessageBody=Parameters(Token=ContextPath().Task.Token, Delay=JsonPath("$.delay"))),
+            **kwargs,
+        )
+    )
+
+
+def _engine(broker: CallbackBroker, respond) -> LocalEngine:
+    engine = LocalEngine()
+    broker.register(engine)
+
+    @engine.register(QUEUE)
+    def _send(parameters, context):
+        body = parameters["MessageBody"]
+        asyncio.get_event_loop().call_later(body["Delay"], respond, body["Token"])
+        return {"MessageId": "1"}
+
+    return engine
+
+
+def test_send_task_success():
+    broker = CallbackBroker()
+    engine = _engine(broker, lambda token: broker.send_task_success(token, {"approved": True}))
+
+    execution = engine.execute(_workflow(), {"delay": 30})
+
+    assert execution.succeeded
+    assert execution.output == {"approved": True}
+    assert execution.duration == pytest.approx(30)
+    assert broker.latencies == [pytest.approx(30)]
+    (callback,) = broker.callbacks.values()
+    assert (callback.status, callback.state, callback.execution_id) == ("SUCCEEDED", "Ask", execution.execution_id)
+    with pytest.raises(StatesError) as excinfo:
+        broker.send_task_success(callback.task_token, {})
+
+    assert excinfo.value.error == "Sfn.TaskTimedOut"
+
+
+def test_send_task_failure():
+    broker = CallbackBroker()
+    engine = _engine(broker, lambda token: broker.send_task_failure(token, "Rejected", "No"))
+
+    execution = engine.execute(_workflow(), {"delay": 5})
+
+    assert (execution.error, execution.cause) == ("Rejected", "No")
+    assert broker.latencies == [pytest.approx(5)]
+
+
+def test_heartbeats():
+    broker = CallbackBroker()
+
+    def _respond(token):
+        loop = asyncio.get_event_loop()
+        for delay in (8, 16, 24):
+            loop.call_later(delay, broker.send_task_heartbeat, token)
+        loop.call_later(30, broker.send_task_success, token, "done")
+
+    execution = _engine(broker, _respond).execute(_workflow(HeartbeatSeconds=10), {"delay": 0})
+
+    assert execution.output == "done"
+    (callback,) = broker.callbacks.values()
+    assert callback.heartbeats == 3
+
+
+def test_heartbeat_timeout():
+    broker = CallbackBroker()
+    engine = _engine(broker, lambda token: broker.send_task_heartbeat(token))
+
+    execution = engine.execute(_workflow(HeartbeatSeconds=10), {"delay": 5})
+
+    assert execution.error == "States.HeartbeatTimeout"
+    assert execution.duration == pytest.approx(15)
+    (callback,) = broker.callbacks.values()
+    assert callback.status == "TIMED_OUT"
+    assert broker.latencies == []
+
+
+def test_task_timeout():
+    broker = CallbackBroker()
+    engine = _engine(broker, lambda token: broker.send_task_success(token, "late"))
+
+    execution = engine.execute(_workflow(TimeoutSeconds=10), {"delay": 20})
+
+    assert execution.error == "States.Timeout"
+    assert [callback.status for callback in broker.callbacks.values()] == ["TIMED_OUT"]
+
+
+def test_retry_gets_new_token():
+    broker = CallbackBroker()
+    engine = _engine(broker, lambda token: broker.send_task_failure(token, "Busy"))
+    workflow = single_state_machine(
+        Task(
+            "Ask",
+            Resource=f"{QUEUE}.waitForTaskToken",
+            Parameters=Parameters(MessageBody=Parameters(Token=ContextPath().Task.Token, Delay=1)),
+            Retry=[{"ErrorEquals": ["Busy"], "MaxAttempts": 2, "IntervalSeconds": 1}],
+        )
+    )
+
+    execution = engine.execute(workflow)
+
+    assert execution.error == "Busy"
+    assert len(broker.callbacks) == 3
+
+
+def test_invalid_token():
+    with pytest.raises(StatesError) as excinfo:
+        CallbackBroker().send_task_success("missing", {})
+
+    assert excinfo.value.error == "Sfn.InvalidToken"
+
+
+def test_sdk_callback_between_executions():
+    broker = CallbackBroker()
+    engine = LocalEngine()
+    broker.register(engine)
+    engine.register(QUEUE, lambda parameters, context: {})
+    responder = single_state_machine(
+        Task(
+            "Respond",
+            Resource="arn:aws:states:::aws-sdk:sfn:sendTaskSuccess",
+            Parameters=Parameters(TaskToken=JsonPath("$.token"), Output='{"answer": 42}'),
+        )
+    )
+
+    async def _both():
+        waiting = asyncio.ensure_future(engine.start(_workflow(), {"delay": 0}))
+        await asyncio.sleep(60)
+        (callback,) = broker.waiting
+        responded = await engine.start(responder, {"token": callback.task_token})
+        return await waiting, responded
+
+    waiting, responded = run(_both())
+
+    assert responded.succeeded
+    assert waiting.output == {"answer": 42}
+    assert waiting.duration == pytest.approx(60)
+
+
+def test_many_waiting_executions():
+    broker = CallbackBroker()
+    engine = _engine(broker, lambda token: broker.send_task_success(token, token))
+
+    definition = _workflow().to_dict()
+
+    async def _all():
+        return await asyncio.gather(*(engine.start(definition, {"delay": index % 10}) for index in range(2000)))
+
+    executions = run(_all())
+
+    assert all(execution.succeeded for execution in executions)
+    assert broker.peak_waiting == 2000
+    assert not broker.waiting
+    assert max(broker.latencies) == pytest.approx(9)
+
+
+def test_without_broker():
+    engine = LocalEngine()
+    engine.register(QUEUE, lambda parameters, context: "sent")
+    workflow = single_state_machine(Task("Ask", Resource=f"{QUEUE}.waitForTaskToken"))
+
+    assert engine.execute(workflow).output == "sent"
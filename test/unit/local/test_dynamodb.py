@@ -0,0 +1,129 @@
+"""Unit test suite for ``rhodes.local.dynamodb``."""
+import pytest
+
+from rhodes.exceptions import StatesError
+from rhodes.local import LocalEngine, run
+from rhodes.local.dynamodb import InMemoryDynamoDb
+from rhodes.states import StateMachine
+from rhodes.states.services.dynamodb import AmazonDynamoDb
+from rhodes.structures import JsonPath
+
+from ..unit_test_helpers import single_state_machine
+
+pytestmark = [pytest.mark.local, pytest.mark.functional]
+
+TABLE = "orders-prod"
+
+
+def _requests(count: int):
+    return [{"PutRequest": {"Item": {"pk": {"S": str(index)}, "total": {"N": "1"}}}} for index in range(count)]
+
+
+def _bulk_write(**kwargs) -> StateMachine:
+    return single_state_machine(
+        AmazonDynamoDb(TableName=TABLE).bulk_write("Save", Items="$.orders", ResultPath="$.saved", **kwargs)
+    )
+
+
+def _execute(database: InMemoryDynamoDb, workflow: StateMachine, count: int):
+    engine = LocalEngine()
+    database.register(engine)
+    return engine.execute(workflow, {"orders": _requests(count)})
+
+
+def test_bulk_write_without_throttling():
+    database = InMemoryDynamoDb(latency=0.5)
+    table = database.create_table(TABLE)
+
+    execution = _execute(database, _bulk_write(MaxConcurrency=2), 110)
+
+    assert execution.succeeded
+    assert len(table) == 110
+    assert execution.output["saved"] == [{"Attempts": 1}] * 5
+    assert execution.output["orders"] == _requests(110)
+    assert database.stats.requests == 5
+    # Five requests, two at a time
+    assert execution.duration == pytest.approx(1.5)
+
+
+def test_bulk_write_input_path_keeps_input():
+    database = InMemoryDynamoDb()
+    table = database.create_table(TABLE)
+    engine = LocalEngine()
+    database.register(engine)
+    workflow = single_state_machine(
+        AmazonDynamoDb(TableName=TABLE).bulk_write("Save", Items="$.orders", InputPath="$.data", ResultPath="$.saved")
+    )
+    data = {"keep": 1, "data": {"orders": _requests(30)}}
+
+    execution = engine.execute(workflow, data)
+
+    assert execution.succeeded
+    assert len(table) == 30
+    assert execution.output == dict(data, saved=[{"Attempts": 1}] * 2)
+
+
+def test_bulk_write_retries_unprocessed_items():
+    database = InMemoryDynamoDb(write_capacity=60)
+    table = database.create_table(TABLE)
+
+    execution = _execute(database, _bulk_write(), 400)
+
+    assert execution.succeeded
+    assert len(table) == 400
+    assert database.stats.unprocessed_items > 0
+    assert database.stats.throttled_requests > 0
+    assert any(chunk["Attempts"] > 1 for chunk in execution.output["saved"])
+    # Throughput is bounded by the table's write capacity.
+    assert database.stats.write_throughput <= 60 * 1.25
+    assert execution.duration >= (400 - 60) / 60
+
+
+def test_bulk_write_gives_up_after_max_attempts():
+    database = InMemoryDynamoDb(write_capacity=10)
+    database.create_table(TABLE)
+
+    execution = _execute(database, _bulk_write(MaxAttempts=2, IntervalSeconds=1), 200)
+
+    assert execution.status == "FAILED"
+    assert execution.error in ("DynamoDb.UnprocessedItems", "DynamoDb.ProvisionedThroughputExceededException")
+
+
+def test_batch_write_item_deletes_and_validates():
+    database = InMemoryDynamoDb()
+    table = database.create_table(TABLE, "pk", "sk")
+    item = {"pk": {"S": "a"}, "sk": {"N": "1"}}
+
+    async def _calls():
+        await database.batch_write_item({"RequestItems": {TABLE: [{"PutRequest": {"Item": item}}]}}, None)
+        assert len(table) == 1
+        await database.batch_write_item({"RequestItems": {TABLE: [{"DeleteRequest": {"Key": item}}]}}, None)
+        assert not table
+
+        with pytest.raises(StatesError) as excinfo:
+            await database.batch_write_item({"RequestItems": {TABLE: _requests(26)}}, None)
+        assert excinfo.value.error == "DynamoDb.ValidationException"
+
+        with pytest.raises(StatesError) as excinfo:
+            await database.batch_write_item({"RequestItems": {"missing": _requests(1)}}, None)
+        assert excinfo.value.error == "DynamoDb.ResourceNotFoundException"
+
+    run(_calls())
+
+
+def test_single_item_integrations():
+    database = InMemoryDynamoDb()
+    database.create_table(TABLE)
+    table = AmazonDynamoDb(TableName=TABLE)
+    item = {"pk": {"S": "a"}, "total": {"N": "3"}}
+
+    workflow = StateMachine()
+    workflow.start_with(table.put_item("Put", Item=JsonPath("$.item"), ResultPath="$.put")).then(
+        table.get_item("Get", Key={"pk": {"S": "a"}}, ResultPath="$.got")
+    ).end()
+
+    engine = LocalEngine()
+    database.register(engine)
+    execution = engine.execute(workflow, {"item": item})
+
+    assert execution.output["got"] == {"Item": item}
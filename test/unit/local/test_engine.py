@@ -0,0 +1,256 @@
+"""Unit test suite for ``rhodes.local.engine``."""
+import asyncio
+
+import pytest
+
+from rhodes.choice_rules import VariablePath
+from rhodes.exceptions import LocalExecutionError, StatesError
+from rhodes.local import LocalEngine, run
+from rhodes.states import Choice, Fail, Map, Parallel, Pass, StateMachine, Succeed, Task, Wait
+from rhodes.structures import ContextPath, JsonPath, Parameters
+
+from ..unit_test_helpers import single_state_machine
+
+pytestmark = [pytest.mark.local, pytest.mark.functional]
+
+FUNCTION = "arn:aws:lambda:us-east-1:123456789012:function:work"
+
+
+def _engine(handler) -> LocalEngine:
+    return LocalEngine({FUNCTION: handler})
+
+
+def test_pass_paths_and_intrinsics():
+    workflow = single_state_machine(
+        Pass(
+            "Shape",
+            InputPath="$.order",
+            Parameters=Parameters(
+                **{
+                    "Id.$": "$.id",
+                    "Label.$": "States.Format('order {} of {}', $.id, $.customer)",
+                    "Chunks.$": "States.ArrayPartition($.lines, 2)",
+                    "Count.$": "States.ArrayLength($.lines)",
+                }
+            ),
+            ResultPath="$.shaped",
+        )
+    )
+
+    execution = LocalEngine().execute(workflow, {"order": {"id": 7, "customer": "ana", "lines": [1, 2, 3]}})
+
+    assert execution.succeeded
+    assert execution.output == {
+        "order": {"id": 7, "customer": "ana", "lines": [1, 2, 3]},
+        "shaped": {"Id": 7, "Label": "order 7 of ana", "Chunks": [[1, 2], [3]], "Count": 3},
+    }
+
+
+def test_task_handler_and_wait_use_virtual_time():
+    async def _slow_double(event, context):
+        await asyncio.sleep(30)
+        return event["value"] * 2
+
+    workflow = StateMachine()
+    workflow.start_with(Wait("Pause", Seconds=3600)).then(
+        Task("Double", Resource=FUNCTION, ResultPath="$.doubled")
+    ).end()
+
+    execution = _engine(_slow_double).execute(workflow, {"value": 21})
+
+    assert execution.output == {"value": 21, "doubled": 42}
+    assert execution.duration == 3630
+    assert execution.transitions == 2
+    assert execution.task_calls[FUNCTION] == 1
+
+
+def test_retry_with_backoff():
+    calls = []
+
+    def _flaky(event, context):
+        calls.append(context.retry_count)
+        if len(calls) < 3:
+            raise StatesError("Service.Unavailable", "try again")
+        return "ok"
+
+    workflow = single_state_machine(
+        Task(
+            "Flaky",
+            Resource=FUNCTION,
+            Retry=[{"ErrorEquals": ["Service.Unavailable"], "IntervalSeconds": 2, "BackoffRate": 3, "MaxAttempts": 5}],
+        )
+    )
+
+    execution = _engine(_flaky).execute(workflow)
+
+    assert execution.output == "ok"
+    assert calls == [0, 1, 2]
+    assert execution.duration == 2 + 6
+
+
+def test_catch_after_retries_exhausted():
+    def _broken(event, context):
+        raise ValueError("bad input")
+
+    workflow = StateMachine()
+    task = workflow.start_with(
+        Task(
+            "Broken",
+            Resource=FUNCTION,
+            Retry=[{"ErrorEquals": ["States.ALL"], "MaxAttempts": 1}],
+            Catch=[{"ErrorEquals": ["ValueError"], "ResultPath": "$.error", "Next": "Recover"}],
+        )
+    )
+    task.end()
+    workflow.add_state(Succeed("Recover"))
+
+    execution = _engine(_broken).execute(workflow, {"a": 1})
+
+    assert execution.succeeded
+    assert execution.output == {"a": 1, "error": {"Error": "ValueError", "Cause": "bad input"}}
+    assert execution.task_calls[FUNCTION] == 2
+
+
+def test_task_timeout():
+    async def _hang(event, context):
+        await asyncio.sleep(600)
+
+    execution = _engine(_hang).execute(single_state_machine(Task("Hang", Resource=FUNCTION, TimeoutSeconds=60)))
+
+    assert execution.error == "States.Timeout"
+    assert execution.duration == 60
+
+
+def test_choice_and_fail():
+    workflow = StateMachine()
+    decide = workflow.start_with(Choice("Size?"))
+    decide.if_(VariablePath("$.size") > 10).then(Fail("Too big", Error="Size.Exceeded", Cause="too big"))
+    decide.else_(Succeed("Fine"))
+
+    engine = LocalEngine()
+
+    assert engine.execute(workflow, {"size": 3}).succeeded
+    failed = engine.execute(workflow, {"size": 30})
+    assert (failed.status, failed.error, failed.cause) == ("FAILED", "Size.Exceeded", "too big")
+
+
+def test_map_concurrency_and_context():
+    running = []
+    peak = []
+
+    async def _work(event, context):
+        running.append(event)
+        peak.append(len(running))
+        await asyncio.sleep(1)
+        running.remove(event)
+        return event["index"] * 10
+
+    iterator = single_state_machine(Task("Work", Resource=FUNCTION))
+    workflow = single_state_machine(
+        Map(
+            "Each",
+            Iterator=iterator,
+            ItemsPath="$.items",
+            MaxConcurrency=2,
+            Parameters=Parameters(index=ContextPath("$$.Map.Item.Index"), value=ContextPath("$$.Map.Item.Value")),
+        )
+    )
+
+    execution = _engine(_work).execute(workflow, {"items": ["a", "b", "c", "d", "e"]})
+
+    assert execution.output == [0, 10, 20, 30, 40]
+    assert max(peak) == 2
+    assert execution.duration == 3
+
+
+def test_parallel_failure_cancels_other_branches():
+    async def _slow(event, context):
+        await asyncio.sleep(100)
+
+    slow = single_state_machine(Task("Slow", Resource=FUNCTION))
+    failing = StateMachine()
+    failing.start_with(Fail("Broken", Error="Branch.Failed"))
+
+    execution = _engine(_slow).execute(single_state_machine(Parallel("Both", Branches=[slow, failing])))
+
+    assert execution.error == "Branch.Failed"
+    assert execution.duration == 0
+
+
+def test_many_executions_on_one_clock():
+    async def _wait(event, context):
+        await asyncio.sleep(event)
+        return event
+
+    engine = _engine(_wait)
+    workflow = single_state_machine(Task("Wait", Resource=FUNCTION))
+
+    async def _all():
+        return await asyncio.gather(*(engine.start(workflow, seconds) for seconds in (5, 1, 3)))
+
+    executions = run(_all())
+
+    assert [execution.output for execution in executions] == [5, 1, 3]
+    assert [execution.stopped for execution in executions] == [5, 1, 3]
+
+
+def test_register_pattern_and_integration_suffix():
+    engine = LocalEngine()
+
+    @engine.register("arn:aws:lambda:*")
+    def _any_function(event, context):
+        return context.resource
+
+    engine.register("arn:aws:states:::sqs:sendMessage", lambda event, context: "sent")
+
+    assert engine.handler(FUNCTION) is _any_function
+    assert engine.handler("arn:aws:states:::sqs:sendMessage.waitForTaskToken")({}, None) == "sent"
+    with pytest.raises(LocalExecutionError) as excinfo:
+        engine.handler("arn:aws:states:::sns:publish")
+
+    excinfo.match("No local handler registered")
+
+
+def test_waiting_forever_is_an_error():
+    async def _never(event, context):
+        await asyncio.get_event_loop().create_future()
+
+    with pytest.raises(LocalExecutionError) as excinfo:
+        _engine(_never).execute(single_state_machine(Task("Never", Resource=FUNCTION)))
+
+    excinfo.match("will never happen")
+
+
+def test_missing_path_fails_execution():
+    execution = LocalEngine().execute(single_state_machine(Pass("Read", InputPath=JsonPath("$.missing"))), {})
+
+    assert execution.error == "States.Runtime"
+
+
+@pytest.mark.parametrize("error_equals", (["States.ALL"], ["States.TaskFailed"]))
+def test_runtime_errors_are_not_caught_by_wildcards(error_equals):
+    workflow = StateMachine()
+    task = workflow.start_with(
+        Task(
+            "Read",
+            Resource=FUNCTION,
+            ResultPath="$.count.value",
+            Retry=[{"ErrorEquals": error_equals, "MaxAttempts": 2}],
+            Catch=[{"ErrorEquals": error_equals, "Next": "Recover"}],
+        )
+    )
+    task.end()
+    workflow.add_state(Succeed("Recover"))
+
+    execution = _engine(lambda event, context: 2).execute(workflow, {"count": 1})
+
+    assert execution.error == "States.Runtime"
+    assert execution.task_calls[FUNCTION] == 1
+
+
+@pytest.mark.parametrize("data", ({"count": 1}, {"count": "one"}, {"count": [1]}))
+def test_result_path_through_non_object_fails_execution(data):
+    execution = LocalEngine().execute(single_state_machine(Pass("Write", Result=2, ResultPath="$.count.value")), data)
+
+    assert execution.error == "States.Runtime"
+    assert "Unable to apply ResultPath" in execution.cause
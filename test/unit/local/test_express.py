@@ -0,0 +1,122 @@
+"""Unit test suite for ``rhodes.local.express`` and execution timeouts."""
+import asyncio
+
+import pytest
+
+from rhodes.exceptions import InvalidDefinitionError
+from rhodes.local import LocalEngine
+from rhodes.local.express import ExpressSimulation, simulate_express
+from rhodes.states import Map, Parallel, StateMachine, Task
+from rhodes.structures import ProcessorConfig
+
+from ..unit_test_helpers import single_state_machine
+
+pytestmark = [pytest.mark.local, pytest.mark.functional]
+
+FUNCTION = "arn:aws:lambda:us-east-1:123456789012:function:work"
+
+
+def _engine() -> LocalEngine:
+    engine = LocalEngine()
+
+    @engine.register(FUNCTION)
+    async def _work(event, context):
+        await asyncio.sleep(event)
+        return event
+
+    return engine
+
+
+def _workflow(**kwargs) -> StateMachine:
+    return single_state_machine(Task("Work", Resource=FUNCTION), **kwargs)
+
+
+def test_state_machine_timeout():
+    execution = _engine().execute(_workflow(TimeoutSeconds=10), 30)
+
+    assert execution.status == "TIMED_OUT"
+    assert (execution.error, execution.cause) == ("States.Timeout", "Execution timed out after 10 seconds")
+    assert execution.duration == pytest.approx(10)
+
+
+@pytest.mark.parametrize(
+    "workflow, execution_type, status",
+    (
+        (_workflow(), None, "SUCCEEDED"),
+        (_workflow(), "EXPRESS", "TIMED_OUT"),
+        (_workflow(StateMachineType="EXPRESS"), None, "TIMED_OUT"),
+        (_workflow(StateMachineType="EXPRESS"), "STANDARD", "SUCCEEDED"),
+    ),
+)
+def test_express_timeout(workflow, execution_type, status):
+    execution = _engine().execute(workflow, 400, execution_type=execution_type)
+
+    assert execution.status == status
+    assert execution.duration == pytest.approx(300 if status == "TIMED_OUT" else 400)
+
+
+def test_timeout_cancels_branches():
+    fan_out = Parallel("FanOut")
+    for _ in range(2):
+        fan_out.add_branch(_workflow())
+    workflow = single_state_machine(fan_out, TimeoutSeconds=5)
+    engine = _engine()
+
+    execution = engine.execute(workflow, 10)
+
+    assert execution.status == "TIMED_OUT"
+    assert execution.task_calls[FUNCTION] == 2
+
+
+def test_express_child_executions_time_out():
+    workflow = single_state_machine(
+        Map(
+            "Each",
+            ItemProcessor=_workflow(),
+            ProcessorConfig=ProcessorConfig.distributed("EXPRESS"),
+            ItemsPath="$",
+            ToleratedFailureCount=1,
+        )
+    )
+
+    execution = _engine().execute(workflow, [1, 600])
+
+    assert execution.succeeded
+    assert execution.output == [1, {"Error": "States.Timeout", "Cause": "Execution timed out after 300 seconds"}]
+    assert [child.status for child in execution.map_runs[0].executions] == ["SUCCEEDED", "TIMED_OUT"]
+
+
+def test_simulate_express():
+    simulation = simulate_express(_engine(), _workflow(), [0.25, 1, 1.05, 400], arrival_rate=2, memory_mb=100)
+
+    assert (simulation.succeeded, simulation.failed, simulation.timed_out) == (3, 0, 1)
+    assert not simulation.within_limit
+    # The last execution starts at 1.5 seconds and times out after 300 seconds.
+    assert simulation.makespan == pytest.approx(301.5)
+    assert simulation.executions_per_second == pytest.approx(4 / 301.5)
+    assert simulation.max_duration == pytest.approx(300)
+    # 100 MB is billed as 128 MB; durations are billed in 100 ms increments.
+    assert simulation.gb_seconds == pytest.approx((3 + 10 + 11 + 3000) * 0.1 * 0.125)
+    assert simulation.cost == pytest.approx(4 * 1e-6 + simulation.gb_seconds * 0.00001667)
+
+
+def test_simulate_express_throughput():
+    simulation = simulate_express(_engine(), _workflow(), [1] * 100)
+
+    assert simulation.within_limit
+    assert simulation.makespan == pytest.approx(1)
+    assert simulation.executions_per_second == pytest.approx(100)
+    assert simulation.gb_seconds == pytest.approx(100 * 1 * 0.0625)
+
+
+def test_simulate_express_invalid():
+    workflow = single_state_machine(Task("Work", Resource=f"{FUNCTION}.waitForTaskToken"))
+
+    with pytest.raises(InvalidDefinitionError):
+        simulate_express(_engine(), workflow, [1])
+
+
+def test_empty_simulation():
+    simulation = ExpressSimulation()
+
+    assert (simulation.makespan, simulation.executions_per_second, simulation.cost) == (0, 0, 0)
@@ -0,0 +1,245 @@
+"""Unit test suite for ``rhodes.local.jobs``."""
+import asyncio
+import json
+import random
+
+import pytest
+
+from rhodes.identifiers import IntegrationPattern
+from rhodes.local import LocalEngine, run
+from rhodes.local.jobs import (
+    LocalBatch,
+    LocalEcs,
+    LocalGlue,
+    LocalJobService,
+    LocalSageMaker,
+    exponential,
+    lognormal,
+    uniform,
+)
+from rhodes.states import StateMachine, Task
+from rhodes.states.services.batch import AwsBatch
+from rhodes.states.services.ecs import AmazonEcs
+from rhodes.states.services.glue import AwsGlue
+from rhodes.states.services.sagemaker import AmazonSageMakerCreateTrainingJob
+from rhodes.structures import Parameters
+
+from ..unit_test_helpers import single_state_machine
+
+pytestmark = [pytest.mark.local, pytest.mark.functional]
+
+
+def _batch_workflow(pattern=IntegrationPattern.SYNCHRONOUS, **kwargs) -> StateMachine:
+    return single_state_machine(
+        AwsBatch("Job", JobDefinition="etl", JobName="etl", JobQueue="queue", Pattern=pattern, **kwargs)
+    )
+
+
+def _run_all(engine: LocalEngine, workflow: StateMachine, count: int):
+    definition = workflow.to_dict()
+
+    async def _all():
+        return await asyncio.gather(*(engine.start(definition) for _ in range(count)))
+
+    return run(_all())
+
+
+def test_batch_queue_contention():
+    batch = LocalBatch(capacity={"queue": 4}, vcpus=2, startup=30, duration=600)
+    engine = LocalEngine()
+    batch.register(engine)
+
+    executions = _run_all(engine, _batch_workflow(), 5)
+
+    # Two jobs fit at once, so five jobs run in three rounds.
+    assert sorted(execution.duration for execution in executions) == pytest.approx([630, 630, 1260, 1260, 1890])
+    assert executions[0].output["Status"] == "SUCCEEDED"
+    assert batch.stats.makespan == pytest.approx(1890)
+    assert batch.stats.peak_queued == {"queue": 3}
+    assert batch.stats.max_queue_time == pytest.approx(1260)
+    assert batch.stats.mean_queue_time == pytest.approx((0 + 0 + 630 + 630 + 1260) / 5)
+    assert batch.utilization("queue") == pytest.approx(5 * 2 * 630 / (4 * 1890))
+
+
+def test_batch_array_job():
+    batch = LocalBatch(capacity=8, duration=100)
+    engine = LocalEngine()
+    batch.register(engine)
+    workflow = _batch_workflow(
+        ArrayProperties={"Size": 20}, ContainerOverrides={"ResourceRequirements": [{"Type": "VCPU", "Value": "2"}]}
+    )
+
+    execution = engine.execute(workflow)
+
+    # Four children run at a time.
+    assert execution.duration == pytest.approx(500)
+    (job,) = batch.stats.jobs
+    assert (job.units, job.count, job.run_time) == (2.0, 20, pytest.approx(2000))
+
+
+def test_request_response_keeps_capacity():
+    batch = LocalBatch(capacity=1, duration=100)
+    engine = LocalEngine()
+    batch.register(engine)
+    workflow = StateMachine()
+    workflow.start_with(
+        AwsBatch(
+            "Submit",
+            JobDefinition="etl",
+            JobName="background",
+            JobQueue="queue",
+            Pattern=IntegrationPattern.REQUEST_RESPONSE,
+        )
+    ).then(
+        AwsBatch("Wait", JobDefinition="etl", JobName="etl", JobQueue="queue", Pattern=IntegrationPattern.SYNCHRONOUS)
+    ).end()
+
+    execution = engine.execute(workflow)
+
+    assert execution.succeeded
+    assert execution.duration == pytest.approx(200)
+    assert [job.name for job in batch.stats.jobs] == ["background", "etl"]
+    assert batch.stats.jobs[1].queue_time == pytest.approx(100)
+
+
+def test_job_failure():
+    batch = LocalBatch(failure_rate=1, duration=10)
+    engine = LocalEngine()
+    batch.register(engine)
+
+    execution = engine.execute(_batch_workflow())
+
+    assert execution.error == "States.TaskFailed"
+    assert json.loads(execution.cause)["Status"] == "FAILED"
+
+
+def test_over_capacity():
+    batch = LocalBatch(capacity=4, vcpus=8)
+    engine = LocalEngine()
+    batch.register(engine)
+
+    assert engine.execute(_batch_workflow()).error == "Batch.ClientException"
+
+
+def test_job_service_requires_job_methods():
+    class _Partial(LocalJobService):
+        def demand(self, parameters):
+            return "job", "pool", 1.0, 1
+
+    with pytest.raises(TypeError):
+        _Partial()
+
+
+def test_reject_without_queue():
+    glue = LocalGlue(capacity=15, duration=60, queue=False)
+    engine = LocalEngine()
+    glue.register(engine)
+
+    executions = _run_all(
+        engine, single_state_machine(AwsGlue("Job", JobName="crawl", Pattern=IntegrationPattern.SYNCHRONOUS)), 2
+    )
+
+    assert [execution.error for execution in executions] == [None, "Glue.ResourceNumberLimitExceededException"]
+    assert executions[0].output["JobRunState"] == "SUCCEEDED"
+
+
+def test_glue_dpus():
+    glue = LocalGlue(capacity=20, dpus={"big": 20}, duration=60)
+    engine = LocalEngine()
+    glue.register(engine)
+    workflow = StateMachine()
+    workflow.start_with(
+        Task("Big", Resource="arn:aws:states:::glue:startJobRun.sync", Parameters=Parameters(JobName="big"))
+    ).then(
+        Task(
+            "Workers",
+            Resource="arn:aws:states:::glue:startJobRun.sync",
+            Parameters=Parameters(JobName="small", NumberOfWorkers=5, WorkerType="G.2X"),
+        )
+    ).end()
+
+    engine.execute(workflow)
+
+    assert [job.units for job in glue.stats.jobs] == [20, 10]
+
+
+def test_ecs_tasks():
+    ecs = LocalEcs(capacity={"cluster": 3}, duration=50)
+    engine = LocalEngine()
+    ecs.register(engine)
+    workflow = single_state_machine(
+        AmazonEcs(
+            "Run",
+            Cluster="arn:aws:ecs:us-east-1:123456789012:cluster/cluster",
+            TaskDefinition="worker:1",
+            Pattern=IntegrationPattern.SYNCHRONOUS,
+        )
+    )
+
+    executions = _run_all(engine, workflow, 4)
+
+    assert max(execution.duration for execution in executions) == pytest.approx(100)
+    assert executions[0].output["Tasks"][0]["LastStatus"] == "STOPPED"
+
+
+def test_sagemaker_instances():
+    sagemaker = LocalSageMaker(capacity={"ml.p3.2xlarge": 2}, startup=120, duration=3600)
+    engine = LocalEngine()
+    sagemaker.register(engine)
+    workflow = single_state_machine(
+        AmazonSageMakerCreateTrainingJob(
+            "Train",
+            TrainingJobName="model",
+            AlgorithmSpecification={},
+            OutputDataConfig={},
+            ResourceConfig={"InstanceType": "ml.p3.2xlarge", "InstanceCount": 2},
+            RoleArn="role",
+            StoppingCondition={},
+            Pattern=IntegrationPattern.SYNCHRONOUS,
+        )
+    )
+
+    executions = _run_all(engine, workflow, 2)
+
+    assert sorted(execution.duration for execution in executions) == pytest.approx([3720, 7440])
+    assert executions[0].output["TrainingJobStatus"] == "Completed"
+    assert executions[0].output["TrainingJobArn"].endswith(":training-job/model")
+
+
+def test_task_timeout_releases_capacity():
+    batch = LocalBatch(capacity=1, duration=100)
+    engine = LocalEngine()
+    batch.register(engine)
+
+    executions = _run_all(engine, _batch_workflow(TimeoutSeconds=150), 3)
+
+    assert [execution.error for execution in executions] == [None, "States.Timeout", "States.Timeout"]
+    assert [job.status for job in batch.stats.jobs] == ["SUCCEEDED", "FAILED", "FAILED"]
+    # The second job started after 100 seconds and was stopped at 150 seconds.
+    assert batch.stats.jobs[1].run_time == pytest.approx(50)
+    assert batch.stats.jobs[2].started is None
+
+
+@pytest.mark.parametrize(
+    "distribution, expected",
+    ((uniform(10, 20), (10, 20)), (exponential(5), (0, None)), (lognormal(60, 0.5), (0, None))),
+)
+def test_distributions(distribution, expected):
+    generator = random.Random(1)
+    samples = [distribution(generator) for _ in range(200)]
+
+    low, high = expected
+    assert all(sample >= low for sample in samples)
+    if high is not None:
+        assert all(sample <= high for sample in samples)
+
+
+def test_seeded_runs_repeat():
+    def _makespan() -> float:
+        batch = LocalBatch(capacity=4, duration=lognormal(600, 0.5), startup=uniform(30, 90), seed=7)
+        engine = LocalEngine()
+        batch.register(engine)
+        _run_all(engine, _batch_workflow(), 10)
+        return batch.stats.makespan
+
+    assert _makespan() == _makespan()
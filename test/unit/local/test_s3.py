@@ -0,0 +1,195 @@
+"""Unit test suite for ``rhodes.local.s3`` and distributed Map states."""
+import asyncio
+import gzip
+import json
+
+import pytest
+
+from rhodes.exceptions import StatesError
+from rhodes.local import LocalEngine
+from rhodes.local.s3 import LocalS3
+from rhodes.states import Map, StateMachine, Task
+from rhodes.structures import ContextPath, ItemBatcher, ItemReader, JsonPath, Parameters, ProcessorConfig, ResultWriter
+
+from ..unit_test_helpers import single_state_machine
+
+pytestmark = [pytest.mark.local, pytest.mark.functional]
+
+FUNCTION = "arn:aws:lambda:us-east-1:123456789012:function:work"
+
+
+@pytest.fixture
+def storage(tmp_path):
+    (tmp_path / "data").mkdir()
+    (tmp_path / "results").mkdir()
+    (tmp_path / "data" / "rows.csv").write_text("id,value\n1,10\n2,20\n3,oops\n4,40\n")
+    (tmp_path / "data" / "items.json").write_text(json.dumps([{"value": value} for value in range(10)]))
+    return LocalS3(tmp_path, latency=0.5)
+
+
+def _engine(storage: LocalS3, duration: float = 1.0) -> LocalEngine:
+    engine = LocalEngine()
+    storage.register(engine)
+
+    @engine.register(FUNCTION)
+    async def _work(event, context):
+        await asyncio.sleep(duration)
+        if "Items" in event:
+            return [int(item["value"]) * event["BatchInput"]["scale"] for item in event["Items"]]
+        return int(event["value"]) * 2
+
+    return engine
+
+
+def _workflow(**kwargs) -> StateMachine:
+    processor = single_state_machine(Task("Work", Resource=FUNCTION))
+    return single_state_machine(
+        Map("Each", ItemProcessor=processor, ProcessorConfig=ProcessorConfig.distributed("EXPRESS"), **kwargs)
+    )
+
+
+def test_json_items_with_max_concurrency(storage):
+    workflow = _workflow(ItemReader=ItemReader.json_file("data", "items.json", MaxItems=6), MaxConcurrency=2)
+
+    execution = _engine(storage).execute(workflow)
+
+    assert execution.succeeded
+    assert execution.output == [0, 2, 4, 6, 8, 10]
+    map_run = execution.map_runs[0]
+    assert map_run.items == 6
+    assert map_run.succeeded == 6
+    # Read the object, then three rounds of two child executions.
+    assert execution.duration == pytest.approx(0.5 + 3)
+    assert map_run.duration == pytest.approx(0.5 + 3)
+    # Child executions are counted separately from the parent execution.
+    assert execution.transitions == 1
+    assert execution.task_calls[FUNCTION] == 6
+
+
+def test_csv_batches_with_result_writer(storage, tmp_path):
+    workflow = _workflow(
+        ItemReader=ItemReader.csv_file("data", JsonPath("$.key")),
+        ItemBatcher=ItemBatcher(MaxItemsPerBatch=2, BatchInput=Parameters(scale=JsonPath("$.scale"))),
+        ResultWriter=ResultWriter.s3("results", "runs"),
+        ToleratedFailureCount=1,
+        Label="Rows",
+    )
+
+    execution = _engine(storage).execute(workflow, {"key": "rows.csv", "scale": 3})
+
+    assert execution.succeeded, execution.cause
+    map_run = execution.map_runs[0]
+    assert (map_run.items, map_run.succeeded, map_run.failed) == (4, 1, 1)
+    assert ":mapRun:local/Rows:" in execution.output["MapRunArn"]
+
+    details = execution.output["ResultWriterDetails"]
+    manifest = json.loads((tmp_path / "results" / details["Key"]).read_text())
+    assert manifest["MapRunArn"] == execution.output["MapRunArn"]
+    assert [len(manifest["ResultFiles"][status]) for status in ("SUCCEEDED", "FAILED", "PENDING")] == [1, 1, 0]
+
+    succeeded = json.loads((tmp_path / "results" / manifest["ResultFiles"]["SUCCEEDED"][0]["Key"]).read_text())
+    assert json.loads(succeeded[0]["Output"]) == [30, 60]
+    assert json.loads(succeeded[0]["Input"])["Items"] == [{"id": "1", "value": "10"}, {"id": "2", "value": "20"}]
+    failed = json.loads((tmp_path / "results" / manifest["ResultFiles"]["FAILED"][0]["Key"]).read_text())
+    assert failed[0]["Error"] == "ValueError"
+
+
+@pytest.mark.parametrize(
+    "tolerance, succeeded",
+    (({}, False), ({"ToleratedFailureCount": 1}, True), ({"ToleratedFailurePercentage": 20}, False)),
+)
+def test_tolerated_failures(storage, tolerance, succeeded):
+    workflow = _workflow(ItemReader=ItemReader.csv_file("data", "rows.csv"), **tolerance)
+
+    execution = _engine(storage).execute(workflow)
+
+    assert execution.succeeded is succeeded
+    if succeeded:
+        assert execution.output[2] == {"Error": "ValueError", "Cause": "invalid literal for int() with base 10: 'oops'"}
+    else:
+        assert execution.error == "States.ExceedToleratedFailureThreshold"
+
+
+def test_list_objects(storage):
+    processor = single_state_machine(Task("Work", Resource=FUNCTION))
+    workflow = single_state_machine(
+        Map(
+            "Each",
+            ItemProcessor=processor,
+            ProcessorConfig=ProcessorConfig.distributed(),
+            ItemReader=ItemReader.s3_objects("data"),
+            ItemSelector=Parameters(key=ContextPath().Map.Item.Value.Key),
+        )
+    )
+    engine = LocalEngine()
+    storage.register(engine)
+    engine.register(FUNCTION, lambda event, context: event["key"])
+
+    execution = engine.execute(workflow)
+
+    assert execution.output == ["items.json", "rows.csv"]
+
+
+def test_manifest(storage, tmp_path):
+    (tmp_path / "inventory").mkdir()
+    (tmp_path / "inventory" / "part-0.csv.gz").write_bytes(gzip.compress(b'"data","a.txt","3"\n"data","b.txt","5"\n'))
+    manifest = {
+        "sourceBucket": "data",
+        "destinationBucket": "arn:aws:s3:::inventory",
+        "fileFormat": "CSV",
+        "fileSchema": "Bucket, Key, Size",
+        "files": [{"key": "part-0.csv.gz"}],
+    }
+    (tmp_path / "inventory" / "manifest.json").write_text(json.dumps(manifest))
+    workflow = _workflow(ItemReader=ItemReader.manifest("inventory", "manifest.json"))
+    engine = LocalEngine()
+    storage.register(engine)
+    engine.register(FUNCTION, lambda event, context: event)
+
+    execution = engine.execute(workflow)
+
+    assert execution.output == [
+        {"Bucket": "data", "Key": "a.txt", "Size": "3"},
+        {"Bucket": "data", "Key": "b.txt", "Size": "5"},
+    ]
+    assert storage.requests == 2
+
+
+def test_missing_object(storage):
+    execution = _engine(storage).execute(_workflow(ItemReader=ItemReader.json_file("data", "missing.json")))
+
+    assert execution.error == "S3.NoSuchKey"
+
+
+@pytest.mark.parametrize("key", ("", "../outside", "nested/../../outside", "{root}/outside"))
+def test_put_object_invalid_key(storage, tmp_path, key):
+    key = key.format(root=tmp_path)
+    engine = LocalEngine()
+    storage.register(engine)
+    workflow = single_state_machine(Task("Put", Resource="arn:aws:states:::s3:putObject"))
+
+    execution = engine.execute(workflow, {"Bucket": "results", "Key": key, "Body": "x"})
+
+    assert execution.error == "S3.InvalidArgument"
+    assert not (tmp_path / "outside").exists()
+    with pytest.raises(StatesError):
+        storage._object("results", key)  # pylint: disable=protected-access
+
+
+def test_get_object_absolute_key(storage, tmp_path):
+    (tmp_path / "secret.txt").write_text("secret")
+
+    with pytest.raises(StatesError) as excinfo:
+        storage._object("data", str(tmp_path / "secret.txt"))  # pylint: disable=protected-access
+
+    assert excinfo.value.error == "S3.NoSuchKey"
+
+
+@pytest.mark.parametrize("bucket", ("", ".", "..", "data/..", "data/nested", "missing"))
+def test_bucket_outside_root(storage, tmp_path, bucket):
+    (tmp_path / "data" / "nested").mkdir()
+
+    with pytest.raises(StatesError) as excinfo:
+        storage._bucket(bucket)  # pylint: disable=protected-access
+
+    assert excinfo.value.error == "S3.NoSuchBucket"
@@ -0,0 +1,183 @@
+"""Concurrent state machine construction tests."""
+import copy
+import pickle
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from rhodes import StateMachine
+from rhodes._util import instance_lock
+from rhodes.choice_rules import VariablePath
+from rhodes.exceptions import InvalidDefinitionError
+from rhodes.loader import load_definition
+from rhodes.states import Choice, Map, Parallel, Pass, Succeed, Task
+
+from ..unit_test_helpers import state_machine_body
+
+pytestmark = [pytest.mark.local, pytest.mark.functional]
+
+RESOURCE = "arn:aws:lambda:us-east-1:123456789012:function:Foo"
+WORKERS = 8
+
+
+def _concurrently(function, count: int = WORKERS):
+    barrier = threading.Barrier(count)
+
+    def _run(index):
+        barrier.wait()
+        return function(index)
+
+    with ThreadPoolExecutor(max_workers=count) as executor:
+        return list(executor.map(_run, range(count)))
+
+
+def _build_chain(machine: StateMachine, prefix: str, length: int = 50):
+    state = machine.start_with(Task(f"{prefix}-0", Resource=RESOURCE))
+    for pos in range(1, length):
+        state = state.then(Task(f"{prefix}-{pos}", Resource=RESOURCE))
+    state.end()
+
+
+def test_build_branches_concurrently():
+    workflow = StateMachine()
+    fan_out = workflow.start_with(Parallel("FanOut"))
+    fan_out.end()
+
+    _concurrently(lambda index: _build_chain(fan_out.add_branch(), f"branch{index}"))
+
+    assert len(fan_out.Branches) == WORKERS
+    for branch in fan_out.Branches:
+        assert len(branch.States) == 50
+        assert all(state.member_of is branch for state in branch.States.values())
+    assert len(workflow.to_dict()["States"]["FanOut"]["Branches"]) == WORKERS
+
+
+def test_add_states_concurrently():
+    workflow = StateMachine()
+
+    def _add(index):
+        for pos in range(100):
+            workflow.add_state(Pass(f"{index}-{pos}", End=True))
+
+    _concurrently(_add)
+
+    assert len(workflow.States) == WORKERS * 100
+    assert all(state.member_of is workflow for state in workflow.States.values())
+
+
+def test_then_is_atomic():
+    workflow = StateMachine()
+    first = workflow.start_with(Pass("First"))
+
+    def _then(index):
+        try:
+            first.then(Succeed(f"Next{index}"))
+        except InvalidDefinitionError:
+            return False
+        return True
+
+    assert sum(_concurrently(_then)) == 1
+    assert first.Next in workflow.States
+
+
+def test_choice_else_is_atomic():
+    workflow = StateMachine()
+    decision = workflow.start_with(Choice("Decide"))
+    decision.if_(VariablePath("$.go") == True).then(Succeed("Yes"))  # noqa: E712
+
+    def _else(index):
+        try:
+            decision.else_(Succeed(f"No{index}"))
+        except InvalidDefinitionError:
+            return False
+        return True
+
+    assert sum(_concurrently(_else)) == 1
+
+
+def test_lazy_states_build_once():
+    workflow = load_definition(state_machine_body("three-tasks"), lazy=True)
+
+    states = _concurrently(lambda index: workflow.States[workflow.StartAt])
+
+    assert all(state is states[0] for state in states)
+
+
+def test_copy_and_pickle_after_locking():
+    workflow = StateMachine()
+    each = workflow.start_with(Map("Each", ItemsPath="$.items", Iterator=StateMachine()))
+    each.Iterator.start_with(Task("Item", Resource=RESOURCE)).end()
+    each.end()
+
+    # Building takes the locks, which cannot be copied or pickled themselves.
+    assert instance_lock(workflow) is instance_lock(workflow)
+
+    shallow = copy.copy(workflow)
+    assert instance_lock(shallow) is not instance_lock(workflow)
+
+    for copied in (copy.deepcopy(workflow), pickle.loads(pickle.dumps(workflow))):
+        assert copied.to_dict() == workflow.to_dict()
+        assert instance_lock(copied) is not instance_lock(workflow)
+        copied.add_state(Succeed("Extra"))
+        assert "Extra" not in workflow.States
+
+
+def _rule_then(first: Choice):
+    first.if_(VariablePath("$.go") == True).then(Succeed("Next"))  # noqa: E712
+
+
+@pytest.mark.parametrize(
+    "state_type, build",
+    (
+        pytest.param(Pass, lambda first: first.then(Succeed("Next")), id="then"),
+        pytest.param(Choice, lambda first: first.else_(Succeed("Next")), id="else"),
+        pytest.param(Choice, _rule_then, id="rule then"),
+    ),
+)
+def test_state_machine_locked_before_state(state_type, build):
+    workflow = StateMachine()
+    first = workflow.start_with(state_type("First"))
+    started = threading.Event()
+
+    def _build():
+        started.set()
+        build(first)
+
+    with instance_lock(workflow):
+        thread = threading.Thread(target=_build)
+        thread.start()
+        started.wait(5)
+        thread.join(0.1)
+        # The builder waits for the state machine lock without holding the state lock,
+        # so a thread that holds the state machine lock can still take the state lock.
+        assert instance_lock(first).acquire(timeout=5)
+        instance_lock(first).release()
+
+    thread.join(5)
+    assert "Next" in workflow.States
+
+
+def test_build_while_loading():
+    definition = {
+        "StartAt": "Step0",
+        "States": {f"Step{pos}": {"Type": "Pass", "Next": f"Step{pos + 1}"} for pos in range(200)},
+    }
+    definition["States"]["Step200"] = {"Type": "Succeed"}
+
+    def _work(index):
+        if index % 2:
+            workflow = load_definition(definition, lazy=True)
+            return all(workflow.States[title].title == title for title in workflow.States)
+
+        workflow = StateMachine()
+        _build_chain(workflow, f"thread{index}")
+        rejected = 0
+        for _ in range(50):
+            try:
+                Task("Invalid", Resource=12345)
+            except TypeError:
+                rejected += 1
+        return len(workflow.States) == 50 and rejected == 50
+
+    assert all(_concurrently(_work))
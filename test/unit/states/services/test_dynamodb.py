@@ -0,0 +1,51 @@
+"""Unit test suite for ``rhodes.states.services.dynamodb``."""
+import pytest
+
+from rhodes.states import Map, Parallel, Pass, StateMachine
+from rhodes.states.services.dynamodb import AmazonDynamoDb
+
+pytestmark = [pytest.mark.local, pytest.mark.functional]
+
+
+def test_bulk_write_states():
+    state = AmazonDynamoDb(TableName="orders").bulk_write(
+        "Save", Items="$.orders", MaxConcurrency=4, ChunkSize=10, ResultPath="$.saved", OutputPath="$.saved"
+    )
+
+    assert isinstance(state, Parallel)
+    assert str(state.ResultPath) == "$"
+    assert str(state.OutputPath) == "$[0]"
+
+    (branch,) = state.Branches
+    chunk = branch.States[branch.StartAt]
+    assert isinstance(chunk, Pass)
+    assert chunk.Parameters.to_dict() == {"Input.$": "$", "Chunks.$": "States.ArrayPartition($.orders, 10)"}
+
+    batches = branch.States[chunk.Next]
+    assert isinstance(batches, Map)
+    assert batches.MaxConcurrency == 4
+    assert str(batches.ResultPath) == "$.Input.saved"
+    assert str(batches.OutputPath) == "$.Input.saved"
+    assert batches.Parameters.to_dict() == {
+        "RequestItems": {"orders.$": "$$.Map.Item.Value"},
+        "Attempt": 0,
+        "Delay": 1,
+    }
+
+    write = batches.Iterator.States["Save Write"]
+    assert write.Resource == "arn:aws:states:::aws-sdk:dynamodb:batchWriteItem"
+    assert write.Retry[0]["MaxAttempts"] == 7
+
+
+def test_bulk_write_then():
+    workflow = StateMachine()
+    save = workflow.start_with(AmazonDynamoDb(TableName="orders").bulk_write("Save", Items="$.orders"))
+    save.then(Pass("After")).end()
+
+    assert workflow.to_dict()["States"]["Save"]["Next"] == "After"
+
+
+@pytest.mark.parametrize("kwargs", ({"ChunkSize": 26}, {"ChunkSize": 0}, {"MaxAttempts": 0}, {"IntervalSeconds": 0}))
+def test_bulk_write_invalid(kwargs):
+    with pytest.raises(ValueError):
+        AmazonDynamoDb(TableName="orders").bulk_write("Save", Items="$.orders", **kwargs)
@@ -0,0 +1,220 @@
+"""Unit test suite for ``rhodes.states.services.sdk``."""
+import copy
+import pickle
+import sys
+
+import pytest
+
+from rhodes.exceptions import InvalidDefinitionError
+from rhodes.identifiers import AwsSdkArn, IntegrationPattern
+from rhodes.states import Task
+from rhodes.states.services import sdk
+from rhodes.states.services.sdk import add_service_model, aws_sdk
+from rhodes.structures import JsonPath, Parameters
+
+from ...unit_test_helpers import single_state_machine
+
+pytestmark = [pytest.mark.local, pytest.mark.functional]
+
+QUEUE_URL = "https://sqs.us-east-1.amazonaws.com/123456789012/queue"
+SQS_MODEL = {
+    "operations": {
+        "SendMessageBatch": {
+            "name": "SendMessageBatch",
+            "input": {"shape": "SendMessageBatchRequest"},
+            "documentation": "<p>Delivers up to ten messages to the specified queue. Maybe more.</p>",
+        }
+    },
+    "shapes": {
+        "SendMessageBatchRequest": {
+            "type": "structure",
+            "required": ["QueueUrl", "Entries"],
+            "members": {
+                "QueueUrl": {"shape": "String", "documentation": "<p>The URL of the queue.</p>"},
+                "Entries": {"shape": "SendMessageBatchRequestEntryList"},
+                "DelaySeconds": {"shape": "Integer"},
+            },
+        },
+        "SendMessageBatchRequestEntryList": {"type": "list", "member": {"shape": "String"}},
+        "String": {"type": "string"},
+        "Integer": {"type": "integer"},
+    },
+}
+
+SSM_MODEL = {
+    "operations": {"SendCommand": {"name": "SendCommand", "input": {"shape": "SendCommandRequest"}}},
+    "shapes": {
+        "SendCommandRequest": {
+            "type": "structure",
+            "required": ["DocumentName", "restApiId", "Force"],
+            "members": {
+                "DocumentName": {"shape": "String"},
+                "Comment": {"shape": "String"},
+                "TimeoutSeconds": {"shape": "Integer"},
+                "Parameters": {"shape": "Parameters"},
+                "restApiId": {"shape": "String"},
+                "Force": {"shape": "Boolean"},
+                "MaxErrors": {"shape": "Integer"},
+            },
+        },
+        "Parameters": {"type": "map", "key": {"shape": "String"}, "value": {"shape": "String"}},
+        "String": {"type": "string"},
+        "Integer": {"type": "integer"},
+        "Boolean": {"type": "boolean"},
+    },
+}
+
+
+@pytest.fixture
+def models(monkeypatch):
+    monkeypatch.setattr(sdk, "_MODELS", {})
+    monkeypatch.setattr(sdk, "_CLASSES", {})
+    add_service_model("sqs", SQS_MODEL)
+    add_service_model("ssm", SSM_MODEL)
+
+
+def test_aws_sdk_arn():
+    assert AwsSdkArn("sqs", "sendMessageBatch").value == "arn:aws:states:::aws-sdk:sqs:sendMessageBatch"
+
+
+@pytest.mark.parametrize("pattern", (IntegrationPattern.REQUEST_RESPONSE, IntegrationPattern.WAIT_FOR_CALLBACK))
+def test_generated_integration(models, pattern):
+    expected = Task(
+        "Send",
+        Resource="arn:aws:states:::aws-sdk:sqs:sendMessageBatch" + pattern.value,
+        Parameters=Parameters(QueueUrl=QUEUE_URL, Entries=JsonPath("$.messages")),
+        ResultPath=JsonPath("$.sent"),
+    )
+
+    send_message_batch = aws_sdk("sqs", "sendMessageBatch")
+    test = send_message_batch(
+        "Send", QueueUrl=QUEUE_URL, Entries=JsonPath("$.messages"), ResultPath="$.sent", Pattern=pattern
+    )
+
+    assert test.to_dict() == expected.to_dict()
+
+
+def test_generated_class(models):
+    send_message_batch = aws_sdk("sqs", "sendMessageBatch")
+
+    assert send_message_batch.__name__ == "AwsSdkSqsSendMessageBatch"
+    assert aws_sdk("sqs", "SendMessageBatch") is send_message_batch
+    assert send_message_batch.__doc__.startswith("Delivers up to ten messages to the specified queue.")
+    assert ":param QueueUrl: (string) The URL of the queue." in send_message_batch.__doc__
+
+
+def test_generated_class_validates_types(models):
+    send_message_batch = aws_sdk("sqs", "sendMessageBatch")
+
+    send_message_batch("Send", DelaySeconds=5)
+    send_message_batch("Send", DelaySeconds=JsonPath("$.delay"))
+    with pytest.raises(TypeError):
+        send_message_batch("Send", DelaySeconds="five")
+    with pytest.raises(TypeError):
+        send_message_batch("Send", Entries="not a list")
+
+
+def test_generated_class_requires_fields(models):
+    state = aws_sdk("sqs", "sendMessageBatch")("Send", QueueUrl=QUEUE_URL, End=True)
+
+    with pytest.raises(InvalidDefinitionError) as excinfo:
+        state.to_dict()
+
+    excinfo.match("requires Entries")
+
+
+def test_generated_members_do_not_set_state_fields(models):
+    expected = Task(
+        "Run",
+        Resource="arn:aws:states:::aws-sdk:ssm:sendCommand",
+        Comment="state comment",
+        TimeoutSeconds=30,
+        Parameters=Parameters(
+            DocumentName="AWS-RunShellScript",
+            Comment="command comment",
+            TimeoutSeconds=600,
+            Parameters={"commands": ["uptime"]},
+            RestApiId="api",
+            Force=False,
+            MaxErrors=0,
+        ),
+        End=True,
+    )
+
+    send_command = aws_sdk("ssm", "sendCommand")
+    test = send_command(
+        "Run",
+        Comment="state comment",
+        TimeoutSeconds=30,
+        DocumentName="AWS-RunShellScript",
+        CommentMember="command comment",
+        TimeoutSecondsMember=600,
+        ParametersMember={"commands": ["uptime"]},
+        RestApiId="api",
+        Force=False,
+        MaxErrors=0,
+        End=True,
+    )
+
+    assert test.to_dict() == expected.to_dict()
+    assert ":param CommentMember: (string)" in send_command.__doc__
+    assert ":param RestApiId: (string)" in send_command.__doc__
+
+
+def test_generated_class_requires_fields_with_falsy_values(models):
+    state = aws_sdk("ssm", "sendCommand")("Run", DocumentName="AWS-RunShellScript", RestApiId="", End=True)
+
+    with pytest.raises(InvalidDefinitionError) as excinfo:
+        state.to_dict()
+
+    excinfo.match("requires Force")
+
+    state.Force = False
+
+    assert state.to_dict()["Parameters"]["Force"] is False
+
+
+def test_generated_state_in_state_machine(models):
+    workflow = single_state_machine(
+        aws_sdk("sqs", "sendMessageBatch")("Send", QueueUrl=QUEUE_URL, Entries=JsonPath("$.messages"))
+    )
+
+    for copied in (copy.deepcopy(workflow), pickle.loads(pickle.dumps(workflow))):
+        assert copied.to_dict() == workflow.to_dict()
+        assert type(copied.States["Send"]) is aws_sdk("sqs", "sendMessageBatch")
+
+
+def test_add_service_model_replaces_generated_classes(models):
+    before = aws_sdk("sqs", "sendMessageBatch")
+
+    add_service_model("sqs", SQS_MODEL)
+
+    assert aws_sdk("sqs", "sendMessageBatch") is not before
+
+
+def test_unknown_action(models):
+    with pytest.raises(ValueError) as excinfo:
+        aws_sdk("sqs", "sendCarrierPigeon")
+
+    excinfo.match("has no action 'sendCarrierPigeon'")
+
+
+def test_botocore_required(models, monkeypatch):
+    monkeypatch.setitem(sys.modules, "botocore", None)
+    monkeypatch.setitem(sys.modules, "botocore.loaders", None)
+    monkeypatch.setitem(sys.modules, "botocore.exceptions", None)
+
+    with pytest.raises(ImportError) as excinfo:
+        aws_sdk("dynamodb", "transactWriteItems")
+
+    excinfo.match("botocore is required")
+
+
+def test_botocore_model(monkeypatch):
+    pytest.importorskip("botocore")
+    monkeypatch.setattr(sdk, "_MODELS", {})
+    monkeypatch.setattr(sdk, "_CLASSES", {})
+
+    state = aws_sdk("dynamodb", "transactWriteItems")("Write", TransactItems=JsonPath("$.items"))
+
+    assert state.to_dict()["Resource"] == "arn:aws:states:::aws-sdk:dynamodb:transactWriteItems"
@@ -0,0 +1,169 @@
+"""Unit tests for ``rhodes.budget``."""
+import pytest
+
+from rhodes.budget import predict_history, state_events
+from rhodes.choice_rules import VariablePath
+from rhodes.identifiers import IntegrationPattern
+from rhodes.states import Choice, Fail, Map, Parallel, Pass, StateMachine, Succeed, Task
+from rhodes.states.services.awslambda import AwsLambda
+from rhodes.states.services.stepfunctions import AwsStepFunctions
+from rhodes.structures import ProcessorConfig
+
+from .unit_test_helpers import single_state_machine
+
+pytestmark = [pytest.mark.local, pytest.mark.functional]
+
+FUNCTION = "arn:aws:lambda:us-east-1:123456789012:function:Foo"
+ACTIVITY = "arn:aws:states:us-east-1:123456789012:activity:Bar"
+
+
+def _iterator() -> StateMachine:
+    iterator = StateMachine()
+    iterator.start_with(Task("Transform", Resource=FUNCTION)).then(Task("Load", Resource=FUNCTION)).end()
+    return iterator
+
+
+def _map_workflow() -> StateMachine:
+    return single_state_machine(Map("Process", Iterator=_iterator(), ItemsPath="$.items"))
+
+
+@pytest.mark.parametrize(
+    "state, expected",
+    (
+        pytest.param(Pass("Foo"), {"PassStateEntered": 1, "PassStateExited": 1}, id="pass"),
+        pytest.param(Fail("Foo"), {"FailStateEntered": 1}, id="fail"),
+        pytest.param(
+            Task("Foo", Resource=FUNCTION),
+            {
+                "TaskStateEntered": 1,
+                "LambdaFunctionScheduled": 1,
+                "LambdaFunctionStarted": 1,
+                "LambdaFunctionSucceeded": 1,
+                "TaskStateExited": 1,
+            },
+            id="lambda function",
+        ),
+        pytest.param(
+            Task("Foo", Resource=ACTIVITY),
+            {
+                "TaskStateEntered": 1,
+                "ActivityScheduled": 1,
+                "ActivityStarted": 1,
+                "ActivitySucceeded": 1,
+                "TaskStateExited": 1,
+            },
+            id="activity",
+        ),
+        pytest.param(
+            AwsLambda("Foo", FunctionName=FUNCTION),
+            {"TaskStateEntered": 1, "TaskScheduled": 1, "TaskStarted": 1, "TaskSucceeded": 1, "TaskStateExited": 1},
+            id="service integration",
+        ),
+        pytest.param(
+            AwsStepFunctions("Foo", StateMachineArn="arn", Pattern=IntegrationPattern.SYNCHRONOUS),
+            {
+                "TaskStateEntered": 1,
+                "TaskScheduled": 1,
+                "TaskStarted": 1,
+                "TaskSubmitted": 1,
+                "TaskSucceeded": 1,
+                "TaskStateExited": 1,
+            },
+            id="synchronous service integration",
+        ),
+    ),
+)
+def test_state_events(state, expected):
+    assert state_events(state) == expected
+
+
+def test_state_events_map():
+    test = state_events(Map("Process", Iterator=_iterator(), ItemsPath="$.items"), items={"Process": 10})
+
+    assert test["MapStateEntered"] == 1
+    assert test["MapIterationStarted"] == 10
+    assert test["MapIterationSucceeded"] == 10
+    assert test["TaskStateEntered"] == 20
+    assert sum(test.values()) == 4 + 10 * 12
+
+
+def test_predict_history_map():
+    test = predict_history(_map_workflow(), items={"Process": 100})
+
+    assert test.total == 2 + 4 + 100 * 12
+    assert test.within_limit
+    assert test.max_items == {"Process": (25000 - 6) // 12}
+
+
+def test_predict_history_exceeds_limit():
+    test = predict_history(_map_workflow(), items={"Process": 2083})
+
+    assert not test.within_limit
+    assert test.headroom < 0
+    assert test.max_items["Process"] == 2082
+
+
+def test_predict_history_custom_limit():
+    test = predict_history(_map_workflow(), limit=1000)
+
+    assert test.max_items == {"Process": (1000 - 6) // 12}
+
+
+def test_predict_history_nested_map():
+    outer = single_state_machine(Map("Inner", Iterator=_iterator(), ItemsPath="$.items"))
+    workflow = single_state_machine(Map("Outer", Iterator=outer, ItemsPath="$.batches"))
+
+    test = predict_history(workflow, items={"Outer": 10, "Inner": 20})
+
+    assert test.events["MapIterationStarted"] == 10 + 10 * 20
+    assert test.total == 2 + 4 + 10 * (2 + 4 + 20 * 12)
+    assert test.max_items["Inner"] == ((25000 - 6) // 10 - 6) // 12
+
+
+def test_predict_history_distributed_map():
+    inner = Map("Inner", Iterator=_iterator(), ItemsPath="$.items")
+    processor = single_state_machine(inner)
+    workflow = single_state_machine(
+        Map("Outer", ItemProcessor=processor, ProcessorConfig=ProcessorConfig.distributed(), ItemsPath="$.batches")
+    )
+
+    test = predict_history(workflow, items={"Outer": 100000, "Inner": 20})
+
+    assert test.events == {
+        "ExecutionStarted": 1,
+        "MapStateEntered": 1,
+        "MapRunStarted": 1,
+        "MapRunSucceeded": 1,
+        "MapStateExited": 1,
+        "ExecutionSucceeded": 1,
+    }
+    assert test.max_items == {}
+
+
+def test_predict_history_longest_path():
+    workflow = StateMachine()
+    decision = workflow.start_with(Choice("Decide"))
+    decision.if_(VariablePath("$.size") == "small").then(Succeed("Done"))
+    parallel = decision.else_(Parallel("Fan out"))
+    parallel.add_branch().start_with(Task("Work", Resource=FUNCTION)).end()
+    parallel.add_branch().start_with(Pass("Skip")).end()
+    parallel.end()
+
+    test = predict_history(workflow)
+
+    assert test.total == 2 + 2 + 4 + 5 + 2
+    assert "SucceedStateEntered" not in test.events
+
+
+def test_predict_history_loop():
+    workflow = StateMachine()
+    poll = workflow.start_with(Task("Poll", Resource=FUNCTION))
+    decision = poll.then(Choice("Done?"))
+    decision.if_(VariablePath("$.status") == "done").then(Succeed("Done"))
+    decision.else_(poll)
+
+    once = predict_history(workflow)
+    many = predict_history(workflow, visits={"Poll": 10, "Done?": 10})
+
+    assert once.total == 2 + 5 + 2 + 2
+    assert many.total == 2 + 10 * 5 + 10 * 2 + 2
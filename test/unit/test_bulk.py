@@ -0,0 +1,157 @@
+"""Unit tests for ``rhodes.bulk`` and ``rhodes.cli``."""
+import hashlib
+import json
+import shutil
+from pathlib import Path
+
+import pytest
+
+from rhodes.bulk import DefinitionCache, analyze_directory, find_definitions, load_directory, summarize
+from rhodes.cli import main
+from rhodes.loader import load_definition
+from rhodes.states import StateMachine
+
+from .unit_test_helpers import VectorTypes, state_machine_body
+
+pytestmark = [pytest.mark.local, pytest.mark.functional]
+
+VECTORS = ("hello-world", "simple-choice", "simple-map", "simple-parallel", "three-tasks")
+
+
+@pytest.fixture
+def definitions(tmp_path):
+    directory = tmp_path / "definitions"
+    (directory / "nested").mkdir(parents=True)
+    for name in VECTORS[:-1]:
+        shutil.copy(str(VectorTypes.STATE_MACHINE.directory / f"{name}.json"), str(directory / f"{name}.json"))
+    shutil.copy(
+        str(VectorTypes.STATE_MACHINE.directory / f"{VECTORS[-1]}.json"), str(directory / "nested" / "three-tasks.json")
+    )
+    (directory / "notes.txt").write_text("not a definition")
+    return directory
+
+
+def test_find_definitions(definitions):
+    found = [path.relative_to(definitions).as_posix() for path in find_definitions(definitions)]
+
+    assert found == sorted([f"{name}.json" for name in VECTORS[:-1]] + ["nested/three-tasks.json"])
+
+
+@pytest.mark.parametrize("workers", (1, 2))
+def test_load_directory(definitions, workers):
+    results = load_directory(definitions, workers=workers)
+
+    assert len(results) == len(VECTORS)
+    for result in results:
+        assert result.ok
+        assert not result.cached
+        assert isinstance(result.state_machine, StateMachine)
+        assert result.state_machine.to_dict() == state_machine_body(result.path.rsplit("/", 1)[-1][:-5])
+
+
+@pytest.mark.parametrize("workers", (1, 2))
+def test_analyze_directory(definitions, workers):
+    results = analyze_directory(definitions, workers=workers)
+
+    for result in results:
+        assert result.ok
+        assert result.state_machine is None
+        with open(result.path) as definition:
+            assert result.result == summarize(load_definition(json.load(definition)))
+
+
+def test_analyze_directory_cache(definitions, tmp_path):
+    cache_dir = tmp_path / "cache"
+
+    cold = analyze_directory(definitions, cache_dir=cache_dir, workers=2)
+    warm = analyze_directory(definitions, cache_dir=cache_dir, workers=2)
+
+    assert not any(result.cached for result in cold)
+    assert all(result.cached for result in warm)
+    assert [result.result for result in cold] == [result.result for result in warm]
+
+    changed = definitions / "hello-world.json"
+    body = json.loads(changed.read_text())
+    body["Comment"] = "changed"
+    changed.write_text(json.dumps(body))
+
+    after_change = {result.path: result for result in analyze_directory(definitions, cache_dir=cache_dir, workers=1)}
+
+    assert not after_change[str(changed)].cached
+    assert all(result.cached for path, result in after_change.items() if path != str(changed))
+
+
+def test_cache_ignores_corrupt_entries(tmp_path):
+    cache = DefinitionCache(tmp_path)
+    machine = load_definition(state_machine_body("hello-world"))
+    cache.put("ab" * 32, machine)
+    assert cache.get("ab" * 32).to_dict() == machine.to_dict()
+
+    cache._path("ab" * 32).write_bytes(b"corrupt")
+
+    assert cache.get("ab" * 32) is None
+    assert cache.get("cd" * 32) is None
+
+
+def test_analyze_directory_reports_errors(definitions):
+    (definitions / "broken.json").write_text('["not", "a", "state machine"]')
+    (definitions / "truncated.json").write_text('{"StartAt": ')
+
+    results = {result.path.rsplit("/", 1)[-1]: result for result in analyze_directory(definitions, workers=2)}
+
+    assert not results["broken.json"].ok
+    assert not results["truncated.json"].ok
+    assert results["truncated.json"].error.startswith("InvalidDefinitionError")
+    assert all(result.ok for name, result in results.items() if name not in ("broken.json", "truncated.json"))
+
+
+def test_cli_analyze_json(definitions, tmp_path, capsys):
+    exit_code = main(["analyze", str(definitions), "--cache-dir", str(tmp_path / "cache"), "--format", "json"])
+
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert exit_code == 0
+    assert len(lines) == len(VECTORS)
+    assert all(line["error"] is None and line["result"]["states"] > 0 for line in lines)
+
+
+def test_cli_analyze_text(definitions, capsys):
+    (definitions / "broken.json").write_text("[]")
+
+    exit_code = main(["analyze", str(definitions), "--no-cache", "--workers", "1"])
+
+    out = capsys.readouterr().out
+    assert exit_code == 1
+    assert "broken.json\tERROR\t" in out
+    assert "hello-world.json\tstates=1\t" in out
+
+
+def test_analyze_directory_reports_read_errors(definitions, tmp_path, monkeypatch):
+    unreadable = definitions / "hello-world.json"
+    corrupt = definitions / "simple-map.json"
+    corrupt_digest = hashlib.sha256(corrupt.read_bytes()).hexdigest()
+    read_bytes = Path.read_bytes
+    get = DefinitionCache.get
+
+    def _read_bytes(path):
+        if path == unreadable:
+            raise PermissionError("denied")
+        return read_bytes(path)
+
+    def _get(cache, digest):
+        if digest == corrupt_digest:
+            raise ValueError("corrupt cache entry")
+        return get(cache, digest)
+
+    monkeypatch.setattr(Path, "read_bytes", _read_bytes)
+    monkeypatch.setattr(DefinitionCache, "get", _get)
+
+    results = {
+        result.path.rsplit("/", 1)[-1]: result
+        for result in analyze_directory(definitions, cache_dir=tmp_path / "cache", workers=1)
+    }
+
+    assert results["hello-world.json"].error == "PermissionError: denied"
+    assert results["hello-world.json"].digest is None
+    assert results["simple-map.json"].error == "ValueError: corrupt cache entry"
+    assert results["simple-map.json"].digest == corrupt_digest
+    assert all(result.ok for name, result in results.items() if name not in ("hello-world.json", "simple-map.json"))
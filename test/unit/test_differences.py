@@ -0,0 +1,205 @@
+"""Unit tests for ``rhodes.differences``."""
+import copy
+
+import pytest
+
+import rhodes
+from rhodes import differences
+from rhodes.choice_rules import VariablePath
+from rhodes.differences import ChangeType, StateChange, diff, structural_hash
+from rhodes.loader import load_definition
+from rhodes.states import Choice, Map, Parallel, Pass, StateMachine, Succeed, Task
+from rhodes.structures import ProcessorConfig
+
+from .unit_test_helpers import single_state_machine, state_machine_body
+
+pytestmark = [pytest.mark.local, pytest.mark.functional]
+
+RESOURCE = "arn:aws:lambda:us-east-1:123456789012:function:Foo"
+
+
+def _workflow(resource: str = RESOURCE) -> StateMachine:
+    workflow = StateMachine(Comment="original")
+    first = workflow.start_with(Task("First", Resource=resource))
+    choice = first.then(Choice("Decide"))
+    choice.if_(VariablePath("$.go") == True).then(Succeed("Yes"))  # noqa: E712
+    choice.else_(Succeed("No"))
+
+    fan_out = Parallel("FanOut")
+    fan_out.add_branch().start_with(Pass("Left")).end()
+    fan_out.add_branch().start_with(Pass("Right")).end()
+    workflow.add_state(fan_out)
+    fan_out.end()
+
+    each = Map("Each", ItemsPath="$.items", Iterator=StateMachine())
+    each.Iterator.start_with(Task("Item", Resource=resource)).end()
+    workflow.add_state(each)
+    each.end()
+    return workflow
+
+
+def test_reexport():
+    assert rhodes.diff is diff
+
+
+def test_identical():
+    changes = diff(_workflow(), _workflow())
+
+    assert not changes
+    assert len(changes) == 0
+    assert structural_hash(_workflow()) == structural_hash(_workflow())
+
+
+def test_reordered_states_are_identical():
+    body = state_machine_body("three-tasks")
+    reordered = dict(body, States=dict(reversed(list(body["States"].items()))))
+
+    assert not diff(load_definition(body), load_definition(reordered))
+
+
+def test_added_removed_modified():
+    old = _workflow()
+    new = _workflow()
+    del new.States["No"]
+    new.add_state(Succeed("Maybe"))
+    new.States["Decide"].Default = "Maybe"
+    new.States["First"].TimeoutSeconds = 30
+    new.Comment = "changed"
+
+    changes = diff(old, new)
+
+    assert changes.removed == [StateChange(ChangeType.REMOVED, title="No")]
+    assert changes.added == [StateChange(ChangeType.ADDED, title="Maybe")]
+    assert StateChange(ChangeType.MODIFIED, fields=("Comment",)) in changes.modified
+    assert StateChange(ChangeType.MODIFIED, title="First", fields=("TimeoutSeconds",)) in changes.modified
+    assert changes.rewired == [
+        StateChange(ChangeType.REWIRED, title="Decide", fields=("Default",), old="No", new="Maybe")
+    ]
+
+
+def test_start_at_rewired():
+    old = _workflow()
+    new = _workflow()
+    new.StartAt = "Decide"
+
+    assert list(diff(old, new)) == [StateChange(ChangeType.REWIRED, fields=("StartAt",), old="First", new="Decide")]
+
+
+def test_nested_changes():
+    old = _workflow()
+    new = _workflow()
+    new.States["FanOut"].Branches[1].States["Right"].Comment = "changed"
+    new.States["Each"].Iterator.States["Item"].Resource = RESOURCE + "-v2"
+
+    changes = diff(old, new)
+
+    assert list(changes) == [
+        StateChange(ChangeType.MODIFIED, title="Right", location=("FanOut", "Branches[1]"), fields=("Comment",)),
+        StateChange(ChangeType.MODIFIED, title="Item", location=("Each", "Iterator"), fields=("Resource",)),
+    ]
+    assert str(changes.modified[0]) == "modified FanOut/Branches[1]/Right (Comment)"
+
+
+def test_item_processor_changes():
+    def _distributed(execution_type: str, resource: str) -> StateMachine:
+        processor = single_state_machine(Task("Item", Resource=resource))
+        return single_state_machine(
+            Map(
+                "Each",
+                ItemsPath="$.items",
+                ItemProcessor=processor,
+                ProcessorConfig=ProcessorConfig.distributed(execution_type),
+            )
+        )
+
+    changes = diff(_distributed("STANDARD", RESOURCE), _distributed("EXPRESS", RESOURCE + "-v2"))
+
+    assert list(changes) == [
+        StateChange(ChangeType.MODIFIED, title="Each", fields=("ProcessorConfig",)),
+        StateChange(ChangeType.MODIFIED, title="Item", location=("Each", "ItemProcessor"), fields=("Resource",)),
+    ]
+
+
+def test_branch_count_changed():
+    old = _workflow()
+    new = _workflow()
+    new.States["FanOut"].add_branch().start_with(Pass("Middle")).end()
+
+    assert list(diff(old, new)) == [StateChange(ChangeType.MODIFIED, title="FanOut", fields=("Branches",))]
+
+
+def test_type_changed():
+    old = _workflow()
+    new = _workflow()
+    del new.States["Yes"]
+    new.add_state(Pass("Yes", End=True))
+
+    changes = diff(old, new)
+
+    assert [change.title for change in changes] == ["Yes"]
+    assert {"End", "Type"} <= set(changes.modified[0].fields)
+
+
+@pytest.mark.parametrize("lazy_old, lazy_new", ((True, True), (True, False), (False, True)))
+def test_lazy(lazy_old, lazy_new):
+    body = state_machine_body("simple-parallel")
+    changed = copy.deepcopy(body)
+    first_branch = changed["States"]["LookupCustomerInfo"]["Branches"][0]
+    first_branch["States"][first_branch["StartAt"]]["Comment"] = "changed"
+
+    unchanged = load_definition(body, lazy=lazy_old)
+    assert not diff(unchanged, load_definition(body, lazy=lazy_new))
+    if lazy_old:
+        # Unchanged states are compared without building them.
+        assert not any(unchanged.States.is_materialized(title) for title in unchanged.States)
+
+    changes = diff(load_definition(body, lazy=lazy_old), load_definition(changed, lazy=lazy_new))
+    assert [(change.kind, change.location, change.fields) for change in changes] == [
+        (ChangeType.MODIFIED, ("LookupCustomerInfo", "Branches[0]"), ("Comment",))
+    ]
+
+
+def test_shared_states_are_not_serialized(monkeypatch):
+    old = _workflow()
+    new = StateMachine(StartAt=old.StartAt, Comment=old.Comment, States=dict(old.States))
+    new.States["First"] = Task("First", Resource=RESOURCE, Next="Decide", TimeoutSeconds=30)
+    hashed = []
+    digest = differences._digest
+    monkeypatch.setattr(differences, "_digest", lambda body: hashed.append(body) or digest(body))
+
+    changes = diff(old, new)
+
+    assert [(change.title, change.fields) for change in changes] == [("First", ("TimeoutSeconds",))]
+    assert [body["Type"] for body in hashed] == ["Task", "Task"]
+
+
+def test_nested_states_are_serialized_once(monkeypatch):
+    old = _workflow()
+    new = _workflow()
+    new.States["FanOut"].Branches[1].States["Right"].Comment = "changed"
+    serialized = []
+    to_dict = Pass.to_dict
+    monkeypatch.setattr(Pass, "to_dict", lambda state: serialized.append(state.title) or to_dict(state))
+
+    changes = diff(old, new)
+
+    assert [(change.location, change.title) for change in changes] == [(("FanOut", "Branches[1]"), "Right")]
+    assert sorted(serialized) == ["Left", "Left", "Right", "Right"]
+
+
+def test_lazy_defaults_are_normalized():
+    body = {
+        "StartAt": "Decide",
+        "States": {
+            "Decide": {
+                "Type": "Choice",
+                "Choices": [{"Variable": "$.count", "NumericGreaterThan": 1, "Next": "Done"}],
+                "Default": "Done",
+            },
+            "Done": {"Type": "Pass", "End": True},
+        },
+    }
+    lazy = load_definition(body, lazy=True)
+
+    assert not diff(lazy, load_definition(body))
+    assert not any(lazy.States.is_materialized(title) for title in lazy.States)
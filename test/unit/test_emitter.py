@@ -0,0 +1,184 @@
+"""Unit tests for ``rhodes.emitter``."""
+import json
+
+import pytest
+from troposphere import Template, awslambda
+
+from rhodes.emitter import MAX_REFERENCE_BYTES, MAX_TEMPLATE_BYTES, emit_state_machines
+from rhodes.identifiers import ExecutionType
+from rhodes.partition import MAX_DEFINITION_BYTES
+from rhodes.states import StateMachine, Task
+
+pytestmark = [pytest.mark.local, pytest.mark.functional]
+
+ROLE = "arn:aws:iam::123456789012:role/Workflow"
+
+
+def _function(title: str) -> awslambda.Function:
+    return awslambda.Function(
+        title, Code=awslambda.Code(ZipFile="pass"), Handler="index.handler", Role="role", Runtime="python3.8"
+    )
+
+
+LOOKUP = _function("LookupFunction")
+STORE = _function("StoreFunction")
+
+
+def _build(*functions, comment: str = "Workflow") -> StateMachine:
+    workflow = StateMachine(Comment=comment)
+    state = workflow.start_with(Task("Step0", Resource=functions[0]))
+    for pos, function in enumerate(functions[1:], start=1):
+        state = state.then(Task(f"Step{pos}", Resource=function))
+    state.end()
+    return workflow
+
+
+def _properties(template: Template, title: str) -> dict:
+    return template.to_dict()["Resources"][title]["Properties"]
+
+
+def test_emit_shares_placeholders():
+    template = Template()
+    workflows = {
+        "First": _build(LOOKUP, STORE, comment="First"),
+        "Second": _build(STORE, comment="Second"),
+        "Third": _build(LOOKUP, comment="Third"),
+    }
+
+    report = emit_state_machines(template, workflows, RoleArn=ROLE)
+
+    assert [emitted.title for emitted in report.state_machines] == ["First", "Second", "Third"]
+    assert all(emitted.duplicate_of is None for emitted in report.state_machines)
+    assert _properties(template, "First")["DefinitionSubstitutions"] == {
+        "ra": {"Fn::GetAtt": ["LookupFunction", "Arn"]},
+        "rb": {"Fn::GetAtt": ["StoreFunction", "Arn"]},
+    }
+    assert _properties(template, "Second")["DefinitionSubstitutions"] == {
+        "rb": {"Fn::GetAtt": ["StoreFunction", "Arn"]}
+    }
+    assert _properties(template, "Second")["Definition"]["States"]["Step0"]["Resource"] == "${rb}"
+    assert _properties(template, "Third")["RoleArn"] == ROLE
+
+    # Every resource that uses a reference shares the same value.
+    first = report.state_machines[0].resource.properties["DefinitionSubstitutions"]["rb"]
+    second = report.state_machines[1].resource.properties["DefinitionSubstitutions"]["rb"]
+    assert first is second
+
+
+def test_emit_matches_single_machine_output():
+    workflow = _build(LOOKUP, STORE, LOOKUP)
+    template = Template()
+
+    emit_state_machines(template, {"Workflow": workflow}, RoleArn=ROLE)
+
+    properties = _properties(template, "Workflow")
+    expected = workflow.definition_substitutions()
+    assert properties["Definition"] == expected.definition
+    assert properties["DefinitionSubstitutions"] == {
+        name: value.to_dict() for name, value in expected.substitutions.items()
+    }
+
+
+def test_emit_definition_string():
+    workflow = _build(LOOKUP, STORE)
+    template = Template()
+
+    emit_state_machines(template, {"Workflow": workflow}, substitutions=False, RoleArn=ROLE)
+
+    assert _properties(template, "Workflow")["DefinitionString"] == workflow.definition_string().to_dict()
+
+
+@pytest.mark.parametrize("substitutions", (True, False))
+def test_emit_dedupes_identical_definitions(substitutions):
+    shared = _build(LOOKUP, STORE)
+    template = Template()
+
+    report = emit_state_machines(
+        template,
+        {"Shared": shared, "SameObject": shared, "SameContent": _build(LOOKUP, STORE), "Other": _build(STORE)},
+        substitutions=substitutions,
+        RoleArn=ROLE,
+    )
+
+    assert [emitted.duplicate_of for emitted in report.state_machines] == [None, "Shared", "Shared", None]
+    resources = [emitted.resource for emitted in report.state_machines]
+    key = "Definition" if substitutions else "DefinitionString"
+    assert resources[0].properties[key] is resources[1].properties[key] is resources[2].properties[key]
+    assert report.state_machines[0].definition_bytes == report.state_machines[2].definition_bytes
+
+
+def test_report_sizes():
+    template = Template()
+    workflows = {f"Workflow{pos}": _build(LOOKUP, STORE, comment=f"Workflow {pos}") for pos in range(20)}
+
+    report = emit_state_machines(template, workflows, RoleArn=ROLE)
+
+    assert report.resources == 20
+    assert report.template_bytes == len(json.dumps(template.to_dict(), separators=(",", ":")))
+    assert report.headroom == MAX_TEMPLATE_BYTES - report.template_bytes
+    assert report.within_limit
+    assert report.oversized == []
+    for emitted in report.state_machines:
+        definition = emitted.resource.properties["Definition"]
+        # Each of the two placeholders ("${ra}", "${rb}") resolves to an ARN of up to 2048 bytes.
+        expected = len(json.dumps(definition, separators=(",", ":"))) + 2 * (MAX_REFERENCE_BYTES - len("${ra}"))
+        assert emitted.definition_bytes == expected
+
+
+@pytest.mark.parametrize("substitutions", (True, False))
+def test_report_resolved_definition_sizes(substitutions):
+    workflow = _build(LOOKUP)
+    reference = "${ra}" if substitutions else "${LookupFunction.Arn}"
+
+    def _emit(reference_bytes):
+        return emit_state_machines(
+            Template(),
+            {"Workflow": workflow},
+            substitutions=substitutions,
+            reference_bytes=reference_bytes,
+            RoleArn=ROLE,
+        )
+
+    short = _emit(80)
+    oversized = _emit(MAX_DEFINITION_BYTES)
+
+    emitted = short.state_machines[0]
+    properties = emitted.resource.properties
+    if substitutions:
+        text = json.dumps(properties["Definition"], separators=(",", ":"))
+    else:
+        text = properties["DefinitionString"].data["Fn::Sub"]
+    assert emitted.definition_bytes == len(text) - len(reference) + 80
+    assert short.oversized == []
+    assert [emitted.title for emitted in oversized.oversized] == ["Workflow"]
+    assert not oversized.within_limit
+
+
+def test_report_over_limit():
+    template = Template()
+
+    report = emit_state_machines(template, {"Workflow": _build(LOOKUP)}, limit=100, RoleArn=ROLE)
+
+    assert report.headroom < 0
+    assert not report.within_limit
+
+
+def test_emit_duplicate_title():
+    template = Template()
+    emit_state_machines(template, {"Workflow": _build(LOOKUP)}, RoleArn=ROLE)
+
+    with pytest.raises(ValueError):
+        emit_state_machines(template, {"Workflow": _build(STORE)}, RoleArn=ROLE)
+
+
+def test_emit_state_machine_type():
+    express = _build(LOOKUP)
+    express.StateMachineType = ExecutionType.EXPRESS
+    template = Template()
+
+    emit_state_machines(template, {"Express": express, "Standard": _build(STORE)}, RoleArn=ROLE)
+    emit_state_machines(template, {"Override": express}, RoleArn=ROLE, StateMachineType="STANDARD")
+
+    assert _properties(template, "Express")["StateMachineType"] == "EXPRESS"
+    assert "StateMachineType" not in _properties(template, "Standard")
+    assert _properties(template, "Override")["StateMachineType"] == "STANDARD"
@@ -0,0 +1,209 @@
+"""Unit tests for ``rhodes.express``."""
+import pytest
+from troposphere import stepfunctions
+
+from rhodes.choice_rules import VariablePath
+from rhodes.exceptions import InvalidDefinitionError
+from rhodes.express import ExpressViolation, express_violations, validate_express
+from rhodes.identifiers import ExecutionType, IntegrationPattern
+from rhodes.states import Choice, Map, Parallel, Pass, StateMachine, Succeed, Task, Wait
+from rhodes.states.services.awslambda import AwsLambda
+from rhodes.states.services.stepfunctions import AwsStepFunctions
+from rhodes.structures import ProcessorConfig
+
+from .unit_test_helpers import single_state_machine
+
+pytestmark = [pytest.mark.local, pytest.mark.functional]
+
+FUNCTION = "arn:aws:lambda:us-east-1:123456789012:function:Foo"
+ACTIVITY = "arn:aws:states:us-east-1:123456789012:activity:Bar"
+
+
+@pytest.mark.parametrize(
+    "state",
+    (
+        pytest.param(Task("Foo", Resource=FUNCTION), id="lambda"),
+        pytest.param(AwsLambda("Foo", FunctionName=FUNCTION), id="lambda helper"),
+        pytest.param(Wait("Foo", Seconds=300), id="wait"),
+        pytest.param(Map("Foo", Iterator=single_state_machine(Task("Bar", Resource=FUNCTION))), id="inline map"),
+    ),
+)
+def test_express_compatible(state):
+    assert express_violations(single_state_machine(state, TimeoutSeconds=300)) == []
+
+
+@pytest.mark.parametrize(
+    "state, reason",
+    (
+        pytest.param(
+            AwsLambda("Foo", FunctionName=FUNCTION, Pattern=IntegrationPattern.WAIT_FOR_CALLBACK),
+            "Express workflows do not support the .waitForTaskToken integration pattern "
+            "(arn:aws:states:::lambda:invoke.waitForTaskToken).",
+            id="callback",
+        ),
+        pytest.param(
+            AwsStepFunctions("Foo", StateMachineArn="arn", Pattern=IntegrationPattern.SYNCHRONOUS),
+            "Express workflows do not support the .sync integration pattern "
+            "(arn:aws:states:::states:startExecution.sync).",
+            id="sync",
+        ),
+        pytest.param(Task("Foo", Resource=ACTIVITY), "Express workflows do not support activities.", id="activity"),
+        pytest.param(
+            Task("Foo", Resource=stepfunctions.Activity("Bar", Name="Bar")),
+            "Express workflows do not support activities.",
+            id="activity resource",
+        ),
+        pytest.param(
+            Map(
+                "Foo",
+                ItemProcessor=single_state_machine(Task("Bar", Resource=FUNCTION)),
+                ProcessorConfig=ProcessorConfig.distributed(),
+            ),
+            "Express workflows do not support distributed Map states.",
+            id="distributed map",
+        ),
+        pytest.param(
+            Wait("Foo", Seconds=301),
+            "Wait of 301 seconds is longer than an Express execution can run (300 seconds).",
+            id="wait",
+        ),
+    ),
+)
+def test_express_violations(state, reason):
+    assert express_violations(single_state_machine(state)) == [ExpressViolation("Foo", (), reason)]
+
+
+def test_express_violations_nested():
+    branch = single_state_machine(Task("Wait For Approval", Resource=f"{FUNCTION}.waitForTaskToken"))
+    fan_out = Parallel("FanOut")
+    fan_out.add_branch(single_state_machine(Pass("Noop")))
+    fan_out.add_branch(branch)
+    workflow = single_state_machine(Map("Each", ItemProcessor=single_state_machine(fan_out)), TimeoutSeconds=3600)
+
+    violations = express_violations(workflow)
+
+    assert [(violation.title, violation.location) for violation in violations] == [
+        (None, ()),
+        ("Wait For Approval", ("Each", "ItemProcessor", "FanOut", "Branches[1]")),
+    ]
+    assert str(violations[0]).startswith("State machine: TimeoutSeconds of 3600")
+    assert str(violations[1]).startswith("Each/ItemProcessor/FanOut/Branches[1]/Wait For Approval: ")
+
+
+def _waits(*seconds: int) -> StateMachine:
+    workflow = StateMachine()
+    state = workflow.start_with(Wait("Wait 0", Seconds=seconds[0]))
+    for position, value in enumerate(seconds[1:], 1):
+        state = state.then(Wait(f"Wait {position}", Seconds=value))
+    state.end()
+    return workflow
+
+
+def _parallel(*branches: StateMachine) -> StateMachine:
+    fan_out = Parallel("FanOut")
+    for branch in branches:
+        fan_out.add_branch(branch)
+    return single_state_machine(fan_out)
+
+
+def _with_shortcut() -> StateMachine:
+    workflow = StateMachine()
+    decide = workflow.start_with(Choice("Skip?"))
+    decide.if_(VariablePath("$.skip") == True).then(Succeed("Done"))  # noqa: E712
+    decide.else_(Wait("Wait 0", Seconds=200)).then(Wait("Wait 1", Seconds=200)).end()
+    return workflow
+
+
+def _with_catch() -> StateMachine:
+    workflow = StateMachine()
+    workflow.start_with(Task("Work", Resource=FUNCTION, Catch=[{"ErrorEquals": ["States.ALL"], "Next": "Done"}])).then(
+        Wait("Wait 0", Seconds=200)
+    ).then(Wait("Wait 1", Seconds=200)).end()
+    workflow.add_state(Succeed("Done"))
+    return workflow
+
+
+def _with_loop() -> StateMachine:
+    workflow = StateMachine()
+    decide = workflow.start_with(Wait("Wait 0", Seconds=200)).then(Choice("Again?"))
+    decide.if_(VariablePath("$.again") == True).then(workflow.States["Wait 0"])  # noqa: E712
+    decide.else_(Succeed("Done"))
+    return workflow
+
+
+@pytest.mark.parametrize(
+    "workflow, seconds",
+    (
+        pytest.param(_waits(200, 200), 400, id="waits"),
+        pytest.param(_parallel(_waits(200), _waits(100, 250)), 350, id="slowest branch"),
+        pytest.param(single_state_machine(Map("Each", Iterator=_waits(150, 151))), 301, id="map iteration"),
+    ),
+)
+def test_express_violations_path(workflow, seconds):
+    assert express_violations(workflow) == [
+        ExpressViolation(
+            None,
+            (),
+            f"Every path waits for at least {seconds} seconds, longer than an Express execution can run "
+            "(300 seconds).",
+        )
+    ]
+
+
+@pytest.mark.parametrize(
+    "workflow",
+    (
+        pytest.param(_waits(150, 150), id="waits"),
+        pytest.param(_with_shortcut(), id="choice"),
+        pytest.param(_with_catch(), id="catch"),
+        pytest.param(_with_loop(), id="loop"),
+    ),
+)
+def test_express_compatible_paths(workflow):
+    assert express_violations(workflow) == []
+
+
+def test_express_path_to_dict():
+    workflow = _waits(200, 200)
+    workflow.StateMachineType = ExecutionType.EXPRESS
+
+    with pytest.raises(InvalidDefinitionError) as excinfo:
+        workflow.to_dict()
+
+    excinfo.match("Every path waits for at least 400 seconds")
+
+    workflow.StateMachineType = ExecutionType.STANDARD
+    workflow.to_dict()
+
+
+def test_express_state_machine_to_dict():
+    workflow = single_state_machine(Task("Foo", Resource=ACTIVITY), StateMachineType="EXPRESS")
+    assert workflow.StateMachineType is ExecutionType.EXPRESS
+
+    with pytest.raises(InvalidDefinitionError) as excinfo:
+        workflow.to_dict()
+
+    excinfo.match("cannot run as an Express workflow: Foo: Express workflows do not support activities.")
+
+    workflow.StateMachineType = ExecutionType.STANDARD
+    assert "StateMachineType" not in workflow.to_dict()
+
+
+def test_express_child_executions_to_dict():
+    processor = single_state_machine(Task("Bar", Resource=ACTIVITY))
+    workflow = single_state_machine(
+        Map("Foo", ItemProcessor=processor, ProcessorConfig=ProcessorConfig.distributed("EXPRESS"), ItemsPath="$.items")
+    )
+
+    with pytest.raises(InvalidDefinitionError):
+        workflow.to_dict()
+
+    workflow.States["Foo"].ProcessorConfig = ProcessorConfig.distributed("STANDARD")
+    workflow.to_dict()
+
+
+def test_validate_express():
+    validate_express(single_state_machine(Task("Foo", Resource=FUNCTION)))
+
+    with pytest.raises(InvalidDefinitionError):
+        validate_express(single_state_machine(Task("Foo", Resource=ACTIVITY)))
@@ -0,0 +1,204 @@
+"""Unit tests for ``rhodes.farm``."""
+import json
+import os
+import site
+import sys
+import textwrap
+import types
+
+import pytest
+
+from rhodes.farm import Builder, build_all, discover, forget_project_modules, is_project_file
+
+from .unit_test_helpers import state_machine_body
+
+pytestmark = [pytest.mark.local, pytest.mark.functional]
+
+GOOD_BUILDER = """
+from rhodes.states import StateMachine, Task
+
+
+def build():
+    workflow = StateMachine(Comment="A simple minimal example of the States language")
+    workflow.start_with(
+        Task("Hello World", Resource="arn:aws:lambda:us-east-1:123456789012:function:HelloWorld")
+    ).end()
+    return workflow
+
+
+def other():
+    return build()
+"""
+FAILING_BUILDER = """
+def build():
+    raise RuntimeError("broken builder")
+"""
+WRONG_TYPE_BUILDER = """
+def build():
+    return {"StartAt": "Nope"}
+"""
+CRASHING_BUILDER = """
+import os
+
+
+def build():
+    os._exit(1)
+"""
+NOT_A_BUILDER = """
+VALUE = 1
+"""
+
+
+@pytest.fixture
+def workflows(tmp_path, monkeypatch, request):
+    package = f"farm_{request.node.name.replace('[', '_').replace(']', '').replace('-', '_')}"
+    root = tmp_path / "src" / package
+    (root / "nested").mkdir(parents=True)
+    (root / "__init__.py").write_text("")
+    (root / "nested" / "__init__.py").write_text("")
+    (root / "good.py").write_text(textwrap.dedent(GOOD_BUILDER))
+    (root / "nested" / "also_good.py").write_text(textwrap.dedent(GOOD_BUILDER))
+    (root / "helpers.py").write_text(NOT_A_BUILDER)
+    monkeypatch.syspath_prepend(str(tmp_path / "src"))
+    return package, root
+
+
+def test_builder_parse():
+    assert Builder.parse("pkg.module") == Builder("pkg.module", "build")
+    assert Builder.parse("pkg.module:other") == Builder("pkg.module", "other")
+    assert str(Builder("pkg.module")) == "pkg.module:build"
+    assert Builder("pkg.module", "other").filename == "pkg.module.other.json"
+
+
+def test_discover(workflows):
+    package, _root = workflows
+
+    builders = discover(package, f"{package}.good:other", f"{package}.good")
+
+    assert builders == [
+        Builder(f"{package}.good"),
+        Builder(f"{package}.nested.also_good"),
+        Builder(f"{package}.good", "other"),
+    ]
+
+
+@pytest.mark.parametrize("workers", (1, 2))
+def test_build_all(workflows, tmp_path, workers):
+    package, _root = workflows
+    output_dir = tmp_path / "out"
+
+    report = build_all(discover(package), output_dir, workers=workers)
+
+    assert not report.failed
+    assert len(report.succeeded) == 2
+    for result in report.results:
+        assert result.seconds > 0
+        with open(result.output) as output:
+            assert json.load(output) == state_machine_body("hello-world")
+    assert sorted(path.name for path in output_dir.iterdir()) == [
+        f"{package}.good.build.json",
+        f"{package}.nested.also_good.build.json",
+    ]
+
+
+def test_build_all_definition_string(workflows, tmp_path):
+    package, _root = workflows
+
+    report = build_all([f"{package}.good"], tmp_path, output_format="definition_string")
+
+    with open(report.results[0].output) as output:
+        rendered = json.load(output)
+    assert json.loads(rendered["Fn::Sub"]) == state_machine_body("hello-world")
+
+
+@pytest.mark.parametrize("workers", (1, 2))
+def test_build_all_isolates_failures(workflows, tmp_path, workers):
+    package, root = workflows
+    (root / "failing.py").write_text(FAILING_BUILDER)
+    (root / "wrong_type.py").write_text(WRONG_TYPE_BUILDER)
+
+    report = build_all(
+        [f"{package}.failing", f"{package}.good", f"{package}.wrong_type", f"{package}.missing"],
+        tmp_path / "out",
+        workers=workers,
+    )
+
+    assert [result.ok for result in report.results] == [False, True, False, False]
+    assert report.results[0].error == "RuntimeError: broken builder"
+    assert "raise RuntimeError" in report.results[0].traceback
+    assert report.results[2].error == "TypeError: Builder returned dict, not StateMachine"
+    assert report.results[3].error.startswith("ModuleNotFoundError")
+
+    summary = report.summary()
+    assert "1 succeeded, 3 failed" in summary
+    assert "FAIL" in summary
+
+
+def test_build_all_isolates_crashes(workflows, tmp_path):
+    package, root = workflows
+    (root / "crashing.py").write_text(CRASHING_BUILDER)
+    targets = [f"{package}.good", f"{package}.crashing", f"{package}.nested.also_good"]
+
+    report = build_all(targets, tmp_path / "out", workers=2)
+
+    assert [result.ok for result in report.results] == [True, False, True]
+    assert report.results[1].error == "Worker process exited unexpectedly"
+
+
+def test_build_all_unknown_format(tmp_path):
+    with pytest.raises(ValueError) as excinfo:
+        build_all([], tmp_path, output_format="yaml")
+
+    excinfo.match("Unknown output format")
+
+
+def test_build_all_definition_substitutions(workflows, tmp_path):
+    package, _root = workflows
+
+    report = build_all([f"{package}.good"], tmp_path, output_format="definition_substitutions")
+
+    with open(report.results[0].output) as output:
+        rendered = json.load(output)
+    assert rendered == {"Definition": state_machine_body("hello-world"), "DefinitionSubstitutions": {}}
+
+
+@pytest.mark.parametrize(
+    "root",
+    (
+        pytest.param(site.getusersitepackages(), id="user site"),
+        pytest.param(sys.prefix, id="prefix"),
+        pytest.param(sys.base_prefix, id="base prefix"),
+        pytest.param(sys.exec_prefix, id="exec prefix"),
+        pytest.param(os.path.dirname(json.__file__), id="stdlib"),
+        pytest.param(os.path.dirname(pytest.__file__), id="installed package"),
+    ),
+)
+def test_is_project_file_installed(root):
+    assert not is_project_file(os.path.join(root, "troposphere", "__init__.py"))
+
+
+def test_is_project_file(workflows):
+    _package, root = workflows
+
+    assert is_project_file(str(root / "good.py"))
+
+
+def _fake_module(name: str, path: str) -> types.ModuleType:
+    module = types.ModuleType(name)
+    module.__file__ = path
+    return module
+
+
+def test_forget_project_modules(workflows, monkeypatch):
+    package, root = workflows
+    project = _fake_module(f"{package}.good", str(root / "good.py"))
+    main = _fake_module("__main__", str(root / "good.py"))
+    dependency = _fake_module("farm_user_dependency", os.path.join(site.getusersitepackages(), "dependency.py"))
+    for module in (project, main, dependency):
+        monkeypatch.setitem(sys.modules, module.__name__, module)
+
+    forget_project_modules()
+
+    assert project.__name__ not in sys.modules
+    assert sys.modules["__main__"] is main
+    assert sys.modules[dependency.__name__] is dependency
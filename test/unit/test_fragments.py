@@ -0,0 +1,189 @@
+"""Unit tests for ``rhodes.fragments``."""
+import pytest
+
+from rhodes.choice_rules import VariablePath
+from rhodes.exceptions import InvalidDefinitionError
+from rhodes.fragments import Fragment
+from rhodes.optimizer import optimize
+from rhodes.states import Choice, Fail, Map, Parallel, Pass, StateMachine, Succeed, Task
+from rhodes.structures import JsonPath, Parameters
+
+pytestmark = [pytest.mark.local, pytest.mark.functional]
+
+RESOURCE = "arn:aws:lambda:us-east-1:123456789012:function:Foo"
+
+
+def _fragment() -> Fragment:
+    fragment = Fragment()
+    fetch = fragment.start_with(
+        Task(
+            "Fetch",
+            Resource=RESOURCE,
+            Parameters=Parameters(Source=JsonPath("$.source")),
+            Retry=[{"ErrorEquals": ["States.ALL"], "MaxAttempts": 2}],
+            Catch=[{"ErrorEquals": ["States.ALL"], "Next": "Failed"}],
+        )
+    )
+    check = fetch.then(Choice("Check"))
+    check.if_(VariablePath("$.ok") == True).then(Pass("Unwrap", InputPath="$.body")).Next = "Done"  # noqa: E712
+    check.else_(Fail("Failed", Error="FetchFailed"))
+    return fragment
+
+
+def test_instantiate():
+    workflow = StateMachine()
+    entry = _fragment().instantiate(workflow, prefix="A-", remap={"Done": "Finish"})
+    workflow.StartAt = entry.title
+    workflow.add_state(Succeed("Finish"))
+
+    assert entry is workflow.States["A-Fetch"]
+    assert workflow.to_dict()["States"] == {
+        "A-Fetch": {
+            "Type": "Task",
+            "Resource": RESOURCE,
+            "InputPath": "$",
+            "OutputPath": "$",
+            "ResultPath": "$",
+            "Parameters": {"Source.$": "$.source"},
+            "Retry": [{"ErrorEquals": ["States.ALL"], "MaxAttempts": 2}],
+            "Catch": [{"ErrorEquals": ["States.ALL"], "Next": "A-Failed"}],
+            "Next": "A-Check",
+        },
+        "A-Check": {
+            "Type": "Choice",
+            "InputPath": "$",
+            "OutputPath": "$",
+            "Choices": [{"Variable": "$.ok", "BooleanEquals": True, "Next": "A-Unwrap"}],
+            "Default": "A-Failed",
+        },
+        "A-Unwrap": {"Type": "Pass", "InputPath": "$.body", "OutputPath": "$", "ResultPath": "$", "Next": "Finish"},
+        "A-Failed": {"Type": "Fail", "Error": "FetchFailed"},
+        "Finish": {"Type": "Succeed"},
+    }
+
+
+def test_instances_share_structure():
+    fragment = _fragment()
+    template = fragment.template.States["Fetch"]
+    workflow = StateMachine()
+
+    first = fragment.instantiate(workflow, prefix="A-")
+    second = fragment.instantiate(workflow, prefix="B-")
+
+    assert first.Parameters is second.Parameters is template.Parameters
+    assert first.InputPath is template.InputPath
+    assert first.Retry == template.Retry
+    assert first.Retry is not template.Retry
+    assert first.member_of is workflow
+    assert template.member_of is fragment.template
+    assert workflow.States["B-Check"].Choices[0].member_of is workflow.States["B-Check"]
+    assert fragment.template.States["Check"].Choices[0].member_of is fragment.template.States["Check"]
+    assert fragment.template.States["Check"].Choices[0].Next == "Unwrap"
+    assert template.Catch == [{"ErrorEquals": ["States.ALL"], "Next": "Failed"}]
+
+
+def test_copy_on_write():
+    fragment = _fragment()
+    workflow = StateMachine()
+    first = fragment.instantiate(workflow, prefix="A-")
+    second = fragment.instantiate(
+        workflow, prefix="B-", overrides={"Fetch": {"Parameters": Parameters(Source="fixed"), "TimeoutSeconds": 5}}
+    )
+
+    first.Comment = "only the first"
+
+    assert second.Comment is None
+    assert fragment.template.States["Fetch"].Comment is None
+    assert second.Parameters.to_dict() == {"Source": "fixed"}
+    assert first.Parameters.to_dict() == {"Source.$": "$.source"}
+    assert second.TimeoutSeconds == 5
+    assert first.TimeoutSeconds is None
+
+
+def _nested_fragment() -> Fragment:
+    fragment = Fragment()
+    fan_out = fragment.start_with(Parallel("FanOut"))
+    fan_out.add_branch().start_with(Pass("Left", End=True))
+    iterator = StateMachine()
+    iterator.start_with(Pass("First")).then(Pass("Second")).end()
+    fan_out.then(Map("Each", ItemsPath="$.items", Iterator=iterator)).end()
+    return fragment
+
+
+def test_nested_branches_are_copied():
+    fragment = _nested_fragment()
+    workflow = StateMachine()
+
+    first = fragment.instantiate(workflow, prefix="A-")
+    second = fragment.instantiate(workflow, prefix="B-")
+    first.add_branch().start_with(Pass("Right", End=True))
+
+    assert len(fragment.template.States["FanOut"].Branches) == 1
+    assert len(second.Branches) == 1
+    assert len(first.Branches) == 2
+    assert first.Branches[0].States["Left"].member_of is first.Branches[0]
+
+
+def test_nested_iterators_are_copied():
+    fragment = _nested_fragment()
+    workflow = StateMachine()
+    first = fragment.instantiate(workflow, prefix="A-").member_of.States["A-Each"]
+    second = fragment.instantiate(workflow, prefix="B-").member_of.States["B-Each"]
+
+    first.Iterator.States["First"].Comment = "only the first"
+
+    assert second.Iterator.States["First"].Comment is None
+    assert fragment.template.States["Each"].Iterator.States["First"].Comment is None
+
+
+def test_optimize_does_not_change_template():
+    fragment = _nested_fragment()
+    workflow = StateMachine()
+    workflow.StartAt = fragment.instantiate(workflow, prefix="A-").title
+
+    report = optimize(workflow)
+
+    assert report
+    assert list(workflow.States["A-Each"].Iterator.States) != ["First", "Second"]
+    assert list(fragment.template.States["Each"].Iterator.States) == ["First", "Second"]
+
+
+def test_containers_are_copied():
+    fragment = _fragment()
+    workflow = StateMachine()
+    first = fragment.instantiate(workflow, prefix="A-")
+    second = fragment.instantiate(workflow, prefix="B-")
+    template = fragment.template.States["Fetch"]
+
+    first.Retry[0]["MaxAttempts"] = 10
+    first.Catch.append({"ErrorEquals": ["Other"], "Next": "A-Check"})
+    workflow.States["A-Check"].Choices[0].Next = "A-Failed"
+
+    assert second.Retry == template.Retry == [{"ErrorEquals": ["States.ALL"], "MaxAttempts": 2}]
+    assert second.Catch == [{"ErrorEquals": ["States.ALL"], "Next": "B-Failed"}]
+    assert template.Catch == [{"ErrorEquals": ["States.ALL"], "Next": "Failed"}]
+    assert workflow.States["B-Check"].Choices[0].Next == "B-Unwrap"
+    assert fragment.template.States["Check"].Choices[0].Next == "Unwrap"
+
+
+def test_duplicate_instance():
+    fragment = _fragment()
+    workflow = StateMachine()
+    fragment.instantiate(workflow, prefix="A-", overrides={"Fetch": {"TimeoutSeconds": 5}})
+
+    with pytest.raises(InvalidDefinitionError):
+        fragment.instantiate(workflow, prefix="A-")
+
+
+@pytest.mark.parametrize(
+    "overrides, error_type",
+    (
+        ({"Missing": {"Comment": "x"}}, KeyError),
+        ({"Fetch": {"NotAField": 1}}, AttributeError),
+        ({"Fetch": {"title": "Other"}}, AttributeError),
+        ({"Fetch": {"TimeoutSeconds": "five"}}, TypeError),
+    ),
+)
+def test_invalid_overrides(overrides, error_type):
+    with pytest.raises(error_type):
+        _fragment().instantiate(StateMachine(), prefix="A-", overrides=overrides)
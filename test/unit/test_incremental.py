@@ -0,0 +1,216 @@
+"""Unit tests for ``rhodes.incremental``."""
+import json
+import sys
+import textwrap
+import types
+
+import pytest
+
+from rhodes import farm
+from rhodes.cli import main
+from rhodes.farm import Builder
+from rhodes.incremental import build_incremental, dependencies, fingerprint, watch
+
+pytestmark = [pytest.mark.local, pytest.mark.functional]
+
+BUILDER = """
+from rhodes.states import StateMachine, Task
+
+from .helpers import FUNCTION
+
+
+def build():
+    workflow = StateMachine()
+    workflow.start_with(Task("Hello World", Resource=FUNCTION)).end()
+    return workflow
+"""
+HELPERS = """
+FUNCTION = "arn:aws:lambda:us-east-1:123456789012:function:HelloWorld"
+"""
+CHANGED_HELPERS = """
+FUNCTION = "arn:aws:lambda:us-east-1:123456789012:function:GoodbyeWorld"
+"""
+UNRELATED = """
+VALUE = 1
+"""
+
+
+@pytest.fixture
+def workflows(tmp_path, monkeypatch, request):
+    package = f"incremental_{request.node.name.replace('[', '_').replace(']', '').replace('-', '_')}"
+    root = tmp_path / "src" / package
+    root.mkdir(parents=True)
+    (root / "__init__.py").write_text("")
+    (root / "flow.py").write_text(textwrap.dedent(BUILDER))
+    (root / "helpers.py").write_text(HELPERS)
+    (root / "unrelated.py").write_text(UNRELATED)
+    monkeypatch.syspath_prepend(str(tmp_path / "src"))
+
+    # Rebuilds forget project modules, which includes the test modules.
+    modules = dict(sys.modules)
+    yield package, root
+    sys.modules.update(modules)
+
+
+def _resource(output) -> str:
+    return json.loads(output.read_text())["States"]["Hello World"]["Resource"]
+
+
+def test_dependencies(workflows):
+    package, root = workflows
+
+    found = dependencies(f"{package}.flow")
+
+    assert found == {
+        package: str(root / "__init__.py"),
+        f"{package}.flow": str(root / "flow.py"),
+        f"{package}.helpers": str(root / "helpers.py"),
+    }
+
+
+def test_fingerprint_tracks_dependencies(workflows):
+    package, root = workflows
+    builder = Builder(f"{package}.flow")
+    original = fingerprint(builder)
+
+    (root / "unrelated.py").write_text("VALUE = 2\n")
+    assert fingerprint(builder) == original
+    assert fingerprint(builder, "definition_string") != original
+
+    (root / "helpers.py").write_text(CHANGED_HELPERS)
+    assert fingerprint(builder) != original
+
+
+def test_build_incremental(workflows, tmp_path):
+    package, root = workflows
+    output_dir = tmp_path / "out"
+    cache_dir = tmp_path / "cache"
+    targets = [f"{package}.flow"]
+
+    first = build_incremental(targets, output_dir, cache_dir=cache_dir, workers=1)
+    output = output_dir / f"{package}.flow.build.json"
+    assert [result.cached for result in first.results] == [False]
+    assert _resource(output).endswith(":HelloWorld")
+
+    output.unlink()
+    second = build_incremental(targets, output_dir, cache_dir=cache_dir, workers=1)
+    assert [result.cached for result in second.results] == [True]
+    assert second.results[0].output == str(output)
+    assert _resource(output).endswith(":HelloWorld")
+
+    (root / "helpers.py").write_text(CHANGED_HELPERS)
+    third = build_incremental(targets, output_dir, cache_dir=cache_dir, workers=1, fresh_imports=True)
+    assert [result.cached for result in third.results] == [False]
+    assert _resource(output).endswith(":GoodbyeWorld")
+
+
+def test_build_incremental_does_not_cache_failures(workflows, tmp_path):
+    package, root = workflows
+    (root / "helpers.py").write_text("raise RuntimeError('broken helpers')\n")
+
+    for _ in range(2):
+        report = build_incremental([f"{package}.flow"], tmp_path / "out", cache_dir=tmp_path / "cache", workers=1)
+        assert not report.results[0].ok
+        assert not report.results[0].cached
+
+
+def test_watch(workflows, tmp_path):
+    package, root = workflows
+    output = tmp_path / "out" / f"{package}.flow.build.json"
+    reports = []
+
+    def _on_report(report):
+        reports.append(report)
+        if len(reports) == 1:
+            assert _resource(output).endswith(":HelloWorld")
+            (root / "helpers.py").write_text(CHANGED_HELPERS)
+
+    watch(
+        [package],
+        tmp_path / "out",
+        cache_dir=tmp_path / "cache",
+        workers=1,
+        interval=0,
+        on_report=_on_report,
+        should_stop=lambda: len(reports) >= 2,
+    )
+
+    assert [[str(result.builder) for result in report.results] for report in reports] == [[f"{package}.flow:build"]] * 2
+    assert all(report.results[0].ok for report in reports)
+    assert _resource(output).endswith(":GoodbyeWorld")
+
+
+def test_watch_keeps_dependency_modules(workflows, tmp_path, monkeypatch):
+    package, root = workflows
+    # Stands in for a "pip install --user" site directory.
+    user_site = tmp_path / "user-site"
+    user_site.mkdir()
+    (user_site / "incremental_dependency.py").write_text("PREFIX = 'arn:aws:lambda:us-east-1:123456789012:function:'\n")
+    monkeypatch.syspath_prepend(str(user_site))
+    monkeypatch.setattr(farm, "_INSTALLED_ROOTS", farm._INSTALLED_ROOTS + (str(user_site) + "/",))
+    (root / "helpers.py").write_text("from incremental_dependency import PREFIX\n\nFUNCTION = PREFIX + 'HelloWorld'\n")
+    # A script run as "python -m" or "python script.py" from the project.
+    main_module = types.ModuleType("__main__")
+    main_module.__file__ = str(root / "unrelated.py")
+    monkeypatch.setitem(sys.modules, "__main__", main_module)
+    import incremental_dependency  # pylint: disable=import-error,import-outside-toplevel
+
+    kept = {name: sys.modules[name] for name in ("__main__", "attr", "jsonpath_rw", "rhodes.states")}
+    reports = []
+
+    def _on_report(report):
+        reports.append(report)
+        (root / "flow.py").write_text(textwrap.dedent(BUILDER) + f"\n# Build {len(reports)}\n")
+
+    watch(
+        [f"{package}.flow"],
+        tmp_path / "out",
+        cache_dir=tmp_path / "cache",
+        workers=1,
+        interval=0,
+        on_report=_on_report,
+        should_stop=lambda: len(reports) >= 3,
+    )
+
+    assert all(report.results[0].ok for report in reports)
+    assert sys.modules["incremental_dependency"] is incremental_dependency
+    assert {name: sys.modules[name] for name in kept} == kept
+
+
+def test_watch_reports_import_errors(workflows, tmp_path):
+    package, root = workflows
+    (root / "flow.py").write_text("def build(:\n")
+    reports = []
+
+    watch(
+        [f"{package}.flow"],
+        tmp_path / "out",
+        cache_dir=tmp_path / "cache",
+        workers=1,
+        interval=0,
+        on_report=reports.append,
+        should_stop=lambda: len(reports) >= 1,
+    )
+
+    assert reports[0].failed[0].error.startswith("SyntaxError")
+
+
+def test_cli_build(workflows, tmp_path, capsys):
+    package, _root = workflows
+    args = ["build", package, "-o", str(tmp_path / "out"), "--cache-dir", str(tmp_path / "cache"), "--workers", "1"]
+
+    assert main(args) == 0
+    assert "1 succeeded, 0 failed in" in capsys.readouterr().out
+
+    assert main(args) == 0
+    assert "1 succeeded, 0 failed, 1 cached in" in capsys.readouterr().out
+    assert (tmp_path / "out" / f"{package}.flow.build.json").is_file()
+
+
+def test_cli_build_failure(workflows, tmp_path, capsys):
+    package, _root = workflows
+
+    exit_code = main(["build", f"{package}.helpers:missing", "-o", str(tmp_path / "out"), "--no-cache"])
+
+    assert exit_code == 1
+    assert "0 succeeded, 1 failed" in capsys.readouterr().out
@@ -0,0 +1,418 @@
+"""Unit tests for ``rhodes.loader``."""
+import copy
+import io
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from rhodes import loader
+from rhodes._graph import GraphIndex
+from rhodes.choice_rules import And, Not, NumericGreaterThan, StringEquals, TimestampLessThan
+from rhodes.exceptions import InvalidDefinitionError
+from rhodes.identifiers import IntegrationPattern
+from rhodes.loader import LazyStates, StateSummary, load_definition, load_json
+from rhodes.states import Parallel, StateMachine, Task
+from rhodes.states.services.awslambda import AwsLambda
+from rhodes.states.services.stepfunctions import AwsStepFunctions
+from rhodes.structures import ContextPath, JsonPath, Parameters, ProcessorConfig
+
+from .unit_test_helpers import state_machine_body
+
+pytestmark = [pytest.mark.local, pytest.mark.functional]
+
+STATE_MACHINE_VECTORS = (
+    "accretion_builder",
+    "accretion_listener",
+    "hello-world",
+    "simple-choice",
+    "simple-map",
+    "simple-parallel",
+    "three-tasks",
+)
+
+
+def _task_machine(**task):
+    task_definition = dict(Type="Task", InputPath="$", OutputPath="$", ResultPath="$", End=True, **task)
+    return {"StartAt": "Work", "States": {"Work": task_definition}}
+
+
+@pytest.mark.parametrize("vector_name", STATE_MACHINE_VECTORS)
+def test_load_vector(vector_name):
+    expected = state_machine_body(vector_name)
+
+    assert StateMachine.from_dict(expected).to_dict() == expected
+    assert StateMachine.from_json(json.dumps(expected)).to_dict() == expected
+
+
+@pytest.mark.parametrize("vector_name", STATE_MACHINE_VECTORS)
+@pytest.mark.parametrize("chunk_size", (1, 7, 4096))
+def test_load_vector_stream(vector_name, chunk_size):
+    expected = state_machine_body(vector_name)
+
+    test = load_json(io.StringIO(json.dumps(expected, indent=4)), chunk_size=chunk_size)
+
+    assert test.to_dict() == expected
+
+
+def test_load_stream_bytes():
+    expected = state_machine_body("simple-parallel")
+
+    test = StateMachine.from_json(io.BytesIO(json.dumps(expected).encode("utf-8")))
+
+    assert isinstance(test.States[test.StartAt], Parallel)
+    assert test.to_dict() == expected
+
+
+def test_load_service_integration():
+    definition = _task_machine(
+        Resource="arn:aws:states:::lambda:invoke.waitForTaskToken",
+        Parameters={
+            "FunctionName": "arn:aws:lambda:us-east-1:123456789012:function:Foo",
+            "Payload": {"Input.$": "$.detail", "Token.$": "$$.Task.Token", "Static": "value"},
+        },
+    )
+
+    test = load_definition(definition)
+
+    work = test.States["Work"]
+    assert isinstance(work, AwsLambda)
+    assert work.member_of is test
+    assert work.Pattern is IntegrationPattern.WAIT_FOR_CALLBACK
+    assert work.FunctionName == "arn:aws:lambda:us-east-1:123456789012:function:Foo"
+    assert isinstance(work.Payload, Parameters)
+    assert work.Payload.to_dict() == {"Input.$": "$.detail", "Token.$": "$$.Task.Token", "Static": "value"}
+    assert test.to_dict() == definition
+
+
+def test_load_service_integration_synchronous_json():
+    definition = _task_machine(
+        Resource="arn:aws:states:::states:startExecution.sync:2",
+        Parameters={"StateMachineArn": "arn:aws:states:us-east-1:123456789012:stateMachine:Child", "Input.$": "$"},
+    )
+
+    test = load_definition(definition)
+
+    assert isinstance(test.States["Work"], AwsStepFunctions)
+    assert test.States["Work"].Pattern is IntegrationPattern.SYNCHRONOUS_JSON
+    assert test.to_dict() == definition
+
+
+@pytest.mark.parametrize(
+    "task",
+    (
+        pytest.param(
+            dict(Resource="arn:aws:states:::lambda:invoke", Parameters={"FunctionName": "Foo", "Unknown": "bar"}),
+            id="unknown parameter",
+        ),
+        pytest.param(
+            dict(Resource="arn:aws:states:::lambda:invoke", Parameters={"FunctionName": "Foo", "Qualifier": ""}),
+            id="invalid parameter value",
+        ),
+        pytest.param(
+            dict(Resource="arn:aws:states:::lambda:invoke.sync", Parameters={"FunctionName": "Foo"}),
+            id="unsupported pattern",
+        ),
+    ),
+)
+def test_load_service_integration_fallback(task):
+    definition = _task_machine(**task)
+
+    test = load_definition(definition)
+
+    assert type(test.States["Work"]) is Task
+    assert test.States["Work"].member_of is test
+    assert test.to_dict() == definition
+
+
+def test_load_parameters():
+    definition = {
+        "StartAt": "Shape",
+        "States": {
+            "Shape": {
+                "Type": "Pass",
+                "Parameters": {
+                    "Item.$": "$.Records[0]",
+                    "Id.$": "$$.Execution.Id",
+                    "Message.$": "States.Format('Hello {}', $.name)",
+                    "Nested": {"Value.$": "$.value"},
+                },
+                "End": True,
+            }
+        },
+    }
+
+    test = load_definition(definition)
+
+    parameters = test.States["Shape"].Parameters._map  # pylint: disable=protected-access
+    assert parameters["Item"] == JsonPath("$.Records[0]")
+    assert str(parameters["Id"]) == str(ContextPath().Execution.Id)
+    assert parameters["Message.$"] == "States.Format('Hello {}', $.name)"
+    assert isinstance(parameters["Nested"], Parameters)
+
+
+def test_load_distributed_map():
+    processor = {
+        "StartAt": "Work",
+        "States": {
+            "Work": {
+                "Type": "Task",
+                "Resource": "arn:aws:lambda:us-east-1:123456789012:function:work",
+                "InputPath": "$",
+                "OutputPath": "$",
+                "ResultPath": "$",
+                "End": True,
+            }
+        },
+        "ProcessorConfig": {"Mode": "DISTRIBUTED", "ExecutionType": "EXPRESS"},
+    }
+    expected = {
+        "StartAt": "Each",
+        "States": {
+            "Each": {
+                "Type": "Map",
+                "ItemProcessor": processor,
+                "ItemReader": {
+                    "Resource": "arn:aws:states:::s3:getObject",
+                    "Parameters": {"Bucket": "data", "Key.$": "$.key"},
+                    "ReaderConfig": {"InputType": "CSV", "CSVHeaderLocation": "GIVEN", "CSVHeaders": ["id"]},
+                },
+                "ItemSelector": {"row.$": "$$.Map.Item.Value", "run.$": "$.run"},
+                "ItemBatcher": {"MaxInputBytesPerBatch": 1024, "BatchInput": {"run.$": "$.run"}},
+                "ResultWriter": {
+                    "Resource": "arn:aws:states:::s3:putObject",
+                    "Parameters": {"Bucket": "results", "Prefix": "rows"},
+                },
+                "ToleratedFailureCount": 3,
+                "Label": "Rows",
+                "InputPath": "$",
+                "OutputPath": "$",
+                "ResultPath": "$",
+                "End": True,
+            }
+        },
+    }
+
+    test = load_definition(expected)
+
+    each = test.States["Each"]
+    assert each.distributed
+    assert each.ProcessorConfig == ProcessorConfig.distributed("EXPRESS")
+    assert each.ItemReader.ReaderConfig.CSVHeaders == ["id"]
+    assert each.ItemBatcher.BatchInput.to_dict() == {"run.$": "$.run"}
+    assert test.to_dict() == expected
+
+
+def test_load_distributed_map_invalid_structure():
+    definition = {
+        "StartAt": "Each",
+        "States": {
+            "Each": {
+                "Type": "Map",
+                "ItemProcessor": {"StartAt": "Done", "States": {"Done": {"Type": "Succeed"}}},
+                "ItemsPath": "$.items",
+                "ItemBatcher": {"MaxItemsPerBatch": 0},
+                "End": True,
+            }
+        },
+    }
+
+    with pytest.raises(InvalidDefinitionError) as excinfo:
+        load_definition(definition)
+
+    excinfo.match("must be at least 1")
+
+
+def test_load_choice_rules():
+    definition = {
+        "StartAt": "Decide",
+        "States": {
+            "Decide": {
+                "Type": "Choice",
+                "Choices": [
+                    {
+                        "And": [
+                            {"Variable": "$.count", "NumericGreaterThan": 10},
+                            {"Not": {"Variable": "$.name", "StringEquals": "skip"}},
+                        ],
+                        "Next": "Done",
+                    },
+                    {"Variable": "$.when", "TimestampLessThan": "2020-01-01T12:30:00.5+01:00", "Next": "Done"},
+                ],
+                "Default": "Done",
+            },
+            "Done": {"Type": "Succeed"},
+        },
+    }
+
+    test = load_definition(definition)
+
+    decision = test.States["Decide"]
+    first, second = decision.Choices
+    assert isinstance(first, And)
+    assert first.member_of is decision
+    assert isinstance(first.Rules[0], NumericGreaterThan)
+    assert isinstance(first.Rules[1], Not)
+    assert isinstance(first.Rules[1].Rule, StringEquals)
+    assert isinstance(second, TimestampLessThan)
+    assert second.Value == datetime(2020, 1, 1, 12, 30, 0, 500000, tzinfo=timezone(timedelta(hours=1)))
+
+
+@pytest.mark.parametrize(
+    "definition, message",
+    (
+        pytest.param(
+            {"StartAt": "A", "States": {"A": {"Type": "Magic", "End": True}}}, "Unknown state type", id="unknown type"
+        ),
+        pytest.param(
+            {"StartAt": "A", "States": {"A": {"Type": "Pass", "ResultPath": None, "End": True}}},
+            "sets ResultPath to null",
+            id="null path",
+        ),
+        pytest.param(
+            {"StartAt": "A", "States": {"A": {"Type": "Pass", "Resource": "arn", "End": True}}},
+            "Unsupported field 'Resource' for Pass state 'States.A'",
+            id="unsupported field",
+        ),
+        pytest.param(
+            {"StartAt": "A", "States": {"A": {"Type": "Wait", "Seconds": 1, "SecondsPath": "$.wait", "End": True}}},
+            "Invalid state 'States.A'",
+            id="invalid value",
+        ),
+        pytest.param(
+            {
+                "StartAt": "A",
+                "States": {
+                    "A": {
+                        "Type": "Parallel",
+                        "Branches": [{"StartAt": "B", "States": {"B": {"Type": "Pass", "End": "yes"}}}],
+                        "End": True,
+                    }
+                },
+            },
+            "Invalid state 'States.A.Branches\\[0\\].States.B'",
+            id="invalid nested value",
+        ),
+        pytest.param(
+            {
+                "StartAt": "A",
+                "States": {"A": {"Type": "Choice", "Choices": [{"Variable": "$.foo", "IsPresent": True, "Next": "A"}]}},
+            },
+            "Unsupported choice rule operator 'IsPresent'",
+            id="unsupported choice rule",
+        ),
+    ),
+)
+def test_load_invalid(definition, message):
+    with pytest.raises(InvalidDefinitionError) as excinfo:
+        load_definition(definition)
+
+    excinfo.match(message)
+
+
+def test_load_invalid_json_stream():
+    with pytest.raises(InvalidDefinitionError) as excinfo:
+        load_json(io.StringIO('{"StartAt": "A", "States": {"A": {"Type": "Pass", '), chunk_size=8)
+
+    excinfo.match("Invalid state machine definition")
+
+
+def _chain_definition(count: int):
+    states = {
+        f"Step{pos}": {"Type": "Pass", "InputPath": f"$.step{pos}", "Next": f"Step{pos + 1}"} for pos in range(count)
+    }
+    states[f"Step{count - 1}"] = {"Type": "Succeed"}
+    return {"StartAt": "Step0", "States": states}
+
+
+def test_load_lazy():
+    definition = _chain_definition(10)
+
+    test = load_definition(definition, lazy=True)
+
+    assert isinstance(test.States, LazyStates)
+    assert list(test.States) == list(definition["States"])
+    assert not any(test.States.is_materialized(title) for title in test.States)
+    assert test.States.peek("Step3") == StateSummary(Type="Pass", Next="Step4")
+    assert test.States.peek("Step9") == StateSummary(Type="Succeed")
+
+    step = test.States["Step3"]
+
+    assert step.member_of is test
+    assert str(step.InputPath) == "$.step3"
+    assert test.States.is_materialized("Step3")
+    assert dict(test.States.materialized()) == {"Step3": step}
+    assert test.States["Step3"] is step
+    assert test.to_dict() == load_definition(definition).to_dict()
+
+
+def test_load_lazy_keeps_validation_on(monkeypatch):
+    building = threading.Event()
+    checked = threading.Event()
+    build_state = loader._Loader.state
+
+    def _state(self, *args):
+        building.set()
+        checked.wait(5)
+        return build_state(self, *args)
+
+    monkeypatch.setattr(loader._Loader, "state", _state)
+    test = load_definition(_chain_definition(3), lazy=True)
+    materialize = threading.Thread(target=test.States.__getitem__, args=("Step1",))
+    materialize.start()
+    building.wait(5)
+    try:
+        # Objects built in other threads while a state is being built are still validated.
+        with pytest.raises(TypeError):
+            Task("Invalid", Resource=12345)
+    finally:
+        checked.set()
+        materialize.join()
+
+    assert test.States.is_materialized("Step1")
+
+
+def test_load_lazy_graph_index():
+    test = load_definition(_chain_definition(10), lazy=True)
+
+    index = GraphIndex(test)
+
+    assert index.reachable() == [f"Step{pos}" for pos in range(10)]
+    assert not any(test.States.is_materialized(title) for title in test.States)
+
+
+@pytest.mark.parametrize("vector_name", STATE_MACHINE_VECTORS)
+def test_load_lazy_vector(vector_name):
+    expected = state_machine_body(vector_name)
+
+    test = StateMachine.from_json(io.StringIO(json.dumps(expected)), lazy=True)
+
+    assert not any(test.States.is_materialized(title) for title in test.States)
+    assert test.to_dict() == expected
+
+
+def test_load_lazy_peek_service_integration():
+    definition = _task_machine(Resource="arn:aws:states:::lambda:invoke", Parameters={"FunctionName": "Foo"})
+    test = load_definition(definition, lazy=True)
+
+    assert isinstance(test.States["Work"], AwsLambda)
+    assert test.States.peek("Work") == StateSummary(Type="Task", End=True)
+
+
+def test_load_lazy_invalid_state():
+    definition = _chain_definition(3)
+    definition["States"]["Step1"]["End"] = True
+    test = load_definition(definition, lazy=True)
+
+    assert test.States["Step0"].member_of is test
+    with pytest.raises(InvalidDefinitionError) as excinfo:
+        test.States["Step1"]
+
+    excinfo.match("Invalid state 'States.Step1'")
+
+
+def test_load_lazy_copy():
+    test = copy.deepcopy(load_definition(_chain_definition(3), lazy=True))
+
+    assert test.States["Step0"].member_of is test
@@ -0,0 +1,127 @@
+"""Unit tests for ``rhodes.minify``."""
+import json
+
+import pytest
+
+from rhodes.choice_rules import VariablePath
+from rhodes.minify import SourceMap
+from rhodes.states import Choice, Fail, Map, Parallel, Pass, StateMachine, Succeed, Task
+from rhodes.structures import ProcessorConfig
+
+from .unit_test_helpers import single_state_machine
+
+pytestmark = [pytest.mark.local, pytest.mark.functional]
+
+RESOURCE = "arn:aws:lambda:us-east-1:123456789012:function:Foo"
+
+
+def _build() -> StateMachine:
+    workflow = StateMachine(Comment="A very descriptive comment")
+    work = workflow.start_with(
+        Task(
+            "Do the first piece of work",
+            Resource=RESOURCE,
+            Comment="Another comment",
+            Catch=[{"ErrorEquals": ["States.ALL"], "Next": "Handle the failure"}],
+        )
+    )
+    decision = work.then(Choice("Decide what to do next"))
+    decision.if_(VariablePath("$.foo") == "bar").then(Succeed("All done"))
+    parallel = decision.else_(Parallel("Do things in parallel", ResultPath="$.Results"))
+    branch = parallel.add_branch()
+    branch.start_with(Pass("Inside the branch", Comment="Nested comment")).end()
+    parallel.end()
+    workflow.add_state(Fail("Handle the failure"))
+    return workflow
+
+
+def test_minify():
+    test = _build().minify()
+
+    assert test.to_dict() == {
+        "StartAt": "a",
+        "States": {
+            "a": {
+                "Type": "Task",
+                "Resource": RESOURCE,
+                "Next": "b",
+                "Catch": [{"ErrorEquals": ["States.ALL"], "Next": "c"}],
+            },
+            "b": {
+                "Type": "Choice",
+                "Choices": [{"StringEquals": "bar", "Variable": "$.foo", "Next": "d"}],
+                "Default": "e",
+            },
+            "d": {"Type": "Succeed"},
+            "e": {
+                "Type": "Parallel",
+                "ResultPath": "$.Results",
+                "Branches": [{"StartAt": "f", "States": {"f": {"Type": "Pass", "End": True}}}],
+                "End": True,
+            },
+            "c": {"Type": "Fail"},
+        },
+    }
+    assert test.source_map.original("e") == "Do things in parallel"
+    assert test.source_map.original("f") == "Inside the branch"
+    assert test.source_map.minified("Handle the failure") == "c"
+
+
+def test_minify_item_processor():
+    processor = single_state_machine(Pass("Inside the processor"))
+    workflow = single_state_machine(
+        Map("Process every item", ItemsPath="$.items", ItemProcessor=processor, ProcessorConfig=ProcessorConfig())
+    )
+
+    test = workflow.minify().to_dict()
+
+    assert test["States"]["a"]["ItemProcessor"] == {
+        "StartAt": "b",
+        "States": {"b": {"Type": "Pass", "End": True}},
+        "ProcessorConfig": {"Mode": "INLINE"},
+    }
+
+
+def test_minify_is_smaller():
+    workflow = _build()
+
+    assert len(workflow.minify().to_json()) < len(json.dumps(workflow.to_dict())) / 2
+
+
+def test_minify_does_not_modify_state_machine():
+    workflow = _build()
+    before = workflow.to_dict()
+
+    workflow.minify()
+
+    assert workflow.to_dict() == before
+
+
+def test_minify_definition_string():
+    test = _build().minify()
+
+    assert test.definition_string().to_dict() == {"Fn::Sub": test.to_json()}
+
+
+def test_source_map_round_trip():
+    source_map = _build().minify().source_map
+
+    assert SourceMap.from_dict(json.loads(json.dumps(source_map.to_dict()))) == source_map
+
+
+def test_translate_history():
+    source_map = SourceMap(titles={"a": "First state", "b": "My map"})
+    events = [
+        {"id": 1, "type": "ExecutionStarted", "executionStartedEventDetails": {"input": "{}"}},
+        {"id": 2, "type": "TaskStateEntered", "stateEnteredEventDetails": {"name": "a", "input": "{}"}},
+        {"id": 3, "type": "TaskStateExited", "stateExitedEventDetails": {"name": "a", "output": "{}"}},
+        {"id": 4, "type": "MapIterationStarted", "mapIterationStartedEventDetails": {"name": "b", "index": 0}},
+    ]
+
+    test = source_map.translate_history(events)
+
+    assert test[1]["stateEnteredEventDetails"]["name"] == "First state"
+    assert test[2]["stateExitedEventDetails"]["name"] == "First state"
+    assert test[3]["mapIterationStartedEventDetails"] == {"name": "My map", "index": 0}
+    assert test[0] == events[0]
+    assert events[1]["stateEnteredEventDetails"]["name"] == "a"
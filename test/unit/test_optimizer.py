@@ -0,0 +1,178 @@
+"""Unit tests for ``rhodes.optimizer``."""
+import pytest
+
+from rhodes.choice_rules import VariablePath
+from rhodes.optimizer import optimize
+from rhodes.states import Choice, Fail, Map, Parallel, Pass, StateMachine, Succeed, Task
+from rhodes.structures import ContextPath, JsonPath, Parameters
+
+pytestmark = [pytest.mark.local, pytest.mark.functional]
+
+RESOURCE = "arn:aws:lambda:us-east-1:123456789012:function:Foo"
+
+
+def test_remove_noop_pass():
+    workflow = StateMachine()
+    workflow.start_with(Pass("Noop")).then(Task("Work", Resource=RESOURCE)).end()
+
+    report = optimize(workflow)
+
+    assert report.removed_passes == 1
+    assert report.transitions_saved == 1
+    assert workflow.StartAt == "Work"
+    assert list(workflow.States) == ["Work"]
+
+
+def test_fuse_promotions():
+    workflow = StateMachine()
+    work = workflow.start_with(Task("Work", Resource=RESOURCE, ResultPath="$.Result"))
+    work.promote("@.Payload").promote("@.Body").end()
+
+    report = optimize(workflow)
+
+    assert report.fused_passes == 1
+    assert workflow.to_dict()["States"]["Work-PromoteResult"] == {
+        "Type": "Pass",
+        "InputPath": "$.Result.Payload.Body",
+        "OutputPath": "$",
+        "ResultPath": "$.Result",
+        "End": True,
+    }
+
+
+def test_fuse_parameters():
+    workflow = StateMachine()
+    workflow.start_with(
+        Pass(
+            "Shape", Parameters=Parameters(Item=JsonPath("$.Records[0]"), Source="queue", Id=ContextPath().Execution.Id)
+        )
+    ).then(
+        Pass(
+            "Select",
+            Parameters=Parameters(Body=JsonPath("$.Item.body"), Source=JsonPath("$.Source"), Id=JsonPath("$.Id")),
+        )
+    ).end()
+
+    report = optimize(workflow)
+
+    assert report.fused_passes == 1
+    assert workflow.to_dict()["States"] == {
+        "Shape": {
+            "Type": "Pass",
+            "InputPath": "$",
+            "OutputPath": "$",
+            "ResultPath": "$",
+            "Parameters": {"Body.$": "$.Records[0].body", "Source": "queue", "Id.$": "$$.Execution.Id"},
+            "End": True,
+        }
+    }
+
+
+def test_do_not_fuse_state_context():
+    workflow = StateMachine()
+    workflow.start_with(Pass("Shape", Parameters=Parameters(Item="foo"))).then(
+        Pass("Select", Parameters=Parameters(Name=ContextPath().State.Name))
+    ).end()
+
+    report = optimize(workflow)
+
+    assert report.transitions_saved == 0
+    assert list(workflow.States) == ["Shape", "Select"]
+
+
+def test_do_not_fuse_shared_target():
+    workflow = StateMachine()
+    decision = workflow.start_with(Choice("Decide"))
+    shared = Pass("Shared", Result={"foo": "bar"})
+    decision.if_(VariablePath("$.foo") == "bar").then(Pass("Left", InputPath="$.left")).then(shared)
+    decision.else_(Pass("Right", InputPath="$.right")).then(shared)
+    shared.end()
+
+    report = optimize(workflow)
+
+    assert report.transitions_saved == 0
+    assert set(workflow.States) == {"Decide", "Left", "Right", "Shared"}
+
+
+def test_fold_projection_into_next_state():
+    workflow = StateMachine()
+    workflow.start_with(Pass("Select", InputPath="$.detail")).then(Task("Work", Resource=RESOURCE)).end()
+
+    report = optimize(workflow)
+
+    assert report.folded_passes == 1
+    assert workflow.StartAt == "Work"
+    assert str(workflow.States["Work"].InputPath) == "$.detail"
+
+
+def test_do_not_fold_into_state_that_reads_raw_input():
+    workflow = StateMachine()
+    workflow.start_with(Pass("Select", InputPath="$.detail")).then(
+        Task("Work", Resource=RESOURCE, ResultPath="$.Result")
+    ).end()
+
+    report = optimize(workflow)
+
+    assert report.transitions_saved == 0
+
+
+def test_collapse_trivial_choice():
+    workflow = StateMachine()
+    decision = workflow.start_with(Choice("Decide"))
+    work = decision.if_(VariablePath("$.foo") == "bar").then(Task("Work", Resource=RESOURCE))
+    decision.else_(work)
+    work.end()
+
+    report = optimize(workflow)
+
+    assert report.collapsed_choices == 1
+    assert workflow.StartAt == "Work"
+    assert list(workflow.States) == ["Work"]
+
+
+def test_deduplicate_terminals():
+    workflow = StateMachine()
+    decision = workflow.start_with(Choice("Decide"))
+    decision.if_(VariablePath("$.foo") == "bar").then(Succeed("Done"))
+    decision.if_(VariablePath("$.foo") == "baz").then(Succeed("AlsoDone"))
+    decision.if_(VariablePath("$.foo") == "wat").then(Fail("Broken", Error="Wat"))
+    decision.else_(Fail("AlsoBroken", Error="Wat", Comment="Same error"))
+
+    report = optimize(workflow)
+
+    assert report.deduplicated_terminals == 2
+    assert report.transitions_saved == 0
+    assert [rule.Next for rule in decision.Choices] == ["Done", "Done", "Broken"]
+    assert decision.Default == "Broken"
+    assert set(workflow.States) == {"Decide", "Done", "Broken"}
+
+
+def test_rewire_catchers():
+    workflow = StateMachine()
+    catchers = [{"ErrorEquals": ["States.ALL"], "Next": "HandleError"}]
+    work = workflow.start_with(Task("Work", Resource=RESOURCE, Catch=catchers))
+    work.then(Succeed("Done"))
+    workflow.add_state(Pass("HandleError", Next="Failed"))
+    workflow.add_state(Fail("Failed"))
+
+    optimize(workflow)
+
+    assert work.Catch == [{"ErrorEquals": ["States.ALL"], "Next": "Failed"}]
+    assert catchers[0]["Next"] == "HandleError"
+
+
+def test_nested_machines():
+    workflow = StateMachine()
+    parallel = workflow.start_with(Parallel("Parallel"))
+    branch = parallel.add_branch()
+    branch.start_with(Pass("BranchNoop")).then(Task("BranchWork", Resource=RESOURCE)).end()
+    iterator = StateMachine()
+    iterator.start_with(Pass("IteratorNoop")).then(Task("IteratorWork", Resource=RESOURCE)).end()
+    parallel.then(Map("Map", Iterator=iterator, ItemsPath="$.items")).end()
+
+    report = optimize(workflow)
+
+    assert report.removed_passes == 2
+    assert branch.StartAt == "BranchWork"
+    assert iterator.StartAt == "IteratorWork"
+    workflow.to_dict()
@@ -0,0 +1,124 @@
+"""Unit tests for ``rhodes.partition``."""
+import pytest
+
+from rhodes.choice_rules import VariablePath
+from rhodes.exceptions import PartitionError
+from rhodes.identifiers import IntegrationPattern
+from rhodes.partition import PartitionLimits, partition
+from rhodes.states import Choice, Pass, StateMachine, Task
+from rhodes.states.services.stepfunctions import AwsStepFunctions
+from rhodes.structures import ContextPath, Parameters
+
+pytestmark = [pytest.mark.local, pytest.mark.functional]
+
+RESOURCE = "arn:aws:lambda:us-east-1:123456789012:function:Foo"
+
+
+def _chain(count: int) -> StateMachine:
+    workflow = StateMachine()
+    state = workflow.start_with(Task("Step0", Resource=RESOURCE))
+    for pos in range(1, count):
+        state = state.then(Task(f"Step{pos}", Resource=RESOURCE))
+    state.end()
+    return workflow
+
+
+def _diamond() -> StateMachine:
+    workflow = StateMachine()
+    decision = workflow.start_with(Task("Start", Resource=RESOURCE)).then(Choice("Decide"))
+    join = Task("Join", Resource=RESOURCE)
+    decision.if_(VariablePath("$.foo") == "bar").then(Pass("Left")).then(join)
+    decision.else_(Pass("Right")).then(join)
+    join.then(Task("Finish", Resource=RESOURCE)).end()
+    return workflow
+
+
+def test_partition_fits_without_changes():
+    workflow = _chain(3)
+
+    test = partition(workflow)
+
+    assert test.children == {}
+    assert test.parent.to_dict() == workflow.to_dict()
+
+
+def test_partition_chain():
+    workflow = _chain(12)
+    limits = PartitionLimits(max_states=5)
+
+    test = partition(workflow, limits)
+
+    for machine in [test.parent] + list(test.children.values()):
+        assert len(machine.States) <= 5
+        machine.to_dict()
+
+    moved = {title for titles in test.regions.values() for title in titles}
+    assert moved | set(test.parent.States) == set(workflow.States)
+
+
+def test_partition_replaces_region_with_child_execution():
+    workflow = _diamond()
+
+    test = partition(workflow, PartitionLimits(max_states=5))
+
+    assert list(test.parent.States) == ["Start", "Finish"]
+    assert test.regions == {"Child1": ["Start", "Decide", "Left", "Join", "Right"]}
+    task = test.parent.States["Start"]
+    assert isinstance(task, AwsStepFunctions)
+    assert task.Pattern is IntegrationPattern.SYNCHRONOUS_JSON
+    assert task.Next == "Finish"
+    assert task.to_dict()["Resource"] == "arn:aws:states:::states:startExecution.sync:2"
+    assert task.to_dict()["OutputPath"] == "$.Output"
+
+    child = test.children["Child1"]
+    assert child.StartAt == "Start"
+    assert child.States["Join"].End is True
+
+
+def test_partition_choice_to_exit():
+    workflow = StateMachine()
+    decision = workflow.start_with(Task("Start", Resource=RESOURCE)).then(Choice("Decide"))
+    # States that read the execution context always stay in the parent.
+    finish = Task("Finish", Resource=RESOURCE, Parameters=Parameters(Id=ContextPath().Execution.Id))
+    decision.if_(VariablePath("$.foo") == "bar").then(Pass("Left")).then(finish)
+    decision.else_(finish)
+    finish.then(Task("Cleanup", Resource=RESOURCE)).end()
+
+    test = partition(workflow, PartitionLimits(max_states=4))
+
+    child = test.children["Child1"]
+    assert test.regions["Child1"] == ["Start", "Decide", "Left"]
+    assert child.States["Decide"].Default == "Finish"
+    assert child.States["Finish"].to_dict() == {"Type": "Succeed"}
+    assert list(test.parent.States) == ["Start", "Finish", "Cleanup"]
+    assert test.parent.States["Start"].Next == "Finish"
+
+
+def test_partition_custom_arn():
+    test = partition(
+        _diamond(), PartitionLimits(max_states=5), state_machine_arn=lambda name: f"arn:{name}", prefix="Part"
+    )
+
+    assert list(test.children) == ["Part1"]
+    assert test.parent.to_dict()["States"]["Start"]["Parameters"]["StateMachineArn"] == "arn:Part1"
+
+
+def test_partition_does_not_modify_state_machine():
+    workflow = _chain(12)
+    before = workflow.to_dict()
+
+    partition(workflow, PartitionLimits(max_states=5))
+
+    assert workflow.to_dict() == before
+
+
+def test_partition_keeps_execution_context_in_parent():
+    workflow = StateMachine()
+    workflow.start_with(Task("Start", Resource=RESOURCE)).then(
+        Task("Named", Resource=RESOURCE, Parameters=Parameters(Id=ContextPath().Execution.Id))
+    ).then(Task("Finish", Resource=RESOURCE)).end()
+
+    with pytest.raises(PartitionError) as excinfo:
+        partition(workflow, PartitionLimits(max_states=2))
+
+    excinfo.match("Unable to find a single-entry/single-exit region")
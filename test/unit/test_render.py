@@ -0,0 +1,182 @@
+"""Unit tests for ``rhodes.render``."""
+import datetime
+
+import pytest
+
+from rhodes.choice_rules import VariablePath
+from rhodes.render import StateStats, history_stats, to_dot, to_mermaid
+from rhodes.states import Choice, Fail, Map, Parallel, Pass, StateMachine, Succeed, Task
+
+from .unit_test_helpers import single_state_machine
+
+pytestmark = [pytest.mark.local, pytest.mark.functional]
+
+RESOURCE = "arn:aws:lambda:us-east-1:123456789012:function:Foo"
+
+
+def _build() -> StateMachine:
+    workflow = StateMachine()
+    work = workflow.start_with(
+        Task("Work", Resource=RESOURCE, Catch=[{"ErrorEquals": ["States.ALL"], "Next": "Failed"}])
+    )
+    decision = work.then(Choice("Decide"))
+    iterator = single_state_machine(Pass("Each"))
+    decision.if_(VariablePath("$.foo") == "bar").then(Map("Repeat", Iterator=iterator, ItemsPath="$.items")).end()
+    decision.else_(Succeed("Done"))
+    workflow.add_state(Fail("Failed"))
+    return workflow
+
+
+def _event(event_id, event_type, timestamp, name=None, **details):
+    event = {"id": event_id, "previousEventId": event_id - 1, "type": event_type, "timestamp": timestamp}
+    if event_type.endswith("StateEntered"):
+        event["stateEnteredEventDetails"] = dict(name=name, **details)
+    elif event_type.endswith("StateExited"):
+        event["stateExitedEventDetails"] = dict(name=name, **details)
+    return event
+
+
+def _history():
+    start = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+
+    def _at(seconds):
+        return start + datetime.timedelta(seconds=seconds)
+
+    return [
+        {"id": 1, "type": "ExecutionStarted", "timestamp": _at(0)},
+        _event(2, "TaskStateEntered", _at(0), "Work"),
+        _event(3, "LambdaFunctionScheduled", _at(0)),
+        _event(4, "LambdaFunctionFailed", _at(1)),
+        _event(5, "LambdaFunctionScheduled", _at(2)),
+        _event(6, "LambdaFunctionSucceeded", _at(3)),
+        _event(7, "TaskStateExited", _at(4), "Work", output='{"foo": "bar"}'),
+        _event(8, "MapStateEntered", _at(4), "Repeat"),
+        _event(9, "MapStateStarted", _at(4)),
+        _event(10, "MapIterationStarted", _at(4)),
+        _event(11, "PassStateEntered", _at(4), "Each"),
+        _event(12, "PassStateExited", _at(5), "Each", output="{}"),
+        _event(13, "MapIterationSucceeded", _at(5)),
+        _event(14, "MapStateSucceeded", _at(5)),
+        _event(15, "MapStateExited", _at(6), "Repeat", output="[{}]"),
+        _event(16, "ExecutionSucceeded", _at(6)),
+    ]
+
+
+def test_history_stats():
+    test = history_stats(_history(), _history())
+
+    assert set(test) == {"Work", "Repeat", "Repeat/Each"}
+    assert test["Work"] == StateStats(
+        visits=2, mean_latency=4.0, p99_latency=4.0, transition_share=1 / 3, payload_bytes=14.0, retry_rate=1.0
+    )
+    assert test["Repeat"].mean_latency == 2.0
+    assert test["Repeat"].retry_rate == 0.0
+    assert test["Repeat/Each"].payload_bytes == 2.0
+
+
+def test_history_stats_percentile():
+    histories = [
+        [
+            _event(1, "PassStateEntered", 0, "Each"),
+            _event(2, "PassStateExited", seconds, "Each", output=""),
+        ]
+        for seconds in range(1, 201)
+    ]
+
+    test = history_stats(*histories)
+
+    assert test["Each"].mean_latency == 100.5
+    assert test["Each"].p99_latency == 198
+
+
+def test_to_dot():
+    test = to_dot(_build())
+
+    assert test.startswith("digraph {\n")
+    assert "start1 -> s2;" in test
+    assert 's2 [label="Work", shape=box];' in test
+    assert 's3 [label="Decide", shape=diamond];' in test
+    assert 's2 -> s4 [label="Catch[0]", style=dashed];' in test
+    assert 's3 -> s5 [label="Choices[0]"];' in test
+    assert "subgraph cluster_" in test
+    assert 'label="Repeat [0]";' in test
+
+
+def test_to_dot_heatmap():
+    stats = {"Work": StateStats(visits=2, mean_latency=4.0), "Decide": StateStats(visits=2, mean_latency=0.1)}
+
+    test = to_dot(_build(), stats)
+
+    assert 'label="Work\\n4s", shape=box, style=filled, fillcolor="#b30000"' in test
+    assert 'label="Decide\\n0.1s", shape=diamond, style=filled, fillcolor="#fef0d9"' in test
+    assert 'label="Done", shape=doubleoctagon];' in test
+
+
+def test_to_mermaid():
+    stats = {"Work": StateStats(visits=2, transition_share=0.5)}
+
+    test = to_mermaid(_build(), stats, metric="transition_share")
+
+    assert test.startswith("flowchart TD\n")
+    assert '  s2["Work<br/>50.0%"]\n  style s2 fill:#b30000\n' in test
+    assert '  s3{"Decide"}\n' in test
+    assert '  s2 -.->|"Catch[0]"| s4\n' in test
+    assert '  s9(["Done"])\n' in test
+    assert "  end\n" in test
+
+
+def test_unknown_metric():
+    with pytest.raises(ValueError) as excinfo:
+        to_dot(_build(), metric="wat")
+
+    excinfo.match("Unknown metric")
+
+
+def _fan_out() -> StateMachine:
+    fan_out = Parallel("FanOut")
+    for _ in range(2):
+        branch = StateMachine()
+        branch.start_with(Task("Work", Resource=RESOURCE)).then(Succeed("Done"))
+        fan_out.add_branch(branch)
+    workflow = StateMachine()
+    workflow.start_with(Task("Work", Resource=RESOURCE)).then(fan_out).end()
+    return workflow
+
+
+def test_to_dot_reused_titles():
+    stats = {"Work": StateStats(mean_latency=1.0), "FanOut/Work": StateStats(mean_latency=4.0)}
+
+    test = to_dot(_fan_out(), stats)
+
+    # One node for the top-level state and one for each branch.
+    assert test.count('label="Work\\n1s"') == 1
+    assert test.count('label="Work\\n4s"') == 2
+    assert test.count('label="Done"') == 2
+    assert "s2 -> s3;" in test
+    assert "s6 -> s7;" in test
+    assert "s10 -> s11;" in test
+
+
+def test_to_mermaid_reused_titles():
+    test = to_mermaid(_fan_out())
+
+    assert len({line.split("[")[0] for line in test.splitlines() if '["Work"]' in line}) == 3
+
+
+def test_history_stats_nested_titles():
+    history = [
+        _event(1, "TaskStateEntered", 0, "Work"),
+        _event(2, "TaskStateExited", 1, "Work", output=""),
+        _event(3, "ParallelStateEntered", 1, "FanOut"),
+        _event(4, "ParallelStateStarted", 1),
+        _event(5, "TaskStateEntered", 1, "Work"),
+        _event(6, "TaskStateExited", 5, "Work", output=""),
+        _event(7, "ParallelStateSucceeded", 5),
+        _event(8, "ParallelStateExited", 5, "FanOut", output=""),
+    ]
+
+    test = history_stats(history)
+
+    assert set(test) == {"Work", "FanOut", "FanOut/Work"}
+    assert test["Work"].mean_latency == 1
+    assert test["FanOut/Work"].mean_latency == 4
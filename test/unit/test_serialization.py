@@ -0,0 +1,107 @@
+"""Unit tests for ``rhodes.serialization``."""
+from enum import Enum
+
+import pytest
+from troposphere import GetAtt, Ref, awslambda, stepfunctions
+
+from rhodes import serialization
+from rhodes.serialization import register_serializer, serialize_value
+from rhodes.states import StateMachine, Task
+from rhodes.structures import JsonPath, Parameters
+
+pytestmark = [pytest.mark.local, pytest.mark.functional]
+
+
+class Color(Enum):
+    RED = "red"
+
+
+class FunctionArn:
+    def __init__(self, name: str):
+        self.arn = f"arn:aws:lambda:us-east-1:123456789012:function:{name}"
+
+
+class VersionedFunctionArn(FunctionArn):
+    pass
+
+
+class HasToDict:
+    def to_dict(self):
+        return {"to": "dict"}
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(serialization, "_SERIALIZERS", dict(serialization._SERIALIZERS))
+    monkeypatch.setattr(serialization, "_RESOLVED", {})
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    (
+        ("plain", "plain"),
+        (3, 3),
+        (None, None),
+        ({"a": 1}, {"a": 1}),
+        (Color.RED, "red"),
+        (HasToDict(), {"to": "dict"}),
+        (JsonPath("$.foo"), "$.foo"),
+        (Parameters(Foo=JsonPath("$.foo")), {"Foo.$": "$.foo"}),
+        (Ref("Thing"), "${Thing}"),
+        (GetAtt("Thing", "Arn"), "${Thing.Arn}"),
+        (stepfunctions.Activity("Approval", Name="approval"), "${Approval}"),
+        (
+            awslambda.Function(
+                "Lookup", Code=awslambda.Code(ZipFile="pass"), Handler="index.handler", Role="role", Runtime="python3.8"
+            ),
+            "${Lookup.Arn}",
+        ),
+    ),
+)
+def test_default_serializers(value, expected):
+    assert serialize_value(value) == expected
+
+
+def test_register_serializer(registry):
+    register_serializer(FunctionArn, lambda value: value.arn)
+
+    workflow = StateMachine()
+    workflow.start_with(Task("Lookup", Resource="placeholder", Parameters=Parameters(Target=FunctionArn("Lookup"))))
+
+    assert workflow.to_dict()["States"]["Lookup"]["Parameters"] == {
+        "Target": "arn:aws:lambda:us-east-1:123456789012:function:Lookup"
+    }
+
+
+def test_register_serializer_decorator(registry):
+    @register_serializer(FunctionArn)
+    def _serialize(value):
+        return value.arn.upper()
+
+    assert _serialize(FunctionArn("a")) == serialize_value(FunctionArn("a"))
+
+
+def test_subclasses_use_nearest_serializer(registry):
+    register_serializer(FunctionArn, lambda value: "base")
+    assert serialize_value(VersionedFunctionArn("a")) == "base"
+
+    # Registering after the subclass was resolved replaces the cached resolution.
+    register_serializer(VersionedFunctionArn, lambda value: "versioned")
+    assert serialize_value(VersionedFunctionArn("a")) == "versioned"
+    assert serialize_value(FunctionArn("a")) == "base"
+
+
+def test_registered_serializer_replaces_defaults(registry):
+    assert serialize_value(HasToDict()) == {"to": "dict"}
+    assert serialize_value(Color.RED) == "red"
+
+    register_serializer(HasToDict, lambda value: "registered")
+    register_serializer(Color, lambda value: value.name)
+
+    assert serialize_value(HasToDict()) == "registered"
+    assert serialize_value(Color.RED) == "RED"
+
+
+def test_register_serializer_requires_type(registry):
+    with pytest.raises(TypeError):
+        register_serializer(FunctionArn("a"), lambda value: value)
@@ -0,0 +1,148 @@
+"""Unit tests for ``rhodes.snapshot``."""
+import io
+import json
+import struct
+import time
+import zlib
+
+import pytest
+
+from rhodes import snapshot
+from rhodes.exceptions import SnapshotError
+from rhodes.loader import LazyStates, load_definition, load_json
+from rhodes.states import Pass, StateMachine, Task
+
+from .unit_test_helpers import single_state_machine, state_machine_body
+
+pytestmark = [pytest.mark.local, pytest.mark.functional]
+
+STATE_MACHINE_VECTORS = (
+    "accretion_builder",
+    "accretion_listener",
+    "hello-world",
+    "simple-choice",
+    "simple-map",
+    "simple-parallel",
+    "three-tasks",
+)
+
+
+@pytest.mark.parametrize("vector_name", STATE_MACHINE_VECTORS)
+def test_round_trip(vector_name):
+    workflow = load_definition(state_machine_body(vector_name))
+
+    data = snapshot.dumps(workflow)
+
+    assert data.startswith(b"RHSNAP")
+    assert snapshot.loads(data).to_dict() == workflow.to_dict()
+
+
+@pytest.mark.parametrize("vector_name", STATE_MACHINE_VECTORS)
+def test_round_trip_file(tmp_path, vector_name):
+    workflow = load_definition(state_machine_body(vector_name))
+    path = str(tmp_path / "workflow.rhsnap")
+
+    snapshot.save(workflow, path)
+
+    assert snapshot.load_file(path).to_dict() == workflow.to_dict()
+    lazy = snapshot.load_file(path, lazy=True)
+    assert isinstance(lazy.States, LazyStates)
+    assert lazy.to_dict() == workflow.to_dict()
+
+
+def test_round_trip_stream():
+    workflow = load_definition(state_machine_body("simple-choice"))
+    stream = io.BytesIO()
+
+    snapshot.dump(workflow, stream)
+    stream.seek(0)
+
+    assert snapshot.load(stream).to_dict() == workflow.to_dict()
+
+
+def test_values():
+    workflow = single_state_machine(
+        Pass("Shape", Result={"big": -(2**70), "float": 1.5, "list": [None, True, False, -1, 0], "text": "ünï"}),
+        TimeoutSeconds=2**70,
+    )
+
+    assert snapshot.loads(snapshot.dumps(workflow)).to_dict() == workflow.to_dict()
+
+
+def test_smaller_than_json():
+    workflow = load_definition(state_machine_body("accretion_listener"))
+
+    assert len(snapshot.dumps(workflow)) < len(json.dumps(workflow.to_dict(), separators=(",", ":")))
+
+
+HEADER = b"RHSNAP" + struct.pack("<HH", snapshot.FORMAT_VERSION, 0)
+
+
+@pytest.mark.parametrize(
+    "data, message",
+    (
+        (b"NOTSNAP\x00\x00\x00", "not a rhodes snapshot"),
+        (b"RHSNAP" + struct.pack("<HH", 1, 0), "Unsupported snapshot format version 1"),
+        (b"RHSNAP", "truncated or corrupt"),
+        (HEADER, "truncated or corrupt"),
+        (HEADER + zlib.compress(b'{"StartAt": "A"}')[:-4], "truncated or corrupt"),
+        (HEADER + b"not zlib", "truncated or corrupt"),
+        (HEADER + zlib.compress(b"{not json"), "truncated or corrupt"),
+        (HEADER + zlib.compress(b"null"), "does not contain a state machine definition"),
+        (HEADER + zlib.compress(b"{}") + b"x", "unexpected data"),
+    ),
+)
+def test_invalid(data, message):
+    with pytest.raises(SnapshotError) as excinfo:
+        snapshot.loads(data)
+
+    excinfo.match(message)
+
+
+def test_order_preserved():
+    workflow = load_definition(state_machine_body("three-tasks"))
+
+    assert list(snapshot.loads(snapshot.dumps(workflow)).States) == list(workflow.States)
+
+
+def _best_time(function, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def test_speed_compared_to_json():
+    workflow = StateMachine()
+    state = workflow.start_with(Pass("Start", Result={"values": list(range(10))}, ResultPath="$.start"))
+    for index in range(200):
+        state = state.then(
+            Task(
+                f"Step {index}",
+                Resource="arn:aws:lambda:us-east-1:123456789012:function:step",
+                ResultPath="$.step",
+                Retry=[{"ErrorEquals": ["States.ALL"], "MaxAttempts": 2}],
+            )
+        )
+    state.end()
+    text = json.dumps(workflow.to_dict())
+    data = snapshot.dumps(workflow)
+
+    # The bounds allow for timing noise; the previous pure-Python codec decoded about six times slower than JSON.
+    decode = _best_time(lambda: snapshot._decode(memoryview(data)))  # pylint: disable=protected-access
+    assert decode < 2 * _best_time(lambda: json.loads(text))
+    assert _best_time(lambda: snapshot.dumps(workflow)) < 1.5 * _best_time(lambda: json.dumps(workflow.to_dict()))
+    assert _best_time(lambda: snapshot.loads(data)) < 1.5 * _best_time(lambda: load_json(text))
+    assert len(data) * 5 < len(text)
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / "empty.rhsnap"
+    path.write_bytes(b"")
+
+    with pytest.raises(SnapshotError) as excinfo:
+        snapshot.load_file(str(path))
+
+    excinfo.match("is empty")
@@ -2,8 +2,12 @@
 import jsonpath_rw
 import pytest
 
-from rhodes.states import Pass, StateMachine
-from rhodes.structures import JsonPath
+from rhodes.exceptions import InvalidDefinitionError
+from rhodes.local import LocalEngine
+from rhodes.states import Map, Parallel, Pass, StateMachine, Task
+from rhodes.structures import ContextPath, ItemBatcher, ItemReader, JsonPath, Parameters, ProcessorConfig, ResultWriter
+
+from .unit_test_helpers import single_state_machine
 
 pytestmark = [pytest.mark.local, pytest.mark.functional]
 
@@ -48,3 +52,196 @@ def test_promote(path_reader, source_result, requested_promotion, expected_input
     assert test.InputPath == JsonPath(expected_input)
     assert test.ResultPath == JsonPath(source_result)
     assert test.member_of is machine
+
+
+FUNCTION = "arn:aws:lambda:us-east-1:123456789012:function:work"
+
+
+def _scale_map(**kwargs) -> Map:
+    iterator = single_state_machine(Task("Scale", Resource=FUNCTION))
+    return Map(
+        "Each",
+        Iterator=iterator,
+        InputPath="$.job",
+        ItemsPath="$.values",
+        Parameters=Parameters(scale=JsonPath("$.scale")),
+        ResultPath="$.scaled",
+        **kwargs,
+    )
+
+
+def test_map_batched_states():
+    batched = _scale_map(MaxConcurrency=2).batched(4)
+
+    assert isinstance(batched, Parallel)
+    assert batched.title == "Each"
+    assert str(batched.OutputPath) == "$[0]"
+
+    branch = batched.Branches[0].to_dict()["States"]
+    assert branch["Each Batch"]["Parameters"] == {
+        "Input.$": "$",
+        "Batches.$": "States.ArrayPartition($.job.values, 4)",
+    }
+    assert branch["Each Batches"]["MaxConcurrency"] == 2
+    assert branch["Each Batches"]["Parameters"] == {"Items.$": "$$.Map.Item.Value", "scale.$": "$.Input.job.scale"}
+    assert branch["Each Flatten"]["InputPath"] == "$.Results[*][*]"
+    assert branch["Each Flatten"]["ResultPath"] == "$.Input.scaled"
+
+
+def test_map_batched_matches_map_output():
+    calls = []
+
+    def _scale_one(event, context):
+        return event["value"] * event["scale"]
+
+    def _scale_batch(event, context):
+        calls.append(len(event["Items"]))
+        return [value * event["scale"] for value in event["Items"]]
+
+    execution_input = {"job": {"values": list(range(10)), "scale": 3}, "other": True}
+
+    each = _scale_map()
+    each.Parameters = Parameters(value=ContextPath("$$.Map.Item.Value"), scale=JsonPath("$.scale"))
+    per_item = single_state_machine(each)
+    batched = single_state_machine(_scale_map().batched(MaxBatchBytes=1000, ItemBytes=250))
+
+    expected = LocalEngine({FUNCTION: _scale_one}).execute(per_item, execution_input)
+    actual = LocalEngine({FUNCTION: _scale_batch}).execute(batched, execution_input)
+
+    assert actual.output == expected.output
+    assert actual.output["scaled"] == [value * 3 for value in range(10)]
+    assert calls == [4, 4, 2]
+
+
+@pytest.mark.parametrize(
+    "kwargs, message",
+    (
+        ({}, "At least one of BatchSize and MaxBatchBytes"),
+        ({"MaxBatchBytes": 100}, "ItemBytes is required"),
+        ({"MaxBatchBytes": 100, "ItemBytes": 200}, "at least one item"),
+        ({"BatchSize": 0}, "at least one item"),
+    ),
+)
+def test_map_batched_invalid_size(kwargs, message):
+    with pytest.raises(ValueError) as excinfo:
+        _scale_map().batched(**kwargs)
+
+    excinfo.match(message)
+
+
+def test_map_batched_item_parameters():
+    each = _scale_map()
+    each.Parameters = Parameters(value=ContextPath("$$.Map.Item.Value"))
+
+    with pytest.raises(InvalidDefinitionError) as excinfo:
+        each.batched(10)
+
+    excinfo.match("refer to a single item")
+
+
+def test_json_path_brackets():
+    assert str(JsonPath("$.items[0]")) == "$.items[0]"
+    assert str(JsonPath("$[*][*]")) == "$[*][*]"
+
+
+def _distributed_map(**kwargs) -> Map:
+    processor = single_state_machine(Task("Scale", Resource=FUNCTION))
+    return Map("Each", ItemProcessor=processor, ProcessorConfig=ProcessorConfig.distributed(), **kwargs)
+
+
+def test_map_distributed_to_dict():
+    each = _distributed_map(
+        ItemReader=ItemReader.csv_file("data", "rows.csv"),
+        ItemSelector=Parameters(row=ContextPath().Map.Item.Value),
+        ItemBatcher=ItemBatcher(MaxItemsPerBatch=50),
+        ResultWriter=ResultWriter.s3("results", "rows"),
+        ToleratedFailurePercentage=5,
+        Label="Rows",
+        End=True,
+    )
+
+    test = each.to_dict()
+
+    assert each.distributed
+    assert each.processor is each.ItemProcessor
+    assert test["ItemProcessor"]["ProcessorConfig"] == {"Mode": "DISTRIBUTED", "ExecutionType": "STANDARD"}
+    assert test["ItemProcessor"]["StartAt"] == "Scale"
+    assert "ProcessorConfig" not in test
+    assert test["ItemReader"]["ReaderConfig"] == {"InputType": "CSV", "CSVHeaderLocation": "FIRST_ROW"}
+    assert test["ItemSelector"] == {"row.$": "$$.Map.Item.Value"}
+    assert test["ItemBatcher"] == {"MaxItemsPerBatch": 50}
+    assert test["ResultWriter"]["Parameters"] == {"Bucket": "results", "Prefix": "rows"}
+    assert test["ToleratedFailurePercentage"] == 5
+    assert test["Label"] == "Rows"
+
+
+@pytest.mark.parametrize(
+    "build, message",
+    (
+        pytest.param(lambda: Map("Each", ItemsPath="$.values"), "Map iterator must be set", id="no iterator"),
+        pytest.param(
+            lambda: _distributed_map(Iterator=StateMachine(), ItemsPath="$.values"),
+            "Only one of 'Iterator' and 'ItemProcessor'",
+            id="both iterators",
+        ),
+        pytest.param(lambda: _distributed_map(), "Map items path must be set", id="no items"),
+        pytest.param(
+            lambda: _distributed_map(ItemsPath="$.values", ItemReader=ItemReader.json_file("data", "items.json")),
+            "Only one of 'ItemsPath' and 'ItemReader'",
+            id="items path and reader",
+        ),
+        pytest.param(
+            lambda: _scale_map(ItemBatcher=ItemBatcher(MaxItemsPerBatch=10)),
+            "'ItemBatcher' requires DISTRIBUTED processing",
+            id="inline batcher",
+        ),
+        pytest.param(
+            lambda: _scale_map(ProcessorConfig=ProcessorConfig()),
+            "ProcessorConfig requires 'ItemProcessor'",
+            id="iterator config",
+        ),
+        pytest.param(
+            lambda: _scale_map(ItemSelector=Parameters(value=1)),
+            "Only one of 'Parameters' and 'ItemSelector'",
+            id="parameters and selector",
+        ),
+    ),
+)
+def test_map_invalid_fields(build, message):
+    with pytest.raises(InvalidDefinitionError) as excinfo:
+        build().to_dict()
+
+    excinfo.match(message)
+
+
+@pytest.mark.parametrize(
+    "kwargs, message",
+    (
+        (dict(ToleratedFailurePercentage=101), "between 0 and 100"),
+        (dict(ToleratedFailureCount=-1), "must not be negative"),
+        (dict(Label="x" * 41), "Invalid Map label"),
+        (dict(Label="two words"), "Invalid Map label"),
+    ),
+)
+def test_map_invalid_distributed_values(kwargs, message):
+    with pytest.raises(ValueError) as excinfo:
+        _distributed_map(ItemsPath="$.values", **kwargs)
+
+    excinfo.match(message)
+
+
+def test_map_batched_distributed():
+    with pytest.raises(InvalidDefinitionError) as excinfo:
+        _distributed_map(ItemsPath="$.values").batched(10)
+
+    excinfo.match("use an ItemBatcher")
+
+
+def test_map_batched_item_processor():
+    each = _distributed_map(ItemsPath="$.values", ItemSelector=Parameters(scale=JsonPath("$.scale")))
+    each.ProcessorConfig = ProcessorConfig()
+
+    branch = each.batched(10).Branches[0].to_dict()["States"]
+
+    assert branch["Each Batches"]["ItemProcessor"]["ProcessorConfig"] == {"Mode": "INLINE"}
+    assert branch["Each Batches"]["ItemSelector"] == {"Items.$": "$$.Map.Item.Value", "scale.$": "$.Input.scale"}
@@ -1,7 +1,19 @@
 """Unit tests for ``rhodes.structures``."""
+import copy
+
 import pytest
 
-from rhodes.structures import ContextPath, Parameters
+from rhodes.identifiers import ExecutionType, MapMode
+from rhodes.structures import (
+    ContextPath,
+    ItemBatcher,
+    ItemReader,
+    JsonPath,
+    Parameters,
+    ProcessorConfig,
+    ReaderConfig,
+    ResultWriter,
+)
 
 pytestmark = [pytest.mark.local, pytest.mark.functional]
 
@@ -80,3 +92,113 @@ def test_parameters_repr():
     test = Parameters(a="A", b=3, c=True)
 
     assert repr(test) == "Parameters(a='A', b=3, c=True)"
+
+
+def test_contextpath_copy():
+    test = ContextPath().Execution.Id
+
+    assert copy.deepcopy(test) == test
+
+
+def test_processor_config_distributed():
+    test = ProcessorConfig.distributed("EXPRESS")
+
+    assert test.Mode is MapMode.DISTRIBUTED
+    assert test.ExecutionType is ExecutionType.EXPRESS
+    assert test.to_dict() == {"Mode": "DISTRIBUTED", "ExecutionType": "EXPRESS"}
+
+
+@pytest.mark.parametrize(
+    "kwargs, message",
+    (
+        pytest.param(dict(Mode="DISTRIBUTED"), "ExecutionType is required", id="distributed without type"),
+        pytest.param(dict(ExecutionType="STANDARD"), "only allowed for DISTRIBUTED", id="inline with type"),
+    ),
+)
+def test_processor_config_invalid(kwargs, message):
+    with pytest.raises(ValueError) as excinfo:
+        ProcessorConfig(**kwargs)
+
+    excinfo.match(message)
+
+
+@pytest.mark.parametrize(
+    "reader, expected",
+    (
+        pytest.param(
+            ItemReader.s3_objects("data", "input/", MaxItems=10),
+            {
+                "Resource": "arn:aws:states:::s3:listObjectsV2",
+                "Parameters": {"Bucket": "data", "Prefix": "input/"},
+                "ReaderConfig": {"MaxItems": 10},
+            },
+            id="objects",
+        ),
+        pytest.param(
+            ItemReader.json_file("data", JsonPath("$.key")),
+            {
+                "Resource": "arn:aws:states:::s3:getObject",
+                "Parameters": {"Bucket": "data", "Key.$": "$.key"},
+                "ReaderConfig": {"InputType": "JSON"},
+            },
+            id="json",
+        ),
+        pytest.param(
+            ItemReader.csv_file("data", "rows.csv", CSVHeaders=["id", "value"]),
+            {
+                "Resource": "arn:aws:states:::s3:getObject",
+                "Parameters": {"Bucket": "data", "Key": "rows.csv"},
+                "ReaderConfig": {"InputType": "CSV", "CSVHeaderLocation": "GIVEN", "CSVHeaders": ["id", "value"]},
+            },
+            id="csv",
+        ),
+        pytest.param(
+            ItemReader.manifest("inventory", "manifest.json"),
+            {
+                "Resource": "arn:aws:states:::s3:getObject",
+                "Parameters": {"Bucket": "inventory", "Key": "manifest.json"},
+                "ReaderConfig": {"InputType": "MANIFEST"},
+            },
+            id="manifest",
+        ),
+    ),
+)
+def test_item_reader(reader, expected):
+    assert reader.to_dict() == expected
+
+
+def test_reader_config_headers_require_given_location():
+    with pytest.raises(ValueError) as excinfo:
+        ReaderConfig(InputType="CSV", CSVHeaders=["id"])
+
+    excinfo.match("CSVHeaders must be set if and only if CSVHeaderLocation is GIVEN")
+
+
+def test_item_batcher():
+    test = ItemBatcher(MaxItemsPerBatch=100, MaxInputBytesPerBatch=1024, BatchInput=Parameters(run=JsonPath("$.run")))
+
+    assert test.to_dict() == {"MaxItemsPerBatch": 100, "MaxInputBytesPerBatch": 1024, "BatchInput": {"run.$": "$.run"}}
+
+
+@pytest.mark.parametrize(
+    "kwargs, message",
+    (
+        pytest.param({}, "At least one of", id="no limit"),
+        pytest.param(dict(MaxItemsPerBatch=0), "must be at least 1", id="no items"),
+        pytest.param(dict(MaxInputBytesPerBatch=256 * 1024 + 1), "must not be more than", id="too big"),
+    ),
+)
+def test_item_batcher_invalid(kwargs, message):
+    with pytest.raises(ValueError) as excinfo:
+        ItemBatcher(**kwargs)
+
+    excinfo.match(message)
+
+
+def test_result_writer():
+    test = ResultWriter.s3("results", JsonPath("$.prefix"))
+
+    assert test.to_dict() == {
+        "Resource": "arn:aws:states:::s3:putObject",
+        "Parameters": {"Bucket": "results", "Prefix.$": "$.prefix"},
+    }
@@ -0,0 +1,90 @@
+"""Unit tests for ``rhodes.substitutions``."""
+import json
+
+import pytest
+from troposphere import GetAtt, awslambda, stepfunctions
+
+from rhodes.states import StateMachine, Task
+from rhodes.structures import Parameters
+from rhodes.substitutions import extract_substitutions
+
+from .unit_test_helpers import state_machine_body
+
+pytestmark = [pytest.mark.local, pytest.mark.functional]
+
+
+def _function(title: str) -> awslambda.Function:
+    return awslambda.Function(
+        title, Code=awslambda.Code(ZipFile="pass"), Handler="index.handler", Role="role", Runtime="python3.8"
+    )
+
+
+def _build(repeats: int = 20) -> StateMachine:
+    lookup = _function("LookupFunction")
+    store = _function("StoreFunction")
+    activity = stepfunctions.Activity("Approval", Name="approval")
+
+    workflow = StateMachine(Comment="Region ${AWS::Region}, literal ${!Literal}")
+    state = workflow.start_with(Task("Approve", Resource=activity))
+    for pos in range(repeats):
+        state = state.then(Task(f"Lookup{pos}", Resource=lookup, Parameters=Parameters(Target=GetAtt(store, "Arn"))))
+    state.end()
+    return workflow
+
+
+def _resolve(substituted) -> str:
+    """Put the references back in place of the placeholders, as Fn::Sub would see them."""
+    text = json.dumps(substituted.definition)
+    for placeholder, value in substituted.substitutions.items():
+        data = value.to_dict()
+        reference = data["Ref"] if "Ref" in data else ".".join(data["Fn::GetAtt"])
+        text = text.replace(f"${{{placeholder}}}", f"${{{reference}}}")
+    return text
+
+
+def test_definition_substitutions():
+    workflow = _build()
+
+    substituted = workflow.definition_substitutions()
+
+    assert {name: value.to_dict() for name, value in substituted.substitutions.items()} == {
+        "ra": {"Ref": "AWS::Region"},
+        "rb": {"Ref": "Approval"},
+        "rc": {"Fn::GetAtt": ["LookupFunction", "Arn"]},
+        "rd": {"Fn::GetAtt": ["StoreFunction", "Arn"]},
+    }
+    assert substituted.definition["Comment"] == "Region ${ra}, literal ${!Literal}"
+    assert substituted.definition["States"]["Lookup3"]["Resource"] == "${rc}"
+    assert _resolve(substituted) == workflow.definition_string().to_dict()["Fn::Sub"]
+
+
+def test_bytes_saved():
+    substituted = _build().definition_substitutions()
+
+    definition_string_bytes = len(
+        json.dumps({"DefinitionString": _build().definition_string().to_dict()}, separators=(",", ":"))
+    )
+    assert substituted.definition_string_bytes == definition_string_bytes
+    assert substituted.bytes_saved == definition_string_bytes - substituted.template_bytes
+    assert substituted.bytes_saved > 0
+
+
+def test_no_references():
+    definition = state_machine_body("hello-world")
+
+    substituted = extract_substitutions(definition)
+
+    assert substituted.to_dict() == definition
+    assert substituted.substitutions == {}
+    assert substituted.resource_properties() == {"Definition": definition}
+
+
+def test_state_machine_resource():
+    substituted = _build(repeats=1).definition_substitutions()
+
+    resource = substituted.state_machine_resource("Workflow", RoleArn="arn:aws:iam::123456789012:role/Workflow")
+
+    properties = resource.to_dict()["Properties"]
+    assert properties["Definition"] == substituted.definition
+    assert properties["DefinitionSubstitutions"]["rc"] == {"Fn::GetAtt": ["LookupFunction", "Arn"]}
+    assert "DefinitionString" not in properties
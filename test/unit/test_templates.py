@@ -0,0 +1,127 @@
+"""Unit tests for ``rhodes.templates``."""
+import copy
+import json
+import pickle
+import re
+from enum import Enum
+
+import pytest
+from troposphere import Ref
+
+from rhodes.exceptions import TemplateError
+from rhodes.states import Parallel, StateMachine, Task
+from rhodes.states.services.dynamodb import AmazonDynamoDbPutItem
+from rhodes.structures import JsonPath, Parameters
+from rhodes.templates import DefinitionTemplate, Slot, compile_template
+
+pytestmark = [pytest.mark.local, pytest.mark.functional]
+
+PRODUCTION = {
+    "Function": "arn:aws:lambda:us-east-1:123456789012:function:Lookup",
+    "Table": "orders-prod",
+    "Region": "us-east-1",
+}
+STAGING = {
+    "Function": "arn:aws:lambda:eu-west-1:210987654321:function:Lookup",
+    "Table": 'orders "staging" \\ été',
+    "Region": "eu-west-1",
+}
+
+
+class Tables(Enum):
+    ORDERS = "orders-enum"
+
+
+def _build(function, table, region) -> StateMachine:
+    workflow = StateMachine(Comment="Template test")
+    lookup = workflow.start_with(
+        Task("Lookup", Resource=function, Parameters=Parameters(Region=region, Queue=f"https://sqs.{region}/queue"))
+    )
+    fan_out = lookup.then(Parallel("FanOut"))
+    branch = fan_out.add_branch()
+    branch.start_with(AmazonDynamoDbPutItem("Store", TableName=table, Item=JsonPath("$.order"))).end()
+    fan_out.end()
+    return workflow
+
+
+def _template(function_pattern: str = r"arn:aws:lambda:.+", **kwargs) -> DefinitionTemplate:
+    workflow = _build(function=Slot("Function", pattern=function_pattern), table=Slot("Table"), region=Slot("Region"))
+    return compile_template(workflow, **kwargs)
+
+
+@pytest.mark.parametrize("values", (PRODUCTION, STAGING))
+@pytest.mark.parametrize(
+    "options",
+    (
+        {},
+        {"indent": 4},
+        {"separators": (",", ":")},
+        {"ensure_ascii": False},
+    ),
+)
+def test_substitute_matches_fresh_build(values, options):
+    template = _template(**options)
+
+    fresh = _build(function=values["Function"], table=values["Table"], region=values["Region"])
+
+    assert template.substitute(values) == json.dumps(fresh.to_dict(), **options)
+    assert template.to_dict(values) == fresh.to_dict()
+
+
+def test_names():
+    template = _template()
+
+    assert template.names == ["Function", "Region", "Table"]
+    assert template.patterns == {"Function": r"arn:aws:lambda:.+"}
+
+
+def test_definition_string_with_helper_values():
+    template = _template(function_pattern=None)
+    values = dict(PRODUCTION, Function=Ref("LookupFunction"), Table=Tables.ORDERS)
+
+    fresh = _build(function=Ref("LookupFunction"), table=Tables.ORDERS, region=PRODUCTION["Region"])
+
+    assert template.definition_string(values).to_dict() == fresh.definition_string().to_dict()
+
+
+@pytest.mark.parametrize(
+    "values, message",
+    (
+        ({"Function": PRODUCTION["Function"], "Table": "t"}, "No values for slots: ['Region']"),
+        (dict(PRODUCTION, Extra="x"), "not in the template: ['Extra']"),
+        (dict(PRODUCTION, Function="not-an-arn"), "does not match"),
+        (dict(PRODUCTION, Table=3), "must serialize to a string"),
+        (dict(PRODUCTION, Table=Slot("Other")), "is itself a slot"),
+    ),
+)
+def test_substitute_errors(values, message):
+    with pytest.raises(TemplateError) as excinfo:
+        _template().substitute(values)
+
+    excinfo.match(re.escape(message))
+
+
+def test_conflicting_patterns():
+    workflow = _build(function=Slot("Function", pattern="a.*"), table=Slot("Function", pattern="b.*"), region="r")
+
+    with pytest.raises(TemplateError) as excinfo:
+        compile_template(workflow)
+
+    excinfo.match("conflicting patterns")
+
+
+@pytest.mark.parametrize("name", ("", "has space", "has}brace", 3))
+def test_invalid_slot_name(name):
+    with pytest.raises(ValueError):
+        Slot(name)
+
+
+def test_slot_copy_and_pickle():
+    slot = Slot("Function", pattern="arn:.+")
+
+    for copied in (copy.copy(slot), copy.deepcopy(slot), pickle.loads(pickle.dumps(slot))):
+        assert copied == slot
+        assert (copied.name, copied.pattern) == ("Function", "arn:.+")
+
+    template = _template()
+    assert pickle.loads(pickle.dumps(template)).substitute(PRODUCTION) == template.substitute(PRODUCTION)
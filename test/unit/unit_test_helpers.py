@@ -8,6 +8,7 @@ from typing import Dict
 import jsonpath_rw
 import pytest
 
+from rhodes.states import State, StateMachine
 from rhodes.structures import JsonPath
 
 __all__ = (
@@ -19,6 +20,7 @@ __all__ = (
     "compare_state",
     "compare_choice_rule",
     "path_converter",
+    "single_state_machine",
 )
 HERE = Path(__file__).parent
 VECTORS_DIR = HERE / ".." / "vectors"
@@ -78,3 +80,9 @@ def _assert_equal_to_vector(vector_type: VectorTypes, vector_name: str, value: D
 compare_state_machine = partial(_assert_equal_to_vector, VectorTypes.STATE_MACHINE)
 compare_state = partial(_assert_equal_to_vector, VectorTypes.STATE)
 compare_choice_rule = partial(_assert_equal_to_vector, VectorTypes.CHOICE_RULE)
+
+
+def single_state_machine(state: State, **kwargs) -> StateMachine:
+    workflow = StateMachine(**kwargs)
+    workflow.start_with(state).end()
+    return workflow